@@ -34,8 +34,11 @@ class Aerogrid(Grid):
 
         self.cs_generators = []
 
+        self.strip_templates = None
+
     def generate(self, data_dict, beam, settings, ts):
         super().generate(data_dict, beam, settings, ts)
+        self.strip_templates = None
 
         # write grid info to screen
         self.output_info()
@@ -143,16 +146,6 @@ class Aerogrid(Grid):
     def generate_zeta_timestep_info(self, structure_tstep, aero_tstep, beam, settings, it=None, dt=None):
         if it is None:
             it = len(beam.timestep_info) - 1
-        global_node_in_surface = []
-        for i_surf in range(self.n_surf):
-            global_node_in_surface.append([])
-
-        # check that we have control surface information
-        try:
-            self.data_dict['control_surface']
-            with_control_surfaces = True
-        except KeyError:
-            with_control_surfaces = False
 
         # check that we have sweep information
         try:
@@ -164,7 +157,70 @@ class Aerogrid(Grid):
         if 'first_twist' not in self.data_dict:     
             self.data_dict['first_twist'] = [True]*self.data_dict['surface_m'].shape[0]
         
-        # one surface per element
+        if self.strip_templates is None:
+            self.generate_strip_templates()
+
+        cga = structure_tstep.cga()
+        # control surface deflections are evaluated once per call and shared by the nodes of each surface
+        control_surface_info = dict()
+        for i_surf, template in enumerate(self.strip_templates):
+            i_elem = template['i_elem']
+            i_local_node = template['i_local_node']
+            i_global_node = template['i_global_node']
+
+            strip_coordinates_b_frame = template['strip_coordinates_b_frame']
+            cs_velocity = None
+            if len(template['control_surface_nodes']) > 0:
+                strip_coordinates_b_frame = strip_coordinates_b_frame.copy()
+                for i_node, i_control_surface in template['control_surface_nodes']:
+                    if i_control_surface not in control_surface_info:
+                        control_surface_info[i_control_surface] = self.get_control_surface_info(
+                            i_control_surface, aero_tstep, it, dt)
+                    deflected_coords, node_cs_velocity = deflect_control_surface(
+                        template['undeflected_b_frame'][i_node],
+                        dict(control_surface_info[i_control_surface]))
+                    strip_coordinates_b_frame[i_node] = np.dot(template['chord_twist'][i_node], deflected_coords)
+                    if node_cs_velocity is not None:
+                        if cs_velocity is None:
+                            cs_velocity = np.zeros_like(strip_coordinates_b_frame)
+                        cs_velocity[i_node] = node_cs_velocity
+
+            zeta, zeta_dot = generate_strips(strip_coordinates_b_frame,
+                                             template['c_sweep'],
+                                             structure_tstep.psi[i_elem, i_local_node, :],
+                                             structure_tstep.psi_dot[i_elem, i_local_node, :],
+                                             structure_tstep.pos[i_global_node, :],
+                                             structure_tstep.pos_dot[i_global_node, :],
+                                             cga,
+                                             orientation_in=self.aero_settings['freestream_dir'],
+                                             cs_velocity=cs_velocity,
+                                             uniform=template['uniform'])
+            aero_tstep.zeta[i_surf][:, :, template['i_n']] = zeta.transpose((1, 2, 0))
+            aero_tstep.zeta_dot[i_surf][:, :, template['i_n']] = zeta_dot.transpose((1, 2, 0))
+
+        # set junction boundary conditions for later phantom cell creation in UVLM
+        if "junction_boundary_condition" in self.data_dict:
+            if np.any(self.data_dict["junction_boundary_condition"] >= 0):
+                self.generate_phantom_panels_at_junction(aero_tstep)
+
+    def generate_strip_templates(self):
+        """
+        Precomputes, for every node of each surface, the part of the strip geometry that does not change in time.
+
+        The chordwise distribution, camber, elastic axis offset, chord and twist are stored in ``B`` frame as a
+        ``(n_nodes, 3, M + 1)`` array per surface, together with the sweep rotations and the index arrays that
+        relate the nodes to the structure and to the ``i_n`` spanwise position of the lattice. The undeflected
+        coordinates of the nodes with control surfaces are kept before scaling, since the deflection is applied
+        about the hinge before the chord and twist.
+
+        The templates are generated in the first call to ``generate_zeta_timestep_info`` and discarded when
+        the grid is generated again.
+        """
+        with_control_surfaces = 'control_surface' in self.data_dict
+        m_distribution = self.data_dict['m_distribution'].decode('ascii')
+
+        nodes = [[] for _ in range(self.n_surf)]
+        global_node_in_surface = [[] for _ in range(self.n_surf)]
         for i_elem in range(self.n_elem):
             i_surf = self.data_dict['surface_distribution'][i_elem]
             # check if we have to generate a surface here
@@ -173,8 +229,6 @@ class Aerogrid(Grid):
 
             for i_local_node in range(len(self.beam.elements[i_elem].global_connectivities)):
                 i_global_node = self.beam.elements[i_elem].global_connectivities[i_local_node]
-                # i_global_node = self.beam.elements[i_elem].global_connectivities[
-                #     self.beam.elements[i_elem].ordering[i_local_node]]
                 if not self.data_dict['aero_node'][i_global_node]:
                     continue
                 if i_global_node in global_node_in_surface[i_surf]:
@@ -182,11 +236,6 @@ class Aerogrid(Grid):
                 else:
                     global_node_in_surface[i_surf].append(i_global_node)
 
-                # master_elem, master_elem_node = beam.master[i_elem, i_local_node, :]
-                # if master_elem < 0:
-                    # master_elem = i_elem
-                    # master_elem_node = i_local_node
-
                 # find the i_surf and i_n data from the mapping
                 i_n = -1
                 ii_surf = -1
@@ -199,102 +248,109 @@ class Aerogrid(Grid):
                 if i_n == -1 or ii_surf == -1:
                     raise AssertionError('Error 12958: Something failed with the mapping in aerogrid.py. Check/report!')
 
-                # control surface implementation
-                control_surface_info = None
+                i_control_surface = -1
                 if with_control_surfaces:
-                # 1) check that this node and elem have a control surface
-                    if self.data_dict['control_surface'][i_elem, i_local_node] >= 0:
-                        i_control_surface = self.data_dict['control_surface'][i_elem, i_local_node]
-                # 2) type of control surface + write info
-                        control_surface_info = dict()
-                        if self.data_dict['control_surface_type'][i_control_surface] == 0:
-                            control_surface_info['type'] = 'static'
-                            control_surface_info['deflection'] = self.data_dict['control_surface_deflection'][i_control_surface]
-                            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
-                            try:
-                                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
-                        elif self.data_dict['control_surface_type'][i_control_surface] == 1:
-                            control_surface_info['type'] = 'dynamic'
-                            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
-                            try:
-                                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
-
-                            params = {'it': it}
-                            control_surface_info['deflection'], control_surface_info['deflection_dot'] = \
-                                self.cs_generators[i_control_surface](params)
-
-                        elif self.data_dict['control_surface_type'][i_control_surface] == 2:
-                            control_surface_info['type'] = 'controlled'
-
-                            try:
-                                old_deflection = self.data.aero.timestep_info[-1].control_surface_deflection[i_control_surface]
-                            except AttributeError:
-                                try:
-                                    old_deflection = aero_tstep.control_surface_deflection[i_control_surface]
-                                except IndexError:
-                                    old_deflection = self.data_dict['control_surface_deflection'][i_control_surface]
-
-                            try:
-                                control_surface_info['deflection'] = aero_tstep.control_surface_deflection[i_control_surface]
-                            except IndexError:
-                                control_surface_info['deflection'] = self.data_dict['control_surface_deflection'][i_control_surface]
-
-                            if dt is not None:
-                                control_surface_info['deflection_dot'] = (
-                                        (control_surface_info['deflection'] - old_deflection)/dt)
-                            else:
-                                control_surface_info['deflection_dot'] = 0.0
-
-                            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
-
-                            try:
-                                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
-                        else:
-                            raise NotImplementedError(str(self.data_dict['control_surface_type'][i_control_surface]) +
-                                ' control surfaces are not yet implemented')
-
-
+                    i_control_surface = self.data_dict['control_surface'][i_elem, i_local_node]
 
                 node_info = dict()
-                node_info['i_node'] = i_global_node
-                node_info['i_local_node'] = i_local_node
-                node_info['chord'] = self.data_dict['chord'][i_elem, i_local_node]
-                node_info['eaxis'] = self.data_dict['elastic_axis'][i_elem, i_local_node]
-                node_info['twist'] = self.data_dict['twist'][i_elem, i_local_node]
-                node_info['sweep'] = self.data_dict['sweep'][i_elem, i_local_node]
                 node_info['M'] = self.dimensions[i_surf, 0]
-                node_info['M_distribution'] = self.data_dict['m_distribution'].decode('ascii')
+                node_info['M_distribution'] = m_distribution
                 node_info['airfoil'] = self.data_dict['airfoil_distribution'][i_elem, i_local_node]
-                node_info['control_surface'] = control_surface_info
-                node_info['beam_coord'] = structure_tstep.pos[i_global_node, :]
-                node_info['pos_dot'] = structure_tstep.pos_dot[i_global_node, :]
-                node_info['beam_psi'] = structure_tstep.psi[i_elem, i_local_node, :]
-                node_info['psi_dot'] = structure_tstep.psi_dot[i_elem, i_local_node, :]
-                node_info['for_delta'] = beam.frame_of_reference_delta[i_elem, i_local_node, :]
-                node_info['elem'] = beam.elements[i_elem]
-                node_info['for_pos'] = structure_tstep.for_pos
-                node_info['cga'] = structure_tstep.cga()
-                if node_info['M_distribution'].lower() == 'user_defined':
+                node_info['eaxis'] = self.data_dict['elastic_axis'][i_elem, i_local_node]
+                if m_distribution.lower() == 'user_defined':
                     ielem_in_surf = i_elem - np.sum(self.surface_distribution < i_surf)
-                    node_info['user_defined_m_distribution'] = self.data_dict['user_defined_m_distribution'][str(i_surf)][:, ielem_in_surf, i_local_node]
-                (aero_tstep.zeta[i_surf][:, :, i_n],
-                 aero_tstep.zeta_dot[i_surf][:, :, i_n]) = (
-                    generate_strip(node_info,
-                                   self.airfoil_db,
-                                   self.aero_settings['aligned_grid'],
-                                   orientation_in=self.aero_settings['freestream_dir'],
-                                   calculate_zeta_dot=True))
-        # set junction boundary conditions for later phantom cell creation in UVLM
-        if "junction_boundary_condition" in self.data_dict:
-            if np.any(self.data_dict["junction_boundary_condition"] >= 0):
-                self.generate_phantom_panels_at_junction(aero_tstep)
+                    node_info['user_defined_m_distribution'] = \
+                        self.data_dict['user_defined_m_distribution'][str(i_surf)][:, ielem_in_surf, i_local_node]
 
+                twist = self.data_dict['twist'][i_elem, i_local_node]
+                if np.abs(twist) > 1e-6:
+                    chord_twist = self.data_dict['chord'][i_elem, i_local_node]*algebra.rotation3d_x(twist)
+                else:
+                    chord_twist = self.data_dict['chord'][i_elem, i_local_node]*np.eye(3)
+
+                sweep = self.data_dict['sweep'][i_elem, i_local_node]
+                c_sweep = np.eye(3)
+                if np.abs(sweep) > 1e-6:
+                    c_sweep = algebra.rotation3d_z(sweep)
+
+                nodes[i_surf].append((i_elem, i_local_node, i_global_node, i_n, i_control_surface,
+                                      strip_b_frame_coordinates(node_info, self.airfoil_db),
+                                      chord_twist, c_sweep))
+
+        self.strip_templates = []
+        for i_surf in range(self.n_surf):
+            template = dict()
+            (template['i_elem'], template['i_local_node'],
+             template['i_global_node'], template['i_n']) = [np.array([node[i] for node in nodes[i_surf]], dtype=int)
+                                                            for i in range(4)]
+            template['undeflected_b_frame'] = np.array([node[5] for node in nodes[i_surf]])
+            template['chord_twist'] = np.array([node[6] for node in nodes[i_surf]])
+            template['c_sweep'] = np.array([node[7] for node in nodes[i_surf]])
+            template['strip_coordinates_b_frame'] = np.matmul(template['chord_twist'],
+                                                              template['undeflected_b_frame'])
+            template['control_surface_nodes'] = [(i_node, node[4]) for i_node, node in enumerate(nodes[i_surf])
+                                                 if node[4] >= 0]
+            template['uniform'] = m_distribution == 'uniform'
+            self.strip_templates.append(template)
+
+    def get_control_surface_info(self, i_control_surface, aero_tstep, it, dt=None):
+        """
+        Returns the dictionary describing the current state of a control surface, as required by
+        :func:`deflect_control_surface`.
+        """
+        control_surface_info = dict()
+        if self.data_dict['control_surface_type'][i_control_surface] == 0:
+            control_surface_info['type'] = 'static'
+            control_surface_info['deflection'] = self.data_dict['control_surface_deflection'][i_control_surface]
+            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
+            try:
+                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
+            except KeyError:
+                control_surface_info['hinge_coords'] = None
+        elif self.data_dict['control_surface_type'][i_control_surface] == 1:
+            control_surface_info['type'] = 'dynamic'
+            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
+            try:
+                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
+            except KeyError:
+                control_surface_info['hinge_coords'] = None
+
+            params = {'it': it}
+            control_surface_info['deflection'], control_surface_info['deflection_dot'] = \
+                self.cs_generators[i_control_surface](params)
+
+        elif self.data_dict['control_surface_type'][i_control_surface] == 2:
+            control_surface_info['type'] = 'controlled'
+
+            try:
+                old_deflection = self.data.aero.timestep_info[-1].control_surface_deflection[i_control_surface]
+            except AttributeError:
+                try:
+                    old_deflection = aero_tstep.control_surface_deflection[i_control_surface]
+                except IndexError:
+                    old_deflection = self.data_dict['control_surface_deflection'][i_control_surface]
+
+            try:
+                control_surface_info['deflection'] = aero_tstep.control_surface_deflection[i_control_surface]
+            except IndexError:
+                control_surface_info['deflection'] = self.data_dict['control_surface_deflection'][i_control_surface]
+
+            if dt is not None:
+                control_surface_info['deflection_dot'] = (
+                        (control_surface_info['deflection'] - old_deflection)/dt)
+            else:
+                control_surface_info['deflection_dot'] = 0.0
+
+            control_surface_info['chord'] = self.data_dict['control_surface_chord'][i_control_surface]
+
+            try:
+                control_surface_info['hinge_coords'] = self.data_dict['control_surface_hinge_coords'][i_control_surface]
+            except KeyError:
+                control_surface_info['hinge_coords'] = None
+        else:
+            raise NotImplementedError(str(self.data_dict['control_surface_type'][i_control_surface]) +
+                                      ' control surfaces are not yet implemented')
+        return control_surface_info
 
     def generate_phantom_panels_at_junction(self, aero_tstep):
         for i_surf in range(self.n_surf):
@@ -371,17 +427,12 @@ class Aerogrid(Grid):
 
 
 
-def generate_strip(node_info, airfoil_db, aligned_grid,
-                   orientation_in=np.array([1, 0, 0]),
-                   calculate_zeta_dot = False,
-                   first_twist=True):
+def strip_b_frame_coordinates(node_info, airfoil_db):
     """
-    Returns a strip of panels in ``A`` frame of reference, it has to be then rotated to
-    simulate angles of attack, etc
+    Returns the coordinates of an undeflected strip in ``B`` frame, with unit chord and measured from the
+    elastic axis, as a ``3 x (M + 1)`` array
     """
-    strip_coordinates_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
     strip_coordinates_b_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
-    zeta_dot_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
 
     # airfoil coordinates
     # we are going to store everything in the x-z plane of the b
@@ -400,40 +451,146 @@ def generate_strip(node_info, airfoil_db, aligned_grid,
                                             strip_coordinates_b_frame[1, :])
 
     # elastic axis correction
-    for i_M in range(node_info['M'] + 1):
-        strip_coordinates_b_frame[1, i_M] -= node_info['eaxis']
+    strip_coordinates_b_frame[1, :] -= node_info['eaxis']
+
+    return strip_coordinates_b_frame
+
+
+def deflect_control_surface(strip_coordinates_b_frame, control_surface_info):
+    """
+    Rotates the control surface panels of a strip about the hinge
+
+    Args:
+        strip_coordinates_b_frame (np.ndarray): undeflected ``3 x (M + 1)`` strip coordinates in ``B`` frame
+        control_surface_info (dict): control surface state, as given by ``Aerogrid.get_control_surface_info``
+
+    Returns:
+        tuple: deflected strip coordinates and velocity of the panel vertices due to the deflection rate in
+        ``B`` frame (``None`` if the control surface has no ``deflection_dot``)
+    """
+    strip_coordinates_b_frame = strip_coordinates_b_frame.copy()
+    M = strip_coordinates_b_frame.shape[1] - 1
+    cs_velocity = None
+    if 'deflection_dot' in control_surface_info:
+        cs_velocity = np.zeros_like(strip_coordinates_b_frame)
+
+    b_frame_hinge_coords = strip_coordinates_b_frame[:, M - control_surface_info['chord']].copy()
+    # support for different hinge location for fully articulated control surfaces
+    if control_surface_info['hinge_coords'] is not None:
+        # make sure the hinge coordinates are only applied when M == cs_chord
+        if not M - control_surface_info['chord'] == 0:
+            control_surface_info['hinge_coords'] = None
+        else:
+            b_frame_hinge_coords = control_surface_info['hinge_coords']
+
+    rotation = algebra.rotation3d_x(-control_surface_info['deflection'])
+    for i_M in range(M - control_surface_info['chord'], M + 1):
+        relative_coords = strip_coordinates_b_frame[:, i_M] - b_frame_hinge_coords
+        # rotate the control surface
+        relative_coords = np.dot(rotation, relative_coords)
+        # deflection velocity
+        if cs_velocity is not None:
+            cs_velocity[:, i_M] += np.cross(np.array([-control_surface_info['deflection_dot'], 0.0, 0.0]),
+                                            relative_coords)
+
+        # restore coordinates
+        relative_coords += b_frame_hinge_coords
+
+        # substitute with new coordinates
+        strip_coordinates_b_frame[:, i_M] = relative_coords
+
+    return strip_coordinates_b_frame, cs_velocity
+
+
+def generate_strips(strip_coordinates_b_frame, c_sweep, beam_psi, psi_dot, beam_coord, pos_dot, cga,
+                    orientation_in=np.array([1, 0, 0]),
+                    cs_velocity=None,
+                    uniform=True):
+    """
+    Batched version of :func:`generate_strip` for all the strips of a surface.
+
+    The strips are given in ``B`` frame with the chord, twist and control surface deflections already applied,
+    so that only the rotations that depend on the current structural state are computed here.
+
+    Args:
+        strip_coordinates_b_frame (np.ndarray): ``n x 3 x (M + 1)`` strip coordinates in ``B`` frame
+        c_sweep (np.ndarray): ``n x 3 x 3`` sweep rotation matrices
+        beam_psi (np.ndarray): ``n x 3`` Cartesian rotation vectors of the nodes
+        psi_dot (np.ndarray): ``n x 3`` time derivatives of the rotation vectors
+        beam_coord (np.ndarray): ``n x 3`` positions of the nodes in ``A`` frame
+        pos_dot (np.ndarray): ``n x 3`` velocities of the nodes in ``A`` frame
+        cga (np.ndarray): rotation matrix from ``A`` to ``G`` frame
+        orientation_in (np.ndarray): free stream direction
+        cs_velocity (np.ndarray): ``n x 3 x (M + 1)`` velocity due to control surface deflection rates
+            in ``B`` frame, or ``None``
+        uniform (bool): chordwise distribution is uniform, in which case the grid is displaced a quarter panel
+
+    Returns:
+        tuple: ``n x 3 x (M + 1)`` arrays of the strip coordinates and velocities in ``G`` frame
+    """
+    M = strip_coordinates_b_frame.shape[2] - 1
+    Cab = algebra.crv2rotation_vec(beam_psi)
+
+    # angle between the free stream and the y_b axis about z_b
+    orientation_in = np.asarray(orientation_in, dtype=float)
+    cross_product = np.cross(orientation_in, Cab[:, :, 1])
+    dot_product = np.dot(Cab[:, :, 1], orientation_in)
+    rot_angle = np.arctan2(np.linalg.norm(cross_product, axis=1), dot_product)
+    rot_angle[np.einsum('ij,ij->i', Cab[:, :, 2], cross_product) < 0] *= -1
+    rot_angle[np.sign(dot_product) < 0] += -2*np.pi
+    Crot = np.zeros_like(Cab)
+    Crot[:, 0, 0] = np.cos(-rot_angle)
+    Crot[:, 0, 1] = -np.sin(-rot_angle)
+    Crot[:, 1, 0] = np.sin(-rot_angle)
+    Crot[:, 1, 1] = np.cos(-rot_angle)
+    Crot[:, 2, 2] = 1.
+
+    strip_coordinates_a_frame = np.matmul(np.matmul(Cab, np.matmul(c_sweep, Crot)), strip_coordinates_b_frame)
+
+    # velocity due to pos_dot and psi_dot
+    omega_a = np.einsum('nji,nj->ni', algebra.crv2tan_vec(beam_psi), psi_dot)
+    zeta_dot_a_frame = np.cross(omega_a[:, :, None], strip_coordinates_a_frame, axis=1)
+    zeta_dot_a_frame += pos_dot[:, :, None]
+    # control surface deflection velocity contribution
+    if cs_velocity is not None:
+        zeta_dot_a_frame += np.matmul(Cab, cs_velocity)
+
+    # add node coords
+    strip_coordinates_a_frame += beam_coord[:, :, None]
+
+    # add quarter-chord disp
+    if uniform:
+        delta_c = (strip_coordinates_a_frame[:, :, -1] - strip_coordinates_a_frame[:, :, 0])/M
+        strip_coordinates_a_frame += 0.25*delta_c[:, :, None]
+    else:
+        warnings.warn("No quarter chord disp of grid for non-uniform grid distributions implemented", UserWarning)
+
+    # rotation from a to g
+    return np.matmul(cga, strip_coordinates_a_frame), np.matmul(cga, zeta_dot_a_frame)
+
+
+def generate_strip(node_info, airfoil_db, aligned_grid,
+                   orientation_in=np.array([1, 0, 0]),
+                   calculate_zeta_dot = False,
+                   first_twist=True):
+    """
+    Returns a strip of panels in ``A`` frame of reference, it has to be then rotated to
+    simulate angles of attack, etc
+    """
+    strip_coordinates_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
+    zeta_dot_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
+
+    strip_coordinates_b_frame = strip_b_frame_coordinates(node_info, airfoil_db)
 
     # chord_line_b_frame = strip_coordinates_b_frame[:, -1] - strip_coordinates_b_frame[:, 0]
     cs_velocity = np.zeros_like(strip_coordinates_b_frame)
 
     # control surface deflection
     if node_info['control_surface'] is not None:
-        b_frame_hinge_coords = strip_coordinates_b_frame[:, node_info['M'] - node_info['control_surface']['chord']]
-        # support for different hinge location for fully articulated control surfaces
-        if node_info['control_surface']['hinge_coords'] is not None:
-            # make sure the hinge coordinates are only applied when M == cs_chord
-            if not node_info['M'] - node_info['control_surface']['chord'] == 0:
-                node_info['control_surface']['hinge_coords'] = None
-            else:
-                b_frame_hinge_coords =  node_info['control_surface']['hinge_coords']
-
-        for i_M in range(node_info['M'] - node_info['control_surface']['chord'], node_info['M'] + 1):
-            relative_coords = strip_coordinates_b_frame[:, i_M] - b_frame_hinge_coords
-            # rotate the control surface
-            relative_coords = np.dot(algebra.rotation3d_x(-node_info['control_surface']['deflection']),
-                                     relative_coords)
-            # deflection velocity
-            try:
-                cs_velocity[:, i_M] += np.cross(np.array([-node_info['control_surface']['deflection_dot'], 0.0, 0.0]),
-                                            relative_coords)
-            except KeyError:
-                pass
-
-            # restore coordinates
-            relative_coords += b_frame_hinge_coords
-
-            # substitute with new coordinates
-            strip_coordinates_b_frame[:, i_M] = relative_coords
+        strip_coordinates_b_frame, deflection_velocity = deflect_control_surface(strip_coordinates_b_frame,
+                                                                                 node_info['control_surface'])
+        if deflection_velocity is not None:
+            cs_velocity = deflection_velocity
 
     # chord scaling
     strip_coordinates_b_frame *= node_info['chord']
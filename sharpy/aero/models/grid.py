@@ -39,6 +39,7 @@ class Grid(object):
 
         self.struct2aero_mapping = None
         self.aero2struct_mapping = []
+        self.force_mapping = None
 
 
     def generate(self, data_dict, beam, aero_settings, ts):
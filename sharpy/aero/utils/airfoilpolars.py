@@ -1,5 +1,6 @@
 import numpy as np
 # import sharpy.utils.algebra as algebra
+import sharpy.utils.cout_utils as cout
 from sharpy.utils.constants import deg2rad
 from scipy.interpolate import interp1d
 
@@ -118,6 +119,125 @@ class Polar:
         
         return cd, cm
 
+
+
+def interp_segment(x, x0, x1, f0, f1):
+    """
+    Element-wise linear interpolation within the segments ``[x0, x1]``, clamped at the ends as ``np.interp``
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = (f1 - f0)/(x1 - x0)*(x - x0) + f0
+    f = np.where(x < x0, f0, f)
+    return np.where(x >= x1, f1, f)
+
+
+class PolarTables:
+    """
+    Batched evaluation of the coefficients of several airfoil polars
+
+    The sections are grouped by airfoil and each group is evaluated with array operations on the polar table, so the
+    cost of an evaluation does not scale with the number of sections in Python.
+
+    Args:
+        polars (list(Polar)): Airfoil polars
+    """
+
+    def __init__(self, polars):
+        self.polars = polars
+
+        # Branches of the polar starting at the angle of attack of zero lift used by ``get_cdcm_from_cl``
+        self.i_aoa_cl0 = []
+        self.cl_max_up = []
+        self.cl_min_down = []
+        for polar in polars:
+            dist = np.abs(polar.table[:, 0] - polar.aoa_cl0_deg)
+            i_aoa_cl0 = np.where(dist == np.min(dist))[0][0]
+            self.i_aoa_cl0.append(i_aoa_cl0)
+            self.cl_max_up.append(np.maximum.accumulate(polar.table[i_aoa_cl0:, 1]))
+            self.cl_min_down.append(np.minimum.accumulate(polar.table[i_aoa_cl0::-1, 1]))
+
+    def groups(self, iairfoil):
+        """
+        Yields the airfoils in ``iairfoil`` and the sections using each of them
+        """
+        for airfoil in np.unique(iairfoil):
+            yield airfoil, np.where(iairfoil == airfoil)[0]
+
+    def get_coefs(self, aoa, iairfoil):
+        """
+        Coefficients at the angles of attack ``aoa`` of sections with airfoils ``iairfoil``
+
+        Equivalent to ``Polar.get_coefs`` for each section.
+
+        Args:
+            aoa (np.ndarray): Angles of attack
+            iairfoil (np.ndarray): Airfoil of each section
+
+        Returns:
+            tuple: ``cl``, ``cd`` and ``cm`` arrays
+        """
+        coefs = np.zeros((3, len(aoa)))
+        for airfoil, isections in self.groups(iairfoil):
+            table = self.polars[airfoil].table
+            if (aoa[isections] < table[0, 0]).any() or (aoa[isections] > table[-1, 0]).any():
+                raise ValueError('Angle of attack out of the range of the polar of airfoil %d' % airfoil)
+            for icoef in range(3):
+                coefs[icoef, isections] = np.interp(aoa[isections], table[:, 0], table[:, icoef + 1])
+
+        return coefs[0], coefs[1], coefs[2]
+
+    def get_cdcm_from_cl(self, cl, iairfoil):
+        """
+        Drag and moment coefficients of sections with airfoils ``iairfoil`` at the lift coefficients ``cl``
+
+        Equivalent to ``Polar.get_cdcm_from_cl`` for each section, with a single warning per call for the sections
+        out of the range of their polar.
+
+        Args:
+            cl (np.ndarray): Lift coefficients
+            iairfoil (np.ndarray): Airfoil of each section
+
+        Returns:
+            tuple: ``cd`` and ``cm`` arrays
+        """
+        cd = np.zeros_like(cl)
+        cm = np.zeros_like(cl)
+        n_out_of_range = 0
+        for airfoil, isections in self.groups(iairfoil):
+            polar = self.polars[airfoil]
+            table = polar.table
+            npoints = table.shape[0]
+            cl_airfoil = cl[isections]
+
+            out_of_range = (cl_airfoil > np.max(table[:, 1])) | (cl_airfoil < np.min(table[:, 1]))
+            n_out_of_range += np.count_nonzero(out_of_range)
+
+            # First point of the polar above (below) the lift coefficient from the zero lift angle of attack
+            i_up = self.i_aoa_cl0[airfoil] + np.searchsorted(self.cl_max_up[airfoil], cl_airfoil, side='left')
+            i_up = np.clip(i_up, 1, npoints - 1)
+            i_down = self.i_aoa_cl0[airfoil] - np.searchsorted(-self.cl_min_down[airfoil], -cl_airfoil, side='left')
+            i_down = np.clip(i_down, 0, npoints - 2)
+            i_low = np.where(cl_airfoil > 0., i_up - 1, i_down)
+
+            cd_airfoil = interp_segment(cl_airfoil, table[i_low, 1], table[i_low + 1, 1],
+                                        table[i_low, 2], table[i_low + 1, 2])
+            cm_airfoil = interp_segment(cl_airfoil, table[i_low, 1], table[i_low + 1, 1],
+                                        table[i_low, 3], table[i_low + 1, 3])
+
+            zero_lift = cl_airfoil == 0.
+            cd_airfoil[zero_lift] = np.interp(polar.aoa_cl0_deg, table[:, 0], table[:, 2])
+            cm_airfoil[zero_lift] = np.interp(polar.aoa_cl0_deg, table[:, 0], table[:, 3])
+            cd_airfoil[out_of_range] = 0.
+            cm_airfoil[out_of_range] = 0.
+
+            cd[isections] = cd_airfoil
+            cm[isections] = cm_airfoil
+
+        if n_out_of_range:
+            cout.cout_wrap('cl out of the polar range in %u sections, their forces will not be corrected'
+                           % n_out_of_range, 3)
+        return cd, cm
+
     
 def interpolate(polar1, polar2, coef=0.5):
 
@@ -1,5 +1,6 @@
 """Force Mapping Utilities"""
 import numpy as np
+import scipy.sparse as sp
 import sharpy.utils.algebra as algebra
 
 
@@ -87,6 +88,205 @@ def aero2struct_force_mapping(aero_forces,
     return struct_forces
 
 
+class AeroStructForceMapping(object):
+    r"""
+    Vectorised mapping of the aerodynamic forces at the lattice vertices to the structural nodes.
+
+    It is equivalent to :func:`aero2struct_force_mapping`, but the gather/scatter index tables relating lattice
+    vertices and structural nodes are built once per aerodynamic grid (from ``struct2aero_mapping``) and the
+    mapping is then performed with batched rotation matrices and sparse matrix products.
+
+    Lattice vertices are numbered surface by surface, with the vertex ``(i_m, i_n)`` of surface ``i_surf``
+    being ``surface_offset[i_surf] + i_m * (N + 1) + i_n``.
+
+    Args:
+        struct2aero_mapping (list): Structural to aerodynamic node mapping
+        conn (np.ndarray): Connectivities matrix
+        dimensions (np.ndarray): Dimensions of the lattice ``[n_surf x chordwise panels x spanwise panels]``
+
+    Attributes:
+        n_node (int): Number of structural nodes
+        n_vertex (int): Total number of lattice vertices
+        surface_offset (np.ndarray): Index of the first vertex of each surface
+        node_elem (np.ndarray): Element from which the rotation of each node is taken (``-1`` if not mapped)
+        node_local (np.ndarray): Local node within ``node_elem``
+        vertex_index (np.ndarray): Global index of every mapped vertex
+        vertex_node (np.ndarray): Structural node associated to every mapped vertex
+        scatter (scipy.sparse.csr_matrix): ``n_node x len(vertex_index)`` summation operator from mapped
+          vertices to nodes
+    """
+    def __init__(self, struct2aero_mapping, conn, dimensions):
+        self.dimensions = np.array(dimensions, dtype=int)
+        self.n_node = len(struct2aero_mapping)
+
+        n_vertex_surf = (self.dimensions[:, 0] + 1)*(self.dimensions[:, 1] + 1)
+        self.surface_offset = np.zeros((len(n_vertex_surf) + 1,), dtype=int)
+        self.surface_offset[1:] = np.cumsum(n_vertex_surf)
+        self.n_vertex = self.surface_offset[-1]
+
+        # the rotation of each node is taken from the first element it appears in
+        self.node_elem = -np.ones((self.n_node,), dtype=int)
+        self.node_local = np.zeros((self.n_node,), dtype=int)
+        n_elem, n_node_elem = conn.shape
+        for i_elem in range(n_elem):
+            for i_local_node in range(n_node_elem):
+                i_global_node = conn[i_elem, i_local_node]
+                if self.node_elem[i_global_node] == -1:
+                    self.node_elem[i_global_node] = i_elem
+                    self.node_local[i_global_node] = i_local_node
+
+        vertex_index = [np.zeros((0,), dtype=int)]
+        vertex_node = [np.zeros((0,), dtype=int)]
+        for i_node in range(self.n_node):
+            if self.node_elem[i_node] == -1:
+                continue
+            for mapping in struct2aero_mapping[i_node]:
+                i_surf = mapping['i_surf']
+                i_n = mapping['i_n']
+                n_m = self.dimensions[i_surf, 0] + 1
+                n_n = self.dimensions[i_surf, 1] + 1
+                vertex_index.append(self.surface_offset[i_surf] + np.arange(n_m)*n_n + i_n)
+                vertex_node.append(i_node*np.ones((n_m,), dtype=int))
+        self.vertex_index = np.concatenate(vertex_index)
+        self.vertex_node = np.concatenate(vertex_node)
+
+        n_mapped = len(self.vertex_index)
+        self.scatter = sp.csr_matrix((np.ones((n_mapped,)), (self.vertex_node, np.arange(n_mapped))),
+                                     shape=(self.n_node, n_mapped))
+
+    def is_compatible(self, dimensions):
+        """
+        Checks whether the index tables were built for a lattice of the given ``dimensions``
+        """
+        return np.array_equal(self.dimensions, dimensions)
+
+    @staticmethod
+    def stack_vertex_variable(variable):
+        """
+        Stacks a list of per-surface vertex variables ``[n_surf][n_dim x (M + 1) x (N + 1)]`` (such as ``zeta`` or
+        ``forces``) into a single ``n_vertex x n_dim`` array following the global vertex numbering.
+        """
+        return np.concatenate([surf_variable.reshape((surf_variable.shape[0], -1)) for surf_variable in variable],
+                              axis=1).T
+
+    def nodal_rotations(self, psi_def, cag=np.eye(3)):
+        """
+        Returns the ``n_node x 3 x 3`` rotation matrices from ``G`` to the nodal ``B`` frames of reference.
+        """
+        i_elem = np.maximum(self.node_elem, 0)
+        cab = algebra.crv2rotation_vec(psi_def[i_elem, self.node_local, :])
+        return np.matmul(cab.transpose((0, 2, 1)), cag)
+
+    def moment_arms(self, zeta, pos_def, cag=np.eye(3)):
+        """
+        Returns the vectors (in ``G``) between every mapped vertex and its structural node
+        """
+        zeta_vertex = self.stack_vertex_variable(zeta)
+        return zeta_vertex[self.vertex_index, :] - np.dot(pos_def, cag)[self.vertex_node, :]
+
+    def map_forces(self, aero_forces_list, zeta, pos_def, psi_def, cag=np.eye(3),
+                   skip_moments_generated_by_forces=False):
+        """
+        Maps one or several sets of aerodynamic forces (i.e. steady and unsteady) to the structural nodes in a single
+        pass.
+
+        Args:
+            aero_forces_list (list): List of aerodynamic force sets, each of them in the format of
+              ``AeroTimeStepInfo.forces`` (``[n_surf][6 x (M + 1) x (N + 1)]``) in ``G``
+            zeta (list): Aerodynamic grid coordinates
+            pos_def (np.ndarray): Vector of structural node displacements
+            psi_def (np.ndarray): Vector of structural node rotations (CRVs)
+            cag (np.ndarray): Transformation matrix between inertial and body-attached reference ``A``
+            skip_moments_generated_by_forces (bool): Flag to skip local moment calculation.
+
+        Returns:
+            list: structural forces (``n_node x 6`` in ``B``) for each set of aerodynamic forces
+        """
+        n_sets = len(aero_forces_list)
+        cbg = self.nodal_rotations(psi_def, cag)
+        if not skip_moments_generated_by_forces:
+            chi_g = self.moment_arms(zeta, pos_def, cag)
+
+        vertex_forces = np.zeros((len(self.vertex_index), 6*n_sets))
+        for i_set, aero_forces in enumerate(aero_forces_list):
+            forces = self.stack_vertex_variable(aero_forces)[self.vertex_index, :]
+            vertex_forces[:, 6*i_set:6*i_set + 6] = forces
+            if not skip_moments_generated_by_forces:
+                vertex_forces[:, 6*i_set + 3:6*i_set + 6] += np.cross(chi_g, forces[:, 0:3])
+
+        nodal_forces_g = self.scatter.dot(vertex_forces).reshape((self.n_node, 2*n_sets, 3))
+        nodal_forces_b = np.einsum('nij,nkj->nki', cbg, nodal_forces_g)
+
+        return [nodal_forces_b[:, 2*i_set:2*i_set + 2, :].reshape((self.n_node, 6)) for i_set in range(n_sets)]
+
+    def gain(self, zeta, pos_def, psi_def, cag=np.eye(3), skip_moments_generated_by_forces=False):
+        r"""
+        Sparse operator mapping the stacked aerodynamic forces at the lattice vertices (``G`` frame) to the
+        structural forces at the nodes (``B`` frame) for the given configuration, such that
+
+        .. math:: \mathbf{f}_{struct} = \mathbf{K}\,\mathbf{f}_{aero}
+
+        where :math:`\mathbf{f}_{aero}` is ``stack_vertex_variable(forces).reshape(-1)`` (``6 * n_vertex``) and
+        :math:`\mathbf{f}_{struct}` is the ``n_node x 6`` structural forces reshaped to ``6 * n_node``.
+
+        Returns:
+            scipy.sparse.csr_matrix: ``6 n_node x 6 n_vertex`` mapping operator
+        """
+        n_mapped = len(self.vertex_index)
+        cbg = self.nodal_rotations(psi_def, cag)[self.vertex_node]
+
+        blocks = [(0, 0, cbg), (3, 3, cbg)]
+        if not skip_moments_generated_by_forces:
+            chi_g = self.moment_arms(zeta, pos_def, cag)
+            skew_chi = np.zeros((n_mapped, 3, 3))
+            skew_chi[:, 1, 2] = -chi_g[:, 0]
+            skew_chi[:, 2, 0] = -chi_g[:, 1]
+            skew_chi[:, 0, 1] = -chi_g[:, 2]
+            skew_chi[:, 2, 1] = chi_g[:, 0]
+            skew_chi[:, 0, 2] = chi_g[:, 1]
+            skew_chi[:, 1, 0] = chi_g[:, 2]
+            blocks.append((3, 0, np.matmul(cbg, skew_chi)))
+
+        local_index = np.arange(3)
+        rows = []
+        cols = []
+        values = []
+        for row_offset, col_offset, block in blocks:
+            rows.append(np.broadcast_to(6*self.vertex_node[:, None, None] + row_offset + local_index[None, :, None],
+                                        block.shape).reshape(-1))
+            cols.append(np.broadcast_to(6*self.vertex_index[:, None, None] + col_offset + local_index[None, None, :],
+                                        block.shape).reshape(-1))
+            values.append(block.reshape(-1))
+
+        return sp.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(6*self.n_node, 6*self.n_vertex))
+
+
+def get_force_mapping(grid, dimensions=None):
+    """
+    Returns the :class:`AeroStructForceMapping` of an aerodynamic (or nonlifting body) grid.
+
+    The mapping is built the first time it is requested and stored in the grid as ``force_mapping``. It is rebuilt
+    if the lattice ``dimensions`` change.
+
+    Args:
+        grid (sharpy.aero.models.grid.Grid): Aerodynamic grid including ``struct2aero_mapping``
+        dimensions (np.ndarray (optional)): Current lattice dimensions. Defaults to ``grid.dimensions``
+
+    Returns:
+        AeroStructForceMapping: Force mapping of the grid
+    """
+    if dimensions is None:
+        dimensions = grid.dimensions
+    force_mapping = getattr(grid, 'force_mapping', None)
+    if force_mapping is None or not force_mapping.is_compatible(dimensions):
+        force_mapping = AeroStructForceMapping(grid.struct2aero_mapping,
+                                               grid.beam.connectivities,
+                                               dimensions)
+        grid.force_mapping = force_mapping
+    return force_mapping
+
+
 def total_forces_moments(forces_nodes_a,
                          pos_def,
                          ref_pos=np.array([0., 0., 0.])):
@@ -92,6 +92,27 @@ def local_stability_axes(dir_urel, dir_chord):
     return algebra.triad2rotation(xs, ys, zs)
 
 
+
+def local_stability_axes_vec(dir_urel, dir_chord):
+    """
+    Vectorised version of :func:`local_stability_axes` for several sections.
+
+    Args:
+        dir_urel (np.array): ``n x 3`` unit vectors in the direction of the free stream velocity expressed in B frame.
+        dir_chord (np.array): ``n x 3`` unit vectors in the direction of the local chord expressed in B frame.
+
+    Returns:
+        np.array: ``n x 3 x 3`` rotation matrices from B to S
+    """
+    xs = dir_urel
+
+    zb = np.array([0, 0, 1.])
+    zs = np.cross(np.cross(dir_chord, zb), dir_urel)
+
+    ys = -np.cross(xs, zs)
+
+    return np.stack((xs, ys, zs), axis=2)
+
 def span_chord(i_node_surf, zeta):
     """
     Retrieve the local span and local chord
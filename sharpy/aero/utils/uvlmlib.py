@@ -11,6 +11,22 @@ try:
 except OSError:
     UvlmLib = ct_utils.import_ctypes_lib(SharpyDir + '/lib/UVLM/lib', 'libuvlm')
 
+# the return type of the library functions is declared once rather than at every call
+for _function_name in ('run_VLM',
+                       'run_linear_source_panel_method',
+                       'run_VLM_coupled_with_LSPM',
+                       'run_UVLM',
+                       'run_UVLM_coupled_with_LSPM',
+                       'calculate_unsteady_forces',
+                       'UVLM_check_incidence_angle',
+                       'total_induced_velocity_at_points',
+                       'call_biot_panel'):
+    try:
+        getattr(UvlmLib, _function_name).restype = None
+    except AttributeError:
+        # not available in this version of the library
+        pass
+
 # TODO: Combine VMOpts and UVMOpts (Class + inheritance)?
 
 class VMopts(ct.Structure):
@@ -59,8 +75,12 @@ class VMopts(ct.Structure):
                 ("vortex_radius_wake_ind", ct.c_double),
                 ("consider_u_ind_by_sources_for_lifting_forces", ct.c_bool),
                 ("ignore_first_x_nodes_in_force_calculation", ct.c_uint)]
-    
 
+    # settings read by ``set_options``
+    settings_keys = ('horseshoe', 'rollup_dt', 'n_rollup', 'rollup_tolerance', 'rollup_aic_refresh', 'num_cores',
+                     'iterative_solver', 'iterative_tol', 'iterative_precond', 'vortex_radius',
+                     'vortex_radius_wake_ind', 'only_nonlifting', 'nonlifting_body_interactions',
+                     'phantom_wing_test', 'ignore_first_x_nodes_in_force_calculation')
 
     def __init__(self):
         ct.Structure.__init__(self)
@@ -138,6 +158,12 @@ class UVMopts(ct.Structure):
                 ("consider_u_ind_by_sources_for_lifting_forces", ct.c_bool),
                 ("ignore_first_x_nodes_in_force_calculation", ct.c_uint)]
 
+    # settings read by ``set_options``
+    settings_keys = ('dt', 'num_cores', 'convection_scheme', 'iterative_solver', 'iterative_tol', 'iterative_precond',
+                     'cfl1', 'vortex_radius', 'vortex_radius_wake_ind', 'interp_coords', 'filter_method',
+                     'interp_method', 'yaw_slerp', 'quasi_steady', 'only_nonlifting', 'phantom_wing_test',
+                     'ignore_first_x_nodes_in_force_calculation')
+
     def __init__(self):
         ct.Structure.__init__(self)
         self.dt = ct.c_double(0.01)
@@ -216,11 +242,39 @@ class FlightConditions(ct.Structure):
 # type for 2d integer matrix
 t_2int = ct.POINTER(ct.c_int)*2
 
+_options_cache = ct_utils.StructureCache()
+
+
+def get_options(opts_class, options, **kwargs):
+    """
+    Returns a ``VMopts`` or ``UVMopts`` structure set from the solver settings.
+
+    The structure is built with ``set_options`` the first time a combination of settings and keyword arguments is
+    requested and reused afterwards, so it must not be modified by the caller.
+
+    Args:
+        opts_class (type): ``VMopts`` or ``UVMopts``
+        options (dict): Solver settings
+        **kwargs: Keyword arguments of ``opts_class.set_options``
+
+    Returns:
+        VMopts or UVMopts: Options structure
+    """
+    key = ((opts_class.__name__, tuple(sorted(kwargs.items()))) +
+           tuple([options[name] for name in opts_class.settings_keys if name in options]))
+
+    def build():
+        opts = opts_class()
+        opts.set_options(options, **kwargs)
+        return opts
+
+    return _options_cache.get(key, build)
+
+
 def vlm_solver(ts_info, options):
     run_VLM = UvlmLib.run_VLM
 
-    vmopts = VMopts()
-    vmopts.set_options(options, n_surfaces = ts_info.n_surf)
+    vmopts = get_options(VMopts, options, n_surfaces=ts_info.n_surf)
 
     flightconditions = FlightConditions(options['rho'], ts_info.u_ext[0][:, 0, 0])
 
@@ -245,8 +299,7 @@ def vlm_solver(ts_info, options):
 def vlm_solver_nonlifting_body(ts_info, options):
     run_linear_source_panel_method = UvlmLib.run_linear_source_panel_method
 
-    vmopts = VMopts()
-    vmopts.set_options(options, n_surfaces_nonlifting = ts_info.n_surf)
+    vmopts = get_options(VMopts, options, n_surfaces_nonlifting=ts_info.n_surf)
 
     flightconditions = FlightConditions(options['rho'], ts_info.u_ext[0][:, 0, 0])
 
@@ -264,8 +317,8 @@ def vlm_solver_nonlifting_body(ts_info, options):
 def vlm_solver_lifting_and_nonlifting_bodies(ts_info_lifting, ts_info_nonlifting, options):
     run_VLM_coupled_with_LSPM = UvlmLib.run_VLM_coupled_with_LSPM
 
-    vmopts = VMopts()    
-    vmopts.set_options(options, n_surfaces = ts_info_lifting.n_surf, n_surfaces_nonlifting = ts_info_nonlifting.n_surf)
+    vmopts = get_options(VMopts, options, n_surfaces=ts_info_lifting.n_surf,
+                         n_surfaces_nonlifting=ts_info_nonlifting.n_surf)
 
     flightconditions = FlightConditions(options['rho'], ts_info_lifting.u_ext[0][:, 0, 0])
 
@@ -305,13 +358,12 @@ def uvlm_solver(i_iter, ts_info, struct_ts_info, options, convect_wake=True, dt=
 
     run_UVLM = UvlmLib.run_UVLM
 
-    uvmopts = UVMopts()
-    uvmopts.set_options(options,
-                        n_surfaces = ts_info.n_surf,
-                        n_surfaces_nonlifting = 0, 
-                        dt = dt, 
-                        convect_wake = convect_wake, 
-                        n_span_panels_wo_u_ind=0)
+    uvmopts = get_options(UVMopts, options,
+                          n_surfaces=ts_info.n_surf,
+                          n_surfaces_nonlifting=0,
+                          dt=dt,
+                          convect_wake=convect_wake,
+                          n_span_panels_wo_u_ind=0)
 
     flightconditions = FlightConditions(options['rho'], ts_info.u_ext[0][:, 0, 0])
 
@@ -342,14 +394,13 @@ def uvlm_solver_lifting_and_nonlifting(i_iter, ts_info, ts_info_nonlifting, stru
     p_rbm_vel = get_ctype_pointer_of_rbm_vel_in_G_frame(struct_ts_info.for_vel.copy(), struct_ts_info.cga())
     p_centre_rot = options['centre_rot'].ctypes.data_as(ct.POINTER(ct.c_double))
 
-    uvmopts = UVMopts()
-    uvmopts.set_options(options,
-                        n_surfaces = ts_info.n_surf,
-                        n_surfaces_nonlifting = ts_info_nonlifting.n_surf, 
-                        dt = dt, 
-                        convect_wake = convect_wake, 
-                        n_span_panels_wo_u_ind=4,
-                        only_lifting=False)
+    uvmopts = get_options(UVMopts, options,
+                          n_surfaces=ts_info.n_surf,
+                          n_surfaces_nonlifting=ts_info_nonlifting.n_surf,
+                          dt=dt,
+                          convect_wake=convect_wake,
+                          n_span_panels_wo_u_ind=4,
+                          only_lifting=False)
     run_UVLM = UvlmLib.run_UVLM_coupled_with_LSPM
 
     flightconditions = FlightConditions(options['rho'], ts_info.u_ext[0][:, 0, 0])
@@ -404,6 +404,22 @@ class BladePitchPid(controller_interface.BaseController):
         control_param, detailed_control_param = self.controller_implementation(current_input[-1])
         return (control_param, detailed_control_param)
 
+    def checkpoint_state(self):
+        return {'system_pv': np.array(self.system_pv),
+                'prescribed_sp': np.array(self.prescribed_sp),
+                'pitch': self.pitch,
+                'rotor_vel': self.rotor_vel,
+                'rotor_acc': self.rotor_acc,
+                'pid': self.controller_implementation.checkpoint_state()}
+
+    def restore_checkpoint_state(self, state):
+        self.system_pv = state['system_pv'].tolist()
+        self.prescribed_sp = state['prescribed_sp'].tolist()
+        self.pitch = float(state['pitch'])
+        self.rotor_vel = float(state['rotor_vel'])
+        self.rotor_acc = float(state['rotor_acc'])
+        self.controller_implementation.restore_checkpoint_state(state['pid'])
+
     def __exit__(self, *args):
         # self.log.close()
         pass
@@ -234,5 +234,13 @@ class ControlSurfacePidController(controller_interface.BaseController):
         control_param, detailed_control_param = self.controller_implementation(current_input[-1])
         return (control_param, detailed_control_param)
 
+    def checkpoint_state(self):
+        return {'real_state_input_history': np.array(self.real_state_input_history),
+                'pid': self.controller_implementation.checkpoint_state()}
+
+    def restore_checkpoint_state(self, state):
+        self.real_state_input_history = state['real_state_input_history'].tolist()
+        self.controller_implementation.restore_checkpoint_state(state['pid'])
+
     def __exit__(self, *args):
         self.log.close()
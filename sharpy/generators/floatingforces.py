@@ -2,8 +2,8 @@ import numpy as np
 import h5py as h5
 import ctypes as ct
 import os
-from scipy import fft, ifft
 from scipy.interpolate import interp1d
+from scipy.linalg import expm
 from control import forced_response, TransferFunction
 
 import sharpy.utils.cout_utils as cout
@@ -209,39 +209,197 @@ def response_freq_dep_matrix(H, omega_H, q, it_, dt):
     """
     Compute the frequency response of a system with a transfer function depending on the frequency
     F(t) = H(omega) * q(t)
+
+    The history ``q[:it_ + 1]`` is taken as one period of a periodic signal so the cost of each call grows with
+    the number of time steps. ``H`` is either an array of (possibly complex) matrices at the frequencies
+    ``omega_H`` [rad/s] or a dictionary of rational functions of the frequency (see ``matrix_from_rf``).
     """
     it = it_ + 1
-    omega_fft = np.linspace(0, 1/(2*dt), it//2)[:it//2]
-    fourier_q = fft(q[:it, :], axis=0)
-    fourier_f = np.zeros_like(fourier_q)
-
-    ndof = q.shape[1]
-    f = np.zeros((ndof))
+    omega_fft = 2.*np.pi*np.fft.rfftfreq(it, d=dt)
+    fourier_q = np.fft.rfft(q[:it, :], axis=0)
 
-    # Compute the constant component
     if type(H) is np.ndarray:
-        interp_H = interp1d(omega_H, H, axis=0)
-        H_omega = interp_H(omega_fft[0])
-    elif type(H) is tuple:
-        H_omega = matrix_from_rf(H, omega_fft[0])
+        interp_H = interp1d(omega_H, H, axis=0, bounds_error=False, fill_value=(H[0, ...], H[-1, ...]))
+        H_omega = interp_H(omega_fft)
+    elif type(H) is dict:
+        H_omega = np.array([matrix_from_rf(H, omega) for omega in omega_fft])
     else:
-        cout.cout_wrap(("ERROR: Not implemented response_freq_dep_matrix for type(H) %s" % type(H)), 4)
-    fourier_f[0, :] = np.dot(H_omega, fourier_q[0, :])
-
-    # Compute the rest of the terms
-    for iomega in range(1, omega_fft.shape[0]):
-        # Interpolate H at omega
-        if type(H) is np.ndarray:
-            H_omega = interp_H(omega_fft[iomega])
-        elif type(H) is dict:
-            H_omega = matrix_from_rf(H, omega_fft[iomega])
-        fourier_f[iomega, :] = np.dot(H_omega, fourier_q[iomega, :])
-        fourier_f[-iomega, :] = np.dot(H_omega, fourier_q[-iomega, :])
+        raise NotImplementedError('response_freq_dep_matrix not implemented for type(H) %s' % type(H))
+    fourier_f = np.einsum('wij,wj->wi', H_omega, fourier_q)
 
     # Compute the inverse Fourier tranform
-    f[:] = np.real(ifft(fourier_f, axis=0)[it_, :])
+    return np.fft.irfft(fourier_f, n=it, axis=0)[it_, :]
+
+
+def radiation_kernel_freq(omega, added_mass, damping, added_mass_inf):
+    r"""
+    Frequency response of the radiation kernel in Cummins' equation
+
+    .. math:: \mathbf{K}(i\omega) = \mathbf{B}(\omega) + i\omega(\mathbf{A}(\omega) - \mathbf{A}_\infty)
+
+    so that the radiation forces are :math:`\mathbf{f} = -\mathbf{A}_\infty\ddot{\mathbf{q}} -
+    \mathbf{K}\dot{\mathbf{q}}`
+
+    Args:
+        omega (np.ndarray): Frequencies [rad/s]
+        added_mass (np.ndarray): Added mass matrices at ``omega``
+        damping (np.ndarray): Damping matrices at ``omega``
+        added_mass_inf (np.ndarray): Infinite frequency added mass matrix
+
+    Returns:
+        np.ndarray: Kernel matrices at ``omega``
+    """
+    return damping + 1j*omega[:, None, None]*(added_mass - added_mass_inf)
+
+
+def fit_rational_function(omega, H, order, n_iter=10):
+    """
+    Fit a strictly proper and stable rational function ``num(s)/den(s)`` to the frequency response ``H``
+    at ``s = i omega``
+
+    The denominator is identified with the iterated weighted least squares of Sanathanan and Koerner, unstable
+    poles are reflected about the imaginary axis and the numerator is fitted again for the final denominator.
+
+    Args:
+        omega (np.ndarray): Frequencies [rad/s]
+        H (np.ndarray): Complex frequency response at ``omega``
+        order (int): Order of the denominator
+        n_iter (int): Number of Sanathanan-Koerner iterations
+
+    Returns:
+        tuple: Coefficients of the numerator and the (monic) denominator in the order used by ``np.polyval``
+    """
+    # Scale the frequencies for the conditioning of the Vandermonde matrices
+    omega_ref = np.max(np.abs(omega))
+    s = 1j*omega/omega_ref
+    vander = np.vander(s, order + 1)
+
+    weight = np.ones_like(omega)
+    for i_iter in range(n_iter):
+        # num(s) - H*(den(s) - s^order) = H*s^order with unknown coefficients num and den[1:]
+        lhs = np.hstack((vander[:, 1:], -H[:, None]*vander[:, 1:]))*weight[:, None]
+        rhs = H*vander[:, 0]*weight
+        coefs = np.linalg.lstsq(np.vstack((lhs.real, lhs.imag)),
+                                np.concatenate((rhs.real, rhs.imag)),
+                                rcond=None)[0]
+        den = np.concatenate(([1.], coefs[order:]))
+        weight = 1./np.abs(np.polyval(den, s))
+
+    poles = np.roots(den)
+    poles = np.where(poles.real > 0, -np.conj(poles), poles)
+    den = np.real(np.poly(poles))
+
+    lhs = vander[:, 1:]/np.polyval(den, s)[:, None]
+    num = np.linalg.lstsq(np.vstack((lhs.real, lhs.imag)),
+                          np.concatenate((H.real, H.imag)),
+                          rcond=None)[0]
+
+    # Undo the frequency scaling
+    powers = omega_ref**np.arange(order + 1)
+    return num*powers[1:], den*powers
+
+
+def fit_radiation_kernel(omega, K, order, rtol=1e-6):
+    """
+    Fit rational functions to each term of the radiation kernel
+
+    Args:
+        omega (np.ndarray): Frequencies [rad/s]
+        K (np.ndarray): Kernel matrices at ``omega``, see ``radiation_kernel_freq``
+        order (int): Order of each rational function
+        rtol (float): Terms smaller than ``rtol`` times the largest term are neglected
+
+    Returns:
+        dict: Numerator and denominator of the non-zero terms with the ``"i_j"`` keys of the ``K_rf`` data in the
+        floating files
+    """
+    valid = np.isfinite(omega)
+    omega = omega[valid]
+    K = K[valid]
+
+    dict_rf = dict()
+    threshold = rtol*np.max(np.abs(K))
+    for i in range(K.shape[1]):
+        for j in range(K.shape[2]):
+            if np.max(np.abs(K[:, i, j])) <= threshold:
+                continue
+            num, den = fit_rational_function(omega, K[:, i, j], order)
+            dict_rf["%d_%d" % (i, j)] = {'num': num, 'den': den}
+
+    return dict_rf
+
+
+def rational_function_ss(dict_rf, ninput=6, noutput=6):
+    """
+    State-space realisation of a matrix of strictly proper rational functions of ``s``
+
+    Each term is realised in controllable canonical form and the blocks are stacked, so the state vector
+    contains the states of all the terms.
 
-    return f
+    Args:
+        dict_rf (dict): Numerator and denominator of each term with ``"i_j"`` keys
+        ninput (int): Number of inputs
+        noutput (int): Number of outputs
+
+    Returns:
+        tuple: ``A``, ``B`` and ``C`` matrices of the realisation
+    """
+    A_blocks = []
+    B_blocks = []
+    C_blocks = []
+    for pos, rf in dict_rf.items():
+        ioutput, iinput = [int(index) for index in pos.split('_')]
+        den = np.asarray(rf['den'], dtype=float)
+        num = np.asarray(rf['num'], dtype=float)
+        order = len(den) - 1
+        num = np.concatenate((np.zeros((order - len(num))), num))/den[0]
+
+        A = np.zeros((order, order))
+        A[0, :] = -den[1:]/den[0]
+        A[1:, :-1] = np.eye(order - 1)
+        B = np.zeros((order, ninput))
+        B[0, iinput] = 1.
+        C = np.zeros((noutput, order))
+        C[ioutput, :] = num
+
+        A_blocks.append(A)
+        B_blocks.append(B)
+        C_blocks.append(C)
+
+    nstates = sum([A.shape[0] for A in A_blocks])
+    A = np.zeros((nstates, nstates))
+    istate = 0
+    for block in A_blocks:
+        A[istate:istate + block.shape[0], istate:istate + block.shape[0]] = block
+        istate += block.shape[0]
+    if nstates == 0:
+        return A, np.zeros((0, ninput)), np.zeros((noutput, 0))
+
+    return A, np.vstack(B_blocks), np.hstack(C_blocks)
+
+
+def discretise_first_order_hold(A, B, dt):
+    r"""
+    Exact discretisation of :math:`\dot{\mathbf{x}} = \mathbf{Ax} + \mathbf{Bu}` for inputs that vary linearly
+    within the time step
+
+    .. math:: \mathbf{x}_{n+1} = \mathbf{\Phi}\mathbf{x}_n + \mathbf{\Gamma}_0\mathbf{u}_n +
+        \mathbf{\Gamma}_1\mathbf{u}_{n+1}
+
+    Returns:
+        tuple: :math:`\mathbf{\Phi}`, :math:`\mathbf{\Gamma}_0` and :math:`\mathbf{\Gamma}_1`
+    """
+    nstates, ninput = B.shape
+    mat = np.zeros((nstates + 2*ninput, nstates + 2*ninput))
+    mat[:nstates, :nstates] = A*dt
+    mat[:nstates, nstates:nstates + ninput] = B*dt
+    mat[nstates:nstates + ninput, nstates + ninput:] = np.eye(ninput)
+    exp_mat = expm(mat)
+
+    phi = exp_mat[:nstates, :nstates]
+    gamma_u = exp_mat[:nstates, nstates:nstates + ninput]
+    gamma_du = exp_mat[:nstates, nstates + ninput:]
+    return phi, gamma_u - gamma_du, gamma_du
 
 
 def compute_equiv_hd_added_mass(f, q):
@@ -318,7 +476,7 @@ def noise_freq_1s(w):
     sigma = 1. #/np.sqrt(2)
     nomega = w.shape[0]
 
-    wn = np.zeros((nomega, ), dtype=np.complex)
+    wn = np.zeros((nomega, ), dtype=complex)
     u1 = np.random.random(size=nomega) #+ 0j
     u2 = np.random.random(size=nomega) #+ 0j
     wn[0] = 0. + 0j
@@ -344,6 +502,11 @@ class FloatingForces(generator_interface.BaseGenerator):
     The mooring model is the quasisteady implementation of Jonkman [2] .However, equation 2-37b is thought to be wrong (it is just a copy from eq 2-35b)
     This was corrected according to the theory review of MAP++ [3].
 
+    The frequency-dependent radiation forces can be computed with constant matrices, with the rational function
+    approximation of the radiation kernel stored in the floating file or with a state-space model (``state_space``)
+    whose rational functions are fitted to the added mass and damping matrices during the initialisation [4]. The
+    state-space model is integrated recursively so its cost per time step does not depend on the time history.
+
     The default values have been obtained from the OC3 platform report [1]
 
     [1] Jonkman, J. Definition of the Floating System for Phase IV of OC3. 2010. NREL/TP-500-47535
@@ -351,6 +514,9 @@ class FloatingForces(generator_interface.BaseGenerator):
     [2] Jonkman, J. M. Dynamics modeling and loads analysis of an offshore floating wind turbine. 2007. NREL/TP-500-41958
 
     [3] https://map-plus-plus.readthedocs.io/en/latest/theory.html (accessed on Octorber 14th, 2020)
+
+    [4] Perez, T. and Fossen, T. I. Time- vs. frequency-domain identification of parametric radiation force models
+    for marine structures at zero speed. Modeling, Identification and Control, 29(1), 2008
     """
     generator_id = 'FloatingForces'
     generator_classification = 'runtime'
@@ -403,7 +569,7 @@ class FloatingForces(generator_interface.BaseGenerator):
     settings_types['method_matrices_freq'] = 'str'
     settings_default['method_matrices_freq'] = 'constant'
     settings_description['method_matrices_freq'] = 'Method to compute frequency-dependent matrices'
-    settings_options['method_matrices_freq'] = ['constant', 'rational_function']
+    settings_options['method_matrices_freq'] = ['constant', 'rational_function', 'state_space']
 
     settings_types['matrices_freq'] = 'float'
     settings_default['matrices_freq'] = 4.8 # Close to the upper limit defined in the oc3 report
@@ -413,6 +579,10 @@ class FloatingForces(generator_interface.BaseGenerator):
     settings_default['steps_constant_matrices'] = 8
     settings_description['steps_constant_matrices'] = 'Time steps to compute with constant matrices computed at ``matrices_freq``. Irrelevant in ``method_matrices_freq``=``constant``'
 
+    settings_types['radiation_order'] = 'int'
+    settings_default['radiation_order'] = 4
+    settings_description['radiation_order'] = 'Order of the rational functions fitted to each term of the radiation kernel. Only used in ``method_matrices_freq = state_space``'
+
     settings_types['added_mass_in_mass_matrix'] = 'bool'
     settings_default['added_mass_in_mass_matrix'] = True
     settings_description['added_mass_in_mass_matrix'] = 'Include the platform added mass in the mass matrix of the system'
@@ -490,6 +660,12 @@ class FloatingForces(generator_interface.BaseGenerator):
         self.log_filename = None
         self.added_mass_in_mass_matrix = None
 
+        self.rad_phi = None
+        self.rad_gamma0 = None
+        self.rad_gamma1 = None
+        self.rad_C = None
+        self.x_rad = None
+
 
     def initialise(self, in_dict=None, data=None, restart=False):
         self.in_dict = in_dict
@@ -560,7 +736,7 @@ class FloatingForces(generator_interface.BaseGenerator):
                                axis=0)
             self.hd_damping_const = interp_d(self.settings['matrices_freq'])
 
-        elif self.settings['method_matrices_freq'] == 'rational_function':
+        elif self.settings['method_matrices_freq'] in ['rational_function', 'state_space']:
             self.hd_added_mass_const = self.floating_data['hydrodynamics']['added_mass_matrix'][-1, :, :]
             self.hd_damping_const = self.floating_data['hydrodynamics']['damping_matrix'][-1, :, :]
 
@@ -600,6 +776,23 @@ class FloatingForces(generator_interface.BaseGenerator):
                 self.x0_K = [None]*(self.settings['n_time_steps'] + 1)
                 self.x0_K[0] = 0.
 
+        elif self.settings['method_matrices_freq'] == 'state_space':
+            if not restart:
+                K_freq = radiation_kernel_freq(self.floating_data['hydrodynamics']['ab_freq_rads'],
+                                               self.floating_data['hydrodynamics']['added_mass_matrix'],
+                                               self.floating_data['hydrodynamics']['damping_matrix'],
+                                               self.hd_added_mass_const)
+                K_rf = fit_radiation_kernel(self.floating_data['hydrodynamics']['ab_freq_rads'],
+                                            K_freq,
+                                            self.settings['radiation_order'])
+                A, B, self.rad_C = rational_function_ss(K_rf)
+                self.rad_phi, self.rad_gamma0, self.rad_gamma1 = discretise_first_order_hold(A, B,
+                                                                                             self.settings['dt'])
+                cout.cout_wrap(("Radiation state-space model with %d states" % A.shape[0]), 2)
+                self.x_rad = np.zeros((self.settings['n_time_steps'] + 1, A.shape[0]))
+            else:
+                self.x_rad = np.concatenate((self.x_rad, np.zeros((increase_ts, self.x_rad.shape[1]))), axis=0)
+
 
         # Wave forces
         self.wave_forces_node = self.floating_data['wave_forces']['node']
@@ -706,6 +899,41 @@ class FloatingForces(generator_interface.BaseGenerator):
         return
 
 
+    def checkpoint_state(self):
+        state = {'q': self.q,
+                 'qdot': self.qdot,
+                 'qdotdot': self.qdotdot,
+                 # np.nan before the first mooring computation
+                 'hf_prev': np.array([np.nan if hf is None else hf for hf in self.hf_prev]),
+                 'vf_prev': np.array([np.nan if vf is None else vf for vf in self.vf_prev])}
+        if self.x_rad is not None:
+            state['x_rad'] = self.x_rad
+        if self.settings['method_matrices_freq'] == 'rational_function':
+            # only the state of the last time step is used
+            i_last = max([it for it, x0 in enumerate(self.x0_K) if x0 is not None])
+            state['x0_K_index'] = i_last
+            state['x0_K'] = np.array(self.x0_K[i_last])
+        if self.settings['method_wave'] == 'jonswap':
+            # random phases of the waves
+            state['noise_freq'] = self.noise_freq
+            state['wave_amplitude'] = self.wave_amplitude
+        return state
+
+    def restore_checkpoint_state(self, state):
+        n_steps = min(self.q.shape[0], state['q'].shape[0])
+        self.q[:n_steps] = state['q'][:n_steps]
+        self.qdot[:n_steps] = state['qdot'][:n_steps]
+        self.qdotdot[:n_steps] = state['qdotdot'][:n_steps]
+        self.hf_prev = [None if np.isnan(hf) else hf for hf in state['hf_prev']]
+        self.vf_prev = [None if np.isnan(vf) else vf for vf in state['vf_prev']]
+        if 'x_rad' in state and self.x_rad is not None:
+            self.x_rad[:n_steps] = state['x_rad'][:n_steps]
+        if 'x0_K' in state:
+            self.x0_K[int(state['x0_K_index'])] = state['x0_K'] if state['x0_K'].ndim else float(state['x0_K'])
+        if 'wave_amplitude' in state:
+            self.noise_freq = state['noise_freq']
+            self.wave_amplitude = state['wave_amplitude']
+
     def freq_wave_forces_variables(self, Tp, Hs, dt, time, xi, w_xi):
         """
         Compute the frequency arrays needed for wave forces
@@ -734,39 +962,50 @@ class FloatingForces(generator_interface.BaseGenerator):
         self.omega = w
         self.nomega_2s = nomega_2s
 
-        self.xi_interp = np.zeros((nomega, 6), dtype=np.complex)
-        for iomega in range(nomega):
-            for idim in range(6):
-                self.xi_interp[iomega, idim] = np.interp(self.omega[iomega], w_xi, xi[:, idim])
+        self.xi_interp = np.zeros((nomega, 6), dtype=complex)
+        for idim in range(6):
+            self.xi_interp[:, idim] = np.interp(self.omega, w_xi, xi[:, idim])
+
+        # Frequency components of the forces without the phase due to the position of the platform
+        self.wave_amplitude = (self.noise_freq*0.5*self.jonswap_freq)[:, None]*self.xi_interp
+        # Frequencies appearing twice in the two-sided spectrum (all but the constant and the Nyquist ones)
+        self.wave_nconj = nomega - 1 if nomega_2s%2 else nomega - 2
+        self.wave_weight = np.ones((nomega))
+        self.wave_weight[1:self.wave_nconj + 1] = 2.
 
 
     def time_wave_forces(self, dx, grav):
         """
         Compute the time evolution of wave forces
         """
+        k = self.omega**2/grav
+        force_freq_1s = self.wave_amplitude*np.exp(-1j*k*dx)[:, None]
 
         # Compute the two-sided spectrum
-        force_freq_2s = np.zeros((self.nomega_2s, 6), dtype=np.complex)
-        for idim in range(6):
-            for iomega in range(self.omega.shape[0]):
-                k = self.omega[iomega]**2/grav
-                force_freq_2s[iomega, idim] = (self.noise_freq[iomega]*
-                                               0.5*self.jonswap_freq[iomega]*
-                                               self.xi_interp[iomega, idim]*
-                                               np.exp(-1j*k*dx))
-                if not iomega == 0:
-                    if not ((iomega == self.omega.shape[0] - 1) and (self.nomega_2s%2 == 0)):
-                        force_freq_2s[-iomega, idim] = (np.conj(self.noise_freq[iomega])*
-                                                        0.5*self.jonswap_freq[iomega]*
-                                                        np.conj(self.xi_interp[iomega, idim])*
-                                                        np.exp(1j*k*dx))
+        force_freq_2s = np.zeros((self.nomega_2s, 6), dtype=complex)
+        force_freq_2s[:self.omega.shape[0], :] = force_freq_1s
+        force_freq_2s[self.nomega_2s - self.wave_nconj:, :] = np.conj(force_freq_1s[self.wave_nconj:0:-1, :])
 
         # Compute the inverse Fourier transform
-        force_waves = ifft(force_freq_2s, axis=0)
+        force_waves = np.fft.ifft(force_freq_2s, axis=0)
 
         return np.real(force_waves)
 
 
+    def step_wave_forces(self, dx, grav, it):
+        """
+        Compute the wave forces at time step ``it``
+
+        Equivalent to ``time_wave_forces(dx, grav)[it, :]`` evaluating only the required term of the inverse
+        Fourier transform
+        """
+        k = self.omega**2/grav
+        phase = 2.*np.pi*np.arange(self.omega.shape[0])*(it%self.nomega_2s)/self.nomega_2s - k*dx
+        force_waves = np.dot(self.wave_weight*np.exp(1j*phase), self.wave_amplitude)
+
+        return np.real(force_waves)/self.nomega_2s
+
+
     def generate(self, params):
         # Renaming for convenience
         data = params['data']
@@ -857,6 +1096,14 @@ class FloatingForces(generator_interface.BaseGenerator):
             hd_f_qdot_g -= yout[:, 1]
             hd_f_qdotdot_g = np.zeros((6))
 
+        elif self.settings['method_matrices_freq'] == 'state_space':
+            # Damping: one step of the radiation state-space model from the previous time step
+            self.x_rad[data.ts, :] = (np.dot(self.rad_phi, self.x_rad[data.ts - 1, :]) +
+                                      np.dot(self.rad_gamma0, self.qdot[data.ts - 1, :]) +
+                                      np.dot(self.rad_gamma1, self.qdot[data.ts, :]))
+            hd_f_qdot_g -= np.dot(self.rad_C, self.x_rad[data.ts, :])
+            hd_f_qdotdot_g = np.zeros((6))
+
         else:
             cout.cout_wrap(("ERROR: Unknown method_matrices_freq %s" % self.settings['method_matrices_freq']), 4)
 
@@ -939,10 +1186,9 @@ class FloatingForces(generator_interface.BaseGenerator):
         if self.settings['method_wave'] == 'sin':
             phase = (self.settings['wave_freq']*data.ts*self.settings['dt'] +
                      dx*self.settings['wave_freq']**2/self.settings['gravity'])
-            for idim in range(6):
-                wave_forces_g[idim] = np.real(self.settings['wave_amplitude']*self.xi_interp[idim]*(np.cos(phase) + 1j*np.sin(phase)))
+            wave_forces_g = np.real(self.settings['wave_amplitude']*self.xi_interp*np.exp(1j*phase))
         elif self.settings['method_wave'] == 'jonswap':
-            wave_forces_g = self.time_wave_forces(dx, self.settings['gravity'])[data.ts, :]
+            wave_forces_g = self.step_wave_forces(dx, self.settings['gravity'], data.ts)
 
         struct_tstep.runtime_unsteady_forces[self.wave_forces_node, 0:3] += np.dot(cbg, wave_forces_g[0:3])
         struct_tstep.runtime_unsteady_forces[self.wave_forces_node, 3:6] += np.dot(cbg, wave_forces_g[3:6])
@@ -65,6 +65,28 @@ class BaseGust(metaclass=ABCMeta):
     def u_inf_direction(self, value):
         self._u_inf_direction = value
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        """
+        Gust velocity at an array of points.
+
+        This default implementation evaluates ``gust_shape`` point by point, so that user defined gusts only need to
+        implement the latter. Gusts that can be evaluated with array operations should override it.
+
+        Args:
+            x (np.ndarray): ``x`` coordinates of the points, of any shape
+            y (np.ndarray): ``y`` coordinates of the points, same shape as ``x``
+            z (np.ndarray): ``z`` coordinates of the points, same shape as ``x``
+            time (float): Time
+
+        Returns:
+            np.ndarray: Gust velocity of shape ``(3,) + x.shape``
+        """
+        x = np.asarray(x)
+        vel = np.zeros((3,) + x.shape)
+        for index in np.ndindex(x.shape):
+            vel[(slice(None),) + index] = self.gust_shape(x[index], y[index], z[index], time)
+        return vel
+
 
 @gust
 class one_minus_cos(BaseGust):
@@ -112,6 +134,17 @@ class one_minus_cos(BaseGust):
         vel[self.settings['gust_component']] = (1.0 - np.cos(2.0 * np.pi * x / gust_length)) * gust_intensity * 0.5
         return vel
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        gust_length = self.settings['gust_length']
+        gust_intensity = self.settings['gust_intensity']
+
+        x = np.asarray(x)
+        vel = np.zeros((3,) + x.shape)
+        in_gust = (x <= 0.0) & (x >= -gust_length)
+        vel[self.settings['gust_component']][in_gust] = \
+            (1.0 - np.cos(2.0 * np.pi * x[in_gust] / gust_length)) * gust_intensity * 0.5
+        return vel
+
 
 @gust
 class DARPA(BaseGust):
@@ -165,6 +198,20 @@ class DARPA(BaseGust):
         vel[self.settings['gust_component']] *= -np.cos(y / span * np.pi)
         return vel
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        gust_length = self.settings['gust_length']
+        gust_intensity = self.settings['gust_intensity']
+        span = self.settings['span']
+
+        x = np.asarray(x)
+        y = np.asarray(y)
+        vel = np.zeros((3,) + x.shape)
+        in_gust = (x <= 0.0) & (x >= -gust_length)
+        vel[self.settings['gust_component']][in_gust] = \
+            (1.0 - np.cos(2.0 * np.pi * x[in_gust] / gust_length)) * gust_intensity * 0.5 * \
+            -np.cos(y[in_gust] / span * np.pi)
+        return vel
+
 
 @gust
 class continuous_sin(BaseGust):
@@ -212,6 +259,17 @@ class continuous_sin(BaseGust):
         vel[self.settings['gust_component']] = 0.5 * gust_intensity * np.sin(2 * np.pi * x / gust_length)
         return vel
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        gust_length = self.settings['gust_length']
+        gust_intensity = self.settings['gust_intensity']
+
+        x = np.asarray(x)
+        vel = np.zeros((3,) + x.shape)
+        in_gust = x <= 0.0
+        vel[self.settings['gust_component']][in_gust] = \
+            0.5 * gust_intensity * np.sin(2 * np.pi * x[in_gust] / gust_length)
+        return vel
+
 
 @gust
 class time_varying_global(BaseGust):
@@ -262,6 +320,12 @@ class time_varying_global(BaseGust):
             vel[idim] = self.list_interpolated_velocity_field_functions[counter](time)
         return vel
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        vel = np.zeros((3,) + np.shape(x))
+        for counter, idim in enumerate(self.settings['gust_component']):
+            vel[idim] = self.list_interpolated_velocity_field_functions[counter](time)
+        return vel
+
 
 @gust
 class time_varying(time_varying_global):
@@ -286,6 +350,15 @@ class time_varying(time_varying_global):
             for counter, idim in enumerate(self.settings['gust_component']):
                 vel[idim] = self.list_interpolated_velocity_field_functions[counter](d)
         return vel
+
+    def gust_shape_batch(self, x, y, z, time=0):
+        x = np.asarray(x)
+        vel = np.zeros((3,) + x.shape)
+        d = x * self.u_inf_direction[0] + y * self.u_inf_direction[1] + z * self.u_inf_direction[2]
+        in_gust = d <= 0.0
+        for counter, idim in enumerate(self.settings['gust_component']):
+            vel[idim][in_gust] = self.list_interpolated_velocity_field_functions[counter](d[in_gust])
+        return vel
        
 @gust
 class span_sine(BaseGust):
@@ -343,6 +416,16 @@ class span_sine(BaseGust):
 
         return vel * self.settings['perturbation_dir']
 
+    def gust_shape_batch(self, x, y, z, time=0):
+        span_dir = self.settings['span_dir']
+        d = np.asarray(x * span_dir[0] + y * span_dir[1] + z * span_dir[2])
+        vel = np.where(np.abs(d) <= self.settings['span_with_gust'] / 2,
+                       0.5 * self.settings['gust_intensity'] * np.sin(
+                           d * 2. * np.pi / (self.settings['span'] / self.settings['periods_per_span'])),
+                       0.)
+        perturbation_dir = np.asarray(self.settings['perturbation_dir'], dtype=float)
+        return perturbation_dir.reshape((3,) + (1,) * vel.ndim) * vel
+
 
 @generator_interface.generator
 class GustVelocityField(generator_interface.BaseGenerator):
@@ -441,21 +524,21 @@ class GustVelocityField(generator_interface.BaseGenerator):
 
         for_pos = params['for_pos'][0:3]
 
+        total_offset_val = self.settings['offset']
+        if self.settings['relative_motion']:
+            total_offset_val -= self.settings['u_inf'] * t
+        total_offset = total_offset_val * self.settings['u_inf_direction'] + for_pos
+
         for i_surf in range(len(zeta)):
             if override:
                 uext[i_surf].fill(0.0)
 
-            for i in range(zeta[i_surf].shape[1]):
-                for j in range(zeta[i_surf].shape[2]):
-                    total_offset_val = self.settings['offset']
-                    if self.settings['relative_motion']:
-                        uext[i_surf][:, i, j] += self.settings['u_inf'] * self.settings['u_inf_direction']
-                        total_offset_val -= self.settings['u_inf'] * t
-
-                    total_offset = total_offset_val * self.settings['u_inf_direction'] + for_pos
-                    uext[i_surf][:, i, j] += self.gust.gust_shape(
-                        zeta[i_surf][0, i, j] + total_offset[0],
-                        zeta[i_surf][1, i, j] + total_offset[1],
-                        zeta[i_surf][2, i, j] + total_offset[2],
-                        t
-                    )
+            if self.settings['relative_motion']:
+                uext[i_surf] += (self.settings['u_inf'] * self.settings['u_inf_direction'])[:, None, None]
+
+            uext[i_surf] += self.gust.gust_shape_batch(
+                zeta[i_surf][0, :, :] + total_offset[0],
+                zeta[i_surf][1, :, :] + total_offset[1],
+                zeta[i_surf][2, :, :] + total_offset[2],
+                t
+            )
@@ -3,7 +3,9 @@ import os
 import sharpy.utils.generator_interface as generator_interface
 import sharpy.utils.settings as settings
 import sharpy.utils.algebra as algebra
-from sharpy.aero.utils.utils import magnitude_and_direction_of_relative_velocity, local_stability_axes, span_chord
+from sharpy.aero.utils.utils import span_chord, local_stability_axes_vec
+from sharpy.aero.utils.airfoilpolars import PolarTables
+from sharpy.aero.utils.mapping import AeroStructForceMapping
 from sharpy.utils.generate_cases import get_aoacl0_from_camber
 
 
@@ -47,6 +49,9 @@ class PolarCorrection(generator_interface.BaseGenerator):
     overriding any moment computed in SHARPy. That is, the moment will include the polar pitching moment, and moments
     due to lift and drag computed from the polar data.
 
+    The nodes to correct, their aerodynamic sections and airfoils are tabulated in the initialisation, so each call to
+    :meth:`generate` corrects all the nodes with array operations.
+
     """
     generator_id = 'PolarCorrection'
 
@@ -111,6 +116,22 @@ class PolarCorrection(generator_interface.BaseGenerator):
         self.n_node = None
         self.flag_node_shared_by_multiple_surfaces = None
 
+        self.polar_tables = None
+        self.node = None
+        self.node_elem = None
+        self.node_local = None
+        self.node_airfoil = None
+        self.node_aoa_cl0 = None
+        self.node_surf = None
+        self.node_i_n = None
+        self.vertex_le = None
+        self.vertex_le_aft = None
+        self.vertex_te = None
+        self.vertex_span_p = None
+        self.vertex_span_m = None
+        self.shared_section = None
+        self.shared_vertex = None
+
     def initialise(self, in_dict, **kwargs):
         self.settings = in_dict
         settings.to_custom_types(self.settings, self.settings_types, self.settings_default)
@@ -129,6 +150,88 @@ class PolarCorrection(generator_interface.BaseGenerator):
             self.compute_aoa_cl0_from_airfoil_data(self.aero)
 
         self.check_for_special_cases(self.aero)
+        if self.aero.polars is not None:
+            self.build_lookup_tables(self.aero)
+
+    def build_lookup_tables(self, aerogrid):
+        """
+        Tabulates the structural nodes to correct and the indices of their element, airfoil and lattice vertices.
+
+        Lattice vertices are numbered as in :class:`~sharpy.aero.utils.mapping.AeroStructForceMapping`.
+
+        Args:
+            aerogrid :class:`~sharpy.aero.models.AerogridLoader
+        """
+        data_dict = aerogrid.data_dict
+        dimensions = np.array(aerogrid.dimensions, dtype=int)
+        n_vertex_surf = (dimensions[:, 0] + 1)*(dimensions[:, 1] + 1)
+        surface_offset = np.concatenate(([0], np.cumsum(n_vertex_surf)))
+
+        def vertex(i_surf, i_m, i_n):
+            return surface_offset[i_surf] + i_m*(dimensions[i_surf, 1] + 1) + i_n
+
+        self.node = np.array([inode for inode in range(self.n_node) if
+                              data_dict['aero_node'][inode] and
+                              aerogrid.struct2aero_mapping[inode][0]['i_surf'] not in self.settings['skip_surfaces']],
+                             dtype=int)
+        self.node_elem = self.structure.node_master_elem[self.node, 0]
+        self.node_local = self.structure.node_master_elem[self.node, 1]
+        self.node_airfoil = data_dict['airfoil_distribution'][self.node_elem, self.node_local].astype(int)
+        if not self.cd_from_cl:
+            self.node_aoa_cl0 = np.array(self.list_aoa_cl0, dtype=float).reshape(-1)[self.node_airfoil]
+        self.node_surf = np.array([aerogrid.struct2aero_mapping[inode][0]['i_surf'] for inode in self.node],
+                                  dtype=int)
+        self.node_i_n = np.array([aerogrid.struct2aero_mapping[inode][0]['i_n'] for inode in self.node],
+                                 dtype=int)
+
+        # Vertices of the sections as in ``span_chord``
+        self.vertex_le = vertex(self.node_surf, 0, self.node_i_n)
+        self.vertex_le_aft = vertex(self.node_surf, 1, self.node_i_n)
+        self.vertex_te = vertex(self.node_surf, dimensions[self.node_surf, 0], self.node_i_n)
+        self.vertex_span_p, self.vertex_span_m = self.span_vertices(self.node_surf, self.node_i_n, dimensions,
+                                                                    vertex)
+
+        # Sections of other surfaces sharing the node, whose area is added as in ``correct_surface_area``
+        shared_section = []
+        shared_surf = []
+        shared_i_n = []
+        for isection, inode in enumerate(self.node):
+            if self.flag_shared_node_by_surfaces[inode]:
+                for mapping in aerogrid.struct2aero_mapping[inode][1:]:
+                    shared_section.append(isection)
+                    shared_surf.append(mapping['i_surf'])
+                    shared_i_n.append(mapping['i_n'])
+        self.shared_section = np.array(shared_section, dtype=int)
+        shared_surf = np.array(shared_surf, dtype=int)
+        shared_i_n = np.array(shared_i_n, dtype=int)
+        self.shared_vertex = dict()
+        self.shared_vertex['le'] = vertex(shared_surf, 0, shared_i_n)
+        self.shared_vertex['te'] = vertex(shared_surf, dimensions[shared_surf, 0], shared_i_n)
+        self.shared_vertex['span_p'], self.shared_vertex['span_m'] = self.span_vertices(shared_surf, shared_i_n,
+                                                                                        dimensions, vertex)
+
+        self.polar_tables = PolarTables(aerogrid.polars)
+
+    @staticmethod
+    def span_vertices(i_surf, i_n, dimensions, vertex):
+        """
+        Leading edge vertices defining the span of the sections as in ``span_chord``
+        """
+        n_span = dimensions[i_surf, 1]
+        i_n_p = np.where(i_n == 0, 1, np.where(i_n == n_span, n_span, i_n + 1))
+        i_n_m = np.where(i_n == 0, 0, np.where(i_n == n_span, n_span - 1, i_n - 1))
+        return vertex(i_surf, 0, i_n_p), vertex(i_surf, 0, i_n_m)
+
+    @staticmethod
+    def section_span_chord(zeta, vertex_span_p, vertex_span_m, vertex_le, vertex_te):
+        """
+        Vectorised ``span_chord`` for the sections defined by their vertices in the stacked ``zeta``
+        """
+        span = np.linalg.norm(0.5 * (zeta[vertex_span_p, :] - zeta[vertex_span_m, :]), axis=1)
+        dir_chord = zeta[vertex_te, :] - zeta[vertex_le, :]
+        chord = np.linalg.norm(dir_chord, axis=1)
+        dir_chord = algebra.unit_vector_vec(dir_chord)
+        return span, dir_chord, chord
 
 
     def generate(self, **params):
@@ -147,139 +250,104 @@ class PolarCorrection(generator_interface.BaseGenerator):
         struct_forces = params['struct_forces']
         ts = params['ts']
 
-        aerogrid = self.aero
-        structure = self.structure
+        if self.aero.polars is None:
+            return struct_forces
+        new_struct_forces = struct_forces.copy()
+
         rho = self.rho
         correct_lift = self.settings['correct_lift']
         moment_from_polar = self.settings['moment_from_polar']
-        
-        list_aoa_induced = []
+        nodes = self.node
 
-        data_dict = aerogrid.data_dict
-        if aerogrid.polars is None:
-            return struct_forces
-        new_struct_forces = np.zeros_like(struct_forces)
-
-        nnode = struct_forces.shape[0]
-
-        # Compute induced velocities at the structural points
         cga = algebra.quat2rotation(structural_kstep.quat)
-        pos_g = np.array([cga.dot(structural_kstep.pos[inode]) + np.array([0, 0, 0]) for inode in range(nnode)])
-
-        for inode in range(nnode):
-            new_struct_forces[inode, :] = struct_forces[inode, :].copy()
-            if data_dict['aero_node'][inode]:
-                ielem, inode_in_elem = structure.node_master_elem[inode]
-                iairfoil = data_dict['airfoil_distribution'][ielem, inode_in_elem]
-                isurf = aerogrid.struct2aero_mapping[inode][0]['i_surf']
-                if isurf not in self.settings['skip_surfaces']:
-                    i_n = aerogrid.struct2aero_mapping[inode][0]['i_n']
-                    polar = aerogrid.polars[iairfoil]
-                    cab = algebra.crv2rotation(structural_kstep.psi[ielem, inode_in_elem, :])
-                    cgb = np.dot(cga, cab)
-
-                    if not self.cd_from_cl:
-                        airfoil = str(data_dict['airfoil_distribution'][ielem, inode_in_elem])
-                        aoa_0cl = self.list_aoa_cl0[int(airfoil)]
-
-                    # computing surface area of panels contributing to force
-                    dir_span, span, dir_chord, chord = span_chord(i_n, aero_kstep.zeta[isurf])
-                    area = span * chord
-                    area = self.correct_surface_area(inode, aerogrid.struct2aero_mapping, aero_kstep.zeta, area)
-               
-                    # Define the relative velocity and its direction
-                    urel, dir_urel = magnitude_and_direction_of_relative_velocity(structural_kstep.pos[inode, :],
-                                                                                structural_kstep.pos_dot[inode, :],
-                                                                                structural_kstep.for_vel[:],
-                                                                                cga,
-                                                                                aero_kstep.u_ext[isurf][:, :, i_n],
-                                                                                self.settings['add_rotation'],
-                                                                                self.settings['rot_vel_g'],
-                                                                                self.settings['centre_rot_g'],)
-                    # Coefficient to change from aerodynamic coefficients to forces (and viceversa)
-                    coef = 0.5 * rho * np.linalg.norm(urel) ** 2 * area
-                    # Stability axes - projects forces in B onto S
-                    c_bs = local_stability_axes(cgb.T.dot(dir_urel), cgb.T.dot(dir_chord))
-                    forces_s = c_bs.T.dot(struct_forces[inode, :3])
-                    moment_s = c_bs.T.dot(struct_forces[inode, 3:])
-                    drag_force = forces_s[0]
-                    lift_force = forces_s[2]
-                    # Compute the associated lift
-                    cl = np.sign(lift_force) * np.linalg.norm(lift_force) / coef
-                    cd_sharpy = np.linalg.norm(drag_force) / coef
-
-                    if self.cd_from_cl:
-                        # Compute the drag from the UVLM computed lift
-                        cd, cm = polar.get_cdcm_from_cl(cl)
-
-                    else:
-                        """
-                        Compute L, D, M from polar depending on:
-                        ii) Compute the effective angle of attack from potential flow theory or specified it as setting
-                        input. The local lift curve slope is 2pi and the zero-lift angle of attack is given by thin 
-                        airfoil theory or specified it as setting input. From this, the effective angle of attack is 
-                        computed for the section and includes 3D effects.
-                        """
-                        aoa = cl / 2 / np.pi + aoa_0cl 
-                        list_aoa_induced.append(aoa)
-                        # Compute the coefficients associated to that angle of attack
-                        cl_polar, cd, cm = polar.get_coefs(aoa)
-                        
-                        if correct_lift:
-                            # Use polar generated CL rather than UVLM computed CL
-                            cl = cl_polar
-
-                    # Recompute the forces based on the coefficients (side force is uncorrected)
-                    forces_s[0] += cd * coef  # add viscous drag to induced drag from UVLM
-                    forces_s[2] = cl * coef
-
-                    new_struct_forces[inode, 0:3] = c_bs.dot(forces_s)
-
-                    # Pitching moment
-                    # The panels are shifted by 0.25 of a panel aft from the leading edge
-                    panel_shift = 0.25 * (aero_kstep.zeta[isurf][:, 1, i_n] - aero_kstep.zeta[isurf][:, 0, i_n])
-                    ref_point = aero_kstep.zeta[isurf][:, 0, i_n] + 0.25 * chord * dir_chord - panel_shift
-
-                    # viscous contribution (pure moment)
-                    moment_s[1] += cm * coef * chord
-
-                    # moment due to drag
-                    arm = cgb.T.dot(ref_point - pos_g[inode])  # in B frame
-                    moment_polar_drag = algebra.cross3(c_bs.T.dot(arm), cd * dir_urel * coef)  # in S frame
-                    moment_s += moment_polar_drag
-
-                    # Pitching moment
-                    if moment_from_polar:
-                        # The panels are shifted by 0.25 of a panel aft from the leading edge
-                        panel_shift = 0.25 * (aero_kstep.zeta[isurf][:, 1, i_n] - aero_kstep.zeta[isurf][:, 0, i_n])
-                        ref_point = aero_kstep.zeta[isurf][:, 0, i_n] + 0.25 * chord * dir_chord - panel_shift
-                        new_struct_forces[inode, 3:6] = c_bs.dot(moment_s)
-
-                        # viscous contribution (pure moment)
-                        moment_s[1] += cm * coef * chord
-
-
-                        # moment due to drag
-                        arm = cgb.T.dot(ref_point - pos_g[inode])  # in B frame
-                        moment_polar_drag = algebra.cross3(c_bs.T.dot(arm), cd * dir_urel * coef)  # in S frame
-                        moment_s += moment_polar_drag
-
-                    # moment due to lift (if corrected)
-                    if correct_lift and moment_from_polar:
-                        # add moment from scratch: cm_polar + cm_drag_polar + cl_lift_polar
-                        moment_s = np.zeros(3)
-                        moment_s[1] = cm * coef * chord
-                        moment_s += moment_polar_drag
-                        moment_polar_lift = algebra.cross3(c_bs.T.dot(arm), forces_s[2] * np.array([0, 0, 1]))
-                        moment_s += moment_polar_lift
-
-                    new_struct_forces[inode, 3:6] = c_bs.dot(moment_s)
+        pos = structural_kstep.pos[nodes, :]
+        pos_g = np.dot(pos, cga.T)
+        cab = algebra.crv2rotation_vec(structural_kstep.psi[self.node_elem, self.node_local, :])
+        cgb = np.matmul(cga, cab)
+
+        # computing surface area of panels contributing to force
+        zeta = AeroStructForceMapping.stack_vertex_variable(aero_kstep.zeta)
+        span, dir_chord, chord = self.section_span_chord(zeta, self.vertex_span_p, self.vertex_span_m,
+                                                         self.vertex_le, self.vertex_te)
+        area = span * chord
+        if len(self.shared_section) > 0:
+            span_shared, _, chord_shared = self.section_span_chord(zeta, self.shared_vertex['span_p'],
+                                                                   self.shared_vertex['span_m'],
+                                                                   self.shared_vertex['le'],
+                                                                   self.shared_vertex['te'])
+            np.add.at(area, self.shared_section, span_shared * chord_shared)
+
+        # Define the relative velocity and its direction
+        for_vel = structural_kstep.for_vel
+        urel = structural_kstep.pos_dot[nodes, :] + for_vel[0:3] + np.cross(for_vel[3:6], pos)
+        urel = -np.dot(urel, cga.T)
+        for isurf in np.unique(self.node_surf):
+            isections = np.where(self.node_surf == isurf)[0]
+            urel[isections, :] += np.average(aero_kstep.u_ext[isurf][:, :, self.node_i_n[isections]], axis=1).T
+        if self.settings['add_rotation']:
+            urel -= np.cross(self.settings['rot_vel_g'], pos_g - self.settings['centre_rot_g'])
+        dir_urel = algebra.unit_vector_vec(urel)
+
+        # Coefficient to change from aerodynamic coefficients to forces (and viceversa)
+        coef = 0.5 * rho * np.linalg.norm(urel, axis=1) ** 2 * area
+        # Stability axes - projects forces in B onto S
+        c_bs = local_stability_axes_vec(np.einsum('nji,nj->ni', cgb, dir_urel),
+                                        np.einsum('nji,nj->ni', cgb, dir_chord))
+        forces_s = np.einsum('nji,nj->ni', c_bs, struct_forces[nodes, :3])
+        moment_s = np.einsum('nji,nj->ni', c_bs, struct_forces[nodes, 3:])
+        lift_force = forces_s[:, 2]
+        # Compute the associated lift
+        cl = np.sign(lift_force) * np.abs(lift_force) / coef
+
+        if self.cd_from_cl:
+            # Compute the drag from the UVLM computed lift
+            cd, cm = self.polar_tables.get_cdcm_from_cl(cl, self.node_airfoil)
+            aoa = []
+        else:
+            # Effective angle of attack from potential flow theory: the local lift curve slope is 2pi and the
+            # zero-lift angle of attack is given by thin airfoil theory or by the settings
+            aoa = cl / 2 / np.pi + self.node_aoa_cl0
+            cl_polar, cd, cm = self.polar_tables.get_coefs(aoa, self.node_airfoil)
+            if correct_lift:
+                # Use polar generated CL rather than UVLM computed CL
+                cl = cl_polar
+
+        # Recompute the forces based on the coefficients (side force is uncorrected)
+        forces_s[:, 0] += cd * coef  # add viscous drag to induced drag from UVLM
+        forces_s[:, 2] = cl * coef
+        new_struct_forces[nodes, 0:3] = np.einsum('nij,nj->ni', c_bs, forces_s)
+
+        # Pitching moment
+        # The panels are shifted by 0.25 of a panel aft from the leading edge
+        panel_shift = 0.25 * (zeta[self.vertex_le_aft, :] - zeta[self.vertex_le, :])
+        ref_point = zeta[self.vertex_le, :] + (0.25 * chord)[:, None] * dir_chord - panel_shift
+
+        # viscous contribution (pure moment)
+        moment_s[:, 1] += cm * coef * chord
+
+        # moment due to drag
+        arm_s = np.einsum('nji,nj->ni', c_bs, np.einsum('nji,nj->ni', cgb, ref_point - pos_g))
+        moment_polar_drag = np.cross(arm_s, cd[:, None] * dir_urel * coef[:, None])  # in S frame
+        moment_s += moment_polar_drag
+
+        if moment_from_polar:
+            moment_s[:, 1] += cm * coef * chord
+            moment_s += moment_polar_drag
+
+        # moment due to lift (if corrected)
+        if correct_lift and moment_from_polar:
+            # add moment from scratch: cm_polar + cm_drag_polar + cl_lift_polar
+            moment_s = np.zeros_like(moment_s)
+            moment_s[:, 1] = cm * coef * chord
+            moment_s += moment_polar_drag
+            moment_s += np.cross(arm_s, forces_s[:, 2:3] * np.array([0, 0, 1]))
+
+        new_struct_forces[nodes, 3:6] = np.einsum('nij,nj->ni', c_bs, moment_s)
 
         if self.settings['write_induced_aoa']:
-            self.write_induced_aoa_of_each_node(ts, list_aoa_induced)
+            self.write_induced_aoa_of_each_node(ts, aoa)
 
         return new_struct_forces
-    
 
     def correct_surface_area(self, inode, struct2aero_mapping, zeta_ts, area):
         '''
@@ -1,83 +1,74 @@
+import concurrent.futures
+
 import numpy as np
 import scipy.interpolate as interpolate
 
 import sharpy.utils.generator_interface as generator_interface
 import sharpy.utils.settings as settings
 import sharpy.utils.cout_utils as cout
+import sharpy.utils.exceptions as exceptions
 
 
 def interp_rectgrid_vectorfield(points, grid, vector_field, out_value, regularGrid=False, num_cores=1):
-    # check: https://en.wikipedia.org/wiki/Trilinear_interpolation
+    """
+    Trilinear interpolation of a vector field defined on a rectilinear grid.
+
+    See https://en.wikipedia.org/wiki/Trilinear_interpolation
+
+    Args:
+        points (np.ndarray): ``(npoints, 3)`` coordinates of the points
+        grid (tuple(np.ndarray)): Increasing coordinates of the grid along ``x``, ``y`` and ``z``
+        vector_field (np.ndarray): ``(3, nx, ny, nz)`` vector field at the grid points
+        out_value (np.ndarray): Value assigned to the points outside the grid
+        regularGrid (bool): The grid points are equispaced along each direction, so that the cell containing each
+          point is computed directly instead of searched
+        num_cores (int): Number of threads among which the points are split
+
+    Returns:
+        np.ndarray: ``(npoints, 3)`` interpolated vector field
+    """
     npoints = points.shape[0]
-    output = np.zeros((npoints, 3))
-    if regularGrid:
-        length = np.zeros((3))
-        npoints_grid = np.zeros((3), dtype=int)
-        delta = np.zeros((3))
-        for idim in range(3):
-            length[idim] = grid[idim][-1] - grid[idim][0]
-            npoints_grid[idim] = len(grid[idim])
-            delta[idim] = length[idim]/(npoints_grid[idim] - 1)
+    if num_cores > 1 and npoints >= 2*num_cores:
+        chunks = np.array_split(np.arange(npoints), num_cores)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_cores) as executor:
+            results = executor.map(lambda chunk: interp_rectgrid_vectorfield(points[chunk, :], grid, vector_field,
+                                                                             out_value, regularGrid=regularGrid),
+                                   chunks)
+            return np.concatenate(list(results), axis=0)
 
-    for ipoint in range(npoints):
-        # Check if the point is outside the box
-        isout = False
-        for idim in range(3):
-            if (points[ipoint, idim] > grid[idim][-1]) or (points[ipoint, idim] < grid[idim][0]):
-                isout = True
-                output[ipoint, :] = out_value
-                break
-
-        # If the point is in the grid
-        if not isout:
-            # Compute the position
-            igrid = np.zeros((3,), dtype=int)
-            if regularGrid:
-                for idim in range(3):
-                    igrid[idim] = int(np.ceil((points[ipoint, idim] - grid[idim][0])/delta[idim]))
-            else:
-                for idim in range(3):
-                    while points[ipoint, idim] >= grid[idim][igrid[idim]]:
-                        igrid[idim] += 1
-
-            xvec = np.array([grid[0][igrid[0] - 1],
-                             grid[0][igrid[0]    ]])
-            xvec = np.concatenate((xvec, xvec, xvec, xvec))
-            yvec = np.array([grid[1][igrid[1] - 1],
-                             grid[1][igrid[1] - 1],
-                             grid[1][igrid[1]    ],
-                             grid[1][igrid[1]    ]])
-            yvec = np.concatenate((yvec, yvec))
-            zvec = np.ones((8))
-            zvec[0:4] *= grid[2][igrid[2] - 1]
-            zvec[4:8] *= grid[2][igrid[2]    ]
-
-            A = np.zeros((8,8))
-            A[:, 0] = np.ones((8,))
-            A[:, 1] = xvec
-            A[:, 2] = yvec
-            A[:, 3] = zvec
-            A[:, 4] = xvec*yvec
-            A[:, 5] = xvec*zvec
-            A[:, 6] = yvec*zvec
-            A[:, 7] = xvec*yvec*zvec
-
-            Ainv = np.linalg.inv(A)
-            x = points[ipoint, 0]
-            y = points[ipoint, 1]
-            z = points[ipoint, 2]
-            for idim in range(3):
-                b = np.array([vector_field[idim, igrid[0] - 1, igrid[1] - 1, igrid[2] - 1],
-                              vector_field[idim, igrid[0]    , igrid[1] - 1, igrid[2] - 1],
-                              vector_field[idim, igrid[0] - 1, igrid[1]    , igrid[2] - 1],
-                              vector_field[idim, igrid[0]    , igrid[1]    , igrid[2] - 1],
-                              vector_field[idim, igrid[0] - 1, igrid[1] - 1, igrid[2]    ],
-                              vector_field[idim, igrid[0]    , igrid[1] - 1, igrid[2]    ],
-                              vector_field[idim, igrid[0] - 1, igrid[1]    , igrid[2]    ],
-                              vector_field[idim, igrid[0]    , igrid[1]    , igrid[2]    ]
-                             ])
-                f = np.dot(Ainv, b)
-                output[ipoint, idim] = f[0] + f[1]*x + f[2]*y + f[3]*z + f[4]*x*y + f[5]*x*z + f[6]*y*z + f[7]*x*y*z
+    output = np.zeros((npoints, 3))
+    output[:, :] = out_value
+
+    isin = np.ones((npoints,), dtype=bool)
+    for idim in range(3):
+        isin &= (points[:, idim] <= grid[idim][-1]) & (points[:, idim] >= grid[idim][0])
+    points_in = points[isin, :]
+
+    # index of the upper vertex of the cell containing the point in every direction and the
+    # normalised position of the point within the cell
+    igrid = [None]*3
+    weight = [None]*3
+    for idim in range(3):
+        npoints_grid = len(grid[idim])
+        if regularGrid:
+            delta = (grid[idim][-1] - grid[idim][0])/(npoints_grid - 1)
+            igrid[idim] = np.ceil((points_in[:, idim] - grid[idim][0])/delta).astype(int)
+        else:
+            igrid[idim] = np.searchsorted(grid[idim], points_in[:, idim], side='right')
+        igrid[idim] = np.clip(igrid[idim], 1, npoints_grid - 1)
+        lower = grid[idim][igrid[idim] - 1]
+        upper = grid[idim][igrid[idim]]
+        weight[idim] = (points_in[:, idim] - lower)/(upper - lower)
+
+    ix, iy, iz = igrid
+    wx, wy, wz = weight
+    c00 = vector_field[:, ix - 1, iy - 1, iz - 1]*(1. - wx) + vector_field[:, ix, iy - 1, iz - 1]*wx
+    c10 = vector_field[:, ix - 1, iy, iz - 1]*(1. - wx) + vector_field[:, ix, iy, iz - 1]*wx
+    c01 = vector_field[:, ix - 1, iy - 1, iz]*(1. - wx) + vector_field[:, ix, iy - 1, iz]*wx
+    c11 = vector_field[:, ix - 1, iy, iz]*(1. - wx) + vector_field[:, ix, iy, iz]*wx
+    c0 = c00*(1. - wy) + c10*wy
+    c1 = c01*(1. - wy) + c11*wy
+    output[isin, :] = (c0*(1. - wz) + c1*wz).T
 
     return output
 
@@ -131,7 +122,8 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
 
     settings_types['interpolate_wake'] = 'bool'
     settings_default['interpolate_wake'] = True
-    settings_description['interpolate_wake'] = 'If False, u_out will be assigned to all the points in the wake'
+    settings_description['interpolate_wake'] = 'If False, u_out will be assigned to all the points in the wake. ' \
+                                                'When ``streaming``, the planes loaded also cover the wake if True'
 
     settings_types['num_cores'] = 'int'
     settings_default['num_cores'] = 1
@@ -145,6 +137,21 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
     settings_default['use_3_4_interpolation'] = False
     settings_description['use_3_4_interpolation'] = 'Use the farfield velocity at 3/4 chord for all the points along the chord'
 
+    settings_types['streaming'] = 'bool'
+    settings_default['streaming'] = False
+    settings_description['streaming'] = 'Memory map the bts file and only load the planes of the field around the ' \
+                                        'current position of the lattice instead of the whole field. The new ' \
+                                        'orientation must keep the x axis'
+
+    settings_types['streaming_planes'] = 'int'
+    settings_default['streaming_planes'] = 64
+    settings_description['streaming_planes'] = 'Minimum number of x planes of the field loaded in memory when ' \
+                                               '``streaming``. The planes ahead of the lattice in the direction ' \
+                                               'of ``u_fed`` are loaded in advance. The window always spans the ' \
+                                               'lattice, and the wake with ``interpolate_wake``, so the memory ' \
+                                               'used grows with the length of the wake unless ' \
+                                               '``interpolate_wake`` is False'
+
     setting_table = settings.SettingsTable()
     __doc__ += setting_table.generate(settings_types, settings_default, settings_description)
 
@@ -157,6 +164,7 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         self.z_grid = None
 
         self.vel = None
+        self.stream = None
 
         self.dist_to_recirculate = None
         self.gird_size_vec = None
@@ -167,8 +175,21 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         settings.to_custom_types(self.in_dict, self.settings_types, self.settings_default, no_ctype=True)
         self.settings = self.in_dict
 
-        self.x_grid, self.y_grid, self.z_grid, self.vel = self.read_turbsim_bts(self.settings['turbulent_field'], self.settings['case_with_tower'])
-        if not self.settings['new_orientation'] == 'xyz':
+        if self.settings['streaming']:
+            position_in_old, _ = self.parse_orientation(self.settings['new_orientation'])
+            if position_in_old[0] != 0:
+                raise exceptions.NotValidSetting('new_orientation', self.settings['new_orientation'],
+                                                 'orientations that keep the x axis when streaming, i.e. xyz, '
+                                                 'xzy or -x-yz')
+            self.stream = TurbSimBtsStream(self.settings['turbulent_field'],
+                                           case_with_tower=self.settings['case_with_tower'],
+                                           new_orientation=self.settings['new_orientation'],
+                                           n_planes=self.settings['streaming_planes'],
+                                           direction=-np.sign(self.settings['u_fed'][0]))
+            self.x_grid, self.y_grid, self.z_grid = self.stream.grid
+        else:
+            self.x_grid, self.y_grid, self.z_grid, self.vel = self.read_turbsim_bts(self.settings['turbulent_field'], self.settings['case_with_tower'])
+        if (not self.settings['streaming']) and (not self.settings['new_orientation'] == 'xyz'):
             # self.settings['new_orientation'] = 'zyx'
             self.x_grid, self.y_grid, self.z_grid, self.vel = self.change_orientation(self.x_grid, self.y_grid, self.z_grid, self.vel, self.settings['new_orientation'])
 
@@ -210,10 +231,7 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         if is_wake and not self.settings['interpolate_wake']:
             # The generator has received a wake and it will not be interpolated
             for isurf in range(len(uext)):
-                _, n_m, n_n = uext[isurf].shape
-                for i_m in range(n_m):
-                    for i_n in range(n_n):
-                        uext[isurf][:, i_m, i_n] = self.settings['u_out']
+                uext[isurf][:] = self.settings['u_out'][:, None, None]
 
         else:
             offset_mod = np.linalg.norm(self.settings['u_fed'])*t + self.settings['extra_offset']
@@ -229,11 +247,9 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
                 uext_3_4_chord = [None]*nsurf
                 for isurf in range(nsurf):
                     N = zeta[isurf].shape[2]
-                    zeta_3_4_chord[isurf] = np.zeros((3, 1, N))
                     uext_3_4_chord[isurf] = np.zeros((3, 1, N))
                     # Compute the 3/4 chord position
-                    for i_n in range(N):
-                        zeta_3_4_chord[isurf][:, 0, i_n] = (zeta[isurf][:, 0, i_n] + 3.*zeta[isurf][:, -1, i_n])/4.
+                    zeta_3_4_chord[isurf] = (zeta[isurf][:, 0:1, :] + 3.*zeta[isurf][:, -1:, :])/4.
 
                 # Interpolate at the 3/4 chord point
                 self.interpolate_zeta(zeta_3_4_chord,
@@ -243,10 +259,7 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
 
                 # Assign the values to all chord points
                 for isurf in range(nsurf):
-                    _, M, N = zeta[isurf].shape
-                    for i_n in range(N):
-                        for i_m in range(M):
-                            uext[isurf][:, i_m, i_n] = uext_3_4_chord[isurf][:, 0, i_n]
+                    uext[isurf][:] = uext_3_4_chord[isurf]
 
             else:
                 self.interpolate_zeta(zeta,
@@ -258,35 +271,35 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         # if interpolator is None:
         #     interpolator = self.interpolator
 
-        for isurf in range(len(zeta)):
-            _, n_m, n_n = zeta[isurf].shape
+        # Reorder the coordinates
+        points_list = [zeta[isurf].reshape((3, -1)).T + for_pos[0:3] + offset for isurf in range(len(zeta))]
 
-            # Reorder the coordinates
-            points_list = np.zeros((n_m*n_n, 3))
-            ipoint = 0
-            for i_m in range(n_m):
-                for i_n in range(n_n):
-                    points_list[ipoint, :] = zeta[isurf][:, i_m, i_n] + for_pos[0:3] + offset
-                    ipoint += 1
+        if self.stream is None:
+            grid = (self.x_grid, self.y_grid, self.z_grid)
+            vel = self.vel
+        else:
+            grid, vel = self.stream.window_for(np.concatenate(points_list, axis=0))
 
+        for isurf in range(len(zeta)):
             # Interpolate
-            list_uext = interp_rectgrid_vectorfield(points_list,
-                                                 (self.x_grid, self.y_grid, self.z_grid),
-                                                 self.vel,
+            list_uext = interp_rectgrid_vectorfield(points_list[isurf],
+                                                 grid,
+                                                 vel,
                                                  self.settings['u_out'],
                                                  regularGrid=True,
                                                  num_cores=self.settings['num_cores'])
 
             # Reorder the values
-            ipoint = 0
-            for i_m in range(n_m):
-                for i_n in range(n_n):
-                    u_ext[isurf][:, i_m, i_n] = list_uext[ipoint]
-                    ipoint += 1
+            u_ext[isurf][:] = list_uext.T.reshape(zeta[isurf].shape)
 
     @staticmethod
-    def read_turbsim_bts(fname, case_with_tower=False):
+    def read_turbsim_bts_header(fname):
+        """
+        Reads the header of a TurbSim ``.bts`` file.
 
+        Returns:
+            tuple: Dictionary with the header information and offset (in bytes) of the velocity data in the file
+        """
         # This post may be useful to understand the function:
         # https://wind.nrel.gov/forum/wind/viewtopic.php?t=1384
 
@@ -308,46 +321,17 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
             ("v_offset_scaling", np.float32),
             ("w_slope_scaling", np.float32),
             ("w_offset_scaling", np.float32),
-            ("n_char_description", np.int32),
-            ("description", np.dtype((bytes, 73))),
-            # ("data", np.dtype((bytes, 12865632)))
-            ("data", np.dtype((bytes, 2)))
+            ("n_char_description", np.int32)
         ])
 
-        fileContent = np.fromfile(fname, dtype=dtype)
-        n_char_description = fileContent[0][17]
-        nbytes_data = 2*3*fileContent[0][4]*fileContent[0][1]*fileContent[0][2]
-        dtype = np.dtype([
-            ("id", np.int16),
-            ("nz", np.int32),
-            ("ny", np.int32),
-            ("tower_points", np.int32),
-            ("ntime_steps", np.int32),
-            ("dz", np.float32),
-            ("dy", np.float32),
-            ("dt", np.float32),
-            ("u_mean", np.float32),
-            ("HubHt", np.float32),
-            ("Zbottom", np.float32),
-            ("u_slope_scaling", np.float32),
-            ("u_offset_scaling", np.float32),
-            ("v_slope_scaling", np.float32),
-            ("v_offset_scaling", np.float32),
-            ("w_slope_scaling", np.float32),
-            ("w_offset_scaling", np.float32),
-            ("n_char_description", np.int32),
-            ("description", np.dtype((bytes, n_char_description))),
-            ("data", np.dtype((bytes, nbytes_data)))
-        ])
-
-        fileContent = np.fromfile(fname, dtype=dtype)
-
+        fileContent = np.fromfile(fname, dtype=dtype, count=1)
         dictionary = {}
         for i in range(len(fileContent.dtype.names)):
             dictionary[fileContent.dtype.names[i]] = fileContent[0][i]
 
-        scaling = np.array([dictionary['u_slope_scaling'], dictionary['v_slope_scaling'], dictionary['w_slope_scaling']])
-        offset = np.array([dictionary['u_offset_scaling'], dictionary['v_offset_scaling'], dictionary['w_offset_scaling']])
+        n_char_description = dictionary['n_char_description']
+        dictionary['description'] = np.fromfile(fname, dtype=np.dtype((bytes, n_char_description)),
+                                                count=1, offset=dtype.itemsize)[0]
 
         # Checks
         # print("Case description: ", dictionary['description'])
@@ -355,19 +339,13 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
             cout.cout_wrap(("WARNING: I think there is something wrong with the case description. The length is not %d characters" %  n_char_description), 3)
             # print("Input", dictionary['n_char_description'], "as the number of characters of the case description")
 
-        # vel_aux = np.fromstring(dictionary['data'], dtype='>i2')
-        vel_aux = np.fromstring(dictionary['data'], dtype=np.int16)
-        vel = np.zeros((3,dictionary['ntime_steps'],dictionary['ny'],dictionary['nz']))
-
-        counter = -1
-        for ix in range(dictionary['ntime_steps']):
-            for iz in range(dictionary['nz']):
-                for iy in range(dictionary['ny']):
-                    for ivel in range(3):
-                        counter += 1
-                        vel[ivel,-ix,iy,iz] = (vel_aux[counter] - offset[ivel])/scaling[ivel]
+        return dictionary, dtype.itemsize + n_char_description
 
-        # Generate the grid
+    @staticmethod
+    def turbsim_bts_grid(dictionary, case_with_tower=False):
+        """
+        Grid of the TurbSim field described by the header ``dictionary``.
+        """
         height = dictionary['dz']*(dictionary['nz'] - 1)
         width = dictionary['dy']*(dictionary['ny'] - 1)
 
@@ -378,24 +356,52 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         else:
             z_grid = np.linspace(-height/2, height/2, dictionary['nz'])
 
-        return x_grid, y_grid, z_grid, vel
+        return x_grid, y_grid, z_grid
 
     @staticmethod
-    def change_orientation(old_xgrid, old_ygrid, old_zgrid, old_vel, new_orientation_input):
-        old_grid = []
-        old_grid.append(old_xgrid.copy())
-        old_grid.append(old_ygrid.copy())
-        old_grid.append(old_zgrid.copy())
-        new_orientation = ("%s." % new_orientation_input)[:-1]
+    def turbsim_bts_planes(vel_aux, dictionary, ix):
+        """
+        Velocity on the ``x`` planes ``ix`` of the grid from the raw TurbSim data.
 
-        # Generate information for new_orientation
-        if not old_vel.shape[0] == 3:
-            print("ERROR: velocity must have three dimension")
-        if (not (len(old_vel[0,:,0,0]) == len(old_xgrid))) or (not (len(old_vel[0,0,:,0]) == len(old_ygrid))) or (not (len(old_vel[0,0,0,:]) == len(old_zgrid))):
-            print("ERROR: dimensions mismatch")
-            return
+        The data is stored by time step, ``z``, ``y`` and velocity component. The time steps are stored in the ``x``
+        grid in reverse order, starting from the first one.
 
-        old_dim = np.array([len(old_xgrid),len(old_ygrid),len(old_zgrid)])
+        Args:
+            vel_aux (np.ndarray): Raw data of shape ``(ntime_steps, nz, ny, 3)``. It can be memory mapped.
+            dictionary (dict): Header information
+            ix (np.ndarray): Indices of the ``x`` planes
+
+        Returns:
+            np.ndarray: ``(3, len(ix), ny, nz)`` velocity field
+        """
+        scaling = np.array([dictionary['u_slope_scaling'], dictionary['v_slope_scaling'], dictionary['w_slope_scaling']])
+        offset = np.array([dictionary['u_offset_scaling'], dictionary['v_offset_scaling'], dictionary['w_offset_scaling']])
+
+        vel = np.zeros((3, len(ix), dictionary['ny'], dictionary['nz']))
+        vel[:] = ((vel_aux[-ix % dictionary['ntime_steps']] - offset)/scaling).transpose(3, 0, 2, 1)
+        return vel
+
+    @staticmethod
+    def read_turbsim_bts(fname, case_with_tower=False):
+
+        dictionary, data_offset = TurbVelocityFieldBts.read_turbsim_bts_header(fname)
+
+        vel_aux = np.fromfile(fname, dtype=np.int16,
+                              count=3*dictionary['ntime_steps']*dictionary['nz']*dictionary['ny'],
+                              offset=data_offset)
+        vel_aux = vel_aux.reshape((dictionary['ntime_steps'], dictionary['nz'], dictionary['ny'], 3))
+        vel = TurbVelocityFieldBts.turbsim_bts_planes(vel_aux, dictionary, np.arange(dictionary['ntime_steps']))
+
+        # Generate the grid
+        x_grid, y_grid, z_grid = TurbVelocityFieldBts.turbsim_bts_grid(dictionary, case_with_tower)
+
+        return x_grid, y_grid, z_grid, vel
+
+    @staticmethod
+    def parse_orientation(new_orientation):
+        """
+        Position in the original axes and sign of every new axis from the ``new_orientation`` setting
+        """
         position_in_old = np.zeros((3), dtype=int)
         sign = np.array([1,1,1], dtype=int)
         for ivel in range(3):
@@ -410,7 +416,25 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
                 position_in_old[ivel] = 2
 
             new_orientation = new_orientation[1:]
-        # print("position_in_old: ", position_in_old)
+        return position_in_old, sign
+
+    @staticmethod
+    def change_orientation(old_xgrid, old_ygrid, old_zgrid, old_vel, new_orientation_input):
+        old_grid = []
+        old_grid.append(old_xgrid.copy())
+        old_grid.append(old_ygrid.copy())
+        old_grid.append(old_zgrid.copy())
+        new_orientation = ("%s." % new_orientation_input)[:-1]
+
+        # Generate information for new_orientation
+        if not old_vel.shape[0] == 3:
+            print("ERROR: velocity must have three dimension")
+        if (not (len(old_vel[0,:,0,0]) == len(old_xgrid))) or (not (len(old_vel[0,0,:,0]) == len(old_ygrid))) or (not (len(old_vel[0,0,0,:]) == len(old_zgrid))):
+            print("ERROR: dimensions mismatch")
+            return
+
+        old_dim = np.array([len(old_xgrid),len(old_ygrid),len(old_zgrid)])
+        position_in_old, sign = TurbVelocityFieldBts.parse_orientation(new_orientation)
 
         # Check the new orientation system
         new_ux = np.zeros((3), dtype=int)
@@ -441,24 +465,17 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
                 new_grid[ivel] = new_grid[ivel][::-1]
 
         new_vel = np.zeros((3,new_dim[0],new_dim[1],new_dim[2]))
-        # print("old_dim:", old_dim)
-        # print("new_dim:", new_dim)
-        # print("old_vel.shape:", old_vel.shape)
-        # print("new_vel.shape:", new_vel.shape)
-
-        # These loops will index variables associated with the new grid
-        for ix in range(new_dim[0]):
-            for iy in range(new_dim[1]):
-                for iz in range(new_dim[2]):
-                    new_i = np.array([ix, iy, iz])
-                    # old_i = np.array([new_i[position_in_old[0]]*sign[0], new_i[position_in_old[1]]*sign[1], new_i[position_in_old[2]]*sign[2]])
-                    old_i = np.array([new_i[position_in_old[0]], new_i[position_in_old[1]], new_i[position_in_old[2]]])
-                    for icoord in range(3):
-                        if sign[icoord] == -1:
-                            old_i[icoord] = -1*old_i[icoord] - 1
-                    for ivel in range(3):
-                        # print("moving: ", position_in_old[ivel], ix, iy, iz, "to: ", ivel,new_i[0],new_i[1],new_i[2])
-                        new_vel[ivel,new_i[0],new_i[1],new_i[2]] = old_vel[position_in_old[ivel], old_i[0], old_i[1], old_i[2]]*sign[ivel]
+
+        # Indices of the new grid, broadcastable to the new grid shape
+        new_i = [np.arange(new_dim[idim]).reshape([-1 if jdim == idim else 1 for jdim in range(3)])
+                 for idim in range(3)]
+        old_i = [None]*3
+        for icoord in range(3):
+            old_i[icoord] = new_i[position_in_old[icoord]]
+            if sign[icoord] == -1:
+                old_i[icoord] = -1*old_i[icoord] - 1
+        for ivel in range(3):
+            new_vel[ivel, :, :, :] = old_vel[position_in_old[ivel], old_i[0], old_i[1], old_i[2]]*sign[ivel]
 
         return new_grid[0], new_grid[1], new_grid[2], new_vel
 
@@ -468,3 +485,105 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         bbox[1, :] = [np.min(y_grid), np.max(y_grid)]
         bbox[2, :] = [np.min(z_grid), np.max(z_grid)]
         return bbox
+
+
+class TurbSimBtsStream(object):
+    """
+    Memory mapped TurbSim ``.bts`` field of which only a window of consecutive ``x`` planes is loaded.
+
+    The window covers the planes required by the last query points and extends ``n_planes`` planes in the
+    direction in which the field is fed, so it is only reloaded every few time steps. The memory used is therefore
+    bounded by ``n_planes``, or by the extent along ``x`` of the query points if larger, regardless of the length of
+    the box.
+
+    The new orientation of the axes must keep the ``x`` axis (possibly reversed), which is the direction along which
+    the field is streamed.
+
+    Args:
+        fname (str): ``.bts`` file
+        case_with_tower (bool): The vertical grid starts at the bottom of the field instead of being centred
+        new_orientation (str): New orientation of the axes (see ``TurbVelocityFieldBts``)
+        n_planes (int): Minimum number of ``x`` planes in the window
+        direction (float): Sign of the direction in which the points move along ``x`` as time advances
+    """
+    def __init__(self, fname, case_with_tower=False, new_orientation='xyz', n_planes=64, direction=-1.):
+        self.header, data_offset = TurbVelocityFieldBts.read_turbsim_bts_header(fname)
+        self.n_x = self.header['ntime_steps']
+        self.data = np.memmap(fname, dtype=np.int16, mode='r', offset=data_offset,
+                              shape=(self.n_x, self.header['nz'], self.header['ny'], 3))
+
+        self.old_grid = TurbVelocityFieldBts.turbsim_bts_grid(self.header, case_with_tower)
+        self.new_orientation = new_orientation
+        self.position_in_old, self.sign = TurbVelocityFieldBts.parse_orientation(new_orientation)
+        if self.position_in_old[0] != 0:
+            raise ValueError('Streaming of the turbulent field requires the new orientation to keep the '
+                             'x axis, %s given' % new_orientation)
+        self.grid = [None]*3
+        for idim in range(3):
+            self.grid[idim] = self.old_grid[self.position_in_old[idim]]*self.sign[idim]
+            if self.sign[idim] == -1:
+                self.grid[idim] = self.grid[idim][::-1]
+
+        self.n_planes = max(int(n_planes), 2)
+        self.direction = direction
+
+        self.window = None
+        self.vel = None
+        self.n_loads = 0
+
+    def load(self, i_start, i_end):
+        """
+        Loads the ``x`` planes ``i_start`` to ``i_end`` (not included) of the reoriented grid
+        """
+        if self.sign[0] == 1:
+            old_start, old_end = i_start, i_end
+        else:
+            old_start, old_end = self.n_x - i_end, self.n_x - i_start
+
+        vel = TurbVelocityFieldBts.turbsim_bts_planes(self.data, self.header, np.arange(old_start, old_end))
+        if not self.new_orientation == 'xyz':
+            vel = TurbVelocityFieldBts.change_orientation(self.old_grid[0][old_start:old_end],
+                                                          self.old_grid[1],
+                                                          self.old_grid[2],
+                                                          vel,
+                                                          self.new_orientation)[3]
+        self.vel = vel
+        self.window = (i_start, i_end)
+        self.n_loads += 1
+
+    def window_for(self, points):
+        """
+        Grid and velocity field of a window of planes that includes all the ``points`` inside the field.
+
+        Args:
+            points (np.ndarray): ``(npoints, 3)`` query points
+
+        Returns:
+            tuple: Grid (tuple of ``x``, ``y`` and ``z`` coordinates) and ``(3, nx, ny, nz)`` velocity of the window
+        """
+        isin = np.ones((points.shape[0],), dtype=bool)
+        for idim in range(3):
+            isin &= (points[:, idim] <= self.grid[idim][-1]) & (points[:, idim] >= self.grid[idim][0])
+
+        if isin.any():
+            i_low = np.searchsorted(self.grid[0], np.min(points[isin, 0]), side='right') - 1
+            i_high = np.searchsorted(self.grid[0], np.max(points[isin, 0]), side='left') + 1
+            i_low = min(max(i_low, 0), self.n_x - 2)
+            i_high = max(min(i_high, self.n_x), i_low + 2)
+        elif self.window is not None:
+            i_low, i_high = self.window
+        else:
+            i_low, i_high = 0, 2
+
+        if self.window is None or i_low < self.window[0] or i_high > self.window[1]:
+            n_planes = max(self.n_planes, i_high - i_low)
+            if self.direction < 0:
+                i_start = max(i_high - n_planes, 0)
+                i_end = min(i_start + n_planes, self.n_x)
+            else:
+                i_end = min(i_low + n_planes, self.n_x)
+                i_start = max(i_end - n_planes, 0)
+            self.load(i_start, i_end)
+
+        grid = (self.grid[0][self.window[0]:self.window[1]], self.grid[1], self.grid[2])
+        return grid, self.vel
@@ -143,6 +143,11 @@ class LinearUVLM(ss_interface.BaseElement):
     settings_default['cfl1'] = True
     settings_description['cfl1'] = 'If it is ``True``, it assumes that the discretisation complies with CFL=1'
 
+    settings_types['num_cores'] = 'int'
+    settings_default['num_cores'] = 1
+    settings_description['num_cores'] = 'Number of threads over which the pairs of surfaces are distributed in the ' \
+                                        'assembly of the induced velocity derivatives'
+
     settings_types['convert_to_ct'] = 'bool'
     settings_default['convert_to_ct'] = False
     settings_description['convert_to_ct'] = 'Convert system to Continuous Time. Note: features above the original ' \
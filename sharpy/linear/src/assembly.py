@@ -13,13 +13,20 @@ Includes:
           multi-surfaces configurations
         - ``uc_dncdzeta``: assemble derivative matrix dnc/dzeta*Uc at bound collocation
           points
+
+The derivatives of the induced velocities are evaluated over arrays of target
+points and panels (see ``dvinddzeta_vec``). The surface pairs can be
+distributed over threads through the ``num_cores`` argument of
+``nc_dqcdzeta`` and ``dfqsdvind_zeta``.
 """
 
+import concurrent.futures
+import ctypes as ct
+import functools
 import numpy as np
 import scipy.sparse as sparse
 import itertools
 
-from sharpy.aero.utils.uvlmlib import dvinddzeta_cpp, eval_panel_cpp
 import sharpy.linear.src.libsparse as libsp
 import sharpy.linear.src.lib_dbiot as dbiot
 import sharpy.linear.src.lib_ucdncdzeta as lib_ucdncdzeta
@@ -33,6 +40,35 @@ svec = [0, 1, 2, 3]  # seg. no.
 avec = [0, 1, 2, 3]  # 1st vertex no.
 bvec = [1, 2, 3, 0]  # 2nd vertex no.
 
+# max number of (target point, panel) pairs evaluated at once by dvinddzeta_vec
+max_batch_size = 2 ** 14
+# max number of entries of the derivative matrices w.r.t. vertices computed at once
+max_batch_entries = 2 ** 22
+
+
+@functools.lru_cache(maxsize=None)
+def panel_vertex_indices(M, N):
+    """
+    Returns the ``(M*N, 4)`` array with the 1D (scalar) indices of the vertices of each panel of a
+    ``M x N`` surface. Panels are ordered as per ``np.ravel_multi_index((m, n), (M, N))`` and vertices
+    as per ``dmver`` and ``dnver``.
+    """
+    mm, nn = np.unravel_index(np.arange(M * N), (M, N))
+    vertex_indices = np.array([np.ravel_multi_index((mm + dm, nn + dn), (M + 1, N + 1))
+                               for dm, dn in zip(dmver, dnver)]).T
+    vertex_indices.setflags(write=False)
+    return vertex_indices
+
+
+def map_pairs(function, pairs, num_cores=1):
+    """
+    Evaluates ``function(*pair)`` for all ``pairs`` of surfaces, in parallel threads if ``num_cores > 1``
+    """
+    if num_cores > 1 and len(pairs) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_cores) as executor:
+            return list(executor.map(lambda pair: function(*pair), pairs))
+    return [function(*pair) for pair in pairs]
+
 
 def AICs(Surfs, Surfs_star, target='collocation', Project=True):
     """
@@ -115,50 +151,38 @@ def nc_dqcdzeta_Sin_to_Sout(Surf_in, Surf_out, Der_coll, Der_vert, Surf_in_bound
         N_in = Surf_in.maps.N
         M_bound_in = Kzeta_bound_in // (N_in + 1) - 1
 
-    # create mapping panels to vertices to loop
-    Surf_out.maps.map_panels_to_vertices_1D_scalar()
-    # Surf_in.maps.map_panels_to_vertices_1D_scalar()
-
-    ##### loop collocation points
-    for cc_out in range(K_out):
-
-        # get (m,n) indices of collocation point
-        mm_out = Surf_out.maps.ind_2d_pan_scal[0][cc_out]
-        nn_out = Surf_out.maps.ind_2d_pan_scal[1][cc_out]
-
-        # get coords and normal
-        zetac_here = ZetaColl[:, mm_out, nn_out]  # .copy() # non-contiguous array !
-        nc_here = Surf_out.normals[:, mm_out, nn_out]
+    # (m,n) indices, coords and normals of all collocation points
+    mm_out, nn_out = Surf_out.maps.ind_2d_pan_scal
+    zetac = np.ascontiguousarray(ZetaColl[:, mm_out, nn_out].T)
+    nc = np.ascontiguousarray(Surf_out.normals[:, mm_out, nn_out].T)
 
-        # get derivative of induced velocity w.r.t. zetac
-        if Surf_in_bound:
-            dvind_coll, dvind_vert = dvinddzeta_cpp(zetac_here, Surf_in,
-                                                    is_bound=Surf_in_bound,
-                                                    vortex_radius=Surf_in.vortex_radius)
-        else:
-            dvind_coll, dvind_vert = dvinddzeta_cpp(zetac_here, Surf_in,
-                                                    is_bound=Surf_in_bound,
-                                                    vortex_radius=Surf_in.vortex_radius,
-                                                    M_in_bound=M_bound_in)
+    # get derivative of induced velocity w.r.t. zetac
+    if Surf_in_bound:
+        dvind_coll, dvind_vert = dvinddzeta_vec(zetac, Surf_in, IsBound=True,
+                                                Left=nc[:, None, :])
+    else:
+        dvind_coll, dvind_vert = dvinddzeta_vec(zetac, Surf_in, IsBound=False,
+                                                M_in_bound=M_bound_in,
+                                                Left=nc[:, None, :])
 
-        ### Surf_in vertices contribution
-        Der_vert[cc_out, :] += np.dot(nc_here, dvind_vert)
+    ### Surf_in vertices contribution
+    Der_vert += dvind_vert[:, 0, :]
 
-        ### Surf_out collocation point contribution
-        # project
-        dvindnorm_coll = np.dot(nc_here, dvind_coll)
+    ### Surf_out collocation point contribution
+    # project
+    dvindnorm_coll = np.einsum('pi,pij->pj', nc, dvind_coll)
 
-        # loop panel vertices
-        for vv, dm, dn in zip(range(4), dmver, dnver):
-            mm_v, nn_v = mm_out + dm, nn_out + dn
-            ii_v = [np.ravel_multi_index(
-                (cc, mm_v, nn_v), shape_zeta_out) for cc in range(3)]
-            Der_coll[cc_out, ii_v] += wcv_out[vv] * dvindnorm_coll
+    # loop panel vertices: each collocation point appears once per vertex
+    cc_out = np.arange(K_out)
+    for vv, dm, dn in zip(range(4), dmver, dnver):
+        jj_v = np.ravel_multi_index((mm_out + dm, nn_out + dn), shape_zeta_out[1:])
+        for cc in range(3):
+            Der_coll[cc_out, cc * Kzeta_out + jj_v] += wcv_out[vv] * dvindnorm_coll[:, cc]
 
     return Der_coll, Der_vert
 
 
-def nc_dqcdzeta(Surfs, Surfs_star, Merge=False):
+def nc_dqcdzeta(Surfs, Surfs_star, Merge=False, num_cores=1):
     r"""
     Produces a list of derivative matrix
 
@@ -179,6 +203,8 @@ def nc_dqcdzeta(Surfs, Surfs_star, Merge=False):
     If ``Merge`` is ``True``, the derivatives due to collocation points movement are added
     to ``Dvert`` to minimise storage space.
 
+    The pairs of output and input surfaces are evaluated over ``num_cores`` threads.
+
     To do:
 
         - Dcoll is highly sparse, exploit?
@@ -188,40 +214,40 @@ def nc_dqcdzeta(Surfs, Surfs_star, Merge=False):
     assert len(Surfs_star) == n_surf, \
         'Number of bound and wake surfaces much be equal'
 
-    DAICcoll = []
-    DAICvert = []
-
-    ### loop output (bound) surfaces
-    for ss_out in range(n_surf):
-
-        # define output bound surface size
+    def surface_pair(ss_out, ss_in):
         Surf_out = Surfs[ss_out]
-        K_out = Surf_out.maps.K
-        Kzeta_out = Surf_out.maps.Kzeta
-
-        # derivatives w.r.t collocation points: all the in surface scanned will
-        # manipulate this matrix, as the collocation points are on Surf_out
-        Dcoll = np.zeros((K_out, 3 * Kzeta_out))
+        # derivatives w.r.t collocation points: the contributions of all the
+        # in surfaces are added, as the collocation points are on Surf_out
+        Dcoll = np.zeros((K_out_list[ss_out], 3 * Surf_out.maps.Kzeta))
         # derivatives w.r.t. panel coordinates will affect dof on bound Surf_in
         # (not wakes)
-        DAICvert_sub = []
+        Dvert = np.zeros((K_out_list[ss_out], 3 * Surfs[ss_in].maps.Kzeta))
+
+        ##### bound
+        Dcoll, Dvert = nc_dqcdzeta_Sin_to_Sout(
+            Surfs[ss_in], Surf_out, Dcoll, Dvert, Surf_in_bound=True)
+        ##### wake:
+        Dcoll, Dvert = nc_dqcdzeta_Sin_to_Sout(
+            Surfs_star[ss_in], Surf_out, Dcoll, Dvert, Surf_in_bound=False)
+        return Dcoll, Dvert
+
+    # collocation points are generated before spawning threads
+    K_out_list = []
+    for Surf_out in Surfs:
+        if not hasattr(Surf_out, 'zetac'):
+            Surf_out.generate_collocations()
+        K_out_list.append(Surf_out.maps.K)
+
+    pairs = list(itertools.product(range(n_surf), range(n_surf)))
+    results = dict(zip(pairs, map_pairs(surface_pair, pairs, num_cores)))
 
-        # loop input surfaces:
-        for ss_in in range(n_surf):
-            ##### bound
-            Surf_in = Surfs[ss_in]
-            Kzeta_in = Surf_in.maps.Kzeta
-
-            # compute terms
-            Dvert = np.zeros((K_out, 3 * Kzeta_in))
-            Dcoll, Dvert = nc_dqcdzeta_Sin_to_Sout(
-                Surf_in, Surf_out, Dcoll, Dvert, Surf_in_bound=True)
+    DAICcoll = []
+    DAICvert = []
 
-            ##### wake:
-            Surf_in = Surfs_star[ss_in]
-            Dcoll, Dvert = nc_dqcdzeta_Sin_to_Sout(
-                Surf_in, Surf_out, Dcoll, Dvert, Surf_in_bound=False)
-            DAICvert_sub.append(Dvert)
+    ### loop output (bound) surfaces
+    for ss_out in range(n_surf):
+        Dcoll = sum(results[(ss_out, ss_in)][0] for ss_in in range(n_surf))
+        DAICvert_sub = [results[(ss_out, ss_in)][1] for ss_in in range(n_surf)]
 
         if Merge:
             DAICvert_sub[ss_out] += Dcoll
@@ -861,250 +887,217 @@ def dvinddzeta(zetac, Surf_in, IsBound, M_in_bound=None):
     - Dercoll: 3 x 3 matrix
     - Dervert: 3 x 3*Kzeta (if Surf_in is a wake, Kzeta is that of the bound)
 
-    Warning:
-    zetac must be contiguously stored!
+    Single point version of ``dvinddzeta_vec``.
+    """
+
+    Dercoll, Dervert = dvinddzeta_vec(np.reshape(zetac, (1, 3)), Surf_in, IsBound, M_in_bound)
+
+    return Dercoll[0], Dervert[0]
+
+
+def dvinddzeta_vec(zetac, Surf_in, IsBound, M_in_bound=None, Left=None, vortex_radius=None):
+    """
+    Produces derivatives of induced velocity by Surf_in w.r.t. a set of P target
+    points zetac, of shape (P,3), and w.r.t. the Surf_in vertices, evaluating
+    all panels of Surf_in at once (see ``lib_dbiot.eval_panels_vec``).
+
+    The derivatives w.r.t. the vertices can be premultiplied by the (P,r,3)
+    array Left (e.g. the normals at the target points) so as to reduce storage.
+
+    If Surf_in is a wake (IsBound==False), only the TE contributes to Dervert,
+    whose size is computed using the chordwise paneling of the associated bound
+    surface (M_in_bound).
+
+    The output derivatives are:
+    - Dercoll: P x 3 x 3 array
+    - Dervert: P x r x 3*Kzeta array (r=3 if Left is None; if Surf_in is a
+    wake, Kzeta is that of the bound)
     """
 
     M_in, N_in = Surf_in.maps.M, Surf_in.maps.N
-    Kzeta_in = Surf_in.maps.Kzeta
-    shape_zeta_in = (3, M_in + 1, N_in + 1)
+    K_in = Surf_in.maps.K
+    if vortex_radius is None:
+        vortex_radius = Surf_in.vortex_radius
+    if type(vortex_radius) is ct.c_double:
+        vortex_radius = vortex_radius.value
 
-    # allocate matrices
-    Dercoll = np.zeros((3, 3))
+    zetac = np.reshape(zetac, (-1, 3))
+    n_points = zetac.shape[0]
+    n_rows = 3 if Left is None else Left.shape[1]
+
+    # panel vertices [panel, vertex, x/y/z]
+    vertex_indices = panel_vertex_indices(M_in, N_in)
+    ZetaPanels = np.reshape(Surf_in.zeta, (3, -1))[:, vertex_indices].transpose((1, 2, 0))
+    gamma = np.reshape(Surf_in.gamma, (-1,))
 
     if IsBound:
         """ Bound: scan everthing, and include every derivative. The TE is not
         scanned twice"""
-
-        Dervert = np.zeros((3, 3 * Kzeta_in))
-
-        for pp_in in itertools.product(range(0, M_in), range(0, N_in)):
-            mm_in, nn_in = pp_in
-            # zeta_panel_in=Surf_in.get_panel_vertices_coords(mm_in,nn_in)
-            zeta_panel_in = Surf_in.zeta[:, [mm_in + 0, mm_in + 1, mm_in + 1, mm_in + 0],
-                            [nn_in + 0, nn_in + 0, nn_in + 1, nn_in + 1]].T
-            # get local derivatives
-            der_zetac, der_zeta_panel = eval_panel_cpp(
-                zetac, zeta_panel_in, Surf_in.vortex_radius, gamma_pan=Surf_in.gamma[mm_in, nn_in])
-            ### Mid-segment point contribution
-            Dercoll += der_zetac
-            ### Panel vertices contribution
-            for vv_in in range(4):
-                # get vertices m,n indices
-                mm_v, nn_v = mm_in + dmver[vv_in], nn_in + dnver[vv_in]
-                # get vertices 1d index
-                jj_v = [np.ravel_multi_index(
-                    (cc, mm_v, nn_v), shape_zeta_in) for cc in range(3)]
-                Dervert[:, jj_v] += der_zeta_panel[vv_in, :, :]
-
+        M_in_bound = M_in
+        # every vertex of every panel contributes
+        vert_panels = slice(None)
+        vert_vertices = [0, 1, 2, 3]
+        jj_v = vertex_indices.reshape(-1)
     else:
         """
         All segments are scanned when computing the contrib. Dercoll. The
         TE is scanned a second time to include the contrib. due to the TE
-        elements moviment. The Dervert shape is computed using the chordwse
-        paneling of the associated bound surface (M_in_bound).
+        elements moviment.
         """
-
-        Kzeta_in_bound = (M_in_bound + 1) * (N_in + 1)
-        Dervert = np.zeros((3, 3 * Kzeta_in_bound))
-
-        ### loop all panels (coll. contrib)
-        for pp_in in itertools.product(range(0, M_in), range(0, N_in)):
-            mm_in, nn_in = pp_in
-            # zeta_panel_in=Surf_in.get_panel_vertices_coords(mm_in,nn_in)
-            zeta_panel_in = Surf_in.zeta[:, [mm_in + 0, mm_in + 1, mm_in + 1, mm_in + 0],
-                            [nn_in + 0, nn_in + 0, nn_in + 1, nn_in + 1]].T
-            # get local derivatives
-            der_zetac = dbiot.eval_panel_cpp_coll(
-                zetac, zeta_panel_in, Surf_in.vortex_radius, gamma_pan=Surf_in.gamma[mm_in, nn_in])
-            # der_zetac_fast=dbiot.eval_panel_fast_coll(
-            # 		zetac,zeta_panel_in,gamma_pan=Surf_in.gamma[mm_in,nn_in])
-            # if np.max(np.abs(der_zetac-der_zetac_fast))>1e-10:
-            # 	embed()
-
-            ### Mid-segment point contribution
-            Dercoll += der_zetac
-
-        ### Re-scan the TE to include vertex contrib.
         # vertex 0 of wake is vertex 1 of bound (local no.)
         # vertex 3 of wake is vertex 2 of bound (local no.)
-        vvec = [0, 3]  # vertices to include
-        dn = [0, 1]  # delta to go from (m,n) panel to (m,n) vertices (on bound)
-
-        shape_zeta_in_bound = (3, M_in_bound + 1, N_in + 1)
-        for nn_in in range(N_in):
-            # zeta_panel_in=Surf_in.get_panel_vertices_coords(0,nn_in)
-            zeta_panel_in = Surf_in.zeta[:, [0, 1, 1, 0],
-                            [nn_in + 0, nn_in + 0, nn_in + 1, nn_in + 1]].T
-            # get local derivatives
-            _, der_zeta_panel = eval_panel_cpp(
-                zetac, zeta_panel_in, Surf_in.vortex_radius, gamma_pan=Surf_in.gamma[0, nn_in])
-
-            for vv in range(2):
-                nn_v = nn_in + dn[vv]
-                jj_v = []
-                for cc in range(3):
-                    jj_v.append(np.ravel_multi_index(
-                        (cc, M_in_bound, nn_v), shape_zeta_in_bound))
-                Dervert[:, jj_v] += der_zeta_panel[vvec[vv], :, :]
+        vert_panels = slice(0, N_in)
+        vert_vertices = [0, 3]
+        nn_in = np.arange(N_in)
+        jj_v = np.ravel_multi_index((np.full((2 * N_in,), M_in_bound),
+                                     np.column_stack((nn_in, nn_in + 1)).reshape(-1)),
+                                    (M_in_bound + 1, N_in + 1))
+    Kzeta_in_bound = (M_in_bound + 1) * (N_in + 1)
+
+    # scatter matrix from (panel, vertex) pairs to vertices
+    Scatter = sparse.csc_matrix((np.ones((len(jj_v),)), (np.arange(len(jj_v)), jj_v)),
+                                shape=(len(jj_v), Kzeta_in_bound))
+
+    Dercoll = np.zeros((n_points, 3, 3))
+    Dervert = np.zeros((n_points, n_rows, 3 * Kzeta_in_bound))
+
+    chunk_size = max(1, max_batch_size // K_in)
+    for pp in range(0, n_points, chunk_size):
+        chunk = slice(pp, min(pp + chunk_size, n_points))
+        if IsBound:
+            Dercoll[chunk], der_vert = dbiot.eval_panels_vec(
+                zetac[chunk], ZetaPanels, vortex_radius, gamma)
+        else:
+            Dercoll[chunk], _ = dbiot.eval_panels_vec(
+                zetac[chunk], ZetaPanels, vortex_radius, gamma, vertices=False)
+            _, der_vert = dbiot.eval_panels_vec(
+                zetac[chunk], ZetaPanels[vert_panels], vortex_radius, gamma[vert_panels])
+        # [point, panel, vertex, Q_{x,y,z}, zeta_{x,y,z}]
+        der_vert = der_vert[:, :, vert_vertices]
+        if Left is not None:
+            der_vert = np.matmul(Left[chunk, None, None, :, :], der_vert)
+
+        # [point, row, zeta_{x,y,z}, (panel, vertex)] to [point, row, zeta_{x,y,z}, vertex]
+        n_chunk = der_vert.shape[0]
+        der_vert = der_vert.transpose((0, 3, 4, 1, 2)).reshape((n_chunk * n_rows * 3, -1))
+        Dervert[chunk] = Scatter.T.dot(der_vert.T).T.reshape((n_chunk, n_rows, 3 * Kzeta_in_bound))
 
     return Dercoll, Dervert
 
 
-def dfqsdvind_zeta(Surfs, Surfs_star):
+def dfqsdvind_zeta(Surfs, Surfs_star, num_cores=1):
     """
     Assemble derivative of quasi-steady force w.r.t. induced velocities changes
     due to zeta.
+
+    The segments of each output surface are evaluated at once against every
+    input surface, and the pairs of output and input surfaces are distributed
+    over ``num_cores`` threads.
     """
 
     n_surf = len(Surfs)
     assert len(Surfs_star) == n_surf, \
         'Number of bound and wake surfaces much be equal'
 
-    # allocate
-    Dercoll_list = []
-    Dervert_list = []
-    for ss_out in range(n_surf):
+    # segments mid-points, Lskew matrices and vertex indices of each output surface
+    Segments = [dfqsdvind_zeta_segments(Surfs[ss_out], Surfs_star[ss_out]) for ss_out in range(n_surf)]
+
+    def surface_pair(ss_out, ss_in):
+        zeta_mid, Lskew, jj_a, jj_b = Segments[ss_out]
         Kzeta_out = Surfs[ss_out].maps.Kzeta
-        Dercoll_list.append(np.zeros((3 * Kzeta_out, 3 * Kzeta_out)))
-        Dervert_list_sub = []
-        for ss_in in range(n_surf):
-            Kzeta_in = Surfs[ss_in].maps.Kzeta
-            Dervert_list_sub.append(np.zeros((3 * Kzeta_out, 3 * Kzeta_in)))
-        Dervert_list.append(Dervert_list_sub)
+        Surf_in = Surfs[ss_in]
+        Kzeta_in = Surf_in.maps.Kzeta
+        Dercoll = np.zeros((3 * Kzeta_out, 3 * Kzeta_out))
+        Dervert = np.zeros((3 * Kzeta_out, 3 * Kzeta_in))
+
+        # 1d indices of the vertices coordinates [segment, x/y/z]
+        ii_a = jj_a[:, None] + Kzeta_out * np.arange(3)[None, :]
+        ii_b = jj_b[:, None] + Kzeta_out * np.arange(3)[None, :]
+
+        n_seg = zeta_mid.shape[0]
+        chunk_size = max(1, max_batch_entries // (9 * Kzeta_in))
+        for ll in range(0, n_seg, chunk_size):
+            chunk = slice(ll, min(ll + chunk_size, n_seg))
+            ### Bound
+            # deriv wrt induced velocity
+            dvind_mid, dvind_vert = dvinddzeta_vec(
+                zeta_mid[chunk], Surf_in, IsBound=True, Left=0.5 * Lskew[chunk])
+            ### wake
+            dvind_mid_w, dvind_vert_w = dvinddzeta_vec(
+                zeta_mid[chunk], Surfs_star[ss_in], IsBound=False,
+                M_in_bound=Surf_in.maps.M, Left=0.5 * Lskew[chunk],
+                vortex_radius=Surf_in.vortex_radius)
+            dvind_mid += dvind_mid_w
+            dvind_vert += dvind_vert_w
+
+            # allocate coll
+            Df = np.matmul(0.25 * Lskew[chunk], dvind_mid)
+            for ii_row, ii_col in [(ii_a, ii_a), (ii_b, ii_a), (ii_a, ii_b), (ii_b, ii_b)]:
+                np.add.at(Dercoll, (ii_row[chunk, :, None], ii_col[chunk, None, :]), Df)
+
+            # allocate vert
+            n_chunk = dvind_vert.shape[0]
+            rows = np.concatenate((ii_a[chunk].reshape(-1), ii_b[chunk].reshape(-1)))
+            cols = np.tile(np.arange(3 * n_chunk), 2)
+            Scatter = sparse.csr_matrix((np.ones((len(rows),)), (rows, cols)),
+                                        shape=(3 * Kzeta_out, 3 * n_chunk))
+            Dervert += Scatter.dot(dvind_vert.reshape((3 * n_chunk, 3 * Kzeta_in)))
+
+        return Dercoll, Dervert
+
+    pairs = list(itertools.product(range(n_surf), range(n_surf)))
+    results = dict(zip(pairs, map_pairs(surface_pair, pairs, num_cores)))
 
+    Dercoll_list = []
+    Dervert_list = []
     for ss_out in range(n_surf):
+        Dercoll_list.append(sum(results[(ss_out, ss_in)][0] for ss_in in range(n_surf)))
+        Dervert_list.append([results[(ss_out, ss_in)][1] for ss_in in range(n_surf)])
 
-        Surf_out = Surfs[ss_out]
-        M_out, N_out = Surf_out.maps.M, Surf_out.maps.N
-        K_out = Surf_out.maps.K
-        Kzeta_out = Surf_out.maps.Kzeta
-        shape_fqs = Surf_out.maps.shape_vert_vect  # (3,M+1,N+1)
-        Dercoll = Dercoll_list[ss_out]  # <--link
-
-        ### Loop out (bound) surface panels
-        for pp_out in itertools.product(range(0, M_out), range(0, N_out)):
-            mm_out, nn_out = pp_out
-            # zeta_panel_out=Surf_out.get_panel_vertices_coords(mm_out,nn_out)
-            zeta_panel_out = Surf_out.zeta[:, [mm_out + 0, mm_out + 1, mm_out + 1, mm_out + 0],
-                             [nn_out + 0, nn_out + 0, nn_out + 1, nn_out + 1]].T
-
-            # Loop segments
-            for ll, aa, bb in zip(svec, avec, bvec):
-                zeta_mid = 0.5 * (zeta_panel_out[bb, :] + zeta_panel_out[aa, :])
-                lv = zeta_panel_out[bb, :] - zeta_panel_out[aa, :]
-                Lskew = algebra.skew((-Surf_out.rho * Surf_out.gamma[mm_out, nn_out]) * lv)
-
-                # get vertices m,n indices
-                mm_a, nn_a = mm_out + dmver[aa], nn_out + dnver[aa]
-                mm_b, nn_b = mm_out + dmver[bb], nn_out + dnver[bb]
-                # get vertices 1d index
-                ii_a = [np.ravel_multi_index(
-                    (cc, mm_a, nn_a), shape_fqs) for cc in range(3)]
-                ii_b = [np.ravel_multi_index(
-                    (cc, mm_b, nn_b), shape_fqs) for cc in range(3)]
-                del mm_a, mm_b, nn_a, nn_b
-
-                ### loop input surfaces coordinates
-                for ss_in in range(n_surf):
-                    ### Bound
-                    Surf_in = Surfs[ss_in]
-                    M_in_bound, N_in_bound = Surf_in.maps.M, Surf_in.maps.N
-                    shape_zeta_in_bound = (3, M_in_bound + 1, N_in_bound + 1)
-                    Dervert = Dervert_list[ss_out][ss_in]  # <- link
-                    # deriv wrt induced velocity
-                    dvind_mid, dvind_vert = dvinddzeta_cpp(
-                        zeta_mid, Surf_in, is_bound=True, vortex_radius=Surf_in.vortex_radius)
-                    # allocate coll
-                    Df = np.dot(0.25 * Lskew, dvind_mid)
-                    Dercoll[np.ix_(ii_a, ii_a)] += Df
-                    Dercoll[np.ix_(ii_b, ii_a)] += Df
-                    Dercoll[np.ix_(ii_a, ii_b)] += Df
-                    Dercoll[np.ix_(ii_b, ii_b)] += Df
-                    # allocate vert
-                    Df = np.dot(0.5 * Lskew, dvind_vert)
-                    Dervert[ii_a, :] += Df
-                    Dervert[ii_b, :] += Df
-
-                    ### wake
-                    # deriv wrt induced velocity
-                    dvind_mid, dvind_vert = dvinddzeta_cpp(
-                        zeta_mid, Surfs_star[ss_in],
-                        is_bound=False, vortex_radius=Surf_in.vortex_radius,
-                        M_in_bound=Surf_in.maps.M)
-                    # allocate coll
-                    Df = np.dot(0.25 * Lskew, dvind_mid)
-                    Dercoll[np.ix_(ii_a, ii_a)] += Df
-                    Dercoll[np.ix_(ii_b, ii_a)] += Df
-                    Dercoll[np.ix_(ii_a, ii_b)] += Df
-                    Dercoll[np.ix_(ii_b, ii_b)] += Df
-
-                    Df = np.dot(0.5 * Lskew, dvind_vert)
-                    Dervert[ii_a, :] += Df
-                    Dervert[ii_b, :] += Df
-
-        # Loop output surf. TE
-        # - we use Gammaw_0 over the TE
-        # - we run along the positive direction as defined in the first row of
-        # wake panels
-        for nn_out in range(N_out):
-
-            # get TE bound vertices m,n indices
-            nn_a = nn_out + 1
-            nn_b = nn_out
-
-            # get segment and mid-point
-            zeta_mid = 0.5 * (Surf_out.zeta[:, M_out, nn_b] + Surf_out.zeta[:, M_out, nn_a])
-            lv = Surf_out.zeta[:, M_out, nn_b] - Surf_out.zeta[:, M_out, nn_a]
-            Lskew = algebra.skew((-Surf_out.rho * Surfs_star[ss_out].gamma[0, nn_out]) * lv)
+    return Dercoll_list, Dervert_list
 
-            # get vertices 1d index on bound
-            ii_a = [np.ravel_multi_index(
-                (cc, M_out, nn_a), shape_fqs) for cc in range(3)]
-            ii_b = [np.ravel_multi_index(
-                (cc, M_out, nn_b), shape_fqs) for cc in range(3)]
 
-            ### loop input surfaces coordinates
-            for ss_in in range(n_surf):
-                ### Bound
-                Surf_in = Surfs[ss_in]
-                M_in_bound, N_in_bound = Surf_in.maps.M, Surf_in.maps.N
-                shape_zeta_in_bound = (3, M_in_bound + 1, N_in_bound + 1)
-                Dervert = Dervert_list[ss_out][ss_in]  # <- link
-                # deriv wrt induced velocity
-                dvind_mid, dvind_vert = dvinddzeta_cpp(zeta_mid, Surf_in,
-                                                       is_bound=True,
-                                                       vortex_radius=Surf_in.vortex_radius)
-                # allocate coll
-                Df = np.dot(0.25 * Lskew, dvind_mid)
-                Dercoll[np.ix_(ii_a, ii_a)] += Df
-                Dercoll[np.ix_(ii_b, ii_a)] += Df
-                Dercoll[np.ix_(ii_a, ii_b)] += Df
-                Dercoll[np.ix_(ii_b, ii_b)] += Df
-                # allocate vert
-                Df = np.dot(0.5 * Lskew, dvind_vert)
-                Dervert[ii_a, :] += Df
-                Dervert[ii_b, :] += Df
-
-                ### wake
-                # deriv wrt induced velocity
-                dvind_mid, dvind_vert = dvinddzeta_cpp(
-                    zeta_mid, Surfs_star[ss_in],
-                    is_bound=False, vortex_radius=Surf_in.vortex_radius,
-                    M_in_bound=Surf_in.maps.M)
-                # allocate coll
-                Df = np.dot(0.25 * Lskew, dvind_mid)
-                Dercoll[np.ix_(ii_a, ii_a)] += Df
-                Dercoll[np.ix_(ii_b, ii_a)] += Df
-                Dercoll[np.ix_(ii_a, ii_b)] += Df
-                Dercoll[np.ix_(ii_b, ii_b)] += Df
-
-                # allocate vert
-                Df = np.dot(0.5 * Lskew, dvind_vert)
-                Dervert[ii_a, :] += Df
-                Dervert[ii_b, :] += Df
+def dfqsdvind_zeta_segments(Surf_out, Surf_star_out):
+    """
+    Returns the segments of the bound surface Surf_out on which the
+    quasi-steady force is computed in ``dfqsdvind_zeta``:
+    - the mid-points zeta_mid, of shape (L,3)
+    - the matrices Lskew=skew(-rho*gamma*lv), of shape (L,3,3)
+    - the 1D (scalar) indices of the segments vertices a and b, of shape (L,)
+
+    The segments of all panels are followed by the TE segments, over which
+    Gammaw_0 is used, running along the positive direction as defined in the
+    first row of wake panels.
+    """
 
-    return Dercoll_list, Dervert_list
+    M_out, N_out = Surf_out.maps.M, Surf_out.maps.N
+    vertex_indices = panel_vertex_indices(M_out, N_out)
+    zeta = np.reshape(Surf_out.zeta, (3, -1))
+
+    ### out (bound) surface panels segments [panel, segment]
+    jj_a = vertex_indices[:, avec]
+    jj_b = vertex_indices[:, bvec]
+    gamma = np.repeat(np.reshape(Surf_out.gamma, (-1, 1)), 4, axis=1)
+
+    ### output surf. TE
+    nn_out = np.arange(N_out)
+    jj_a = np.concatenate((jj_a.reshape(-1), np.ravel_multi_index((np.full((N_out,), M_out), nn_out + 1),
+                                                                  (M_out + 1, N_out + 1))))
+    jj_b = np.concatenate((jj_b.reshape(-1), np.ravel_multi_index((np.full((N_out,), M_out), nn_out),
+                                                                  (M_out + 1, N_out + 1))))
+    gamma = np.concatenate((gamma.reshape(-1), Surf_star_out.gamma[0, :]))
+
+    zeta_mid = np.ascontiguousarray(0.5 * (zeta[:, jj_b] + zeta[:, jj_a]).T)
+    lv = (zeta[:, jj_b] - zeta[:, jj_a]).T * (-Surf_out.rho * gamma[:, None])
+    Lskew = np.zeros((len(gamma), 3, 3))
+    Lskew[:, 0, 1] = -lv[:, 2]
+    Lskew[:, 0, 2] = lv[:, 1]
+    Lskew[:, 1, 0] = lv[:, 2]
+    Lskew[:, 1, 2] = -lv[:, 0]
+    Lskew[:, 2, 0] = -lv[:, 1]
+    Lskew[:, 2, 1] = lv[:, 0]
+
+    return zeta_mid, Lskew, jj_a, jj_b
 
 
 def dfunstdgamma_dot(Surfs):
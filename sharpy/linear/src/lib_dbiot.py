@@ -486,6 +486,87 @@ def eval_panel_fast_coll(zetaP, ZetaPanel, vortex_radius, gamma_pan=1.0):
     return DerP
 
 
+def eval_panels_vec(zetaP, ZetaPanels, vortex_radius, gamma_pan, vertices=True):
+    """
+    Vectorised version of eval_panel_fast over a set of target points and panels.
+
+    Args:
+        zetaP (np.ndarray): target points, with shape ``(P, 3)``
+        ZetaPanels (np.ndarray): panels vertices coordinates, with shape ``(K, 4, 3)``
+        vortex_radius (float): vortex core radius
+        gamma_pan (np.ndarray): panels circulation, with shape ``(K,)``
+        vertices (bool): if ``False``, the derivatives w.r.t. the panel vertices are not computed
+
+    Returns:
+        tuple: Two elements:
+            - DerP: derivative of the velocity induced by all panels w.r.t. each target point, with shape
+              ``(P, 3, 3)``
+            - DerVertices: derivative of the velocity induced at each target point w.r.t. the vertices
+              of each panel, with shape ``(P, K, 4, 3, 3)``, or ``None`` if ``vertices`` is ``False``
+    """
+
+    vortex_radius_sq = vortex_radius*vortex_radius
+    n_points = zetaP.shape[0]
+    n_panels = ZetaPanels.shape[0]
+    DerP = np.zeros((n_points, 3, 3))
+    DerVertices = None
+    if vertices:
+        DerVertices = np.zeros((n_points, n_panels, 4, 3, 3))
+
+    ### ---------------------------------------------- Compute common variables
+    Cfact = cfact_biot * np.asarray(gamma_pan, dtype=float).reshape((1, n_panels))
+
+    # distance vertex ii-th from P: [point, panel, vertex, x/y/z]
+    R = zetaP[:, None, None, :] - ZetaPanels[None, :, :, :]
+    rinv = 1. / np.sqrt(np.sum(R * R, axis=-1))
+    Runit = R * rinv[..., None]
+    Der_runit = rinv[..., None, None] * (np.eye(3) - Runit[..., :, None] * Runit[..., None, :])
+
+    ### ------------------------------------------------- Loop through segments
+    for aa, bb in LoopPanel:
+
+        RAB = ZetaPanels[:, bb, :] - ZetaPanels[:, aa, :]  # segment vector
+        Vcr = np.cross(R[:, :, aa, :], R[:, :, bb, :])
+        vcr2 = np.sum(Vcr * Vcr, axis=-1)
+
+        # segments within the vortex core do not contribute
+        active = vcr2 >= vortex_radius_sq * np.sum(RAB * RAB, axis=-1)[None, :]
+        vcr2inv = np.zeros_like(vcr2)
+        vcr2inv[active] = 1. / vcr2[active]
+
+        Tv = Runit[:, :, aa, :] - Runit[:, :, bb, :]
+        dotprod = np.sum(RAB[None, :, :] * Tv, axis=-1)
+
+        ### ----------------------------------------- cross-product derivatives
+        Cvcr2inv = Cfact * vcr2inv
+        diag_fact = Cvcr2inv * dotprod
+        off_fact = -2. * Cvcr2inv * vcr2inv * dotprod
+        Dvcross = off_fact[..., None, None] * Vcr[..., :, None] * Vcr[..., None, :]
+        Dvcross[..., [0, 1, 2], [0, 1, 2]] += diag_fact[..., None]
+
+        ### ---------------------------------------- difference term derivative
+        Vsc = Vcr * Cvcr2inv[..., None]
+        Ddiff = Vsc[..., :, None] * RAB[None, :, None, :]
+
+        ### ------------------------------------------ Final assembly (crucial)
+        # the rows of Dvcross*skew(rv) are the cross products of the rows of Dvcross with rv
+        if vertices:
+            dQ_dRA = np.cross(Dvcross, -R[:, :, None, bb, :]) \
+                     + np.matmul(Ddiff, Der_runit[:, :, aa])
+            dQ_dRB = np.cross(Dvcross, R[:, :, None, aa, :]) \
+                     - np.matmul(Ddiff, Der_runit[:, :, bb])
+            dQ_dRAB = Vsc[..., :, None] * Tv[..., None, :]
+
+            DerP += np.sum(dQ_dRA + dQ_dRB, axis=1)  # w.r.t. P
+            DerVertices[:, :, aa] -= dQ_dRAB + dQ_dRA  # w.r.t. A
+            DerVertices[:, :, bb] += dQ_dRAB - dQ_dRB  # w.r.t. B
+        else:
+            DerP += np.sum(np.cross(Dvcross, RAB[None, :, None, :])
+                           + np.matmul(Ddiff, Der_runit[:, :, aa] - Der_runit[:, :, bb]), axis=1)
+
+    return DerP, DerVertices
+
+
 if __name__ == '__main__':
 
     import cProfile
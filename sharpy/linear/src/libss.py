@@ -17,7 +17,7 @@ Classes:
 
 Methods for state-space manipulation:
 - couple: feedback coupling. Does not support sparsity
-- freqresp: calculate frequency response. Supports sparsity.
+- freqresp: calculate frequency response. Supports sparsity and parallel evaluation.
 - series: series connection between systems
 - parallel: parallel connection between systems
 - SSconv: convert state-space model with predictions and delays
@@ -52,6 +52,7 @@ to do:
 		- add method to automatically determine whether to use sparse or dense?
 """
 
+import concurrent.futures
 import copy
 import warnings
 import numpy as np
@@ -60,6 +61,8 @@ import scipy.linalg as scalg
 from sharpy.linear.utils.ss_interface import LinearVector, StateVariable, InputVariable, OutputVariable
 import scipy.interpolate as scint
 import h5py
+import scipy.sparse as sparse
+import scipy.sparse.linalg as spalg
 import sharpy.utils.h5utils as h5utils
 
 # dependency
@@ -225,7 +228,7 @@ class StateSpace:
     def get_mats(self):
         return self.A, self.B, self.C, self.D
 
-    def freqresp(self, wv):
+    def freqresp(self, wv, num_cores=1, callback=None):
         """
         Calculate frequency response over frequencies wv
 
@@ -234,7 +237,7 @@ class StateSpace:
         dlti = True
         if self.dt is None:
             dlti = False
-        return freqresp(self, wv, dlti=dlti)
+        return freqresp(self, wv, dlti=dlti, num_cores=num_cores, callback=callback)
 
     def addGain(self, K, where):
         """
@@ -1229,52 +1232,146 @@ def retain_inout_channels(sys, retain_channels, where):
     return sys
 
 
-def freqresp(SS, wv, dlti=True):
+def freqresp(SS, wv, dlti=True, num_cores=1, callback=None):
     """
     In-house frequency response function supporting dense/sparse types
 
+    The state matrix is only reduced once for all frequencies (see :class:`FreqRespEngine`) and the frequencies can be
+    evaluated in chunks over ``num_cores`` threads.
+
     Inputs:
     - SS: instance of StateSpace class, or scipy.signal.StateSpace*
     - wv: frequency range
     - dlti: True if discrete-time system is considered.
+    - num_cores: number of threads over which the frequencies are evaluated.
+    - callback: function called as ``callback(indices, Ychunk)`` when the response at the frequencies ``wv[indices]``
+      is available, for instance to write it to file as the computation progresses. Chunks may be completed in any
+      order.
 
     Outputs:
     - Yfreq[outputs,inputs,len(wv)]: frequency response over wv
-
-    Warnings:
-    -  This function may not be very efficient for dense matrices (as A is not
-    reduced to upper Hessenberg form), but can exploit sparsity in the state-space
-    matrices.
     """
 
     assert type(SS) == StateSpace, \
         'Type %s of state-space model not supported. Use libss.StateSpace instead!' % type(SS)
     SS.check_types()
 
-    if hasattr(SS, 'dt') and dlti:
-        Ts = SS.dt
-        wTs = Ts * wv
-        zv = np.cos(wTs) + 1.j * np.sin(wTs)
+    wv = np.atleast_1d(wv)
+    Nw = len(wv)
+    engine = FreqRespEngine(SS, dlti=dlti, reduce=Nw >= FreqRespEngine.min_freqs_reduction)
+
+    Yfreq = np.empty((engine.Ny, engine.Nu, Nw,), dtype=np.complex_)
+    if num_cores > 1:
+        num_chunks = min(Nw, 4 * num_cores)
+    elif callback is not None:
+        num_chunks = min(Nw, 10)
+    else:
+        num_chunks = 1
+    chunks = [chunk for chunk in np.array_split(np.arange(Nw), num_chunks) if len(chunk)]
+
+    if num_cores > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_cores) as executor:
+            futures = {executor.submit(engine.evaluate, wv[chunk]): chunk for chunk in chunks}
+            for future in concurrent.futures.as_completed(futures):
+                chunk = futures[future]
+                Yfreq[:, :, chunk] = future.result()
+                if callback is not None:
+                    callback(chunk, Yfreq[:, :, chunk])
     else:
-        # print('Assuming a continuous time system')
-        zv = 1.j * wv
+        for chunk in chunks:
+            Yfreq[:, :, chunk] = engine.evaluate(wv[chunk])
+            if callback is not None:
+                callback(chunk, Yfreq[:, :, chunk])
 
-    Nx = SS.A.shape[0]
-    Ny = SS.D.shape[0]
-    try:
-        Nu = SS.B.shape[1]
-    except IndexError:
-        Nu = 1
+    return Yfreq
 
-    Nw = len(wv)
 
-    Yfreq = np.empty((Ny, Nu, Nw,), dtype=np.complex_)
-    Eye = libsp.eye_as(SS.A)
-    for ii in range(Nw):
-        sol_cplx = libsp.solve(zv[ii] * Eye - SS.A, SS.B)
-        Yfreq[:, :, ii] = libsp.dot(SS.C, sol_cplx, type_out=np.ndarray) + SS.D
+class FreqRespEngine:
+    r"""
+    Evaluates the frequency response of a ``StateSpace``
+
+    .. math:: \mathbf{Y}(z) = \mathbf{C} (z\mathbf{I} - \mathbf{A})^{-1}\mathbf{B} + \mathbf{D}
 
-    return Yfreq
+    reducing the state matrix once so that each frequency is cheap to evaluate:
+
+    - dense ``A``: complex Schur decomposition :math:`\mathbf{A} = \mathbf{Z}\mathbf{T}\mathbf{Z}^H`. Each
+      frequency requires a triangular solve, :math:`O(n^2)` instead of :math:`O(n^3)`. The decomposition costs about
+      as much as ``min_freqs_reduction`` dense solves, thus it is skipped (``reduce=False``) when fewer frequencies are
+      evaluated.
+
+    - sparse ``A``: the fill-reducing column ordering of :math:`z\mathbf{I} - \mathbf{A}` is computed once and reused
+      by the LU factorisation at every frequency.
+
+    The ``evaluate`` method does not modify the engine, thus it can be called from several threads.
+
+    Args:
+        SS (StateSpace): state-space system
+        dlti (bool): treat the system as discrete time
+        reduce (bool): reduce the dense state matrix to Schur form
+    """
+
+    min_freqs_reduction = 10
+
+    def __init__(self, SS, dlti=True, reduce=True):
+        self.dt = SS.dt if (dlti and SS.dt is not None) else None
+        self.sparse = type(SS.A) is libsp.csc_matrix
+        self.Nx = SS.A.shape[0]
+
+        B = libsp.dense(SS.B)
+        if B.ndim == 1:
+            B = B.reshape((self.Nx, 1))
+        self.Ny = SS.D.shape[0]
+        self.Nu = B.shape[1]
+        self.C = SS.C
+        self.D = libsp.dense(SS.D).reshape((self.Ny, self.Nu))
+
+        self.schur = False
+        if self.sparse:
+            eye = sparse.identity(self.Nx, format='csc')
+            # column ordering of the sparsity pattern of zI - A, found with a first factorisation
+            perm_c = spalg.splu(sparse.csc_matrix(abs(SS.A) + eye)).perm_c
+            self.A = sparse.csc_matrix(SS.A)[:, perm_c]
+            self.eye = eye[:, perm_c]
+            self.perm_c = perm_c
+            self.B = B
+        elif reduce:
+            self.schur = True
+            T, Z = scalg.schur(SS.A, output='complex')
+            self.A = T
+            self.B = np.dot(Z.conj().T, B)
+            self.C = libsp.dot(SS.C, Z, type_out=np.ndarray)
+        else:
+            self.A = SS.A
+            self.B = B
+
+    def z(self, wv):
+        r"""
+        Frequency variable: :math:`e^{i\omega\Delta t}` for discrete time systems, else :math:`i\omega`
+        """
+        if self.dt is not None:
+            wTs = self.dt * wv
+            return np.cos(wTs) + 1.j * np.sin(wTs)
+        else:
+            return 1.j * wv
+
+    def evaluate(self, wv):
+        """
+        Frequency response ``[outputs, inputs, len(wv)]`` at the frequencies ``wv``
+        """
+        zv = self.z(wv)
+        Yfreq = np.empty((self.Ny, self.Nu, len(zv)), dtype=np.complex_)
+        for ii in range(len(zv)):
+            if self.sparse:
+                lu = spalg.splu(zv[ii] * self.eye - self.A, permc_spec='NATURAL')
+                sol_cplx = np.empty((self.Nx, self.Nu), dtype=np.complex_)
+                sol_cplx[self.perm_c, :] = lu.solve(self.B.astype(np.complex_))
+            elif self.schur:
+                sol_cplx = scalg.solve_triangular(zv[ii] * np.eye(self.Nx) - self.A, self.B, check_finite=False)
+            else:
+                sol_cplx = libsp.solve(zv[ii] * np.eye(self.Nx) - self.A, self.B)
+            Yfreq[:, :, ii] = libsp.dot(self.C, sol_cplx, type_out=np.ndarray).reshape((self.Ny, self.Nu)) + self.D
+
+        return Yfreq
 
 
 def series(SS01, SS02):
@@ -17,6 +17,7 @@ References:
 
 """
 
+import concurrent.futures
 import time
 import warnings
 import numpy as np
@@ -46,6 +47,9 @@ settings_default_static['vortex_radius'] = vortex_radius_def
 settings_types_static['cfl1'] = 'bool'
 settings_default_static['cfl1'] = True
 
+settings_types_static['num_cores'] = 'int'
+settings_default_static['num_cores'] = 1
+
 settings_types_dynamic = dict()
 settings_default_dynamic = dict()
 
@@ -75,6 +79,9 @@ settings_default_dynamic['vortex_radius'] = vortex_radius_def
 settings_types_dynamic['cfl1'] = 'bool'
 settings_default_dynamic['cfl1'] = True
 
+settings_types_dynamic['num_cores'] = 'int'
+settings_default_dynamic['num_cores'] = 1
+
 
 class Static():
     """	Static linear solver """
@@ -96,6 +103,7 @@ class Static():
 
         self.vortex_radius = settings_here['vortex_radius']
         self.cfl1 = settings_here['cfl1']
+        self.num_cores = settings_here['num_cores']
         MS = multisurfaces.MultiAeroGridSurfaces(tsdata,
                                                  self.vortex_radius,
                                                  for_vel=for_vel)
@@ -155,7 +163,7 @@ class Static():
         # ----------------------------------------------------------- state eq.
         List_uc_dncdzeta = ass.uc_dncdzeta(MS.Surfs)
         List_nc_dqcdzeta_coll, List_nc_dqcdzeta_vert = \
-            ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star)
+            ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, num_cores=self.num_cores)
         List_AICs, List_AICs_star = ass.AICs(MS.Surfs, MS.Surfs_star,
                                              target='collocation', Project=True)
         List_Wnv = []
@@ -203,7 +211,7 @@ class Static():
         self.Dfqsdzeta = scalg.block_diag(
             *ass.dfqsdzeta_vrel0(MS.Surfs, MS.Surfs_star))
         # ... induced velocity contrib.
-        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star)
+        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star, num_cores=self.num_cores)
         for ss in range(MS.n_surf):
             List_vert[ss][ss] += List_coll[ss]
         self.Dfqsdzeta += np.block(List_vert)
@@ -594,7 +602,8 @@ class Dynamic(Static):
             self.settings['ScalingDict'] = ScalingDict
 
         static_dict = {'vortex_radius': self.settings['vortex_radius'],
-                       'cfl1': self.settings['cfl1']}
+                       'cfl1': self.settings['cfl1'],
+                       'num_cores': self.settings['num_cores']}
         super().__init__(tsdata, custom_settings=static_dict, for_vel=for_vel)
 
         self.dt = self.settings['dt']
@@ -869,7 +878,8 @@ class Dynamic(Static):
             Ass = libsp.csc_matrix(Ass)
 
         # zeta derivs
-        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True)
+        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True,
+                                           num_cores=self.num_cores)
         List_uc_dncdzeta = ass.uc_dncdzeta(MS.Surfs)
         List_nc_domegazetadzeta_vert = ass.nc_domegazetadzeta(MS.Surfs, MS.Surfs_star)
         for ss in range(MS.n_surf):
@@ -943,7 +953,7 @@ class Dynamic(Static):
         Dss[:, :3 * Kzeta] = scalg.block_diag(
             *ass.dfqsdzeta_vrel0(MS.Surfs, MS.Surfs_star))
         # zeta (induced velocity contrib)
-        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star)
+        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star, num_cores=self.num_cores)
         for ss in range(MS.n_surf):
             List_vert[ss][ss] += List_coll[ss]
         Dss[:, :3 * Kzeta] += np.block(List_vert)
@@ -982,7 +992,7 @@ class Dynamic(Static):
         self.cpu_summary['assemble'] = time.time() - t0
         cout.cout_wrap('\t\t\t...done in %.2f sec' % self.cpu_summary['assemble'])
 
-    def freqresp(self, kv, wake_prop_settings=None):
+    def freqresp(self, kv, wake_prop_settings=None, num_cores=1):
         """
         Ad-hoc method for fast UVLM frequency response over the frequencies
         kv. The method, only requires inversion of a K x K matrix at each
@@ -991,6 +1001,8 @@ class Dynamic(Static):
         The algorithm implemented here can be used also upon projection of
         the state-space model.
 
+        The frequencies are evaluated in chunks over ``num_cores`` threads.
+
         Note:
         This method is very similar to the "minsize" solution option is the
         steady_solve.
@@ -1028,46 +1040,55 @@ class Dynamic(Static):
             P = self.SS.A[:K, :K]
             Pw = self.SS.A[:K, K:K + K_star]
 
+        # output matrix blocks, extracted once for all frequencies
+        C_gamma = self.SS.C[:, :K]
+        C_gamma_star = self.SS.C[:, K:K + K_star]
+        C_gamma_dot = self.SS.C[:, K + K_star:2 * K + K_star]
+        if self.remove_predictor:
+            D = self.D_predictor
+        else:
+            D = self.SS.D
+
         Nk = len(kv)
         kvdt = kv * self.SS.dt
         zv = np.cos(kvdt) + 1.j * np.sin(kvdt)
         Yfreq = np.empty((self.SS.outputs, self.SS.inputs, Nk,), dtype=np.complex_)
 
-        for kk in range(Nk):
+        def evaluate(chunk):
+            for kk in chunk:
+                ###  build Cw complex
+                Cw_cpx = self.get_Cw_cpx(zv[kk], settings=wake_prop_settings)
 
-            ###  build Cw complex
-            Cw_cpx = self.get_Cw_cpx(zv[kk], settings=wake_prop_settings)
-
-            if self.remove_predictor:
-                Ygamma = zv[kk] * \
-                         libsp.solve(zv[kk] * Eye - P -
-                                     libsp.dot(Pw, Cw_cpx, type_out=libsp.csc_matrix),
-                                     Bup)
-            else:
                 Ygamma = libsp.solve(zv[kk] * Eye - P -
                                      libsp.dot(Pw, Cw_cpx, type_out=libsp.csc_matrix),
                                      Bup)
-
-            Ygamma_star = Cw_cpx.dot(Ygamma)
-
-            if self.integr_order == 1:
-                dfact = (1. - 1. / zv[kk])
-            elif self.integr_order == 2:
-                dfact = .5 * (3. - 4. / zv[kk] + 1. / zv[kk] ** 2)
-            else:
-                raise NameError('Specify valid integration order')
-
-            # calculate solution
-            if self.remove_predictor:
-                Yfreq[:, :, kk] = np.dot(self.SS.C[:, :K], Ygamma) + \
-                                  np.dot(self.SS.C[:, K:K + K_star], Ygamma_star) + \
-                                  np.dot(self.SS.C[:, K + K_star:2 * K + K_star], dfact * Ygamma) + \
-                                  self.D_predictor
-            else:
-                Yfreq[:, :, kk] = np.dot(self.SS.C[:, :K], Ygamma) + \
-                                  np.dot(self.SS.C[:, K:K + K_star], Ygamma_star) + \
-                                  np.dot(self.SS.C[:, K + K_star:2 * K + K_star], dfact * Ygamma) + \
-                                  self.SS.D
+                if self.remove_predictor:
+                    Ygamma = zv[kk] * Ygamma
+
+                Ygamma_star = Cw_cpx.dot(Ygamma)
+
+                if self.integr_order == 1:
+                    dfact = (1. - 1. / zv[kk])
+                elif self.integr_order == 2:
+                    dfact = .5 * (3. - 4. / zv[kk] + 1. / zv[kk] ** 2)
+                else:
+                    raise NameError('Specify valid integration order')
+
+                # calculate solution
+                Yfreq[:, :, kk] = np.dot(C_gamma, Ygamma) + \
+                                  np.dot(C_gamma_star, Ygamma_star) + \
+                                  np.dot(C_gamma_dot, dfact * Ygamma) + \
+                                  D
+
+        if num_cores > 1:
+            chunks = [chunk for chunk in np.array_split(np.arange(Nk), 4 * num_cores) if len(chunk)]
+            # the first chunk is evaluated serially, as get_Cw_cpx may generate the wake collocation points
+            evaluate(chunks[0])
+            with concurrent.futures.ThreadPoolExecutor(max_workers=num_cores) as executor:
+                for future in [executor.submit(evaluate, chunk) for chunk in chunks[1:]]:
+                    future.result()
+        else:
+            evaluate(range(Nk))
 
         return Yfreq
 
@@ -1978,7 +1999,8 @@ class DynamicBlock(Dynamic):
         AinvAWCgammaW = None
 
         # zeta derivs
-        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True)
+        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True,
+                                           num_cores=self.num_cores)
         List_uc_dncdzeta = ass.uc_dncdzeta(MS.Surfs)
         List_nc_domegazetadzeta_vert = ass.nc_domegazetadzeta(MS.Surfs, MS.Surfs_star)
         for ss in range(MS.n_surf):
@@ -2054,7 +2076,7 @@ class DynamicBlock(Dynamic):
             [scalg.block_diag(*ass.dfqsdzeta_vrel0(MS.Surfs, MS.Surfs_star))])
 
         # zeta (induced velocity contrib)
-        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star)
+        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star, num_cores=self.num_cores)
         for ss in range(MS.n_surf):
             List_vert[ss][ss] += List_coll[ss]
         Dss[0][0] += np.block(List_vert)
@@ -2754,7 +2776,8 @@ class Frequency(Static):
         List_AICs, List_AICs_star = None, None
 
         # zeta derivs
-        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True)
+        List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True,
+                                           num_cores=self.num_cores)
         List_uc_dncdzeta = ass.uc_dncdzeta(MS.Surfs)
         List_nc_domegazetadzeta_vert = ass.nc_domegazetadzeta(MS.Surfs, MS.Surfs_star)
         for ss in range(MS.n_surf):
@@ -2814,7 +2837,7 @@ class Frequency(Static):
         Dss[:, :3 * Kzeta] = scalg.block_diag(
             *ass.dfqsdzeta_vrel0(MS.Surfs, MS.Surfs_star))
         # zeta (induced velocity contrib)
-        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star)
+        List_coll, List_vert = ass.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star, num_cores=self.num_cores)
         for ss in range(MS.n_surf):
             List_vert[ss][ss] += List_coll[ss]
         Dss[:, :3 * Kzeta] += np.block(List_vert)
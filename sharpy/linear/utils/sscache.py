@@ -0,0 +1,377 @@
+"""Linear system cache
+
+Content addressed, on disk storage of assembled linear systems.
+
+A key is computed as the hash of the linearisation reference state (aerodynamic and structural time steps), the
+structural model, the aerodynamic input data and the settings used in the assembly. Each entry is a folder named after the key and holds the
+assembled :class:`~sharpy.linear.src.libss.StateSpace` and :class:`~sharpy.linear.src.libss.Gain` objects, saved
+with their own ``save`` methods, the linearisation vectors and the attributes of the assembly objects used by the
+postprocessors (the UVLM scaling factors and the modal projection of the beam).
+
+The assembly objects themselves are not stored, so the cache is not loaded when the ``flow`` contains solvers that
+need them (see :data:`assembly_consumers`).
+
+Entries are evicted when older than a given age, and the least recently used ones when the cache exceeds
+a given size.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+import sharpy.linear.src.libss as libss
+import sharpy.utils.cout_utils as cout
+import sharpy.utils.settings as settings_utils
+import sharpy.utils.solver_interface as solver_interface
+
+# to be increased if the format of the entries or of the key changes
+cache_version = 2
+
+aero_tstep_fields = ['zeta', 'zeta_dot', 'zeta_star', 'gamma', 'gamma_star', 'gamma_dot', 'u_ext',
+                     'dimensions', 'dimensions_star', 'control_surface_deflection']
+
+struct_tstep_fields = ['pos', 'pos_dot', 'psi', 'psi_dot', 'for_pos', 'for_vel', 'for_acc', 'quat',
+                       'steady_applied_forces', 'gravity_forces', 'modal']
+
+structure_fields = ['num_node', 'num_elem', 'num_node_elem', 'connectivities', 'elem_stiffness', 'stiffness_db',
+                    'elem_mass', 'mass_db', 'frame_of_reference_delta', 'structural_twist', 'boundary_conditions',
+                    'beam_number', 'body_number', 'lumped_mass', 'lumped_mass_nodes', 'lumped_mass_inertia',
+                    'lumped_mass_position']
+
+# solvers that need the assembly objects of the linear system, which are not restored from the cache, and the
+# condition on their settings for which they do
+assembly_consumers = {
+    'LinDynamicSim': lambda settings: True,
+    'StabilityDerivatives': lambda settings: True,
+    'AsymptoticStability': lambda settings: settings['reference_velocity'] != 1. or
+                                            len(settings['velocity_analysis']) == 3,
+    'SaveData': lambda settings: settings['save_rom'],
+    'SaveParametricCase': lambda settings: settings['save_pmor_items'],
+}
+
+
+class CachedSystemError(RuntimeError):
+    """
+    Raised when an operation that needs the assembly objects is called on a linear system loaded from the cache
+    """
+    pass
+
+
+def update_hash(hasher, value):
+    """
+    Adds ``value`` to the ``hasher``. Arrays, dictionaries, lists and scalars are hashed by content, other objects
+    only by type so that the key does not depend on their memory address.
+    """
+    if isinstance(value, np.ndarray):
+        hasher.update(b'array' + str(value.dtype).encode() + str(value.shape).encode())
+        if value.dtype == object:
+            for item in value.flat:
+                update_hash(hasher, item)
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        hasher.update(b'dict')
+        for key in sorted(value.keys(), key=str):
+            update_hash(hasher, str(key))
+            update_hash(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b'list' + str(len(value)).encode())
+        for item in value:
+            update_hash(hasher, item)
+    elif value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic)):
+        hasher.update(repr(value).encode())
+    elif hasattr(value, 'value') and np.isscalar(value.value):
+        # ctypes scalars
+        hasher.update(repr(value.value).encode())
+    else:
+        hasher.update(type(value).__name__.encode())
+
+
+def linearisation_key(tsaero0, tsstruct0, structure, settings, aero=None):
+    """
+    Returns the cache key of a linearisation
+
+    Args:
+        tsaero0 (sharpy.utils.datastructures.AeroTimeStepInfo): Linearisation aerodynamic time step
+        tsstruct0 (sharpy.utils.datastructures.StructTimeStepInfo): Linearisation structural time step
+        structure (sharpy.structure.models.beam.Beam): Structural model
+        settings (dict): Settings that define the assembly of the linear system
+        aero (sharpy.aero.models.aerogrid.Aerogrid): Aerodynamic model. All its input data (``data_dict``) is
+          hashed, as the control surface definitions are used in the assembly.
+
+    Returns:
+        str: hexadecimal SHA-256 digest
+    """
+    hasher = hashlib.sha256()
+    update_hash(hasher, cache_version)
+    for obj, fields in [(tsaero0, aero_tstep_fields),
+                        (tsstruct0, struct_tstep_fields),
+                        (structure, structure_fields)]:
+        for field in fields:
+            update_hash(hasher, field)
+            update_hash(hasher, getattr(obj, field, None))
+    update_hash(hasher, 'aero_data_dict')
+    update_hash(hasher, getattr(aero, 'data_dict', None))
+    update_hash(hasher, settings)
+    return hasher.hexdigest()
+
+
+def find_assembly_consumers(settings):
+    """
+    Returns the solvers in the ``flow`` that need the assembly objects of the linear system with their current
+    settings, in which case the linear system cannot be loaded from the cache.
+
+    Args:
+        settings (dict): SHARPy settings (usually found in ``data.settings``)
+
+    Returns:
+        list(str): names of the solvers
+    """
+    consumers = []
+    for name in settings['SHARPy']['flow']:
+        if name not in assembly_consumers:
+            continue
+        solver = solver_interface.solver_from_string(name)
+        solver_settings = dict(settings.get(name, dict()))
+        settings_utils.to_custom_types(solver_settings, solver.settings_types, solver.settings_default,
+                                       options=getattr(solver, 'settings_options', dict()), no_ctype=True)
+        if assembly_consumers[name](solver_settings):
+            consumers.append(name)
+    return consumers
+
+
+def get_cached_objects(ss, linear_system):
+    """
+    Returns the dictionary of objects of an assembled linear system that are stored in the cache
+
+    Args:
+        ss (libss.StateSpace): Final state-space system
+        linear_system: Assembled linear system (see :mod:`sharpy.linear.assembler`)
+
+    Returns:
+        dict: objects to store, by name
+    """
+    objects = {'ss': ss,
+               'linearisation_vectors': getattr(linear_system, 'linearisation_vectors', dict())}
+    for name in ['uvlm', 'beam']:
+        subsystem = getattr(linear_system, name, None)
+        if subsystem is None:
+            continue
+        if isinstance(getattr(subsystem, 'ss', None), libss.StateSpace):
+            objects[name + '_ss'] = subsystem.ss
+        objects[name + '_linearisation_vectors'] = getattr(subsystem, 'linearisation_vectors', dict())
+    for name, coupling in getattr(linear_system, 'couplings', dict()).items():
+        if isinstance(coupling, libss.Gain):
+            objects['couplings_' + name] = coupling
+
+    uvlm_sys = getattr(getattr(linear_system, 'uvlm', None), 'sys', None)
+    if uvlm_sys is not None:
+        objects['uvlm_scaling_facts'] = dict(uvlm_sys.ScalingFacts)
+        objects['uvlm_attributes'] = {'scaled': bool(linear_system.uvlm.scaled)}
+    beam_sys = getattr(getattr(linear_system, 'beam', None), 'sys', None)
+    if beam_sys is not None:
+        objects['beam_sys'] = {'modal': bool(beam_sys.modal),
+                               'clamped': bool(beam_sys.clamped),
+                               'num_dof_rig': int(beam_sys.num_dof_rig)}
+        if beam_sys.U is not None:
+            objects['beam_sys']['U'] = beam_sys.U
+    return objects
+
+
+class LinearSystemCache(object):
+    """
+    On disk cache of assembled linear systems
+
+    Args:
+        folder (str): Cache folder
+        max_size (float): Maximum size of the cache in MB. The least recently used entries are evicted beyond it.
+        max_age (float): Maximum age of the entries in days since they were last used.
+    """
+    def __init__(self, folder, max_size=None, max_age=None):
+        self.folder = os.path.abspath(folder)
+        self.max_size = max_size
+        self.max_age = max_age
+
+        os.makedirs(self.folder, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.folder, key)
+
+    def entries(self):
+        """
+        Returns the list of ``(key, last use time, size in bytes)`` of the stored entries
+        """
+        entries = []
+        for key in os.listdir(self.folder):
+            path = self.entry_path(key)
+            if key.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, file_name)) for file_name in os.listdir(path))
+            entries.append((key, os.path.getmtime(path), size))
+        return entries
+
+    def load(self, key):
+        """
+        Returns the dictionary of stored objects for ``key``, or ``None`` if it is not in the cache
+        """
+        path = self.entry_path(key)
+        if not os.path.isdir(path):
+            return None
+
+        objects = dict()
+        for file_name in os.listdir(path):
+            name, kind, _ = file_name.rsplit('.', 2)
+            file_path = os.path.join(path, file_name)
+            if kind == 'ss':
+                objects[name] = libss.StateSpace.load_from_h5(file_path)
+            elif kind == 'gain':
+                objects[name] = libss.Gain.load_from_h5(file_path)
+            else:
+                with h5py.File(file_path, 'r') as f:
+                    objects[name] = {k: f[k][()] for k in f.keys()}
+
+        # register the use for the eviction policy
+        os.utime(path)
+        return objects
+
+    def store(self, key, objects):
+        """
+        Stores the objects under ``key`` and evicts old entries. The entry is not stored if any state-space system is
+        not dense or if any dictionary holds values other than numerical arrays and scalars.
+
+        Args:
+            key (str): cache key
+            objects (dict): state-spaces, gains and dictionaries of arrays by name
+
+        Returns:
+            bool: whether the entry was stored
+        """
+        for name, value in objects.items():
+            if isinstance(value, libss.StateSpace) and \
+                    not all(isinstance(matrix, np.ndarray) for matrix in value.get_mats()):
+                cout.cout_wrap('Linear system cache: {:s} is not dense and is not stored'.format(name), 3)
+                return False
+            if isinstance(value, dict):
+                unsupported = [k for k, v in value.items() if not self.storable(v)]
+                if unsupported:
+                    cout.cout_wrap('Linear system cache: {:s} cannot store {:s} and the system is not '
+                                   'stored'.format(name, ', '.join(unsupported)), 3)
+                    return False
+
+        # write the entry to a temporary folder that is then renamed, so that no partial entries are loaded
+        tmp_path = tempfile.mkdtemp(prefix='.' + key, dir=self.folder)
+        try:
+            for name, value in objects.items():
+                if isinstance(value, libss.StateSpace):
+                    value.save(os.path.join(tmp_path, name + '.ss.h5'))
+                elif isinstance(value, libss.Gain):
+                    value.save(os.path.join(tmp_path, name + '.gain.h5'))
+                else:
+                    with h5py.File(os.path.join(tmp_path, name + '.vectors.h5'), 'w') as f:
+                        for k, v in value.items():
+                            f.create_dataset(k, data=v)
+            if os.path.isdir(self.entry_path(key)):
+                shutil.rmtree(self.entry_path(key))
+            os.replace(tmp_path, self.entry_path(key))
+        finally:
+            if os.path.isdir(tmp_path):
+                shutil.rmtree(tmp_path)
+
+        self.evict(keep=key)
+        return True
+
+    @staticmethod
+    def storable(value):
+        if isinstance(value, np.ndarray):
+            return value.dtype != object
+        return isinstance(value, (bool, int, float, complex, np.number, np.bool_))
+
+    def evict(self, keep=None):
+        """
+        Removes the entries that have not been used for longer than ``max_age`` and then the least recently used
+        ones until the cache is smaller than ``max_size``. The entry ``keep`` is never removed.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        if self.max_age is not None:
+            oldest = time.time() - self.max_age * 86400.
+            for entry in [entry for entry in entries if entry[1] < oldest and entry[0] != keep]:
+                self.remove(entry[0])
+                entries.remove(entry)
+
+        if self.max_size is not None:
+            size = sum(entry[2] for entry in entries)
+            for key, _, entry_size in entries:
+                if size <= self.max_size * 1024 ** 2:
+                    break
+                if key == keep:
+                    continue
+                self.remove(key)
+                size -= entry_size
+
+    def remove(self, key):
+        cout.cout_wrap('Linear system cache: evicting entry {:s}'.format(key), 3)
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+
+class CachedAttributes(object):
+    """
+    Attributes of an assembly object (such as the ``sys`` of the UVLM and beam systems) restored from the cache
+    """
+    def __init__(self, sys_id, attributes):
+        self.sys_id = sys_id
+        self.__dict__.update(attributes)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        raise AttributeError('{:s} is not available in the linear system {:s} loaded from the cache. Disable the '
+                             'cache in LinearAssembler to use the assembly objects'.format(
+                                 name, self.__dict__.get('sys_id', '')))
+
+
+class CachedLinearSystem(CachedAttributes):
+    """
+    Linear system restored from the cache.
+
+    Only the assembled state-space systems, coupling gains, linearisation vectors and the attributes in
+    :func:`get_cached_objects` are available. Methods that require the underlying assembly objects (e.g. updating the
+    system for a new reference velocity) raise a :class:`CachedSystemError`: the cache must be disabled for those, and
+    accessing any other attribute raises an ``AttributeError`` that says so.
+    """
+    def __init__(self, sys_id, objects, name=''):
+        super().__init__(sys_id, dict())
+        self.ss = objects.get(name + 'ss')
+        self.linearisation_vectors = objects.get(name + 'linearisation_vectors', dict())
+        self.couplings = dict()
+        for key, value in objects.items():
+            if key.startswith(name + 'couplings_'):
+                self.couplings[key[len(name + 'couplings_'):]] = value
+
+        if name == 'uvlm_' and 'uvlm_scaling_facts' in objects:
+            self.sys = CachedAttributes(sys_id, {'ScalingFacts': objects['uvlm_scaling_facts']})
+            self.scaled = bool(objects['uvlm_attributes']['scaled'])
+        elif name == 'beam_' and 'beam_sys' in objects:
+            beam_sys = objects['beam_sys']
+            self.sys = CachedAttributes(sys_id, {'modal': bool(beam_sys['modal']),
+                                                 'clamped': bool(beam_sys['clamped']),
+                                                 'num_dof_rig': int(beam_sys['num_dof_rig']),
+                                                 'U': beam_sys.get('U')})
+
+        self.uvlm = None
+        self.beam = None
+        if not name:
+            for subsystem in ['uvlm', 'beam']:
+                if subsystem + '_ss' in objects:
+                    setattr(self, subsystem, CachedLinearSystem(sys_id, objects, name=subsystem + '_'))
+
+    def not_available(self, *args, **kwargs):
+        raise CachedSystemError('The linear system {:s} has been loaded from the cache. Disable the cache '
+                                  'in LinearAssembler to use the assembly objects'.format(self.sys_id))
+
+    update = not_available
+    assemble = not_available
+    to_nodal_coordinates = not_available
@@ -1,9 +1,12 @@
 import os
 
 import numpy as np
+import vtk
 from tvtk.api import tvtk, write_data
+from tvtk.common import configure_input
 
 import sharpy.utils.algebra as algebra
+import sharpy.utils.plotutils as plotutils
 import sharpy.utils.cout_utils as cout
 from sharpy.utils.settings import str2bool
 from sharpy.utils.solver_interface import solver, BaseSolver
@@ -88,6 +91,11 @@ class AerogridPlot(BaseSolver):
     settings_types['save_wake'] = 'bool'
     settings_default['save_wake'] = True
     settings_description['save_wake'] = 'Plot the wake'
+
+    settings_types['multiblock'] = 'bool'
+    settings_default['multiblock'] = False
+    settings_description['multiblock'] = 'Write a single multi-block ``.vtm`` file per time step with all the ' \
+                                         'surfaces and wakes instead of one ``.vtu`` file per surface'
     
     table = su.SettingsTable()
     __doc__ += table.generate(settings_types, settings_default, settings_description)
@@ -100,6 +108,8 @@ class AerogridPlot(BaseSolver):
         self.body_filename = ''
         self.wake_filename = ''
         self.nonlifting_filename = ''
+        self.multiblock_filename = ''
+        self.blocks = []
         self.ts_max = 0
         self.caller = None
 
@@ -127,6 +137,10 @@ class AerogridPlot(BaseSolver):
                                     self.settings['name_prefix'] +
                                     'nonlifting_' +
                                     self.data.settings['SHARPy']['case'])
+        self.multiblock_filename = (self.folder +
+                                    self.settings['name_prefix'] +
+                                    'aero_' +
+                                    self.data.settings['SHARPy']['case'])
         self.caller = caller
 
     def run(self, **kwargs):
@@ -137,21 +151,32 @@ class AerogridPlot(BaseSolver):
         if not online:
             for self.ts in range(self.ts_max):
                 if self.data.structure.timestep_info[self.ts] is not None:
-                    self.plot_body()
-                    self.plot_wake()
-                    if self.settings['plot_nonlifting_surfaces']:
-                        self.plot_nonlifting_surfaces()
+                    self.plot_timestep()
             cout.cout_wrap('...Finished', 1)
         elif (self.data.ts % self.settings['stride'] == 0):
             aero_tsteps = len(self.data.aero.timestep_info) - 1
             struct_tsteps = len(self.data.structure.timestep_info) - 1
             self.ts = np.max((aero_tsteps, struct_tsteps))
-            self.plot_body()
-            self.plot_wake()
-            if self.settings['plot_nonlifting_surfaces']:
-                self.plot_nonlifting_surfaces()
+            self.plot_timestep()
         return self.data
 
+    def plot_timestep(self):
+        self.plot_body()
+        self.plot_wake()
+        if self.settings['plot_nonlifting_surfaces']:
+            self.plot_nonlifting_surfaces()
+        if self.settings['multiblock']:
+            self.write_multiblock()
+
+    def snapshot_variables(self):
+        if self.settings['include_incidence_angle'] or self.settings['include_velocities']:
+            # these call the UVLM library on the current time step and modify it
+            return None
+        variables = {'structure': None, 'aero': None}
+        if self.settings['plot_nonlifting_surfaces']:
+            variables['nonlifting_body'] = None
+        return variables
+
     def plot_body(self):
 
         aero_tstep = self.data.aero.timestep_info[self.ts]
@@ -177,75 +202,26 @@ class AerogridPlot(BaseSolver):
             point_data_dim = (dims[0]+1)*(dims[1]+1)  # + (dims_star[0]+1)*(dims_star[1]+1)
             panel_data_dim = (dims[0])*(dims[1])  # + (dims_star[0])*(dims_star[1])
 
-            coords = np.zeros((point_data_dim, 3))
-            conn = []
-            panel_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_surf_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_gamma = np.zeros((panel_data_dim,))
-            panel_gamma_dot = np.zeros((panel_data_dim,))
-            normal = np.zeros((panel_data_dim, 3))
-            point_struct_id = np.zeros((point_data_dim,), dtype=int)
-            point_cf = np.zeros((point_data_dim, 3))
-            point_unsteady_cf = np.zeros((point_data_dim, 3))
-            zeta_dot = np.zeros((point_data_dim, 3))
-            u_inf = np.zeros((point_data_dim, 3))
-            if self.settings['include_velocities']:
-                vel = np.zeros((point_data_dim, 3))
-            counter = -1
-
             # coordinates of corners
-            for i_n in range(dims[1]+1):
-                for i_m in range(dims[0]+1):
-                    counter += 1
-                    coords[counter, :] = aero_tstep.zeta[i_surf][:, i_m, i_n]
-                    if self.settings['include_rbm']:
-                        coords[counter, :] += struct_tstep.for_pos[0:3]
-                    if self.settings['include_forward_motion']:
-                        coords[counter, 0] -= self.settings['dt']*self.ts*self.settings['u_inf']
-
+            coords = self.vertex_coordinates(aero_tstep.zeta[i_surf], struct_tstep)
+            conn = plotutils.quad_connectivity(dims[0], dims[1])
+
+            # cell data
+            panel_id = np.arange(panel_data_dim)
+            panel_surf_id = np.full((panel_data_dim,), i_surf, dtype=int)
+            panel_gamma = plotutils.flatten_grid_variable(aero_tstep.gamma[i_surf])
+            panel_gamma_dot = plotutils.flatten_grid_variable(aero_tstep.gamma_dot[i_surf])
+            normal = plotutils.flatten_grid_variable(aero_tstep.normals[i_surf])
             if self.settings['include_incidence_angle']:
-                incidence_angle = np.zeros_like(panel_gamma)
-
-            counter = -1
-            node_counter = -1
-            for i_n in range(dims[1] + 1):
-                global_counter = self.data.aero.aero2struct_mapping[i_surf][i_n]
-                for i_m in range(dims[0] + 1):
-                    node_counter += 1
-                    # point data
-                    point_struct_id[node_counter] = global_counter
-                    point_cf[node_counter, :] = aero_tstep.forces[i_surf][0:3, i_m, i_n]
-                    try:
-                        point_unsteady_cf[node_counter, :] = aero_tstep.dynamic_forces[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    try:
-                        zeta_dot[node_counter, :] = aero_tstep.zeta_dot[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    try:
-                        u_inf[node_counter, :] = aero_tstep.u_ext[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    if i_n < dims[1] and i_m < dims[0]:
-                        counter += 1
-                    else:
-                        continue
-
-                    conn.append([node_counter + 0,
-                                 node_counter + 1,
-                                 node_counter + dims[0]+2,
-                                 node_counter + dims[0]+1])
-                    # cell data
-                    normal[counter, :] = aero_tstep.normals[i_surf][:, i_m, i_n]
-                    panel_id[counter] = counter
-                    panel_surf_id[counter] = i_surf
-                    panel_gamma[counter] = aero_tstep.gamma[i_surf][i_m, i_n]
-                    panel_gamma_dot[counter] = aero_tstep.gamma_dot[i_surf][i_m, i_n]
-
-                    if self.settings['include_incidence_angle']:
-                        incidence_angle[counter] = \
-                            aero_tstep.postproc_cell['incidence_angle'][i_surf][i_m, i_n]
+                incidence_angle = plotutils.flatten_grid_variable(
+                    aero_tstep.postproc_cell['incidence_angle'][i_surf])
+
+            # point data
+            point_struct_id = np.repeat(self.data.aero.aero2struct_mapping[i_surf][:dims[1] + 1], dims[0] + 1)
+            point_cf = plotutils.flatten_grid_variable(aero_tstep.forces[i_surf][0:3])
+            point_unsteady_cf = self.vertex_vector(aero_tstep, 'dynamic_forces', i_surf, point_data_dim)
+            zeta_dot = self.vertex_vector(aero_tstep, 'zeta_dot', i_surf, point_data_dim)
+            u_inf = self.vertex_vector(aero_tstep, 'u_ext', i_surf, point_data_dim)
 
             if self.settings['include_velocities']:
                 vel = uvlmlib.uvlm_calculate_total_induced_velocity_at_points(aero_tstep,
@@ -284,58 +260,30 @@ class AerogridPlot(BaseSolver):
             if self.settings['include_velocities']:
                 ug.point_data.add_array(vel)
                 ug.point_data.get_array(6).name = 'velocity'
-            write_data(ug, filename)
+            self.write_grid(ug, filename, 'body_%02u' % i_surf)
 
     def plot_wake(self):
-        for i_surf in range(self.data.aero.timestep_info[self.ts].n_surf):
+        aero_tstep = self.data.aero.timestep_info[self.ts]
+        struct_tstep = self.data.structure.timestep_info[self.ts]
+        for i_surf in range(aero_tstep.n_surf):
             filename = (self.wake_filename +
                         '_' +
                         ('%02u_' % i_surf) +
                         ('%06u' % self.ts) +
                         '.vtu')
 
-            dims_star = self.data.aero.timestep_info[self.ts].dimensions_star[i_surf, :].copy()
+            dims_star = aero_tstep.dimensions_star[i_surf, :].copy()
             dims_star[0] -= self.settings['minus_m_star']
 
-            point_data_dim = (dims_star[0]+1)*(dims_star[1]+1)
             panel_data_dim = (dims_star[0])*(dims_star[1])
 
-            coords = np.zeros((point_data_dim, 3))
-            conn = []
-            panel_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_surf_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_gamma = np.zeros((panel_data_dim,))
-            counter = -1
-            # rotation_mat = self.data.structure.timestep_info[self.ts].cga().T
             # coordinates of corners
-            for i_n in range(dims_star[1]+1):
-                for i_m in range(dims_star[0]+1):
-                    counter += 1
-                    coords[counter, :] = self.data.aero.timestep_info[self.ts].zeta_star[i_surf][:, i_m, i_n]
-                    if self.settings['include_rbm']:
-                        coords[counter, :] += self.data.structure.timestep_info[self.ts].for_pos[0:3]
-                    if self.settings['include_forward_motion']:
-                        coords[counter, 0] -= self.settings['dt']*self.ts*self.settings['u_inf']
-
-            counter = -1
-            node_counter = -1
-            # wake
-            for i_n in range(dims_star[1]+1):
-                for i_m in range(dims_star[0]+1):
-                    node_counter += 1
-                    # cell data
-                    if i_n < dims_star[1] and i_m < dims_star[0]:
-                        counter += 1
-                    else:
-                        continue
-
-                    conn.append([node_counter + 0,
-                                 node_counter + 1,
-                                 node_counter + dims_star[0]+2,
-                                 node_counter + dims_star[0]+1])
-                    panel_id[counter] = counter
-                    panel_surf_id[counter] = i_surf
-                    panel_gamma[counter] = self.data.aero.timestep_info[self.ts].gamma_star[i_surf][i_m, i_n]
+            coords = self.vertex_coordinates(aero_tstep.zeta_star[i_surf][:, :dims_star[0] + 1, :], struct_tstep)
+            conn = plotutils.quad_connectivity(dims_star[0], dims_star[1])
+
+            panel_id = np.arange(panel_data_dim)
+            panel_surf_id = np.full((panel_data_dim,), i_surf, dtype=int)
+            panel_gamma = plotutils.flatten_grid_variable(aero_tstep.gamma_star[i_surf][:dims_star[0], :])
 
             ug = tvtk.UnstructuredGrid(points=coords)
             ug.set_cells(tvtk.Quad().cell_type, conn)
@@ -347,7 +295,7 @@ class AerogridPlot(BaseSolver):
             ug.cell_data.get_array(2).name = 'panel_gamma'
             ug.point_data.scalars = np.arange(0, coords.shape[0])
             ug.point_data.scalars.name = 'n_id'
-            write_data(ug, filename)
+            self.write_grid(ug, filename, 'wake_%02u' % i_surf)
 
     def plot_nonlifting_surfaces(self):
         nonlifting_tstep = self.data.nonlifting_body.timestep_info[self.ts]
@@ -364,54 +312,22 @@ class AerogridPlot(BaseSolver):
             point_data_dim = (dims[0]+1)*(dims[1]+1)  # + (dims_star[0]+1)*(dims_star[1]+1)
             panel_data_dim = (dims[0])*(dims[1])  # + (dims_star[0])*(dims_star[1])
 
-            coords = np.zeros((point_data_dim, 3))
-            conn = []
-            panel_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_surf_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_sigma = np.zeros((panel_data_dim,))
-            normal = np.zeros((panel_data_dim, 3))
-            point_struct_id = np.zeros((point_data_dim,), dtype=int)
-            point_cf = np.zeros((point_data_dim, 3))
-            u_inf = np.zeros((point_data_dim, 3))
-            counter = -1
-
             # coordinates of corners
-            for i_n in range(dims[1]+1):
-                for i_m in range(dims[0]+1):
-                    counter += 1
-                    coords[counter, :] = nonlifting_tstep.zeta[i_surf][:, i_m, i_n]
-                    # TODO: include those for nonlifting body (are they different for nonlifting coordinates?)
-                    if self.settings['include_rbm']:
-                        coords[counter, :] += struct_tstep.for_pos[0:3]
-                    if self.settings['include_forward_motion']:
-                        coords[counter, 0] -= self.settings['dt']*self.ts*self.settings['u_inf']
-            counter = -1
-            node_counter = -1
-            for i_n in range(dims[1] + 1):
-                global_counter = self.data.nonlifting_body.aero2struct_mapping[i_surf][i_n]
-                for i_m in range(dims[0] + 1):
-                    node_counter += 1
-                    # point data
-                    point_struct_id[node_counter] = global_counter
-                    point_cf[node_counter, :] = nonlifting_tstep.forces[i_surf][0:3, i_m, i_n]
-                    try:
-                        u_inf[node_counter, :] = nonlifting_tstep.u_ext[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    if i_n < dims[1] and i_m < dims[0]:
-                        counter += 1
-                    else:
-                        continue
-
-                    conn.append([node_counter + 0,
-                                 node_counter + 1,
-                                 node_counter + dims[0]+2,
-                                 node_counter + dims[0]+1])
-                    # cell data
-                    normal[counter, :] = nonlifting_tstep.normals[i_surf][:, i_m, i_n]
-                    panel_id[counter] = counter
-                    panel_surf_id[counter] = i_surf
-                    panel_sigma[counter] = nonlifting_tstep.sigma[i_surf][i_m, i_n]
+            # TODO: include those for nonlifting body (are they different for nonlifting coordinates?)
+            coords = self.vertex_coordinates(nonlifting_tstep.zeta[i_surf], struct_tstep)
+            conn = plotutils.quad_connectivity(dims[0], dims[1])
+
+            # cell data
+            panel_id = np.arange(panel_data_dim)
+            panel_surf_id = np.full((panel_data_dim,), i_surf, dtype=int)
+            panel_sigma = plotutils.flatten_grid_variable(nonlifting_tstep.sigma[i_surf])
+            normal = plotutils.flatten_grid_variable(nonlifting_tstep.normals[i_surf])
+
+            # point data
+            point_struct_id = np.repeat(self.data.nonlifting_body.aero2struct_mapping[i_surf][:dims[1] + 1],
+                                        dims[0] + 1)
+            point_cf = plotutils.flatten_grid_variable(nonlifting_tstep.forces[i_surf][0:3])
+            u_inf = self.vertex_vector(nonlifting_tstep, 'u_ext', i_surf, point_data_dim)
 
             ug = tvtk.UnstructuredGrid(points=coords)
             ug.set_cells(tvtk.Quad().cell_type, conn)
@@ -431,22 +347,51 @@ class AerogridPlot(BaseSolver):
             ug.point_data.get_array(2).name = 'point_steady_force'
             ug.point_data.add_array(u_inf)
             ug.point_data.get_array(3).name = 'u_inf'
+            self.write_grid(ug, filename, 'nonlifting_%02u' % i_surf)
+
+    def vertex_coordinates(self, zeta, struct_tstep):
+        """
+        Coordinates of the vertices of a surface in Paraview's order including, if requested, the rigid body and
+        forward motions.
+        """
+        coords = plotutils.flatten_grid_variable(zeta)
+        if self.settings['include_rbm']:
+            coords += struct_tstep.for_pos[0:3]
+        if self.settings['include_forward_motion']:
+            coords[:, 0] -= self.settings['dt']*self.ts*self.settings['u_inf']
+        return coords
+
+    @staticmethod
+    def vertex_vector(tstep, name, i_surf, n_vertex):
+        """
+        First three components of the vertex variable ``name`` of a surface in Paraview's order, or zeros if the
+        time step does not have it.
+        """
+        try:
+            return plotutils.flatten_grid_variable(getattr(tstep, name)[i_surf][0:3])
+        except AttributeError:
+            return np.zeros((n_vertex, 3))
+
+    def write_grid(self, ug, filename, block_name):
+        """
+        Writes the grid to ``filename`` or, if ``multiblock``, stores it as a block of the current time step file.
+        """
+        if self.settings['multiblock']:
+            self.blocks.append((block_name, ug))
+        else:
             write_data(ug, filename)
 
-        def write_paraview_data(self, coords, conn, panel_id, list_cell_parameters, list_cell_names, list_point_parameters, list_point_names, filename):
-            ug = tvtk.UnstructuredGrid(points=coords)
-            
-            ug.set_cells(tvtk.Quad().cell_type, conn)
-            ug.cell_data.scalars = panel_id
-            ug.cell_data.scalars.name = 'panel_n_id'
-            for counter in range(len(list_cell_parameters)):
-                ug.cell_data.add_array(list_cell_parameters[counter])
-                ug.cell_data.get_array(counter+1).name = list_cell_names[counter]
-                
-            ug.point_data.scalars = np.arange(0, coords.shape[0])
-            ug.point_data.scalars.name = 'n_id'
-            for counter in range(len(list_point_parameters)):
-                ug.point_data.add_array(list_point_parameters[counter])
-                ug.point_data.get_array(counter+1).name = list_point_names[counter]
-            
-            write_data(ug, filename)
+    def write_multiblock(self):
+        """
+        Writes the blocks of the current time step to a single ``.vtm`` file (and its ``.vtu`` pieces).
+        """
+        multiblock = tvtk.MultiBlockDataSet()
+        vtk_multiblock = tvtk.to_vtk(multiblock)
+        for i_block, (name, ug) in enumerate(self.blocks):
+            multiblock.set_block(i_block, ug)
+            vtk_multiblock.GetMetaData(i_block).Set(vtk.vtkCompositeDataSet.NAME(), name)
+        self.blocks = []
+
+        writer = tvtk.XMLMultiBlockDataWriter(file_name=self.multiblock_filename + '_%06u.vtm' % self.ts)
+        configure_input(writer, multiblock)
+        writer.write()
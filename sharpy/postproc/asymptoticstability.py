@@ -2,6 +2,7 @@ import os
 import warnings
 import numpy as np
 import scipy.linalg as sclalg
+import scipy.sparse.linalg as scsplalg
 import sharpy.utils.settings as settings_utils
 from sharpy.utils.solver_interface import solver, BaseSolver, initialise_solver
 import sharpy.utils.cout_utils as cout
@@ -27,6 +28,12 @@ class AsymptoticStability(BaseSolver):
     The eigenvalues can be truncated, keeping a minimum ``num_evals`` (sorted by decreasing real part) or by limiting
     the higher frequency modes through ``frequency_cutoff``.
 
+    For large systems, where only the modes close to the stability boundary are of interest, the
+    ``eigenvalue_method`` can be set to ``shift_invert``. Instead of the full eigen-decomposition of the (dense or
+    sparse) state matrix, ``num_evals_per_target`` eigenvalues are found iteratively around each of the
+    ``target_frequencies``, i.e. around :math:`i\\omega` for continuous time systems or around
+    :math:`e^{i\\omega\\Delta t}` on the unit circle for discrete time systems.
+
     Results can be saved to file using ``export_eigenvalues``. The setting ``display_root_locus`` shows a simple
     Argand diagram where the continuous time eigenvalues are displayed.
 
@@ -89,6 +96,23 @@ class AsymptoticStability(BaseSolver):
     settings_description['modes_to_plot'] = 'List of mode numbers to plot. Plots the 0, 45, 90 and 135' \
                                             'degree phases.'
 
+    settings_types['eigenvalue_method'] = 'str'
+    settings_default['eigenvalue_method'] = 'direct'
+    settings_description['eigenvalue_method'] = 'Method to compute the eigenvalues. ``direct`` computes all of them ' \
+                                                'with a dense eigen-decomposition. ``shift_invert`` computes those ' \
+                                                'closest to the ``target_frequencies`` iteratively'
+    settings_options['eigenvalue_method'] = ['direct', 'shift_invert']
+
+    settings_types['target_frequencies'] = 'list(float)'
+    settings_default['target_frequencies'] = [0.]
+    settings_description['target_frequencies'] = 'Frequencies in rad/s on the stability boundary around which the ' \
+                                                 'eigenvalues are sought with the ``shift_invert`` method'
+
+    settings_types['num_evals_per_target'] = 'int'
+    settings_default['num_evals_per_target'] = 20
+    settings_description['num_evals_per_target'] = 'Number of eigenvalues computed around each target frequency ' \
+                                                   'with the ``shift_invert`` method'
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
 
@@ -196,13 +220,18 @@ class AsymptoticStability(BaseSolver):
             system_name = system_name_list[ith]
 
             if self.print_info:
-                cout.cout_wrap('Calculating %s eigenvalues using direct method' % system_name)
-
-            eigenvalues, eigenvectors = sclalg.eig(system.A)
+                if self.settings['eigenvalue_method'] == 'direct':
+                    cout.cout_wrap('Calculating %s eigenvalues using direct method' % system_name)
+                else:
+                    cout.cout_wrap('Calculating %s eigenvalues using shift-invert method' % system_name)
 
-            # Convert DT eigenvalues into CT
             if system.dt:
+                eigenvalues, eigenvectors = self.eigen_decomposition(system.A,
+                                                                     self.dimensional_dt(system.dt, not_scaled))
+                # Convert DT eigenvalues into CT
                 eigenvalues = self.convert_to_continuoustime(system.dt, eigenvalues, not_scaled)
+            else:
+                eigenvalues, eigenvectors = self.eigen_decomposition(system.A)
 
             num_evals = min(self.num_evals, len(eigenvalues))
 
@@ -239,6 +268,72 @@ class AsymptoticStability(BaseSolver):
 
         return eigenvalues, eigenvectors
 
+    def eigen_decomposition(self, A, dt=None):
+        """
+        Eigenvalues and right eigenvectors of the state matrix with the chosen ``eigenvalue_method``.
+
+        With the ``shift_invert`` method, ``scipy.sparse.linalg.eigs`` is called around each of the
+        ``target_frequencies``. The conjugates of the complex eigenvalues are added, such that the result matches the
+        corresponding subset of the direct method, and the eigenvalues found around several targets are only
+        retained once.
+
+        Args:
+            A (np.ndarray or libsparse.csc_matrix): State matrix
+            dt (float (optional)): Dimensional time step for discrete time systems
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): Eigenvalues (in discrete time if ``dt`` is given) and eigenvectors
+        """
+        if self.settings['eigenvalue_method'] == 'direct':
+            if not isinstance(A, np.ndarray):
+                A = A.toarray()
+            return sclalg.eig(A)
+
+        num_states = A.shape[0]
+        k = min(self.settings['num_evals_per_target'], num_states - 2)
+        real_system = not np.iscomplexobj(A)
+
+        eigenvalues = []
+        eigenvectors = []
+        for frequency in self.settings['target_frequencies']:
+            if dt:
+                sigma = np.exp(1j * frequency * dt)
+            else:
+                sigma = 1j * frequency
+            try:
+                target_evals, target_evecs = scsplalg.eigs(A, k=k, sigma=sigma)
+            except RuntimeError:
+                # the shift is an eigenvalue, thus A - sigma I is singular
+                sigma += 1e-6 * (1 + abs(sigma))
+                target_evals, target_evecs = scsplalg.eigs(A, k=k, sigma=sigma)
+
+            for i_eval in range(len(target_evals)):
+                candidates = [(target_evals[i_eval], target_evecs[:, i_eval])]
+                if real_system and np.abs(target_evals[i_eval].imag) > 1e-10 * np.abs(target_evals[i_eval]):
+                    candidates.append((target_evals[i_eval].conj(), target_evecs[:, i_eval].conj()))
+                for candidate_eval, candidate_evec in candidates:
+                    if len(eigenvalues) and np.min(np.abs(np.array(eigenvalues) - candidate_eval)) <= \
+                            1e-8 * max(1., np.abs(candidate_eval)):
+                        continue
+                    eigenvalues.append(candidate_eval)
+                    eigenvectors.append(candidate_evec)
+
+        return np.array(eigenvalues), np.column_stack(eigenvectors)
+
+    def dimensional_dt(self, dt, not_scaled=False):
+        """
+        Dimensional time step of a discrete time system, see :meth:`convert_to_continuoustime`
+        """
+        if not not_scaled:
+            try:
+                ScalingFacts = self.data.linear.linear_system.uvlm.sys.ScalingFacts
+                if ScalingFacts['length'] != 1.0 and ScalingFacts['time'] != 1.0:
+                    dt *= ScalingFacts['length'] / self.settings['reference_velocity']
+            except AttributeError:
+                pass
+
+        return dt
+
     def convert_to_continuoustime(self, dt, discrete_time_eigenvalues, not_scaled=False):
         r"""
         Convert eigenvalues to discrete time. The ``not_scaled`` argument can be used to bypass the search from
@@ -261,19 +356,7 @@ class AsymptoticStability(BaseSolver):
             discrete_time_eigenvalues (np.ndarray): Array of discrete time eigenvalues.
             not_scaled (bool): Treat the system as not scaled. No Scaling Factors will be searched in SHARPy.
         """
-        if not_scaled:
-            dt = dt
-        else:
-            try:
-                ScalingFacts = self.data.linear.linear_system.uvlm.sys.ScalingFacts
-                if ScalingFacts['length'] != 1.0 and ScalingFacts['time'] != 1.0:
-                    dt *= ScalingFacts['length'] / self.settings['reference_velocity']
-                else:
-                    dt = dt
-            except AttributeError:
-                dt = dt
-
-        return np.log(discrete_time_eigenvalues) / dt
+        return np.log(discrete_time_eigenvalues) / self.dimensional_dt(dt, not_scaled)
 
     def export_eigenvalues(self, num_evals, eigenvalues, eigenvectors, filename=None):
         """
@@ -350,14 +433,14 @@ class AsymptoticStability(BaseSolver):
         for i in range(len(u_inf_vec)):
             ss_aeroelastic = self.data.linear.linear_system.update(u_inf_vec[i])
 
-            eigs, eigenvectors = sclalg.eig(ss_aeroelastic.A)
-
-            eigs, eigenvectors = self.sort_eigenvalues(eigs, eigenvectors)
-
             # Obtain dimensional time
             dt_dimensional = self.data.linear.linear_system.uvlm.sys.ScalingFacts['length'] / u_inf_vec[i] \
                              * ss_aeroelastic.dt
 
+            eigs, eigenvectors = self.eigen_decomposition(ss_aeroelastic.A, dt_dimensional)
+
+            eigs, eigenvectors = self.sort_eigenvalues(eigs, eigenvectors)
+
             eigs_cont = np.log(eigs) / dt_dimensional
             Nunst = np.sum(eigs_cont.real > 0)
             fn = np.abs(eigs_cont)
@@ -57,6 +57,7 @@ class BeamPlot(BaseSolver):
         self.filename = ''
         self.filename_for = ''
         self.caller = None
+        self.connectivities = None
 
     def initialise(self, data, custom_settings=None, caller=None, restart=False):
         self.data = data
@@ -89,6 +90,9 @@ class BeamPlot(BaseSolver):
             cout.cout_wrap('...Finished', 1)
         return self.data
 
+    def snapshot_variables(self):
+        return {'structure': None}
+
     def write(self):
         if self.settings['output_rbm']:
             filename = self.filename + '_rbm_acc.csv'
@@ -205,50 +209,37 @@ class BeamPlot(BaseSolver):
             else:
                 raise AttributeError('Only scalar and 3-vector types supported in beamplot')
 
-        for i_node in range(num_nodes):
-            i_elem = self.data.structure.node_master_elem[i_node, 0]
-            i_local_node = self.data.structure.node_master_elem[i_node, 1]
-            node_id[i_node] = i_node
-
-            v1 = np.array([1., 0, 0])
-            v2 = np.array([0., 1, 0])
-            v3 = np.array([0., 0, 1])
-            cab = algebra.crv2rotation(
-                tstep.psi[i_elem, i_local_node, :])
-            local_x[i_node, :] = np.dot(aero2inertial, np.dot(cab, v1))
-            local_y[i_node, :] = np.dot(aero2inertial, np.dot(cab, v2))
-            local_z[i_node, :] = np.dot(aero2inertial, np.dot(cab, v3))
-
-            if i_local_node == 2:
-                coords_a_cell[i_elem, :] = tstep.pos[i_node, :]
-            coords_a[i_node, :] = tstep.pos[i_node, :]
-
-            # applied forces
-            cab = algebra.crv2rotation(tstep.psi[i_elem, i_local_node, :])
-            app_forces[i_node, :] = np.dot(aero2inertial,
-                                           np.dot(cab,
-                                                  tstep.steady_applied_forces[i_node, 0:3]+
-                                                  tstep.unsteady_applied_forces[i_node, 0:3]))
-            app_moment[i_node, :] = np.dot(aero2inertial,
-                                           np.dot(cab,
-                                                  tstep.steady_applied_forces[i_node, 3:6]+
-                                                  tstep.unsteady_applied_forces[i_node, 3:6]))
-            forces_constraints_nodes[i_node, :] = np.dot(aero2inertial,
-                                                         np.dot(cab,
-                                                                tstep.forces_constraints_nodes[i_node, 0:3]))
-            moments_constraints_nodes[i_node, :] = np.dot(aero2inertial,
-                                                          np.dot(cab,
-                                                                 tstep.forces_constraints_nodes[i_node, 3:6]))
-
-            if with_gravity:
-                gravity_forces_g[i_node, 0:3] = np.dot(aero2inertial,
-                                                     gravity_forces[i_node, 0:3])
-                gravity_forces_g[i_node, 3:6] = np.dot(aero2inertial,
-                                                     gravity_forces[i_node, 3:6])
-
-        for i_elem in range(num_elem):
-            conn[i_elem, :] = self.data.structure.elements[i_elem].reordered_global_connectivities
-            elem_id[i_elem] = i_elem
+        node_id[:] = np.arange(num_nodes)
+        i_elem = self.data.structure.node_master_elem[:, 0]
+        i_local_node = self.data.structure.node_master_elem[:, 1]
+
+        # material to inertial rotation at every node
+        cab = algebra.crv2rotation_vec(tstep.psi[i_elem, i_local_node, :])
+        cgb = np.matmul(aero2inertial, cab)
+        local_x[:] = cgb[:, :, 0]
+        local_y[:] = cgb[:, :, 1]
+        local_z[:] = cgb[:, :, 2]
+
+        mid_node = i_local_node == 2
+        coords_a_cell[i_elem[mid_node], :] = tstep.pos[mid_node, :]
+        coords_a[:] = tstep.pos
+
+        # applied forces
+        applied_forces = tstep.steady_applied_forces + tstep.unsteady_applied_forces
+        app_forces[:] = np.einsum('nij,nj->ni', cgb, applied_forces[:, 0:3])
+        app_moment[:] = np.einsum('nij,nj->ni', cgb, applied_forces[:, 3:6])
+        forces_constraints_nodes[:] = np.einsum('nij,nj->ni', cgb, tstep.forces_constraints_nodes[:, 0:3])
+        moments_constraints_nodes[:] = np.einsum('nij,nj->ni', cgb, tstep.forces_constraints_nodes[:, 3:6])
+
+        if with_gravity:
+            gravity_forces_g[:, 0:3] = np.dot(gravity_forces[:, 0:3], aero2inertial.T)
+            gravity_forces_g[:, 3:6] = np.dot(gravity_forces[:, 3:6], aero2inertial.T)
+
+        if self.connectivities is None:
+            self.connectivities = np.array([elem.reordered_global_connectivities
+                                            for elem in self.data.structure.elements], dtype=int)
+        conn[:] = self.connectivities
+        elem_id[:] = np.arange(num_elem)
 
         ug = tvtk.UnstructuredGrid(points=coords)
         ug.set_cells(tvtk.Line().cell_type, conn)
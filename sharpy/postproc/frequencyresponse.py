@@ -25,7 +25,8 @@ class FrequencyResponse(solver_interface.BaseSolver):
 
     If ``compute_hinf`` is set, the H-infinity norm of the system is calculated.
 
-    This will be saved to a binary ``.h5`` file as detailed in :func:`save_freq_resp`.
+    This will be saved to a binary ``.h5`` file as detailed in :func:`save_freq_resp`. The response is written to the
+    file as it is computed, in chunks of frequencies that are evaluated over ``num_cores`` threads.
 
     Finally, the ``quick_plot`` option will plot some quick and dirty bode plots of the response. This requires
     access to ``matplotlib``.
@@ -88,6 +89,10 @@ class FrequencyResponse(solver_interface.BaseSolver):
     settings_default['compute_hinf'] = False
     settings_description['compute_hinf'] = 'Compute Hinfinity norm of the system.'
 
+    settings_types['num_cores'] = 'int'
+    settings_default['num_cores'] = 1
+    settings_description['num_cores'] = 'Number of threads over which the frequencies are evaluated.'
+
     settings_types['quick_plot'] = 'bool'
     settings_default['quick_plot'] = False
     settings_description['quick_plot'] = 'Produce array of ``.png`` plots showing response. Requires matplotlib.'
@@ -191,8 +196,15 @@ class FrequencyResponse(solver_interface.BaseSolver):
             else:
                 system_name = None  # For the case where the state-space is parsed in run().
 
+            h5filename = self.freq_resp_filename(system_name)
             t0fom = time.time()
-            y_freq_fom = system.freqresp(self.wv)
+            with h5.File(h5filename, 'w') as f:
+                response = self.create_freq_resp_datasets(f, self.wv * self.w_to_k, system.outputs, system.inputs)
+
+                def write_chunk(chunk, y_freq_chunk):
+                    response[:, :, chunk[0]:chunk[-1] + 1] = y_freq_chunk
+
+                y_freq_fom = system.freqresp(self.wv, num_cores=self.settings['num_cores'], callback=write_chunk)
             tfom = time.time() - t0fom
 
             if self.settings['compute_hinf']:
@@ -208,7 +220,12 @@ class FrequencyResponse(solver_interface.BaseSolver):
             else:
                 hinf = None
 
-            self.save_freq_resp(self.wv * self.w_to_k, y_freq_fom, system_name=system_name, hinf=hinf)
+            if hinf is not None:
+                with h5.File(h5filename, 'a') as f:
+                    f.create_dataset('hinf_norm', data=hinf)
+            self.write_readme()
+            if self.print_info:
+                cout.cout_wrap('Saved .h5 file to %s with frequency response data' % h5filename)
 
             cout.cout_wrap('\tComputed the frequency response in %f s' % tfom, 2)
 
@@ -232,30 +249,47 @@ class FrequencyResponse(solver_interface.BaseSolver):
             hinf (float (optional)): H-infinity norm of the system.
         """
 
-        with open(self.folder + '/freqdata_readme.txt', 'w') as outfile:
-            outfile.write('Frequency Response Data Output\n\n')
-            outfile.write('Frequency data found in the relevant .h5 file\n')
-            outfile.write('The units of frequency are rad/s\nThe frequency' \
-                          'response is given in complex form.')
-
-        case_name = ''
-        if system_name is not None:
-            case_name += system_name + '.'
+        self.write_readme()
 
         p, m, _ = Yfreq.shape
 
-        h5filename = self.folder + '/' + case_name + 'freqresp.h5'
+        h5filename = self.freq_resp_filename(system_name)
         with h5.File(h5filename, 'w') as f:
-            f.create_dataset('frequency', data=wv)
-            f.create_dataset('response', data=Yfreq, dtype=complex)
-            f.create_dataset('inputs', data=m)
-            f.create_dataset('outputs', data=p)
+            response = self.create_freq_resp_datasets(f, wv, p, m)
+            response[:] = Yfreq
             if hinf is not None:
                 f.create_dataset('hinf_norm', data=hinf)
 
         if self.print_info:
             cout.cout_wrap('Saved .h5 file to %s with frequency response data' % h5filename)
 
+    def freq_resp_filename(self, system_name=None):
+        case_name = ''
+        if system_name is not None:
+            case_name += system_name + '.'
+
+        return self.folder + '/' + case_name + 'freqresp.h5'
+
+    @staticmethod
+    def create_freq_resp_datasets(h5file, wv, p, m):
+        """
+        Creates the datasets of the frequency response file, see :func:`save_freq_resp`.
+
+        Returns:
+            h5py.Dataset: Empty ``response`` dataset of shape ``[p, m, n_freq_eval]`` to be filled in
+        """
+        h5file.create_dataset('frequency', data=wv)
+        h5file.create_dataset('inputs', data=m)
+        h5file.create_dataset('outputs', data=p)
+        return h5file.create_dataset('response', shape=(p, m, len(wv)), dtype=complex)
+
+    def write_readme(self):
+        with open(self.folder + '/freqdata_readme.txt', 'w') as outfile:
+            outfile.write('Frequency Response Data Output\n\n')
+            outfile.write('Frequency data found in the relevant .h5 file\n')
+            outfile.write('The units of frequency are rad/s\nThe frequency' \
+                          'response is given in complex form.')
+
     def quick_plot(self, y_freq_fom=None, subfolder=None):
         p, m, _ = y_freq_fom.shape
         try:
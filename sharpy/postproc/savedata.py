@@ -1,6 +1,7 @@
 import os
 import h5py
 import copy
+import importlib
 import sharpy
 import sharpy.utils.cout_utils as cout
 from sharpy.utils.solver_interface import solver, BaseSolver
@@ -23,6 +24,15 @@ class SaveData(BaseSolver):
 
         * :class:`sharpy.solvers.linearassembler.Linear` including classes in :exc:`sharpy.linear.assembler`
 
+    The time step information can be saved in two layouts, selected with ``timestep_format``:
+
+        * ``group`` (legacy): one group per time step in ``data/<structure|aero>/timestep_info/<ts>``.
+
+        * ``columnar``: one resizable dataset per variable with time as the leading axis in
+          ``timeseries/<structure|aero|nonlifting_body>/<variable>``, together with the time step index ``ts``. The
+          file is kept open during the simulation and written in batches of ``flush_stride`` time steps. Variables can
+          be read over a time window with :func:`sharpy.utils.h5utils.read_time_history`.
+
     Notes:
         This method saves simply the data. If you would like to preserve the SHARPy methods of the relevant classes
         see also :class:`sharpy.solvers.pickledata.PickleData`.
@@ -98,6 +108,24 @@ class SaveData(BaseSolver):
     settings_default['stride'] = 1
     settings_description['stride'] = 'Number of steps between the execution calls when run online'
 
+    settings_types['timestep_format'] = 'str'
+    settings_default['timestep_format'] = 'group'
+    settings_description['timestep_format'] = 'Layout of the time step information. ``group`` writes a group per ' \
+                                              'time step and ``columnar`` a dataset per variable with time as the ' \
+                                              'leading axis'
+    settings_options['timestep_format'] = ['group', 'columnar']
+
+    settings_types['flush_stride'] = 'int'
+    settings_default['flush_stride'] = 100
+    settings_description['flush_stride'] = 'Number of saved time steps kept in memory before writing them to disk ' \
+                                           'with ``timestep_format = columnar``'
+
+    settings_types['compression'] = 'str'
+    settings_default['compression'] = ''
+    settings_description['compression'] = 'Compression filter of the time history datasets with ' \
+                                          '``timestep_format = columnar``'
+    settings_options['compression'] = ['', 'gzip', 'lzf']
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description,
                                        settings_options=settings_options)
@@ -112,6 +140,10 @@ class SaveData(BaseSolver):
         self.filename_linear = ''
         self.caller = None
 
+        # columnar time history output
+        self.hdfile = None
+        self.time_history_writers = dict()
+
         ### specify which classes are saved as hdf5 group
         # see initialise and add_as_grp
         self.ClassesToSave = (PreSharpy,)
@@ -193,6 +225,9 @@ class SaveData(BaseSolver):
                     sharpy.utils.datastructures.StructTimeStepInfo,)
 
             if self.settings['save_linear']:
+                # the solvers are imported on demand
+                importlib.import_module('sharpy.solvers.linearassembler')
+                importlib.import_module('sharpy.linear.assembler')
                 self.ClassesToSave += (sharpy.solvers.linearassembler.Linear,
                                        sharpy.linear.assembler.linearaeroelastic.LinearAeroelastic,
                                        sharpy.linear.assembler.linearbeam.LinearBeam,
@@ -201,6 +236,8 @@ class SaveData(BaseSolver):
                                        sharpy.linear.src.lingebm.FlexDynamic,)
 
             if self.settings['save_linear_uvlm']:
+                importlib.import_module('sharpy.solvers.linearassembler')
+                importlib.import_module('sharpy.linear.src.libss')
                 self.ClassesToSave += (sharpy.solvers.linearassembler.Linear, sharpy.linear.src.libss.ss_block)
         self.caller = caller
 
@@ -214,6 +251,13 @@ class SaveData(BaseSolver):
 
         if ((online and (self.data.ts % self.settings['stride'] == 0)) or (not online)):
             if self.settings['format'] == 'h5':
+                if self.settings['timestep_format'] == 'columnar':
+                    first_call = self.hdfile is None
+                    self.save_time_histories(online)
+                    if first_call:
+                        self.save_linear_systems()
+                    return self.data
+
                 file_exists = os.path.isfile(self.filename)
                 hdfile = h5py.File(self.filename, 'a')
 
@@ -247,33 +291,7 @@ class SaveData(BaseSolver):
 
                     hdfile.close()
 
-                    if self.settings['save_linear_uvlm']:
-                        linhdffile = h5py.File(self.filename.replace('.data.h5', '.uvlmss.h5'), 'a')
-                        h5utils.add_as_grp(self.data.linear.linear_system.uvlm.ss, linhdffile, grpname='ss',
-                                        ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
-                                        compress_float=self.settings['compress_float'])
-                        h5utils.add_as_grp(self.data.linear.linear_system.linearisation_vectors, linhdffile,
-                                        grpname='linearisation_vectors',
-                                        ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
-                                        compress_float=self.settings['compress_float'])
-                        linhdffile.close()
-
-                    if self.settings['save_linear']:
-                        with h5py.File(self.filename_linear, 'a') as linfile:
-                            h5utils.add_as_grp(self.data.linear.linear_system.linearisation_vectors, linfile,
-                                            grpname='linearisation_vectors',
-                                            ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
-                                            compress_float=self.settings['compress_float'])
-                            h5utils.add_as_grp(self.data.linear.ss, linfile, grpname='ss',
-                                            ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
-                                            compress_float=self.settings['compress_float'])
-
-                    if self.settings['save_rom']:
-                        try:
-                            for k, rom in self.data.linear.linear_system.uvlm.rom.items():
-                                rom.save(self.filename.replace('.data.h5', '_{:s}.rom.h5'.format(k.lower())))
-                        except AttributeError:
-                            cout.cout_wrap('Could not locate a reduced order model to save')
+                    self.save_linear_systems()
 
             elif self.settings['format'] == 'mat':
                 from scipy.io import savemat
@@ -311,6 +329,44 @@ class SaveData(BaseSolver):
 
         return self.data
 
+    def snapshot_variables(self):
+        # the time steps to save are found looping through the structural ones
+        variables = {'structure': None}
+        if self.settings['save_aero']:
+            variables['aero'] = None
+        if self.settings['save_nonlifting']:
+            variables['nonlifting_body'] = None
+        return variables
+
+    def save_linear_systems(self):
+        if self.settings['save_linear_uvlm']:
+            linhdffile = h5py.File(self.filename.replace('.data.h5', '.uvlmss.h5'), 'a')
+            h5utils.add_as_grp(self.data.linear.linear_system.uvlm.ss, linhdffile, grpname='ss',
+                               ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
+                               compress_float=self.settings['compress_float'])
+            h5utils.add_as_grp(self.data.linear.linear_system.linearisation_vectors, linhdffile,
+                               grpname='linearisation_vectors',
+                               ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
+                               compress_float=self.settings['compress_float'])
+            linhdffile.close()
+
+        if self.settings['save_linear']:
+            with h5py.File(self.filename_linear, 'a') as linfile:
+                h5utils.add_as_grp(self.data.linear.linear_system.linearisation_vectors, linfile,
+                                   grpname='linearisation_vectors',
+                                   ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
+                                   compress_float=self.settings['compress_float'])
+                h5utils.add_as_grp(self.data.linear.ss, linfile, grpname='ss',
+                                   ClassesToSave=self.ClassesToSave, SkipAttr=self.settings['skip_attr'],
+                                   compress_float=self.settings['compress_float'])
+
+        if self.settings['save_rom']:
+            try:
+                for k, rom in self.data.linear.linear_system.uvlm.rom.items():
+                    rom.save(self.filename.replace('.data.h5', '_{:s}.rom.h5'.format(k.lower())))
+            except AttributeError:
+                cout.cout_wrap('Could not locate a reduced order model to save')
+
     @staticmethod
     def save_timestep(data, settings, ts, hdfile):
         if settings['save_aero']:
@@ -336,3 +392,83 @@ class SaveData(BaseSolver):
                                ClassesToSave=(sharpy.utils.datastructures.StructTimeStepInfo,),
                                SkipAttr=settings['skip_attr'],
                                compress_float=settings['compress_float'])
+
+    def time_history_components(self):
+        """
+        Returns the time step lists to be saved as time histories, by name
+        """
+        components = dict()
+        if self.settings['save_struct']:
+            components['structure'] = self.data.structure.timestep_info
+        if self.settings['save_aero']:
+            components['aero'] = self.data.aero.timestep_info
+        if self.settings['save_nonlifting']:
+            components['nonlifting_body'] = self.data.nonlifting_body.timestep_info
+        return components
+
+    def save_time_histories(self, online):
+        """
+        Saves the time step information with ``timestep_format = columnar``.
+
+        On the first call the static information (without ``timestep_info``) is written to ``data`` and all the
+        available time steps are added. Further online calls only append the current time step. The file is
+        kept open until :meth:`shutdown` is called (or the end of the call if not run ``online``).
+        """
+        if self.hdfile is None:
+            self.hdfile = h5py.File(self.filename, 'a')
+            if 'data' not in self.hdfile:
+                skip_attr_init = copy.deepcopy(self.settings['skip_attr'])
+                skip_attr_init.append('timestep_info')
+                h5utils.add_as_grp(self.data, self.hdfile, grpname='data',
+                                   ClassesToSave=self.ClassesToSave, SkipAttr=skip_attr_init,
+                                   compress_float=self.settings['compress_float'])
+
+            timeseries = self.hdfile.require_group('timeseries')
+            new_file = not any(['ts' in timeseries[name] for name in timeseries.keys()])
+            self.time_history_writers = dict()
+            for name in self.time_history_components().keys():
+                self.time_history_writers[name] = h5utils.TimeHistoryWriter(
+                    timeseries.require_group(name),
+                    flush_every=self.settings['flush_stride'],
+                    compression=self.settings['compression'],
+                    compress_float=self.settings['compress_float'])
+
+            if new_file or not online:
+                time_steps = [it for it in range(len(self.data.structure.timestep_info))
+                              if self.data.structure.timestep_info[it] is not None]
+            else:
+                time_steps = [self.data.ts]
+        else:
+            time_steps = [self.data.ts]
+
+        for it in time_steps:
+            self.save_timestep_columnar(it)
+
+        if not online:
+            self.shutdown()
+
+    def save_timestep_columnar(self, ts):
+        for name, timestep_info in self.time_history_components().items():
+            self.time_history_writers[name].append(
+                ts, h5utils.flatten_timestep(timestep_info[ts], SkipAttr=self.settings['skip_attr']))
+
+    def shutdown(self):
+        """
+        Writes the pending time steps and closes the output file (``timestep_format = columnar``)
+        """
+        for writer in self.time_history_writers.values():
+            writer.close()
+        self.time_history_writers = dict()
+        if self.hdfile is not None:
+            self.hdfile.close()
+            self.hdfile = None
+
+    def teardown(self):
+        self.shutdown()
+
+    def __getstate__(self):
+        # open HDF5 handles can not be pickled (i.e. for restart files). The pending time steps are written and the
+        # file is reopened (and appended to) the next time the postprocessor is run. DynamicCoupled waits for its
+        # background worker to be idle before its postprocessors are pickled.
+        self.shutdown()
+        return self.__dict__.copy()
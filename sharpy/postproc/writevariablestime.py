@@ -1,7 +1,11 @@
+import io
 import os
+
+import h5py
 import numpy as np
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings_utils
+import sharpy.utils.h5utils as h5utils
 
 
 @solver
@@ -13,6 +17,17 @@ class WriteVariablesTime(BaseSolver):
 
     It is a postprocessor that outputs the value of variables with time onto a text file.
 
+    The output can be kept in memory and appended to the text files every ``flush_stride`` time steps, and at the end
+    of the simulation, rather than opening every file at every time step. The text files are only open while the rows
+    are appended.
+
+    With ``output_format = h5``, the variables are written instead to a single ``WriteVariablesTime.h5`` file, with a
+    group per kind of variable (``FoR``, ``structure``, ``nonlifting``, ``aero_panels``, ``aero_nodes`` and
+    ``vel_field``). Each variable is a columnar dataset (time along the first axis) named as the equivalent text file,
+    i.e. ``structure/struct_pos_node5``, and the time step numbers of the rows are in the ``ts`` dataset of each group
+    (see :class:`~sharpy.utils.h5utils.TimeHistoryWriter` and :func:`~sharpy.utils.h5utils.read_time_history`).
+    The HDF5 file is kept open until the end of the simulation.
+
     Attributes:
         settings_types (dict): Acceptable data types of the input data
         settings_default (dict): Default values for input data should the user not provide them
@@ -27,6 +42,7 @@ class WriteVariablesTime(BaseSolver):
     settings_types = dict()
     settings_default = dict()
     settings_description = dict()
+    settings_options = dict()
 
     settings_types['delimiter'] = 'str'
     settings_default['delimiter'] = ' '
@@ -108,8 +124,21 @@ class WriteVariablesTime(BaseSolver):
     settings_default['vel_field_points'] = np.array([0., 0., 0.])
     settings_description['vel_field_points'] = 'List of coordinates of the control points as x1, y1, z1, x2, y2, z2 ...'
 
+    settings_types['output_format'] = 'str'
+    settings_default['output_format'] = 'text'
+    settings_description['output_format'] = 'Write a text file per variable and point (``text``) or a single HDF5 ' \
+                                            'file with a columnar dataset per variable and point (``h5``)'
+    settings_options['output_format'] = ['text', 'h5']
+
+    settings_types['flush_stride'] = 'int'
+    settings_default['flush_stride'] = 1
+    settings_description['flush_stride'] = 'Number of time steps kept in memory before writing them to the output ' \
+                                           'files. By default, every time step is written once computed. With ' \
+                                           'larger values, the buffered time steps are lost if the simulation is ' \
+                                           'killed (they are written if the time marching solver raises an error)'
+
     settings_table = settings_utils.SettingsTable()
-    __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
     def __init__(self):
         self.settings = None
@@ -121,18 +150,31 @@ class WriteVariablesTime(BaseSolver):
         self.caller = None
         self.velocity_generator = None
 
+        self.text_buffers = dict()  # filename: io.StringIO with the rows not yet written
+        self.n_buffered_steps = 0
+        self.h5_filename = None
+        self.h5file = None
+        self.h5_writers = dict()  # group: h5utils.TimeHistoryWriter
+        self.h5_rows = dict()  # group: {name: value} of the current time step
+
     def initialise(self, data, custom_settings=None, caller=None, restart=False):
         self.data = data
         if custom_settings is None:
             self.settings = data.settings[self.solver_id]
         else:
             self.settings = custom_settings
-        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default)
+        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default,
+                                       options=self.settings_options)
 
         self.folder = data.output_folder + '/WriteVariablesTime/'
         if not os.path.isdir(self.folder):
             os.makedirs(self.folder)
 
+        self.h5_filename = self.folder + 'WriteVariablesTime.h5'
+        if self.settings['cleanup_old_solution'] and self.settings['output_format'] == 'h5':
+            if os.path.isfile(self.h5_filename):
+                os.remove(self.h5_filename)
+
         # Check inputs
         if not ((len(self.settings['aero_panels_isurf']) == len(self.settings['aero_panels_im'])) and (len(self.settings['aero_panels_isurf']) == len(self.settings['aero_panels_in']))):
             raise RuntimeError("aero_panels should be defined as [i_surf,i_m,i_n]")
@@ -205,7 +247,7 @@ class WriteVariablesTime(BaseSolver):
                 if self.settings['cleanup_old_solution']:
                     if os.path.isfile(filename):
                         os.remove(filename)
-                if not os.path.isfile(filename):
+                if not os.path.isfile(filename) and self.settings['output_format'] == 'text':
                     fid = open(filename, 'w')
                     fid.write(("#t[s]%suext_x[m/s]%suext_y[m/s]%suext_z[m/s]\n" % ((self.settings['delimiter'],)*3)))
                     fid.close()
@@ -230,9 +272,22 @@ class WriteVariablesTime(BaseSolver):
             for it in range(len(self.data.structure.timestep_info)):
                 if self.data.structure.timestep_info[it] is not None:
                     self.data = self.write(it)
+            self.shutdown()
 
         return self.data
 
+    def snapshot_variables(self):
+        if len(self.settings['vel_field_variables']) > 0:
+            # the velocity field is evaluated with the velocity generator of the caller
+            return None
+
+        def requested(*keys):
+            return [name for key in keys for name in self.settings[key] if name != '']
+
+        return {'structure': requested('FoR_variables', 'structure_variables'),
+                'aero': requested('aero_panels_variables', 'aero_nodes_variables'),
+                'nonlifting_body': requested('nonlifting_nodes_variables')}
+
     def write(self, it):
 
         # FoR variables
@@ -247,19 +302,18 @@ class WriteVariablesTime(BaseSolver):
             if self.settings['FoR_variables'][ivariable] == '':
                 continue
             for ifor in range(len(self.settings['FoR_number'])):
-                filename = self.folder + "FoR_" + '%02d' % self.settings['FoR_number'][ifor] + "_" + self.settings['FoR_variables'][ivariable] + ".dat"
-
-                with open(filename, 'a') as fid:
-                    var = np.atleast_2d(getattr(tstep, self.settings['FoR_variables'][ivariable]))
-                    rows, cols = var.shape
-                    if ((cols == 1) and (rows == 1)):
-                        self.write_value_to_file(fid, self.data.ts, var, self.settings['delimiter'])
-                    elif ((cols > 1) and (rows == 1)):
-                        self.write_nparray_to_file(fid, self.data.ts, var, self.settings['delimiter'])
-                    elif ((cols == 1) and (rows >= 1)):
-                        self.write_value_to_file(fid, self.data.ts, var[ifor], self.settings['delimiter'])
-                    else:
-                        self.write_nparray_to_file(fid, self.data.ts, var[ifor,:], self.settings['delimiter'])
+                name = "FoR_" + '%02d' % self.settings['FoR_number'][ifor] + "_" + self.settings['FoR_variables'][ivariable]
+
+                var = np.atleast_2d(getattr(tstep, self.settings['FoR_variables'][ivariable]))
+                rows, cols = var.shape
+                if ((cols == 1) and (rows == 1)):
+                    self.write_output('FoR', name, var, scalar=True)
+                elif ((cols > 1) and (rows == 1)):
+                    self.write_output('FoR', name, var)
+                elif ((cols == 1) and (rows >= 1)):
+                    self.write_output('FoR', name, var[ifor], scalar=True)
+                else:
+                    self.write_output('FoR', name, var[ifor,:])
 
         # Structure variables at nodes
         for ivariable in range(len(self.settings['structure_variables'])):
@@ -269,20 +323,18 @@ class WriteVariablesTime(BaseSolver):
             num_indices = len(var.shape)
             if num_indices == 1:
                 # Beam global variables (i.e. not node dependant)
-                filename = self.folder + "struct_" + self.settings['structure_variables'][ivariable] + ".dat"
-                with open(filename, 'a') as fid:
-                    self.write_nparray_to_file(fid, self.data.ts, var, self.settings['delimiter'])
+                name = "struct_" + self.settings['structure_variables'][ivariable]
+                self.write_output('structure', name, var)
 
             else:  # These variables have nodal values (i.e the number of indices is either 2 or 3)
                 for inode in range(len(self.settings['structure_nodes'])):
                     node = self.settings['structure_nodes'][inode]
-                    filename = self.folder + "struct_" + self.settings['structure_variables'][ivariable] + "_node" + str(node) + ".dat"
-                    with open(filename, 'a') as fid:
-                        if num_indices == 2:
-                            self.write_nparray_to_file(fid, self.data.ts, var[node,:], self.settings['delimiter'])
-                        elif num_indices == 3:
-                            ielem, inode_in_elem = self.data.structure.node_master_elem[node]
-                            self.write_nparray_to_file(fid, self.data.ts, var[ielem,inode_in_elem,:], self.settings['delimiter'])
+                    name = "struct_" + self.settings['structure_variables'][ivariable] + "_node" + str(node)
+                    if num_indices == 2:
+                        self.write_output('structure', name, var[node,:])
+                    elif num_indices == 3:
+                        ielem, inode_in_elem = self.data.structure.node_master_elem[node]
+                        self.write_output('structure', name, var[ielem,inode_in_elem,:])
 
 
         # Aerodynamic variables at nonlifting panels
@@ -294,11 +346,10 @@ class WriteVariablesTime(BaseSolver):
                 i_surf = self.settings['nonlifting_nodes_isurf'][ipanel]
                 i_m = self.settings['nonlifting_nodes_im'][ipanel]
                 i_n = self.settings['nonlifting_nodes_in'][ipanel]
-                filename = self.folder + "nonlifting_" + self.settings['nonlifting_nodes_variables'][ivariable] + "_panel" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n) + ".dat"
+                name = "nonlifting_" + self.settings['nonlifting_nodes_variables'][ivariable] + "_panel" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n)
 
-                with open(filename, 'a') as fid:
-                    var = getattr(self.data.nonlifting_body.timestep_info[it], self.settings['nonlifting_nodes_variables'][ivariable])
-                    self.write_value_to_file(fid, self.data.ts, var[i_surf][i_m,i_n], self.settings['delimiter'])
+                var = getattr(self.data.nonlifting_body.timestep_info[it], self.settings['nonlifting_nodes_variables'][ivariable])
+                self.write_output('nonlifting', name, var[i_surf][i_m,i_n], scalar=True)
 
         # Aerodynamic variables at panels
         for ivariable in range(len(self.settings['aero_panels_variables'])):
@@ -309,11 +360,10 @@ class WriteVariablesTime(BaseSolver):
                 i_m = self.settings['aero_panels_im'][ipanel]
                 i_n = self.settings['aero_panels_in'][ipanel]
 
-                filename = self.folder + "aero_" + self.settings['aero_panels_variables'][ivariable] + "_panel" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n) + ".dat"
+                name = "aero_" + self.settings['aero_panels_variables'][ivariable] + "_panel" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n)
 
-                with open(filename, 'a') as fid:
-                    var = getattr(self.data.aero.timestep_info[it], self.settings['aero_panels_variables'][ivariable])
-                    self.write_value_to_file(fid, self.data.ts, var[i_surf][i_m,i_n], self.settings['delimiter'])
+                var = getattr(self.data.aero.timestep_info[it], self.settings['aero_panels_variables'][ivariable])
+                self.write_output('aero_panels', name, var[i_surf][i_m,i_n], scalar=True)
 
 
         # Aerodynamic variables at nodes
@@ -325,11 +375,10 @@ class WriteVariablesTime(BaseSolver):
                 i_m = self.settings['aero_nodes_im'][inode]
                 i_n = self.settings['aero_nodes_in'][inode]
 
-                filename = self.folder + "aero_" + self.settings['aero_nodes_variables'][ivariable] + "_node" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n) + ".dat"
+                name = "aero_" + self.settings['aero_nodes_variables'][ivariable] + "_node" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n)
 
-                with open(filename, 'a') as fid:
-                    var = getattr(self.data.aero.timestep_info[it], self.settings['aero_nodes_variables'][ivariable])
-                    self.write_nparray_to_file(fid, self.data.ts, var[i_surf][:,i_m,i_n], self.settings['delimiter'])
+                var = getattr(self.data.aero.timestep_info[it], self.settings['aero_nodes_variables'][ivariable])
+                self.write_output('aero_nodes', name, var[i_surf][:,i_m,i_n])
 
         # Velocity field variables at points
         for ivariable in range(len(self.settings['vel_field_variables'])):
@@ -342,12 +391,92 @@ class WriteVariablesTime(BaseSolver):
                                     'override': True},
                                     uext)
                 for ipoint in range(self.n_vel_field_points):
-                    filename = self.folder + "vel_field_" + self.settings['vel_field_variables'][ivariable] + "_point" + str(ipoint) + ".dat"
-                    with open(filename, 'a') as fid:
-                        self.write_nparray_to_file(fid, self.data.ts, uext[0][:,ipoint,0], self.settings['delimiter'])
+                    name = "vel_field_" + self.settings['vel_field_variables'][ivariable] + "_point" + str(ipoint)
+                    self.write_output('vel_field', name, uext[0][:,ipoint,0])
+
+        self.end_step()
 
         return self.data
 
+    def write_output(self, group, name, value, scalar=False):
+        """
+        Adds the value of a variable at the current time step to its output
+
+        Args:
+            group (str): Kind of variable, group of the ``h5`` output
+            name (str): Name of the text file (without extension) or dataset
+            value (np.ndarray): Value at the current time step
+            scalar (bool): Write a single value per row to the text file
+        """
+        if self.settings['output_format'] == 'h5':
+            self.h5_rows.setdefault(group, dict())[name] = np.array(value)
+            return
+
+        filename = self.folder + name + ".dat"
+        try:
+            fid = self.text_buffers[filename]
+        except KeyError:
+            fid = self.text_buffers[filename] = io.StringIO()
+        if scalar:
+            self.write_value_to_file(fid, self.data.ts, value, self.settings['delimiter'])
+        else:
+            self.write_nparray_to_file(fid, self.data.ts, value, self.settings['delimiter'])
+
+    def end_step(self):
+        """
+        Appends the rows of the time step to the columnar ``h5`` outputs or writes the text outputs every
+        ``flush_stride`` time steps
+        """
+        if self.settings['output_format'] == 'h5':
+            if self.h5file is None:
+                self.h5file = h5py.File(self.h5_filename, 'a')
+            for group, rows in self.h5_rows.items():
+                if group not in self.h5_writers:
+                    self.h5_writers[group] = h5utils.TimeHistoryWriter(self.h5file.require_group(group),
+                                                                       flush_every=self.settings['flush_stride'])
+                self.h5_writers[group].append(self.data.ts, rows)
+            self.h5_rows = dict()
+        else:
+            self.n_buffered_steps += 1
+            if self.n_buffered_steps >= self.settings['flush_stride']:
+                self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered rows to the text files
+        """
+        for filename, fid in self.text_buffers.items():
+            rows = fid.getvalue()
+            if rows:
+                with open(filename, 'a') as outfile:
+                    outfile.write(rows)
+                fid.seek(0)
+                fid.truncate()
+        self.n_buffered_steps = 0
+
+    def shutdown(self):
+        """
+        Writes the pending time steps and closes the ``h5`` output file
+        """
+        self.flush()
+        for writer in self.h5_writers.values():
+            writer.close()
+        self.h5_writers = dict()
+        if self.h5file is not None:
+            self.h5file.close()
+            self.h5file = None
+
+    def teardown(self):
+        self.shutdown()
+
+    def __getstate__(self):
+        # open HDF5 handles can not be pickled (i.e. for restart files). The pending time steps are written and the
+        # file is reopened (and appended to) the next time the postprocessor is run. DynamicCoupled waits for its
+        # background worker to be idle before its postprocessors are pickled.
+        self.shutdown()
+        return self.__dict__.copy()
+
+
     def write_nparray_to_file(self, fid, ts, nparray, delimiter):
 
         fid.write("%d%s" % (ts,delimiter))
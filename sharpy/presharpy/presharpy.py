@@ -82,6 +82,8 @@ class PreSharpy(object):
             self._settings = False
 
         self.ts = 0
+        # checkpoint to continue the simulation from (see sharpy.utils.checkpoint)
+        self.restart_checkpoint = None
 
         if self._settings:
             self.settings = in_settings
@@ -0,0 +1,377 @@
+"""Parametric reduced order model interpolation
+
+Database of reduced order models (ROMs) obtained at a set of points of the parameter space (e.g. flight
+conditions), from which reduced state-space systems, their frequency responses and eigenvalues are interpolated at
+any other point of the parameter space without running SHARPy.
+
+The database is built from the ``.pmor.sharpy`` files written by the
+:class:`~sharpy.postproc.saveparametriccase.SaveParametricCase` post-processor with ``save_pmor_items`` on. These
+contain the values of the parameters of each case and the path to the saved aeroelastic state-space and reduced order
+bases.
+
+ROMs obtained at different points are, in general, expressed in different generalised coordinates. Before
+interpolating their matrices, these are transformed onto a consistent set of coordinates [1, 2]. The supported
+methods are:
+
+    - ``congruent``: the reduced order bases are orthonormalised and each ROM is transformed by the rotation that best
+      aligns its basis with the basis of a reference case (solution of the orthogonal Procrustes problem, as the
+      ``weakMAC`` projection of :class:`~sharpy.rom.utils.librom_interp.InterpROM`). The transformation is done when
+      the database is built, thus each query only requires a weighted sum of the matrices.
+
+    - ``grassmann``: the reduced order basis at the query point is interpolated on the Grassmann manifold, about the
+      basis of the closest case, and the ROMs are transformed onto it. This accounts for the variation of the subspace
+      spanned by the bases across the parameter space at the expense of a few thin SVDs per query.
+
+    - ``direct``: the matrices are interpolated as they are, assuming that all ROMs share their coordinates.
+
+The interpolation weights are linear over a Delaunay triangulation of the parameter space (piecewise linear for a
+single parameter), hence the query points need to lie within the convex hull of the database points.
+
+References:
+
+    [1] Amsallem, D. & Farhat, C., 2011. An online method for interpolating linear parametric reduced-order models.
+    SIAM Journal on Scientific Computing, 33(5), pp.2169–2198.
+
+    [2] Amsallem, D. & Farhat, C., 2008. Interpolation method for adapting reduced-order models and application to
+    aeroelasticity. AIAA Journal, 46(7), pp.1803–1813.
+"""
+import concurrent.futures
+import glob
+import os
+
+import configobj
+import numpy as np
+import scipy.linalg as scalg
+import scipy.spatial
+
+import sharpy.linear.src.libss as libss
+import sharpy.linear.src.libsparse as libsp
+import sharpy.utils.cout_utils as cout
+
+
+class ParametricCase:
+    """
+    Reduced order model obtained at a point of the parameter space
+
+    Args:
+        parameters (dict): Parameter values, by name.
+        ss (libss.StateSpace): Reduced order aeroelastic system.
+        aero_basis (np.ndarray): Right reduced order basis of the aerodynamic states.
+        struct_basis (np.ndarray): Structural modal matrix, if the structural states are modal.
+        name (str): Case name.
+    """
+    def __init__(self, parameters, ss, aero_basis=None, struct_basis=None, name=''):
+        self.parameters = parameters
+        self.ss = ss
+        self.aero_basis = aero_basis
+        self.struct_basis = struct_basis
+        self.name = name
+
+    @classmethod
+    def load(cls, pmor_file):
+        """
+        Loads a case from its ``.pmor.sharpy`` file and the files saved in the ``save_pmor_data`` folder
+
+        Args:
+            pmor_file (str): Path to the ``.pmor.sharpy`` file.
+
+        Returns:
+            ParametricCase: loaded case
+        """
+        config = configobj.ConfigObj(pmor_file)
+        name = config['sim_info']['case']
+        parameters = {k: float(v) for k, v in config['parameters'].items()}
+
+        base_name = os.path.join(config['sim_info'].get('path_to_data', ''), 'save_pmor_data', name)
+        if not os.path.isfile(base_name + '_statespace.h5'):
+            # the output folder has been moved together with the .pmor.sharpy file
+            base_name = os.path.join(os.path.dirname(os.path.abspath(pmor_file)), 'save_pmor_data', name)
+        ss = libss.StateSpace.load_from_h5(base_name + '_statespace.h5')
+
+        aero_basis = None
+        aero_files = glob.glob(base_name + '_*_aerorob.h5')
+        if len(aero_files) == 1:
+            aero_basis = libss.Gain.load_multiple_gains(aero_files[0])['V'].value
+        elif len(aero_files) > 1:
+            cout.cout_wrap('PMOR case {:s}: several aerodynamic reduced order bases found, these are not '
+                           'used'.format(name), 3)
+
+        struct_basis = None
+        if os.path.isfile(base_name + '_modal_structrob.h5'):
+            struct_basis = libss.Gain.load_from_h5(base_name + '_modal_structrob.h5').value
+
+        return cls(parameters, ss, aero_basis, struct_basis, name=name)
+
+    def right_basis(self):
+        """
+        Right reduced order basis of the system states
+
+        This is block diagonal with the aerodynamic basis, the structural modal matrix for both the modal displacements
+        and velocities and the identity for any remaining states.
+
+        Returns:
+            np.ndarray: Right reduced order basis, or ``None`` if no bases are available.
+        """
+        if self.aero_basis is None and self.struct_basis is None:
+            return None
+
+        blocks = []
+        remaining_states = self.ss.states
+        if self.aero_basis is not None:
+            blocks.append(self.aero_basis)
+            remaining_states -= self.aero_basis.shape[1]
+        if self.struct_basis is not None and remaining_states == 2 * self.struct_basis.shape[1]:
+            blocks += [self.struct_basis, self.struct_basis]
+            remaining_states = 0
+        if remaining_states < 0:
+            raise ValueError('PMOR case {:s}: the reduced order bases have more columns than the system '
+                             'states'.format(self.name))
+        elif remaining_states > 0:
+            blocks.append(np.eye(remaining_states))
+
+        return scalg.block_diag(*blocks)
+
+
+def transform(mats, T, Tinv):
+    r"""
+    State transformation :math:`\mathbf{x} = \mathbf{T}\mathbf{x}'` of the matrices ``(A, B, C, D)``
+    """
+    A, B, C, D = mats
+    return Tinv.dot(A.dot(T)), Tinv.dot(B), C.dot(T), D
+
+
+def grassmann_log(V0, V):
+    r"""
+    Logarithmic map of the orthonormal basis ``V`` onto the tangent space of the Grassmann manifold at ``V0``
+
+    .. math:: (\mathbf{I} - \mathbf{V}_0\mathbf{V}_0^\top)\mathbf{V}(\mathbf{V}_0^\top\mathbf{V})^{-1} =
+        \mathbf{U}\boldsymbol{\Sigma}\mathbf{Z}^\top \rightarrow
+        \boldsymbol{\Gamma} = \mathbf{U}\arctan(\boldsymbol{\Sigma})\mathbf{Z}^\top
+    """
+    V0TV = V0.T.dot(V)
+    M = np.linalg.solve(V0TV.T, (V - V0.dot(V0TV)).T).T
+    U, s, ZT = scalg.svd(M, full_matrices=False)
+    return (U * np.arctan(s)).dot(ZT)
+
+
+def grassmann_exp(V0, gamma):
+    r"""
+    Exponential map of the tangent vector ``gamma`` at ``V0`` back onto the Grassmann manifold
+
+    .. math:: \boldsymbol{\Gamma} = \mathbf{U}\boldsymbol{\Sigma}\mathbf{Z}^\top \rightarrow
+        \mathbf{V} = (\mathbf{V}_0\mathbf{Z}\cos(\boldsymbol{\Sigma}) + \mathbf{U}\sin(\boldsymbol{\Sigma}))
+        \mathbf{Z}^\top
+    """
+    U, s, ZT = scalg.svd(gamma, full_matrices=False)
+    return (V0.dot(ZT.T) * np.cos(s) + U * np.sin(s)).dot(ZT)
+
+
+class ParametricROMDatabase:
+    """
+    Interpolation of reduced order models over the parameter space
+
+    Args:
+        cases (list(ParametricCase)): Cases that make up the database. All need to have the same parameters and their
+          systems the same number of states, inputs and outputs and the same time step.
+        method (str): Interpolation method: ``congruent``, ``grassmann`` or ``direct`` (see module documentation).
+        reference_case (int): Index of the case whose basis defines the coordinates of the ``congruent`` method.
+
+    Examples:
+
+        >>> database = ParametricROMDatabase.from_directory('./output/', method='congruent')
+        >>> ss = database.interpolate({'u_inf': 25., 'alpha': 2.})
+        >>> envelope = [[u_inf, 2.] for u_inf in np.linspace(20, 30, 50)]
+        >>> eigenvalues = database.eigenvalues(envelope, num_cores=4)
+        >>> yfreq = database.freqresp(envelope, np.linspace(0.1, 50, 100), num_cores=4)
+    """
+    methods = ('congruent', 'grassmann', 'direct')
+
+    def __init__(self, cases, method='congruent', reference_case=0):
+        if method not in self.methods:
+            raise ValueError('PMOR interpolation method {:s} not recognised. Use one of '
+                             '{}'.format(method, self.methods))
+        if len(cases) == 0:
+            raise ValueError('The PMOR database requires at least one case')
+
+        self.cases = cases
+        self.method = method
+        self.parameter_names = sorted(cases[0].parameters.keys())
+        self.dt = cases[0].ss.dt
+
+        sizes = (cases[0].ss.states, cases[0].ss.inputs, cases[0].ss.outputs)
+        for case in cases:
+            if sorted(case.parameters.keys()) != self.parameter_names:
+                raise KeyError('PMOR case {:s} does not have the parameters {}'.format(case.name,
+                                                                                      self.parameter_names))
+            if (case.ss.states, case.ss.inputs, case.ss.outputs) != sizes:
+                raise ValueError('PMOR case {:s}: the systems do not have the same number of states, inputs and '
+                                 'outputs'.format(case.name))
+            if case.ss.dt != self.dt:
+                raise ValueError('PMOR case {:s}: the systems do not have the same time step'.format(case.name))
+
+        self.points = np.array([[case.parameters[name] for name in self.parameter_names] for case in cases],
+                               dtype=float)
+
+        mats = [[libsp.dense(m) for m in case.ss.get_mats()] for case in cases]
+        self.bases = None
+        if method != 'direct':
+            self.bases = []
+            for i_case, case in enumerate(cases):
+                basis = case.right_basis()
+                if basis is None:
+                    raise ValueError('PMOR case {:s}: the {:s} method requires the reduced order '
+                                     'bases'.format(case.name, method))
+                if self.bases and basis.shape != self.bases[0].shape:
+                    raise ValueError('PMOR case {:s}: the reduced order bases do not have the same '
+                                     'size'.format(case.name))
+                # orthonormalise the basis, the coordinates change accordingly with x' = R x
+                Q, R = scalg.qr(basis, mode='economic')
+                mats[i_case] = transform(mats[i_case], scalg.solve_triangular(R, np.eye(R.shape[0])), R)
+                self.bases.append(Q)
+
+            if method == 'congruent':
+                reference_basis = self.bases[reference_case]
+                for i_case in range(len(cases)):
+                    rotation = scalg.orthogonal_procrustes(self.bases[i_case], reference_basis)[0]
+                    mats[i_case] = transform(mats[i_case], rotation, rotation.T)
+
+        self.A, self.B, self.C, self.D = [np.array([m[i_mat] for m in mats]) for i_mat in range(4)]
+
+        self.triangulation = None
+        self.order = None
+        if len(self.parameter_names) > 1:
+            self.triangulation = scipy.spatial.Delaunay(self.points)
+        else:
+            self.order = np.argsort(self.points[:, 0])
+
+    @classmethod
+    def from_directory(cls, folder, method='congruent', reference_case=0):
+        """
+        Builds the database from the ``.pmor.sharpy`` files found in ``folder`` and its subfolders
+
+        Args:
+            folder (str): Path to the SHARPy output folder(s).
+            method (str): Interpolation method.
+            reference_case (int): Index of the reference case, in alphabetical order of the ``.pmor.sharpy`` files.
+
+        Returns:
+            ParametricROMDatabase: database
+        """
+        files = sorted(glob.glob(os.path.join(folder, '**', '*.pmor.sharpy'), recursive=True))
+        if not files:
+            raise FileNotFoundError('No .pmor.sharpy files found in {:s}'.format(folder))
+        cout.cout_wrap('Building PMOR database from {:d} cases in {:s}'.format(len(files), folder), 1)
+
+        return cls([ParametricCase.load(file_name) for file_name in files], method=method,
+                   reference_case=reference_case)
+
+    def get_point(self, point):
+        """
+        Returns the query point as an array ordered as ``parameter_names``. The point can be given as a dictionary or
+        as a sequence of values in that order.
+        """
+        if isinstance(point, dict):
+            point = [point[name] for name in self.parameter_names]
+        point = np.atleast_1d(np.array(point, dtype=float))
+        if point.shape != (len(self.parameter_names),):
+            raise ValueError('The query point should have values for the parameters {}'.format(self.parameter_names))
+        return point
+
+    def weights(self, point):
+        """
+        Interpolation weights at ``point``
+
+        Args:
+            point (dict or np.ndarray): Query point.
+
+        Returns:
+            tuple: indices of the cases used in the interpolation and their weights
+        """
+        point = self.get_point(point)
+
+        if self.triangulation is None:
+            values = self.points[self.order, 0]
+            if point[0] < values[0] or point[0] > values[-1]:
+                raise ValueError('The query point {} is outside the PMOR database range'.format(point))
+            if len(values) == 1:
+                return self.order, np.ones((1,))
+            i_lower = min(np.searchsorted(values, point[0], side='right') - 1, len(values) - 2)
+            xi = (point[0] - values[i_lower]) / (values[i_lower + 1] - values[i_lower])
+            return self.order[i_lower:i_lower + 2], np.array([1. - xi, xi])
+
+        simplex = int(self.triangulation.find_simplex(point))
+        if simplex < 0:
+            raise ValueError('The query point {} is outside the PMOR database convex hull'.format(point))
+        n_params = len(self.parameter_names)
+        transform_matrix = self.triangulation.transform[simplex]
+        barycentric = transform_matrix[:n_params].dot(point - transform_matrix[n_params])
+        return self.triangulation.simplices[simplex], np.append(barycentric, 1. - barycentric.sum())
+
+    def interpolate(self, point):
+        """
+        Interpolated reduced order system at ``point``
+
+        Args:
+            point (dict or np.ndarray): Query point.
+
+        Returns:
+            libss.StateSpace: interpolated system
+        """
+        indices, weights = self.weights(point)
+
+        if self.method == 'grassmann':
+            reference = indices[np.argmax(weights)]
+            gamma = np.zeros_like(self.bases[reference])
+            for i_case, weight in zip(indices, weights):
+                if i_case != reference:
+                    gamma += weight * grassmann_log(self.bases[reference], self.bases[i_case])
+            basis = grassmann_exp(self.bases[reference], gamma)
+
+            mats = []
+            for i_case in indices:
+                rotation = scalg.orthogonal_procrustes(self.bases[i_case], basis)[0]
+                mats.append(transform((self.A[i_case], self.B[i_case], self.C[i_case], self.D[i_case]),
+                                      rotation, rotation.T))
+            A, B, C, D = [np.tensordot(weights, np.array([m[i_mat] for m in mats]), axes=1) for i_mat in range(4)]
+        else:
+            A, B, C, D = [np.tensordot(weights, matrix[indices], axes=1) for matrix in (self.A, self.B, self.C, self.D)]
+
+        return libss.StateSpace(A, B, C, D, dt=self.dt)
+
+    def map_points(self, function, points, num_cores=1):
+        """
+        Evaluates ``function`` on the interpolated system at each point of ``points`` over ``num_cores`` threads
+        """
+        points = list(points)
+        if num_cores > 1 and len(points) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=num_cores) as executor:
+                return list(executor.map(lambda point: function(self.interpolate(point)), points))
+        return [function(self.interpolate(point)) for point in points]
+
+    def eigenvalues(self, points, num_cores=1):
+        """
+        Eigenvalues of the interpolated systems at each point of ``points``
+
+        Args:
+            points (list or np.ndarray): Query points.
+            num_cores (int): Number of threads over which the points are evaluated.
+
+        Returns:
+            np.ndarray: ``[len(points), states]`` eigenvalues of each interpolated system, ordered by modulus for
+            discrete time systems and by real part for continuous time systems
+        """
+        return np.array(self.map_points(lambda ss: ss.eigvals(), points, num_cores=num_cores))
+
+    def freqresp(self, points, wv, num_cores=1):
+        """
+        Frequency response of the interpolated systems at each point of ``points``
+
+        Args:
+            points (list or np.ndarray): Query points.
+            wv (np.ndarray): Frequencies in rad/s.
+            num_cores (int): Number of threads over which the points are evaluated.
+
+        Returns:
+            np.ndarray: ``[len(points), outputs, inputs, len(wv)]`` frequency responses
+        """
+        return np.array(self.map_points(lambda ss: ss.freqresp(wv), points, num_cores=num_cores))
@@ -40,12 +40,7 @@ def main(args=None, sharpy_input_dict=None):
     import h5py
     import sharpy.utils.h5utils as h5utils
 
-    # Loading solvers and postprocessors
-    import sharpy.solvers
-    import sharpy.postproc
-    import sharpy.generators
-    import sharpy.controllers
-    # ------------
+    # solvers, postprocessors, generators and controllers are imported on demand (see sharpy.utils.registry)
 
     try:
         # output writer
@@ -59,7 +54,9 @@ def main(args=None, sharpy_input_dict=None):
             """This is the executable for Simulation of High Aspect Ratio Planes.\n
             Imperial College London 2023""")
             parser.add_argument('input_filename', help='path to the *.sharpy input file', type=str, default='')
-            parser.add_argument('-r', '--restart', help='restart the solution with a given snapshot', type=str,
+            parser.add_argument('-r', '--restart', help='restart the solution with a given snapshot (.pkl), or '
+                                                        'continue it from a checkpoint (.h5) written by '
+                                                        'DynamicCoupled', type=str,
                                 default=None)
             parser.add_argument('-d', '--docs', help='generates the solver documentation in the specified location. '
                                                      'Code does not execute if running this flag', action='store_true')
@@ -88,9 +85,11 @@ def main(args=None, sharpy_input_dict=None):
             parser.error('input_filename is a required argument of SHARPy.')
         settings = input_arg.read_settings(args)
         missing_solvers = False
-        if args.restart is None:
+        if args.restart is None or args.restart.endswith('.h5'):
             # run preSHARPy
             data = PreSharpy(settings)
+            # the checkpoint is restored by DynamicCoupled once the model is loaded
+            data.restart_checkpoint = args.restart
             solvers = dict()
             restart = False
         else:
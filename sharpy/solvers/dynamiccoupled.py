@@ -16,8 +16,11 @@ from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings_utils
 import sharpy.utils.algebra as algebra
 import sharpy.utils.exceptions as exc
+import sharpy.utils.checkpoint as checkpoint
 import sharpy.io.network_interface as network_interface
 import sharpy.utils.generator_interface as gen_interface
+from sharpy.utils.datastructures import TimeStepBufferPool, TimeStepHistory
+from sharpy.utils.background_postproc import BackgroundPostprocessors
 
 
 @solver
@@ -181,6 +184,58 @@ class DynamicCoupled(BaseSolver):
     settings_types['nonlifting_body_interactions'] = 'bool'
     settings_default['nonlifting_body_interactions'] = False
     settings_description['nonlifting_body_interactions'] = 'Effect of Nonlifting Bodies on Lifting bodies are considered'
+
+    settings_types['preallocated_timestep_buffers'] = 'bool'
+    settings_default['preallocated_timestep_buffers'] = False
+    settings_description['preallocated_timestep_buffers'] = 'Reuse preallocated structural and aerodynamic time ' \
+                                                            'steps in the FSI loop instead of allocating new ' \
+                                                            'copies at every FSI iteration'
+
+    settings_types['background_postprocessors'] = 'bool'
+    settings_default['background_postprocessors'] = False
+    settings_description['background_postprocessors'] = 'Run the postprocessors that support it (``BeamPlot``, ' \
+                                                        '``AerogridPlot``, ``SaveData`` and ' \
+                                                        '``WriteVariablesTime``) in a background thread on a ' \
+                                                        'snapshot of the current time step. The remaining ' \
+                                                        'postprocessors are run in the time loop'
+
+    settings_types['background_postprocessors_queue'] = 'int'
+    settings_default['background_postprocessors_queue'] = 2
+    settings_description['background_postprocessors_queue'] = 'Maximum number of time steps waiting to be ' \
+                                                              'postprocessed in the background. The time loop ' \
+                                                              'waits if it is reached'
+
+    settings_types['timestep_history_in_memory'] = 'int'
+    settings_default['timestep_history_in_memory'] = 0
+    settings_description['timestep_history_in_memory'] = 'Number of most recent structural and aerodynamic time ' \
+                                                         'steps kept in memory. Older time steps are written to a ' \
+                                                         'temporary file in the output folder and loaded again ' \
+                                                         'when accessed by the postprocessors. If ``0``, the whole ' \
+                                                         'history is kept in memory'
+
+    settings_types['checkpoint_stride'] = 'int'
+    settings_default['checkpoint_stride'] = 0
+    settings_description['checkpoint_stride'] = 'Number of time steps between checkpoints, from which the ' \
+                                                'simulation can be continued (see :mod:`sharpy.utils.checkpoint`). ' \
+                                                'If ``0``, no checkpoints are written'
+
+    settings_types['checkpoint_steps'] = 'int'
+    settings_default['checkpoint_steps'] = 3
+    settings_description['checkpoint_steps'] = 'Number of most recent time steps stored in the checkpoints, ' \
+                                               'besides the initial one'
+
+    settings_types['checkpoint_file'] = 'str'
+    settings_default['checkpoint_file'] = ''
+    settings_description['checkpoint_file'] = 'Checkpoint file. Defaults to ``<case>.checkpoint.h5`` in the ' \
+                                              'output folder'
+
+    settings_types['restart_checkpoint'] = 'str'
+    settings_default['restart_checkpoint'] = ''
+    settings_description['restart_checkpoint'] = 'Checkpoint from which the simulation is continued. It can also ' \
+                                                 'be given with ``sharpy <case>.sharpy -r <checkpoint>.h5``. ' \
+                                                 'The postprocessors are initialised before the checkpoint is ' \
+                                                 'restored, so their outputs are written again from the restart ' \
+                                                 'time step onwards, overwriting those of the previous run'
     
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
@@ -206,6 +261,7 @@ class DynamicCoupled(BaseSolver):
         self.residual_table = None
         self.postprocessors = dict()
         self.with_postprocessors = False
+        self.background_postprocessors = None
         self.controllers = None
 
         self.time_aero = 0.
@@ -223,6 +279,9 @@ class DynamicCoupled(BaseSolver):
         self.runtime_generators = dict()
         self.with_runtime_generators = False
 
+        self.timestep_buffers = None
+        self.checkpoint_file = None
+
     def get_g(self):
         """
         Getter for ``g``, the gravity value
@@ -271,6 +330,11 @@ class DynamicCoupled(BaseSolver):
         self.initial_n_substeps = self.settings['structural_substeps']
 
         self.print_info = self.settings['print_info']
+        if self.settings['preallocated_timestep_buffers']:
+            self.timestep_buffers = TimeStepBufferPool()
+        else:
+            self.timestep_buffers = None
+
         if self.settings['cleanup_previous_solution']:
             # if there's data in timestep_info[>0], copy the last one to
             # timestep_info[0] and remove the rest
@@ -288,6 +352,7 @@ class DynamicCoupled(BaseSolver):
                                     self.settings['aero_solver_settings'],
                                     restart=restart)
         self.data = self.aero_solver.data
+        self.set_timestep_history()
 
         # initialise postprocessors
         if self.settings['postprocessors']:
@@ -330,12 +395,16 @@ class DynamicCoupled(BaseSolver):
         
         # print information header
         if self.print_info:
-            self.residual_table = cout.TablePrinter(8, 12, ['g', 'f', 'g', 'f', 'f', 'f', 'e', 'e'])
+            field_types = ['g', 'f', 'g', 'f', 'f', 'f', 'e', 'e']
+            header = ['ts', 't', 'iter', 'struc ratio', 'iter time', 'residual vel', 'FoR_vel(x)', 'FoR_vel(z)']
+            if self.settings['background_postprocessors']:
+                field_types.append('f')
+                header.append('pp saved')
+            self.residual_table = cout.TablePrinter(len(field_types), 12, field_types)
             self.residual_table.field_length[0] = 5
             self.residual_table.field_length[1] = 6
             self.residual_table.field_length[2] = 4
-            self.residual_table.print_header(['ts', 't', 'iter', 'struc ratio', 'iter time', 'residual vel',
-                                              'FoR_vel(x)', 'FoR_vel(z)'])
+            self.residual_table.print_header(header)
 
         # Define the function to correct aerodynamic forces
         if self.settings['correct_forces_method'] != '':
@@ -367,6 +436,69 @@ class DynamicCoupled(BaseSolver):
                 self.runtime_generators[rg_id] = gen()
             self.runtime_generators[rg_id].initialise(param, data=self.data, restart=restart)
 
+        self.checkpoint_file = self.settings['checkpoint_file']
+        if not self.checkpoint_file:
+            self.checkpoint_file = self.data.output_folder + self.data.settings['SHARPy']['case'] + '.checkpoint.h5'
+        restart_checkpoint = self.settings['restart_checkpoint'] or getattr(self.data, 'restart_checkpoint', None)
+        if restart_checkpoint:
+            self.restore_checkpoint(restart_checkpoint)
+
+    def checkpoint_objects(self):
+        """
+        Returns the solvers, controllers and generators whose internal state is stored in the checkpoints, by name
+        """
+        objects = {'structural_solver': self.structural_solver,
+                   'aero_solver': self.aero_solver}
+        if self.correct_forces:
+            objects['correct_forces'] = self.correct_forces_generator
+        if self.with_controllers:
+            for controller_id, controller in self.controllers.items():
+                objects['controllers/' + controller_id] = controller
+        for rg_id, runtime_generator in self.runtime_generators.items():
+            objects['runtime_generators/' + rg_id] = runtime_generator
+        return objects
+
+    def write_checkpoint(self):
+        """
+        Writes a checkpoint of the current time step to ``checkpoint_file``
+        """
+        checkpoint.write_checkpoint(self.checkpoint_file, self.data, self.checkpoint_objects(),
+                                    n_steps=self.settings['checkpoint_steps'])
+
+    def restore_checkpoint(self, filename):
+        """
+        Continues the simulation from a checkpoint, replacing the time steps and the state of the solvers,
+        controllers and generators. The time marching resumes after the time step of the checkpoint.
+        """
+        cout.cout_wrap('Restarting from the checkpoint ' + filename, 1)
+        missing = checkpoint.restore_checkpoint(filename, self.data, self.checkpoint_objects())
+        for name in missing:
+            cout.cout_wrap('%s has no state in the checkpoint and starts from its initial state' % name, 3)
+        self.set_timestep_history()
+        # only the first DynamicCoupled of the flow is restarted
+        self.data.restart_checkpoint = None
+        cout.cout_wrap('Restarted at time step %u' % self.data.ts, 1)
+
+    def set_timestep_history(self):
+        """
+        Replaces the ``timestep_info`` lists by :class:`~sharpy.utils.datastructures.TimeStepHistory` containers if
+        ``timestep_history_in_memory`` is set
+        """
+        in_memory = self.settings['timestep_history_in_memory']
+        if in_memory <= 0:
+            return
+        components = [self.data.structure, self.data.aero]
+        if self.settings['nonlifting_body_interactions']:
+            components.append(self.data.nonlifting_body)
+        for component in components:
+            if isinstance(component.timestep_info, TimeStepHistory):
+                component.timestep_info.in_memory = in_memory
+                component.timestep_info.cache_size = in_memory
+            else:
+                component.timestep_info = TimeStepHistory(component.timestep_info,
+                                                          in_memory=in_memory,
+                                                          folder=self.data.output_folder)
+
     def cleanup_timestep_info(self):
         if max(len(self.data.aero.timestep_info), len(self.data.structure.timestep_info)) > 1:
             self.remove_old_timestep_info(self.data.structure.timestep_info)
@@ -451,36 +583,40 @@ class DynamicCoupled(BaseSolver):
         included.
         """
         solvers = settings_utils.set_value_or_default(kwargs, 'solvers', None)
-        if self.network_loader is not None:
-            self.set_of_variables = self.network_loader.get_inout_variables()
-
-            incoming_queue = queue.Queue(maxsize=1)
-            outgoing_queue = queue.Queue(maxsize=1)
+        self.start_background_postprocessors()
+        try:
+            if self.network_loader is not None:
+                self.set_of_variables = self.network_loader.get_inout_variables()
 
-            finish_event = threading.Event()
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                netloop = executor.submit(self.network_loop, incoming_queue, outgoing_queue, finish_event)
-                timeloop = executor.submit(self.time_loop, incoming_queue, outgoing_queue, finish_event, solvers)
+                incoming_queue = queue.Queue(maxsize=1)
+                outgoing_queue = queue.Queue(maxsize=1)
 
-                # TODO: improve exception handling to get exceptions when they happen from each thread
-                for t1 in [netloop, timeloop]:
-                    try:
-                        t1.result()
-                    except Exception as e:
-                        print(e)
-                        raise Exception
+                finish_event = threading.Event()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                    netloop = executor.submit(self.network_loop, incoming_queue, outgoing_queue, finish_event)
+                    timeloop = executor.submit(self.time_loop, incoming_queue, outgoing_queue, finish_event, solvers)
 
-        else:
-            self.time_loop(solvers=solvers)
+                    # TODO: improve exception handling to get exceptions when they happen from each thread
+                    for t1 in [netloop, timeloop]:
+                        try:
+                            t1.result()
+                        except Exception as e:
+                            print(e)
+                            raise Exception
 
-        if self.print_info:
-            cout.cout_wrap('...Finished', 1)
+            else:
+                self.time_loop(solvers=solvers)
 
-        for postproc in self.postprocessors:
+            if self.print_info:
+                cout.cout_wrap('...Finished', 1)
+        finally:
+            # the outputs of the time steps run so far are written even if the time loop fails
             try:
-                self.postprocessors[postproc].shutdown()
-            except AttributeError:
-                pass
+                self.stop_background_postprocessors()
+            finally:
+                for postproc in self.postprocessors.values():
+                    if hasattr(postproc, 'shutdown'):
+                        postproc.shutdown()
 
         return self.data
 
@@ -530,8 +666,8 @@ class DynamicCoupled(BaseSolver):
                 self.logger.debug('Time loop - received {}'.format(values))
                 self.set_of_variables.update_timestep(self.data, values)
 
-            structural_kstep = self.data.structure.timestep_info[-1].copy()
-            aero_kstep = self.data.aero.timestep_info[-1].copy()
+            structural_kstep = self.copy_timestep('structural', self.data.structure.timestep_info[-1])
+            aero_kstep = self.copy_timestep('aero', self.data.aero.timestep_info[-1])
             if self.settings['nonlifting_body_interactions']:
                 nl_body_kstep = self.data.nonlifting_body.timestep_info[-1].copy()
             else:
@@ -565,8 +701,8 @@ class DynamicCoupled(BaseSolver):
 
             # Copy the controlled states so that the interpolation does not
             # destroy the previous information
-            controlled_structural_kstep = structural_kstep.copy()
-            controlled_aero_kstep = aero_kstep.copy()
+            controlled_structural_kstep = self.copy_timestep('controlled_structural', structural_kstep)
+            controlled_aero_kstep = self.copy_timestep('controlled_aero', aero_kstep)
 
             for k in range(self.settings['fsi_substeps'] + 1):
                 if (k == self.settings['fsi_substeps'] and
@@ -581,7 +717,7 @@ class DynamicCoupled(BaseSolver):
                     break
 
                 # generate new grid (already rotated)
-                aero_kstep = controlled_aero_kstep.copy()
+                aero_kstep = self.copy_timestep('aero', controlled_aero_kstep)
                 
                 self.aero_solver.update_custom_grid(
                         structural_kstep,
@@ -622,8 +758,8 @@ class DynamicCoupled(BaseSolver):
                                                  nl_body_tstep = nl_body_kstep)
                 self.time_aero += time.perf_counter() - ini_time_aero
 
-                previous_kstep = structural_kstep.copy()
-                structural_kstep = controlled_structural_kstep.copy()
+                previous_kstep = self.copy_timestep('previous_structural', structural_kstep)
+                structural_kstep = self.copy_timestep('structural', controlled_structural_kstep)
                 structural_kstep.runtime_steady_forces = previous_kstep.runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
                 structural_kstep.runtime_unsteady_forces = previous_kstep.runtime_unsteady_forces.astype(dtype=ct.c_double, order='F', copy=True)
                 previous_kstep.runtime_steady_forces = previous_runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
@@ -654,7 +790,7 @@ class DynamicCoupled(BaseSolver):
                 if np.isnan(structural_kstep.unsteady_applied_forces).any():
                     raise exc.NotConvergedSolver('NaN found in unsteady_applied_forces!')
 
-                copy_structural_kstep = structural_kstep.copy()
+                copy_structural_kstep = self.copy_timestep('copy_structural', structural_kstep)
                 ini_time_struc = time.perf_counter()
                 for i_substep in range(
                         self.settings['structural_substeps'] + 1):
@@ -703,24 +839,35 @@ class DynamicCoupled(BaseSolver):
 
             if self.print_info:
                 print_res = 0 if self.res_dqdt == 0. else np.log10(self.res_dqdt)
-                self.residual_table.print_line([self.data.ts,
-                                                self.data.ts*self.dt,
-                                                k,
-                                                self.time_struc/(self.time_aero + self.time_struc),
-                                                final_time - initial_time,
-                                                print_res,
-                                                structural_kstep.for_vel[0],
-                                                structural_kstep.for_vel[2],
-                                                np.sum(structural_kstep.steady_applied_forces[:, 0]),
-                                                np.sum(structural_kstep.steady_applied_forces[:, 2])])
+                line = [self.data.ts,
+                        self.data.ts*self.dt,
+                        k,
+                        self.time_struc/(self.time_aero + self.time_struc),
+                        final_time - initial_time,
+                        print_res,
+                        structural_kstep.for_vel[0],
+                        structural_kstep.for_vel[2]]
+                if self.settings['background_postprocessors']:
+                    # refers to the last time step postprocessed in the background
+                    line.append(0. if self.background_postprocessors is None
+                                else self.background_postprocessors.time_saved())
+                self.residual_table.print_line(line)
             (self.data.structure.timestep_info[self.data.ts].total_forces[0:3],
              self.data.structure.timestep_info[self.data.ts].total_forces[3:6]) = (
                         self.structural_solver.extract_resultants(self.data.structure.timestep_info[self.data.ts]))
             # run postprocessors
             if self.with_postprocessors:
+                if self.background_postprocessors is not None:
+                    self.background_postprocessors.submit(self.data, solvers)
                 for postproc in self.postprocessors:
+                    if (self.background_postprocessors is not None and
+                            postproc in self.background_postprocessors.postprocessors):
+                        continue
                     self.data = self.postprocessors[postproc].run(online=True, solvers=solvers)
 
+            if self.settings['checkpoint_stride'] and self.data.ts % self.settings['checkpoint_stride'] == 0:
+                self.write_checkpoint()
+
             # network only
             # put result back in queue
             if out_queue:
@@ -736,6 +883,59 @@ class DynamicCoupled(BaseSolver):
             finish_event.set()
             self.logger.info('Time loop - Complete')
 
+    def start_background_postprocessors(self):
+        """
+        Starts the worker thread for the postprocessors that can run in the background, if
+        ``background_postprocessors`` is on.
+        """
+        if not (self.with_postprocessors and self.settings['background_postprocessors']):
+            return
+        background = dict()
+        for name, postproc in self.postprocessors.items():
+            if postproc.snapshot_variables() is not None:
+                background[name] = postproc
+        if background:
+            self.background_postprocessors = BackgroundPostprocessors(
+                background, queue_size=self.settings['background_postprocessors_queue'])
+
+    def stop_background_postprocessors(self):
+        """
+        Waits for the postprocessors running in the background to finish the queued time steps and stops the worker.
+        """
+        if self.background_postprocessors is not None:
+            background_postprocessors = self.background_postprocessors
+            self.background_postprocessors = None
+            background_postprocessors.shutdown()
+
+    def __getstate__(self):
+        # the worker thread and its queue cannot be pickled (i.e. by PickleData or for restart files). The queued
+        # time steps are postprocessed first, so that the worker is idle while the postprocessors are pickled, and a
+        # new worker is started by run() after unpickling
+        if self.background_postprocessors is not None:
+            self.background_postprocessors.drain()
+        state = self.__dict__.copy()
+        state['background_postprocessors'] = None
+        return state
+
+    def copy_timestep(self, buffer_name, tstep):
+        """
+        Returns a copy of ``tstep`` to be used within the FSI loop.
+
+        If ``preallocated_timestep_buffers`` is on, the copy is written in place into the preallocated buffer
+        ``buffer_name``, which is overwritten the next time the same buffer is requested. Otherwise, a new
+        time step is allocated.
+
+        Args:
+            buffer_name (str): Name of the buffer
+            tstep: Time step to be copied
+
+        Returns:
+            Copy of ``tstep``
+        """
+        if self.timestep_buffers is None:
+            return tstep.copy()
+        return self.timestep_buffers.fill(buffer_name, tstep)
+
     def convergence(self, k, tstep, previous_tstep,
                     struct_solver, aero_solver, with_runtime_generators):
         r"""
@@ -816,27 +1016,15 @@ class DynamicCoupled(BaseSolver):
         structural_kstep.steady_applied_forces.fill(0.0)
         structural_kstep.unsteady_applied_forces.fill(0.0)
 
-        # aero forces to structural forces
-        struct_forces = mapping.aero2struct_force_mapping(
-            aero_kstep.forces,
-            self.data.aero.struct2aero_mapping,
-            aero_kstep.zeta,
-            structural_kstep.pos,
-            structural_kstep.psi,
-            self.data.structure.node_master_elem,
-            self.data.structure.connectivities,
-            structural_kstep.cag(),
-            self.data.aero.data_dict)
-        dynamic_struct_forces = unsteady_forces_coeff*mapping.aero2struct_force_mapping(
-            aero_kstep.dynamic_forces,
-            self.data.aero.struct2aero_mapping,
+        # aero forces to structural forces (steady and unsteady in a single pass)
+        force_mapping = mapping.get_force_mapping(self.data.aero, aero_kstep.dimensions)
+        struct_forces, dynamic_struct_forces = force_mapping.map_forces(
+            [aero_kstep.forces, aero_kstep.dynamic_forces],
             aero_kstep.zeta,
             structural_kstep.pos,
             structural_kstep.psi,
-            self.data.structure.node_master_elem,
-            self.data.structure.connectivities,
-            structural_kstep.cag(),
-            self.data.aero.data_dict)
+            structural_kstep.cag())
+        dynamic_struct_forces *= unsteady_forces_coeff
 
         if self.correct_forces:
             struct_forces = \
@@ -925,6 +1113,7 @@ class DynamicCoupled(BaseSolver):
 
     def teardown(self):
         
+        self.stop_background_postprocessors()
         self.structural_solver.teardown()
         self.aero_solver.teardown()
         if self.with_postprocessors:
@@ -5,8 +5,10 @@ from sharpy.utils.datastructures import Linear
 from sharpy.utils.solver_interface import solver, BaseSolver
 
 import sharpy.linear.utils.ss_interface as ss_interface
+import sharpy.linear.utils.sscache as sscache
 import sharpy.utils.settings as settings_utils
 import sharpy.utils.cout_utils as cout
+import sharpy.aero.utils.utils as aero_utils
 
 
 @solver
@@ -104,6 +106,28 @@ class LinearAssembler(BaseSolver):
     settings_default['recover_accelerations'] = False
     settings_description['recover_accelerations'] = 'Recover structural system accelerations as additional outputs.'
 
+    settings_types['cache_folder'] = 'str'
+    settings_default['cache_folder'] = ''
+    settings_description['cache_folder'] = 'Folder of the on-disk cache of assembled systems. The cache key is ' \
+                                           'computed from the linearisation time steps, the structural and ' \
+                                           'aerodynamic input data (including the control surfaces), the ' \
+                                           '``rigid_modes_ppal_axes`` setting of ``Modal`` and the settings of ' \
+                                           'this solver. On a cache hit, the assembly is skipped ' \
+                                           'and only the state-space systems, coupling gains, linearisation ' \
+                                           'vectors, UVLM scaling factors and beam modal projection are available. ' \
+                                           'The cache is not loaded when the flow contains solvers that need the ' \
+                                           'assembly objects (i.e. ``LinDynamicSim`` or ``AsymptoticStability`` ' \
+                                           'with a ``reference_velocity``). Empty to disable the cache.'
+
+    settings_types['cache_max_size'] = 'float'
+    settings_default['cache_max_size'] = 2048.
+    settings_description['cache_max_size'] = 'Maximum size of the cache in MB, beyond which the least recently ' \
+                                             'used systems are evicted'
+
+    settings_types['cache_max_age'] = 'float'
+    settings_default['cache_max_age'] = 30.
+    settings_description['cache_max_age'] = 'Systems not used in this number of days are evicted from the cache'
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
@@ -112,6 +136,10 @@ class LinearAssembler(BaseSolver):
         self.settings = dict()
         self.data = None
 
+        self.cache = None
+        self.cache_key = None
+        self.cached_objects = None
+
     def initialise(self, data, custom_settings=None, restart=False):
 
         self.data = data
@@ -143,6 +171,35 @@ class LinearAssembler(BaseSolver):
         # Create data.linear
         self.data.linear = Linear(tsaero0, tsstruct0)
 
+        if self.settings['cache_folder']:
+            self.cache = sscache.LinearSystemCache(self.settings['cache_folder'],
+                                                   max_size=self.settings['cache_max_size'],
+                                                   max_age=self.settings['cache_max_age'])
+            key_settings = {k: v for k, v in self.settings.items() if not k.startswith('cache_')}
+            # the wake propagation depends on the velocity field and the current time step
+            key_settings['ts'] = data.ts
+            try:
+                key_settings['velocity_field'] = aero_utils.find_velocity_generator(data.settings)
+            except KeyError:
+                pass
+            # also used by LinearBeam
+            key_settings['rigid_modes_ppal_axes'] = data.settings.get('Modal', dict()).get('rigid_modes_ppal_axes')
+            self.cache_key = sscache.linearisation_key(tsaero0, tsstruct0, data.structure, key_settings,
+                                                       aero=data.aero)
+            consumers = sscache.find_assembly_consumers(data.settings)
+            if consumers:
+                cout.cout_wrap('Linear system cache: {:s} need the assembly objects, the system is assembled and '
+                               'not loaded from the cache'.format(', '.join(consumers)), 1)
+            else:
+                self.cached_objects = self.cache.load(self.cache_key)
+
+        if self.cached_objects is not None:
+            cout.cout_wrap('Loading assembled linear system from cache {:s}'.format(
+                self.cache.entry_path(self.cache_key)), 1)
+            self.data.linear.linear_system = sscache.CachedLinearSystem(self.settings['linear_system'],
+                                                                        self.cached_objects)
+            return
+
         # Load available systems
         import sharpy.linear.assembler
 
@@ -155,6 +212,12 @@ class LinearAssembler(BaseSolver):
 
     def run(self, **kwargs):
 
+        if self.cached_objects is not None:
+            self.data.linear.ss = self.cached_objects['ss']
+            cout.cout_wrap('Final system is:', 1)
+            cout.cout_wrap(str(self.data.linear.ss), 2)
+            return self.data
+
         self.data.linear.ss = self.data.linear.linear_system.assemble()
 
         if self.settings['recover_accelerations']:
@@ -192,6 +255,10 @@ class LinearAssembler(BaseSolver):
                     removed_variables.append(variable.name)
             ss.remove_outputs(*removed_variables)
 
+        if self.cache is not None:
+            self.cache.store(self.cache_key, sscache.get_cached_objects(self.data.linear.ss,
+                                                                        self.data.linear.linear_system))
+
         cout.cout_wrap('Final system is:', 1)
         cout.cout_wrap(str(self.data.linear.ss), 2)
 
@@ -1,8 +1,8 @@
 import ctypes as ct
 import numpy as np
 import scipy as sc
+import scipy.sparse.linalg
 import os
-import itertools
 import warnings
 import sharpy.structure.utils.xbeamlib as xbeamlib
 from sharpy.utils.solver_interface import solver, BaseSolver
@@ -27,6 +27,7 @@ class Modal(BaseSolver):
     settings_types = dict()
     settings_default = dict()
     settings_description = dict()
+    settings_options = dict()
 
     settings_types['print_info'] = 'bool'
     settings_default['print_info'] = True
@@ -45,6 +46,14 @@ class Modal(BaseSolver):
     settings_default['NumLambda'] = 20  # doubles if use_undamped_modes is False
     settings_description['NumLambda'] = 'Number of modes to retain'
 
+    settings_types['eigensolver'] = 'str'
+    settings_default['eigensolver'] = 'dense'
+    settings_description['eigensolver'] = 'Eigenvalue solver. ``dense`` computes all the modes. ``sparse`` computes ' \
+                                          'only the ``NumLambda`` lowest frequency modes by shift-invert on the ' \
+                                          'sparse mass, damping and stiffness matrices, which is much faster for ' \
+                                          'finely discretised beams'
+    settings_options['eigensolver'] = ['dense', 'sparse']
+
     # output options
     settings_types['write_modes_vtk'] = 'bool'  # write displacements mode shapes in vtk file
     settings_default['write_modes_vtk'] = True
@@ -96,7 +105,7 @@ class Modal(BaseSolver):
     settings_description['rigid_modes_cg'] = 'Not implemente yet'
 
     settings_table = settings_utils.SettingsTable()
-    __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
     def __init__(self):
         self.data = None
@@ -117,7 +126,8 @@ class Modal(BaseSolver):
             self.settings = custom_settings
         settings_utils.to_custom_types(self.settings,
                            self.settings_types,
-                           self.settings_default)
+                           self.settings_default,
+                           options=self.settings_options)
 
         self.rigid_body_motion = self.settings['rigid_body_modes']
 
@@ -178,6 +188,12 @@ class Modal(BaseSolver):
 
             .. math:: \mathbf{A\,\Phi} = \mathbf{\Lambda\,\Phi}.
 
+        With ``eigensolver == 'sparse'``, only the lowest frequency modes are computed by shift-invert on the sparse
+        matrices: the generalised problem :math:`\mathbf{K\,\Phi} = \omega_n^2\mathbf{M\,\Phi}` for the undamped
+        modes and the first order pencil, without inverting :math:`\mathbf{M}`, for the damped modes (see
+        :func:`~sharpy.structure.utils.modalutils.sparse_undamped_modes` and
+        :func:`~sharpy.structure.utils.modalutils.sparse_damped_modes`).
+
         From the eigenvalues, the following system characteristics are provided:
 
             * Natural Frequency: :math:`\omega_n = |\lambda|`
@@ -262,12 +278,9 @@ class Modal(BaseSolver):
 
         # Check if the damping matrix is zero (issue working)
         if self.settings['use_undamped_modes']:
-            zero_FullCglobal = True
-            for i,j in itertools.product(range(num_dof),range(num_dof)):
-                if np.absolute(FullCglobal[i, j]) > np.finfo(float).eps:
-                    zero_FullCglobal = False
-                    warnings.warn('Projecting a system with damping on undamped modal shapes')
-                    break
+            zero_FullCglobal = not np.any(np.absolute(FullCglobal) > np.finfo(float).eps)
+            if not zero_FullCglobal:
+                warnings.warn('Projecting a system with damping on undamped modal shapes')
         # Check if the damping matrix is skew-symmetric
         # skewsymmetric_FullCglobal = True
         # for i in range(num_dof):
@@ -279,11 +292,17 @@ class Modal(BaseSolver):
 
         NumLambda = min(num_dof, self.settings['NumLambda'])
 
+        # the sparse solvers compute fewer eigenpairs than the size of the problem
+        use_sparse = self.settings['eigensolver'] == 'sparse' and NumLambda < num_dof - 4
+
         if self.settings['use_undamped_modes']:
 
             # Solve for eigenvalues (with unit eigenvectors)
-            eigenvalues,eigenvectors=np.linalg.eig(
-                                       np.linalg.solve(FullMglobal,FullKglobal))
+            if use_sparse:
+                eigenvalues, eigenvectors = modalutils.sparse_undamped_modes(FullMglobal, FullKglobal, NumLambda)
+            else:
+                eigenvalues,eigenvectors=np.linalg.eig(
+                                           np.linalg.solve(FullMglobal,FullKglobal))
             eigenvectors_left=None
             # Define vibration frequencies and damping
             freq_natural = np.sqrt(eigenvalues)
@@ -295,16 +314,23 @@ class Modal(BaseSolver):
             damping = np.zeros((NumLambda,))
 
         else:
-            # State-space model
-            Minv_neg = -np.linalg.inv(FullMglobal)
-            A = np.zeros((2*num_dof, 2*num_dof), dtype=ct.c_double, order='F')
-            A[:num_dof, num_dof:] = np.eye(num_dof)
-            A[num_dof:, :num_dof] = np.dot(Minv_neg, FullKglobal)
-            A[num_dof:, num_dof:] = np.dot(Minv_neg, FullCglobal)
-
-            # Solve the eigenvalues problem
-            eigenvalues, eigenvectors_left, eigenvectors = \
-                sc.linalg.eig(A,left=True,right=True)
+            if use_sparse:
+                # a few more eigenvalues than retained such that the last complex conjugate pair is complete
+                Minv_neg = None
+                eigenvalues, eigenvectors_left, eigenvectors = \
+                    modalutils.sparse_damped_modes(FullMglobal, FullCglobal, FullKglobal,
+                                                   min(2*NumLambda + 4, 2*num_dof - 2))
+            else:
+                # State-space model
+                Minv_neg = -np.linalg.inv(FullMglobal)
+                A = np.zeros((2*num_dof, 2*num_dof), dtype=ct.c_double, order='F')
+                A[:num_dof, num_dof:] = np.eye(num_dof)
+                A[num_dof:, :num_dof] = np.dot(Minv_neg, FullKglobal)
+                A[num_dof:, num_dof:] = np.dot(Minv_neg, FullCglobal)
+
+                # Solve the eigenvalues problem
+                eigenvalues, eigenvectors_left, eigenvectors = \
+                    sc.linalg.eig(A,left=True,right=True)
             freq_natural = np.abs(eigenvalues)
             damping = np.zeros_like(freq_natural)
             iiflex = freq_natural > 1e-16*np.mean(freq_natural)  # Pick only structural modes
@@ -353,13 +379,12 @@ class Modal(BaseSolver):
         # Modify rigid body modes for them to be defined wrt the CG
         eigenvectors = modalutils.mode_sign_convention(self.data.structure.boundary_conditions, eigenvectors,
                                                        self.rigid_body_motion)
-        if not eigenvectors_left:
+        t_pa = None  # Transformation matrix from the A frame to the P frame (principal axes of inertia)
+        r_pa = None
+        if eigenvectors_left is None:
             if self.settings['rigid_modes_ppal_axes']:
                 eigenvectors, t_pa, r_pa = modalutils.free_modes_principal_axes(eigenvectors, FullMglobal,
                                                                           return_transform=True)
-            else:
-                t_pa = None  # Transformation matrix from the A frame to the P frame (principal axes of inertia)
-                r_pa = None
         # Scaling
         eigenvectors, eigenvectors_left = self.scale_modes_unit_mass_matrix(eigenvectors, FullMglobal, eigenvectors_left)
 
@@ -373,7 +398,13 @@ class Modal(BaseSolver):
 
         # forces gain matrix (nodal -> modal)
         if not self.settings['use_undamped_modes']:
-            Kin_damp = np.dot(eigenvectors_left[num_dof:, :].T, -Minv_neg)
+            if Minv_neg is None:
+                # M^-T y without inverting the mass matrix
+                lu_mass_transpose = sc.sparse.linalg.splu(sc.sparse.csc_matrix(FullMglobal.T))
+                Kin_damp = (lu_mass_transpose.solve(np.ascontiguousarray(eigenvectors_left[num_dof:, :].real)) +
+                            1j*lu_mass_transpose.solve(np.ascontiguousarray(eigenvectors_left[num_dof:, :].imag))).T
+            else:
+                Kin_damp = np.dot(eigenvectors_left[num_dof:, :].T, -Minv_neg)
         else:
             Kin_damp = None
 
@@ -1,6 +1,8 @@
 import ctypes as ct
 import numpy as np
 import os
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 
 from sharpy.utils.solver_interface import solver, BaseSolver, solver_from_string
 import sharpy.utils.settings as settings_utils
@@ -62,6 +64,22 @@ class NonLinearDynamicMultibody(_BaseStructural):
     settings_default['zero_ini_dot_ddot'] = False
     settings_description['zero_ini_dot_ddot'] = 'Set to zero the position and crv derivatives at the first time step'
 
+    settings_types['sparse_solver'] = 'bool'
+    settings_default['sparse_solver'] = False
+    settings_description['sparse_solver'] = 'Assemble the system in sparse format and solve it with a sparse LU ' \
+                                            'factorisation. With ``write_lm``, the condition numbers are 1-norm estimates'
+
+    settings_types['reuse_factorisation'] = 'bool'
+    settings_default['reuse_factorisation'] = False
+    settings_description['reuse_factorisation'] = 'Reuse the sparse LU factorisation across iterations while the ' \
+                                                  'system matrix changes little (modified Newton). ' \
+                                                  'Only with ``sparse_solver``'
+
+    settings_types['reuse_factorisation_tol'] = 'float'
+    settings_default['reuse_factorisation_tol'] = 1e-2
+    settings_description['reuse_factorisation_tol'] = 'Relative change of the system matrix (Frobenius norm) below ' \
+                                                      'which the factorisation is reused'
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
 
@@ -84,6 +102,11 @@ class NonLinearDynamicMultibody(_BaseStructural):
 
         self.prev_Dq = None
 
+        # Sparse LU factorisation and the matrix it was computed from
+        self.lu = None
+        self.lu_matrix = None
+        self.n_factorisations = 0
+
         self.out_files = None  # dict: containing output_variable:file_path if desired to write output
 
     def initialise(self, data, custom_settings=None, restart=False):
@@ -129,6 +152,8 @@ class NonLinearDynamicMultibody(_BaseStructural):
         self.define_sys_size()
 
         self.prev_Dq = np.zeros((self.sys_size + self.num_LM_eq))
+        self.lu = None
+        self.lu_matrix = None
 
         self.settings['time_integrator_settings']['sys_size'] = self.sys_size
         self.settings['time_integrator_settings']['num_LM_eq'] = self.num_LM_eq
@@ -195,11 +220,21 @@ class NonLinearDynamicMultibody(_BaseStructural):
         Returns:
             MB_Asys (np.ndarray): Matrix of the systems of equations
             MB_Q (np.ndarray): Vector of the systems of equations
+
+        Note:
+            With ``sparse_solver``, the matrices are returned as ``scipy.sparse.csc_matrix``
         """
 
-        MB_M = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
-        MB_C = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
-        MB_K = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+        sparse = self.settings['sparse_solver']
+        if sparse:
+            # Blocks of each body, assembled at the end
+            MB_M = []
+            MB_C = []
+            MB_K = []
+        else:
+            MB_M = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+            MB_C = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+            MB_K = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
         MB_Q = np.zeros((self.sys_size,), dtype=ct.c_double, order='F')
         first_dof = 0
         last_dof = 0
@@ -225,9 +260,14 @@ class NonLinearDynamicMultibody(_BaseStructural):
 
             ############### Assembly into the global matrices
             # Flexible and RBM contribution to Asys
-            MB_M[first_dof:last_dof, first_dof:last_dof] = M.astype(dtype=ct.c_double, copy=True, order='F')
-            MB_C[first_dof:last_dof, first_dof:last_dof] = C.astype(dtype=ct.c_double, copy=True, order='F')
-            MB_K[first_dof:last_dof, first_dof:last_dof] = K.astype(dtype=ct.c_double, copy=True, order='F')
+            if sparse:
+                MB_M.append(sp.coo_matrix(M, dtype=ct.c_double))
+                MB_C.append(sp.coo_matrix(C, dtype=ct.c_double))
+                MB_K.append(sp.coo_matrix(K, dtype=ct.c_double))
+            else:
+                MB_M[first_dof:last_dof, first_dof:last_dof] = M.astype(dtype=ct.c_double, copy=True, order='F')
+                MB_C[first_dof:last_dof, first_dof:last_dof] = C.astype(dtype=ct.c_double, copy=True, order='F')
+                MB_K[first_dof:last_dof, first_dof:last_dof] = K.astype(dtype=ct.c_double, copy=True, order='F')
 
             #Q
             MB_Q[first_dof:last_dof] = Q
@@ -246,11 +286,17 @@ class NonLinearDynamicMultibody(_BaseStructural):
             dt,
             Lambda,
             Lambda_dot,
-            "dynamic")
+            "dynamic",
+            sparse=sparse)
 
         # Include the matrices associated to Lagrange Multipliers
-        MB_C += LM_C[:self.sys_size, :self.sys_size]
-        MB_K += LM_K[:self.sys_size, :self.sys_size]
+        if sparse:
+            MB_M = sp.block_diag(MB_M, format='csc')
+            MB_C = sp.block_diag(MB_C, format='csc') + LM_C[:self.sys_size, :self.sys_size]
+            MB_K = sp.block_diag(MB_K, format='csc') + LM_K[:self.sys_size, :self.sys_size]
+        else:
+            MB_C += LM_C[:self.sys_size, :self.sys_size]
+            MB_K += LM_K[:self.sys_size, :self.sys_size]
         MB_Q += LM_Q[:self.sys_size]
 
         # Only working for non-holonomic constratints
@@ -307,8 +353,8 @@ class NonLinearDynamicMultibody(_BaseStructural):
             return
 
         # TODO the output of this routine is wrong. check at some point.
-        LM_C, LM_K, LM_Q = lagrangeconstraints.generate_lagrange_matrix(self.lc_list, MB_beam, MB_tstep, ts, self.num_LM_eq, self.sys_size, dt, Lambda, Lambda_dot, "dynamic")
-        F = -np.dot(LM_C[:, -self.num_LM_eq:], Lambda_dot) - np.dot(LM_K[:, -self.num_LM_eq:], Lambda)
+        LM_C, LM_K, LM_Q = lagrangeconstraints.generate_lagrange_matrix(self.lc_list, MB_beam, MB_tstep, ts, self.num_LM_eq, self.sys_size, dt, Lambda, Lambda_dot, "dynamic", sparse=self.settings['sparse_solver'])
+        F = -LM_C[:, -self.num_LM_eq:].dot(Lambda_dot) - LM_K[:, -self.num_LM_eq:].dot(Lambda)
 
         first_dof = 0
         for ibody in range(len(MB_beam)):
@@ -327,6 +373,58 @@ class NonLinearDynamicMultibody(_BaseStructural):
             first_dof = last_dof
         # TODO: right now, these forces are only used as an output, they are not read when the multibody is splitted
 
+    def sparse_solve(self, Asys, Q):
+        """
+        Solves ``Asys Dq = -Q`` with a sparse LU factorisation.
+
+        If ``reuse_factorisation``, the last factorisation is used while the relative change of ``Asys`` with respect to
+        the factorised matrix is below ``reuse_factorisation_tol``. The iterations then become a modified Newton scheme:
+        the converged solution is unchanged but more iterations may be needed.
+
+        Args:
+            Asys (scipy.sparse.csc_matrix): Matrix of the system of equations
+            Q (np.ndarray): Vector of the system of equations
+
+        Returns:
+            np.ndarray: Increment of the state ``Dq``
+        """
+        if not self.settings['reuse_factorisation']:
+            self.n_factorisations += 1
+            return spla.splu(Asys).solve(-Q)
+
+        if self.lu is not None:
+            change = spla.norm(Asys - self.lu_matrix)/spla.norm(self.lu_matrix)
+            if change < self.settings['reuse_factorisation_tol']:
+                return self.lu.solve(-Q)
+
+        self.lu = spla.splu(Asys)
+        self.lu_matrix = Asys
+        self.n_factorisations += 1
+        return self.lu.solve(-Q)
+
+    def __getstate__(self):
+        # the SuperLU factorisation cannot be pickled, it is computed again after unpickling
+        state = self.__dict__.copy()
+        state['lu'] = None
+        state['lu_matrix'] = None
+        return state
+
+    @staticmethod
+    def sparse_cond_estimate(A):
+        """
+        Estimate of the 1-norm condition number of a sparse matrix that avoids computing its inverse
+        """
+        try:
+            lu = spla.splu(sp.csc_matrix(A))
+        except RuntimeError:
+            # Exactly singular
+            return np.inf
+        inv_A = spla.LinearOperator(A.shape,
+                                    matvec=lu.solve,
+                                    rmatvec=lambda x: lu.solve(x, trans='T'),
+                                    dtype=A.dtype)
+        return spla.onenormest(A)*spla.onenormest(inv_A)
+
     def write_lm_cond_num(self, iteration, Lambda, Lambda_dot, Lambda_ddot, cond_num, cond_num_lm):
         # Maybe not the most efficient way to output this, as files are opened and closed every time data is written
         # However, containing the writing in the with statement prevents from files remaining open in the previous
@@ -421,22 +519,36 @@ class NonLinearDynamicMultibody(_BaseStructural):
                                                                 Lambda_dot,
                                                                 MBdict)
 
-            Asys, Q = self.time_integrator.build_matrix(MB_M, MB_C, MB_K, MB_Q,
-                                                        kBnh, LM_Q)
+            if self.settings['sparse_solver']:
+                Asys, Q = self.time_integrator.build_sparse_matrix(MB_M, MB_C, MB_K, MB_Q,
+                                                                   kBnh, LM_Q)
+            else:
+                Asys, Q = self.time_integrator.build_matrix(MB_M, MB_C, MB_K, MB_Q,
+                                                            kBnh, LM_Q)
 
             if self.settings['write_lm']:
-                cond_num = np.linalg.cond(Asys[:self.sys_size, :self.sys_size])
-                cond_num_lm = np.linalg.cond(Asys)
+                if self.settings['sparse_solver']:
+                    cond_num = self.sparse_cond_estimate(Asys[:self.sys_size, :self.sys_size])
+                    cond_num_lm = self.sparse_cond_estimate(Asys)
+                else:
+                    cond_num = np.linalg.cond(Asys[:self.sys_size, :self.sys_size])
+                    cond_num_lm = np.linalg.cond(Asys)
 
             if self.settings['rigid_bodies']:
                 rigid_LM_dofs = self.rigid_dofs + (np.arange(self.num_LM_eq, dtype=int) + self.sys_size).tolist()
 
-                rigid_Asys = Asys[np.ix_(rigid_LM_dofs, rigid_LM_dofs)].copy()
                 rigid_Q = Q[rigid_LM_dofs].copy()
-                rigid_Dq = np.linalg.solve(rigid_Asys, -rigid_Q)
+                if self.settings['sparse_solver']:
+                    rigid_Asys = Asys[rigid_LM_dofs, :][:, rigid_LM_dofs].tocsc()
+                    rigid_Dq = spla.spsolve(rigid_Asys, -rigid_Q)
+                else:
+                    rigid_Asys = Asys[np.ix_(rigid_LM_dofs, rigid_LM_dofs)].copy()
+                    rigid_Dq = np.linalg.solve(rigid_Asys, -rigid_Q)
                 Dq = np.zeros((self.sys_size + self.num_LM_eq))
                 Dq[rigid_LM_dofs] = rigid_Dq.copy()
 
+            elif self.settings['sparse_solver']:
+                Dq = self.sparse_solve(Asys, Q)
             else:
                 Dq = np.linalg.solve(Asys, -Q)
 
@@ -512,3 +624,15 @@ class NonLinearDynamicMultibody(_BaseStructural):
         self.Lambda_ddot = Lambda_ddot.astype(dtype=ct.c_double, copy=True, order='F')
 
         return self.data
+
+    def checkpoint_state(self):
+        return {'Lambda': self.Lambda,
+                'Lambda_dot': self.Lambda_dot,
+                'Lambda_ddot': self.Lambda_ddot,
+                'prev_Dq': self.prev_Dq}
+
+    def restore_checkpoint_state(self, state):
+        self.Lambda = state['Lambda'].astype(dtype=ct.c_double, copy=True, order='F')
+        self.Lambda_dot = state['Lambda_dot'].astype(dtype=ct.c_double, copy=True, order='F')
+        self.Lambda_ddot = state['Lambda_ddot'].astype(dtype=ct.c_double, copy=True, order='F')
+        self.prev_Dq = state['prev_Dq'].copy()
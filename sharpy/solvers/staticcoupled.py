@@ -187,16 +187,14 @@ class StaticCoupled(BaseSolver):
                 self.data = self.aero_solver.run()
 
                 # map force
-                struct_forces = mapping.aero2struct_force_mapping(
-                    self.data.aero.timestep_info[self.data.ts].forces,
-                    self.data.aero.struct2aero_mapping,
+                struct_forces = mapping.get_force_mapping(
+                    self.data.aero,
+                    self.data.aero.timestep_info[self.data.ts].dimensions).map_forces(
+                    [self.data.aero.timestep_info[self.data.ts].forces],
                     self.data.aero.timestep_info[self.data.ts].zeta,
                     self.data.structure.timestep_info[self.data.ts].pos,
                     self.data.structure.timestep_info[self.data.ts].psi,
-                    self.data.structure.node_master_elem,
-                    self.data.structure.connectivities,
-                    self.data.structure.timestep_info[self.data.ts].cag(),
-                    self.data.aero.data_dict)
+                    self.data.structure.timestep_info[self.data.ts].cag())[0]
                         
                 if self.correct_forces:
                     struct_forces = \
@@ -207,17 +205,15 @@ class StaticCoupled(BaseSolver):
 
                 # map nonlifting forces to structural nodes
                 if self.settings['nonlifting_body_interactions']:
-                    struct_forces += mapping.aero2struct_force_mapping(
-                        self.data.nonlifting_body.timestep_info[self.data.ts].forces,
-                        self.data.nonlifting_body.struct2aero_mapping,
+                    struct_forces += mapping.get_force_mapping(
+                        self.data.nonlifting_body,
+                        self.data.nonlifting_body.timestep_info[self.data.ts].dimensions).map_forces(
+                        [self.data.nonlifting_body.timestep_info[self.data.ts].forces],
                         self.data.nonlifting_body.timestep_info[self.data.ts].zeta,
                         self.data.structure.timestep_info[self.data.ts].pos,
                         self.data.structure.timestep_info[self.data.ts].psi,
-                        self.data.structure.node_master_elem,
-                        self.data.structure.connectivities,
                         self.data.structure.timestep_info[self.data.ts].cag(),
-                        self.data.nonlifting_body.data_dict,
-                        skip_moments_generated_by_forces = True)
+                        skip_moments_generated_by_forces=True)[0]
 
                 self.data.aero.timestep_info[self.data.ts].aero_steady_forces_beam_dof = struct_forces
                 self.data.structure.timestep_info[self.data.ts].postproc_node['aero_steady_forces'] = struct_forces  # B
@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.ndimage
 import scipy.optimize
 import scipy.signal
 
@@ -7,9 +8,129 @@ import sharpy.utils.settings as settings_utils
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.generator_interface as gen_interface
 import sharpy.utils.cout_utils as cout
+import sharpy.utils.checkpoint as checkpoint
 from sharpy.utils.constants import vortex_radius_def
 
 
+def wiener_last_sample(series, mysize=None):
+    """
+    Last sample of ``scipy.signal.wiener(series[:, i, j], mysize)`` for all the series ``i, j`` at once.
+
+    Args:
+        series (np.ndarray): Time series along the first axis, ``(n_samples, ...)``
+        mysize (int): Odd size of the filter window. Defaults to 3, as in ``scipy.signal.wiener``
+
+    Returns:
+        np.ndarray: Filtered last sample, ``series.shape[1:]``
+    """
+    if mysize is None:
+        mysize = 3
+    window = np.ones((mysize,))
+    local_mean = scipy.ndimage.correlate1d(series, window, axis=0, mode='constant') / mysize
+    local_var = scipy.ndimage.correlate1d(series**2, window, axis=0, mode='constant') / mysize - local_mean**2
+    noise = np.mean(local_var, axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = (series[-1] - local_mean[-1])*(1 - noise/local_var[-1]) + local_mean[-1]
+    return np.where(local_var[-1] < noise, local_mean[-1], res)
+
+
+class GammaDotFilter(object):
+    """
+    Wiener filter of the ``gamma_dot`` of every bound panel along its time history.
+
+    The ``gamma_dot`` of the past time steps is kept in a ring buffer per surface, of shape ``(window, M, N)``, and all
+    the panels are filtered at once. Hence, the time history does not need to be scanned at every time step and the
+    cost per step is constant. If ``window == 0`` the whole time history is kept, as in
+    :meth:`StepUvlm.filter_gamma_dot`.
+
+    Args:
+        window (int): Number of past time steps used by the filter. ``0`` for the whole history.
+        filter_param (int): Size of the Wiener filter window
+    """
+    def __init__(self, window=0, filter_param=None):
+        self.window = window
+        self.filter_param = filter_param
+
+        self.buffers = None
+        self.n_stored = 0  # number of past time steps in the buffers
+        self.i_next = 0  # position in the buffers of the next time step
+        self.n_history = 0  # number of entries of the time history already buffered
+
+    def reset(self):
+        self.buffers = None
+        self.n_stored = 0
+        self.i_next = 0
+        self.n_history = 0
+
+    def append(self, gamma_dot):
+        if self.buffers is None:
+            capacity = self.window if self.window else 64
+            self.buffers = [np.zeros((capacity,) + surf_gamma_dot.shape) for surf_gamma_dot in gamma_dot]
+        elif not self.window and self.n_stored == self.buffers[0].shape[0]:
+            # whole history: the buffers grow, they never wrap around
+            self.buffers = [np.concatenate((buffer, np.zeros_like(buffer))) for buffer in self.buffers]
+
+        capacity = self.buffers[0].shape[0]
+        for buffer, surf_gamma_dot in zip(self.buffers, gamma_dot):
+            buffer[self.i_next] = surf_gamma_dot
+        self.n_stored = min(self.n_stored + 1, capacity)
+        self.i_next = (self.i_next + 1) % capacity
+
+    def update(self, history, tstep):
+        """
+        Buffers the time steps appended to ``history`` since the last call. ``tstep``, whose ``gamma_dot`` is being
+        filtered, is not buffered even if it is the last entry of the history.
+        """
+        if len(history) < self.n_history:
+            # the time history has been reset
+            self.reset()
+
+        n_history = len(history)
+        if n_history and history[-1] is tstep:
+            n_history -= 1
+        for past_tstep in history[self.n_history:n_history]:
+            if past_tstep is not None:
+                self.append(past_tstep.gamma_dot)
+        self.n_history = n_history
+
+    def filter(self, tstep, history):
+        """
+        Filters ``tstep.gamma_dot`` in place
+        """
+        self.update(history, tstep)
+        # as in filter_gamma_dot, the current time step appears twice if it is also in the history
+        n_current = 2 if len(history) and history[-1] is tstep else 1
+
+        if self.buffers is not None:
+            capacity = self.buffers[0].shape[0]
+            order = (self.i_next - self.n_stored + np.arange(self.n_stored)) % capacity
+        for i_surf, surf_gamma_dot in enumerate(tstep.gamma_dot):
+            current = np.repeat(surf_gamma_dot[None, :, :], n_current, axis=0)
+            if self.buffers is None:
+                series = current
+            else:
+                series = np.concatenate((self.buffers[i_surf][order], current))
+            surf_gamma_dot[:] = wiener_last_sample(series, self.filter_param)
+
+    def checkpoint_state(self):
+        state = {'n_stored': self.n_stored,
+                 'i_next': self.i_next,
+                 'n_history': self.n_history}
+        if self.buffers is not None:
+            state['buffers'] = self.buffers
+        return state
+
+    def restore_checkpoint_state(self, state):
+        self.n_stored = int(state['n_stored'])
+        self.i_next = int(state['i_next'])
+        self.n_history = int(state['n_history'])
+        if 'buffers' in state:
+            self.buffers = [buffer.copy() for buffer in checkpoint.state_list(state['buffers'])]
+        else:
+            self.buffers = None
+
+
 @solver
 class StepUvlm(BaseSolver):
     """
@@ -87,6 +208,12 @@ class StepUvlm(BaseSolver):
     settings_description['gamma_dot_filtering'] = 'Filtering parameter for the Welch filter for the Gamma_dot ' \
                                                   'estimation. Used when ``unsteady_force_contribution`` is ``on``.'
 
+    settings_types['gamma_dot_filtering_window'] = 'int'
+    settings_default['gamma_dot_filtering_window'] = 0
+    settings_description['gamma_dot_filtering_window'] = 'Number of past time steps used by the Gamma_dot filter. ' \
+                                                         'The cost per time step is constant if set. If ``0``, the ' \
+                                                         'whole time history is used.'
+
     settings_types['rho'] = 'float'
     settings_default['rho'] = 1.225
     settings_description['rho'] = 'Air density'
@@ -158,6 +285,7 @@ class StepUvlm(BaseSolver):
         self.data = None
         self.settings = None
         self.velocity_generator = None
+        self.gamma_dot_filter = None
 
     def initialise(self, data, custom_settings=None, restart=False):
         """
@@ -194,6 +322,12 @@ class StepUvlm(BaseSolver):
                         2)
                     self.settings['gamma_dot_filtering'] += 1
 
+        if self.settings['gamma_dot_filtering'] is None or self.settings['gamma_dot_filtering'] > 0:
+            self.gamma_dot_filter = GammaDotFilter(self.settings['gamma_dot_filtering_window'],
+                                                   self.settings['gamma_dot_filtering'])
+        else:
+            self.gamma_dot_filter = None
+
         # init velocity generator
         velocity_generator_type = gen_interface.generator_from_string(
             self.settings['velocity_field_generator'])
@@ -270,15 +404,8 @@ class StepUvlm(BaseSolver):
             self.data.aero.compute_gamma_dot(dt,
                                              aero_tstep,
                                              self.data.aero.timestep_info[-3:])
-            if self.settings['gamma_dot_filtering'] is None:
-                self.filter_gamma_dot(aero_tstep,
-                                      self.data.aero.timestep_info,
-                                      None)
-            elif self.settings['gamma_dot_filtering'] > 0:
-                self.filter_gamma_dot(
-                    aero_tstep,
-                    self.data.aero.timestep_info,
-                    self.settings['gamma_dot_filtering'])
+            if self.gamma_dot_filter is not None:
+                self.gamma_dot_filter.filter(aero_tstep, self.data.aero.timestep_info)
             uvlmlib.uvlm_calculate_unsteady_forces(aero_tstep,
                                                    structure_tstep,
                                                    self.settings,
@@ -289,6 +416,15 @@ class StepUvlm(BaseSolver):
                 aero_tstep.gamma_dot[i_surf][:] = 0.0
         return self.data
 
+    def checkpoint_state(self):
+        if self.gamma_dot_filter is None:
+            return None
+        return {'gamma_dot_filter': self.gamma_dot_filter.checkpoint_state()}
+
+    def restore_checkpoint_state(self, state):
+        if self.gamma_dot_filter is not None and 'gamma_dot_filter' in state:
+            self.gamma_dot_filter.restore_checkpoint_state(state['gamma_dot_filter'])
+
     def add_step(self):
         self.data.aero.add_timestep()
         if self.settings['nonlifting_body_interactions']:              
@@ -322,17 +458,8 @@ class StepUvlm(BaseSolver):
 
     @staticmethod
     def filter_gamma_dot(tstep, history, filter_param):
-        clean_history = [x for x in history if x is not None]
-        series_length = len(clean_history) + 1
-        for i_surf in range(len(tstep.zeta)):
-            n_rows, n_cols = tstep.gamma[i_surf].shape
-            for i in range(n_rows):
-                for j in range(n_cols):
-                    series = np.zeros((series_length,))
-                    for it in range(series_length - 1):
-                        series[it] = clean_history[it].gamma_dot[i_surf][i, j]
-                    series[-1] = tstep.gamma_dot[i_surf][i, j]
-
-                    # filter
-                    tstep.gamma_dot[i_surf][i, j] = scipy.signal.wiener(
-                        series, filter_param)[-1]
+        """
+        Filters ``tstep.gamma_dot`` with its whole time history in ``history``. Within the solver, a
+        :class:`GammaDotFilter` is used instead so that the history is not read again at every time step.
+        """
+        GammaDotFilter(0, filter_param).filter(tstep, history)
@@ -1,5 +1,6 @@
 import numpy as np
 import ctypes as ct
+import scipy.sparse as sp
 
 import sharpy.utils.settings as settings_utils
 from sharpy.utils.solver_interface import solver
@@ -35,6 +36,10 @@ class _BaseTimeIntegrator():
         pass
 
 
+    def build_sparse_matrix(self, M, C, K, Q, kBnh, LM_Q):
+        pass
+
+
     def corrector(self, q, dqdt, dqddt, Dq):
         pass
 
@@ -121,6 +126,19 @@ class NewmarkBeta(_BaseTimeIntegrator):
 
         return Asys, Qout
 
+    def build_sparse_matrix(self, M, C, K, Q, kBnh, LM_Q):
+        """
+        Equivalent to ``build_matrix`` for ``scipy.sparse`` matrices. Returns ``Asys`` in CSC format
+        """
+        Asys = K + C*(self.gamma/(self.beta*self.dt)) + M*(1./(self.beta*self.dt*self.dt))
+        if self.num_LM_eq:
+            Asys = sp.bmat([[Asys, kBnh.T],
+                            [(self.gamma/self.beta/self.dt)*kBnh, None]], format='csc')
+        else:
+            Asys = sp.csc_matrix(Asys)
+
+        return Asys, np.concatenate((Q, LM_Q)).astype(dtype=ct.c_double)
+
     def corrector(self, q, dqdt, dqddt, Dq):
 
         sys_size = self.sys_size
@@ -228,6 +246,21 @@ class GeneralisedAlpha(_BaseTimeIntegrator):
 
         return Asys, Qout
 
+    def build_sparse_matrix(self, M, C, K, Q, kBnh, LM_Q):
+        """
+        Equivalent to ``build_matrix`` for ``scipy.sparse`` matrices. Returns ``Asys`` in CSC format
+        """
+        Asys = (K*self.om_af +
+                C*(self.gamma*self.om_af/self.beta/self.dt) +
+                M*(self.om_am/(self.beta*self.dt*self.dt)))
+        if self.num_LM_eq:
+            Asys = sp.bmat([[Asys, kBnh.T],
+                            [(self.gamma*self.om_af/self.beta/self.dt)*kBnh, None]], format='csc')
+        else:
+            Asys = sp.csc_matrix(Asys)
+
+        return Asys, np.concatenate((Q, LM_Q)).astype(dtype=ct.c_double)
+
     def corrector(self, q, dqdt, dqddt, Dq):
 
         sys_size = self.sys_size
@@ -39,6 +39,7 @@ import sharpy.utils.cout_utils as cout
 import os
 import ctypes as ct
 import numpy as np
+import scipy.sparse as sp
 import sharpy.utils.algebra as ag
 from sharpy.utils.settings import set_value_or_default
 
@@ -104,6 +105,65 @@ def initialise_lc(lc_name, print_info=True):
     return lc
 
 
+class SparseLagrangeMatrix(object):
+    """
+    SparseLagrangeMatrix
+
+    Sparse replacement of the dense ``LM_C`` and ``LM_K`` matrices. It supports the in-place additions of blocks
+    (``LM_K[a:b, c:d] += value``) performed by the Lagrange Constraints and stores the non-zero entries as COO triplets.
+    Repeated entries are summed when the matrix is converted.
+
+    Args:
+        shape (tuple): shape of the matrix
+    """
+    def __init__(self, shape):
+        self.shape = shape
+        self.rows = []
+        self.cols = []
+        self.values = []
+
+    def __getitem__(self, key):
+        return _SparseLagrangeBlock(self, key)
+
+    def __setitem__(self, key, value):
+        # Final step of ``LM_K[a:b, c:d] += value``, the block has already been added
+        if not (isinstance(value, _SparseLagrangeBlock) and value.matrix is self):
+            raise NotImplementedError('Only in-place additions of blocks are supported by SparseLagrangeMatrix')
+
+    def add(self, key, value):
+        """
+        Adds ``value`` to the block defined by the slices in ``key``
+        """
+        rows = np.arange(*key[0].indices(self.shape[0]))
+        cols = np.arange(*key[1].indices(self.shape[1]))
+        value = np.broadcast_to(value, (len(rows), len(cols)))
+        i_row, i_col = np.nonzero(value)
+        self.rows.append(rows[i_row])
+        self.cols.append(cols[i_col])
+        self.values.append(value[i_row, i_col])
+
+    def tocsc(self):
+        if len(self.values) == 0:
+            return sp.csc_matrix(self.shape, dtype=ct.c_double)
+        return sp.coo_matrix((np.concatenate(self.values),
+                              (np.concatenate(self.rows), np.concatenate(self.cols))),
+                             shape=self.shape, dtype=ct.c_double).tocsc()
+
+
+class _SparseLagrangeBlock(object):
+    def __init__(self, matrix, key):
+        self.matrix = matrix
+        self.key = key
+
+    def __iadd__(self, value):
+        self.matrix.add(self.key, value)
+        return self
+
+    def __isub__(self, value):
+        self.matrix.add(self.key, -np.asarray(value))
+        return self
+
+
 class BaseLagrangeConstraint(metaclass=ABCMeta):
     __doc__ = """
     BaseLagrangeConstraint
@@ -2018,7 +2078,7 @@ def define_num_LM_eq(lc_list):
     return num_LM_eq
 
 
-def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size, dt, Lambda, Lambda_dot, dynamic_or_static):
+def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size, dt, Lambda, Lambda_dot, dynamic_or_static, sparse=False):
     """
     generate_lagrange_matrix
 
@@ -2035,6 +2095,7 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
         Lambda(np.ndarray): list of Lagrange multipliers values
         Lambda_dot(np.ndarray): list of the first derivative of the Lagrange multipliers values
         dynamic_or_static (str): string defining if the computation is dynamic or static
+        sparse (bool): return ``LM_C`` and ``LM_K`` as ``scipy.sparse.csc_matrix``
 
     Returns:
         LM_C (np.ndarray): Damping matrix associated to the Lagrange Multipliers equations
@@ -2042,8 +2103,12 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
         LM_Q (np.ndarray): Vector of independent terms associated to the Lagrange Multipliers equations
     """
     # Initialize matrices
-    LM_C = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
-    LM_K = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
+    if sparse:
+        LM_C = SparseLagrangeMatrix((sys_size + num_LM_eq, sys_size + num_LM_eq))
+        LM_K = SparseLagrangeMatrix((sys_size + num_LM_eq, sys_size + num_LM_eq))
+    else:
+        LM_C = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
+        LM_K = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
     LM_Q = np.zeros((sys_size + num_LM_eq,),dtype=ct.c_double, order = 'F')
 
     # Define the matrices associated to the constratints
@@ -2076,6 +2141,8 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
                         Lambda=Lambda,
                         Lambda_dot=Lambda_dot)
 
+    if sparse:
+        return LM_C.tocsc(), LM_K.tocsc(), LM_Q
     return LM_C, LM_K, LM_Q
 
 
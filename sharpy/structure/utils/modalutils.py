@@ -1,4 +1,7 @@
 import numpy as np
+import scipy.optimize
+import scipy.sparse as sp
+import scipy.sparse.linalg as spalg
 import sharpy.utils.cout_utils as cout
 import sharpy.utils.algebra as algebra
 from tvtk.api import tvtk, write_data
@@ -656,3 +659,127 @@ def modes_to_cg_ref(phi, M, rigid_body_motion=False, use_euler=False):
     phit[-num_rig_dof:, :num_rig_dof] = phirr
 
     return phit
+
+
+def is_symmetric(matrix, rtol=1e-10):
+    """
+    Checks whether a dense or sparse matrix is symmetric to a tolerance relative to its largest entry
+    """
+    return abs(matrix - matrix.T).max() <= rtol * abs(matrix).max()
+
+
+def frequency_scale(mass_matrix, stiffness_matrix):
+    r"""
+    Characteristic frequency of the structure, :math:`\sqrt{\overline{|K_{ii}|}/\overline{|M_{ii}|}}`, used to
+    scale the spectral shift of the sparse eigenvalue solvers.
+    """
+    return np.sqrt(np.abs(stiffness_matrix.diagonal()).mean() / np.abs(mass_matrix.diagonal()).mean())
+
+
+def shift_invert_eigs(a, b, num_modes, sigma=0.):
+    r"""
+    Eigenvalues and right eigenvectors of the pencil :math:`\mathbf{a}\phi = \lambda\mathbf{b}\phi` closest to
+    ``sigma``
+
+    Only ``num_modes`` eigenpairs are computed with ARPACK in shift-invert mode: the largest eigenvalues :math:`\mu`
+    of :math:`(\mathbf{a} - \sigma\mathbf{b})^{-1}\mathbf{b}` correspond to the eigenvalues of the pencil closest
+    to the shift, :math:`\lambda = \sigma + 1/\mu`. Only the sparse LU factorisation of
+    :math:`\mathbf{a} - \sigma\mathbf{b}` is required, and neither matrix needs to be symmetric.
+
+    Args:
+        a (scipy.sparse.spmatrix): Left hand side matrix.
+        b (scipy.sparse.spmatrix): Right hand side matrix.
+        num_modes (int): Number of eigenpairs to compute. Needs to be smaller than the size of the problem minus one.
+        sigma (float): Real shift.
+
+    Returns:
+        tuple: Eigenvalues and eigenvectors (by columns).
+    """
+    lu = spalg.splu(sp.csc_matrix(a - sigma * b))
+    operator = spalg.LinearOperator(a.shape, matvec=lambda x: lu.solve(b.dot(x)), dtype=float)
+    mu, eigenvectors = spalg.eigs(operator, k=num_modes, which='LM')
+
+    return sigma + 1. / mu, eigenvectors
+
+
+def sparse_undamped_modes(mass_matrix, stiffness_matrix, num_modes):
+    r"""
+    Lowest frequency undamped modes, solution of :math:`\mathbf{K}\phi = \omega^2\mathbf{M}\phi`
+
+    The eigenvalues closest to a small negative shift are found by shift-invert on the sparse matrices, with ``eigsh``
+    if both matrices are symmetric and with :func:`shift_invert_eigs` otherwise. The negative shift keeps
+    :math:`\mathbf{K} - \sigma\mathbf{M}` non-singular in the presence of rigid body modes.
+
+    Args:
+        mass_matrix (np.ndarray or scipy.sparse.spmatrix): Mass matrix.
+        stiffness_matrix (np.ndarray or scipy.sparse.spmatrix): Stiffness matrix.
+        num_modes (int): Number of modes to compute.
+
+    Returns:
+        tuple: Eigenvalues :math:`\omega^2` and eigenvectors (by columns), unordered. These are real unless the
+        unsymmetric problem results in complex eigenvalues.
+    """
+    mass_matrix = sp.csc_matrix(mass_matrix)
+    stiffness_matrix = sp.csc_matrix(stiffness_matrix)
+    sigma = -(1e-2 * frequency_scale(mass_matrix, stiffness_matrix)) ** 2
+
+    if is_symmetric(mass_matrix) and is_symmetric(stiffness_matrix):
+        return spalg.eigsh(stiffness_matrix, k=num_modes, M=mass_matrix, sigma=sigma, which='LM')
+
+    eigenvalues, eigenvectors = shift_invert_eigs(stiffness_matrix, mass_matrix, num_modes, sigma=sigma)
+    if np.all(np.abs(eigenvalues.imag) <= 1e-10 * np.abs(eigenvalues).max()):
+        eigenvalues = eigenvalues.real
+        eigenvectors = eigenvectors.real
+    return eigenvalues, eigenvectors
+
+
+def sparse_damped_modes(mass_matrix, damping_matrix, stiffness_matrix, num_modes):
+    r"""
+    Lowest frequency damped modes of the first order system
+
+    .. math:: \begin{bmatrix} \mathbf{I} & \mathbf{0} \\ \mathbf{0} & \mathbf{M} \end{bmatrix} \dot{\mathbf{x}} =
+        \begin{bmatrix} \mathbf{0} & \mathbf{I} \\ -\mathbf{K} & -\mathbf{C} \end{bmatrix} \mathbf{x}
+
+    found by shift-invert (:func:`shift_invert_eigs`) on the sparse pencil, without inverting the mass matrix. The
+    left eigenvectors are found from the transposed pencil and matched to the right ones by their eigenvalues.
+    Within groups of repeated eigenvalues, the left eigenvectors are transformed such that they are bi-orthogonal to
+    the right eigenvectors.
+
+    Args:
+        mass_matrix (np.ndarray or scipy.sparse.spmatrix): Mass matrix.
+        damping_matrix (np.ndarray or scipy.sparse.spmatrix): Damping matrix.
+        stiffness_matrix (np.ndarray or scipy.sparse.spmatrix): Stiffness matrix.
+        num_modes (int): Number of eigenvalues to compute, counting each of a complex conjugate pair.
+
+    Returns:
+        tuple: Eigenvalues, left eigenvectors and right eigenvectors of the state matrix, unordered. As with
+        ``scipy.linalg.eig``, the left eigenvectors :math:`\mathbf{y}` satisfy
+        :math:`\mathbf{y}^H\mathbf{A} = \lambda\mathbf{y}^H`.
+    """
+    num_dof = mass_matrix.shape[0]
+    mass_matrix = sp.csc_matrix(mass_matrix)
+    eye = sp.identity(num_dof, format='csc')
+    a = sp.bmat([[None, eye], [-sp.csc_matrix(stiffness_matrix), -sp.csc_matrix(damping_matrix)]], format='csc')
+    b = sp.block_diag((eye, mass_matrix), format='csc')
+    sigma = -1e-2 * frequency_scale(mass_matrix, stiffness_matrix)
+
+    eigenvalues, eigenvectors = shift_invert_eigs(a, b, num_modes, sigma=sigma)
+
+    # right eigenvectors z of the transposed pencil, the left eigenvectors of A are y = b^T z
+    eigenvalues_left, eigenvectors_left = shift_invert_eigs(a.T, b.T, num_modes, sigma=sigma)
+    match = scipy.optimize.linear_sum_assignment(np.abs(eigenvalues[:, None] - eigenvalues_left[None, :]))[1]
+    eigenvectors_left = b.T.dot(eigenvectors_left[:, match])
+
+    # bi-orthogonalise repeated eigenvalues
+    tolerance = 1e-8 * np.abs(eigenvalues).max()
+    grouped = np.zeros(num_modes, dtype=bool)
+    for i_mode in range(num_modes):
+        if grouped[i_mode]:
+            continue
+        group = np.where(np.abs(eigenvalues - eigenvalues[i_mode]) <= tolerance)[0]
+        grouped[group] = True
+        if len(group) > 1:
+            product = eigenvectors_left[:, group].T.dot(eigenvectors[:, group])
+            eigenvectors_left[:, group] = np.linalg.solve(product, eigenvectors_left[:, group].T).T
+
+    return eigenvalues, eigenvectors_left.conj(), eigenvectors
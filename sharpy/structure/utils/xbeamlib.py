@@ -21,6 +21,28 @@ doubleP = ct.POINTER(ct.c_double)
 intP = ct.POINTER(ct.c_int)
 charP = ct.POINTER(ct.c_char_p)
 
+# all the library functions are subroutines: the return type is declared once rather than at every call
+for _function_name in ('cbeam3_asbly_dynamic_python',
+                       'cbeam3_asbly_static_python',
+                       'cbeam3_correct_gravity_forces_python',
+                       'cbeam3_loads',
+                       'cbeam3_solv_disp2state_python',
+                       'cbeam3_solv_modal_python',
+                       'cbeam3_solv_nlndyn_python',
+                       'cbeam3_solv_nlndyn_step_python',
+                       'cbeam3_solv_nlnstatic_python',
+                       'cbeam3_solv_state2disp_python',
+                       'xbeam3_asbly_dynamic_python',
+                       'xbeam_solv_couplednlndyn_python',
+                       'xbeam_solv_coupledrigid_step_python',
+                       'xbeam_solv_nlndyn_init_python',
+                       'xbeam_solv_nlndyn_step_python'):
+    try:
+        getattr(xbeamlib, _function_name).restype = None
+    except AttributeError:
+        # not available in this version of the library
+        pass
+
 
 class Xbopts(ct.Structure):
     """Structure skeleton for options input in xbeam
@@ -74,12 +96,37 @@ class Xbopts(ct.Structure):
         self.relaxation_factor = ct.c_double(0.3)
 
 
+_xbopts_cache = ct_utils.StructureCache()
+
+
+def get_xbopts(**fields):
+    """
+    Returns an ``Xbopts`` structure with ``fields`` set on top of the default options.
+
+    The structure is built the first time a combination of fields is requested and shared afterwards, so that the
+    solvers called at every time step do not rebuild it. It must not be modified by the caller.
+
+    Args:
+        **fields: Values of the ``Xbopts`` fields (as Python, ``numpy`` or ``ctypes`` scalars)
+
+    Returns:
+        Xbopts: Options structure
+    """
+    def build():
+        field_types = dict(Xbopts._fields_)
+        xbopts = Xbopts()
+        for name, value in fields.items():
+            setattr(xbopts, name, field_types[name](ct_utils.hashable_setting(value)))
+        return xbopts
+
+    return _xbopts_cache.get(tuple(sorted(fields.items())), build)
+
+
 def cbeam3_solv_nlnstatic(beam, settings, ts):
     """@brief Python wrapper for f_cbeam3_solv_nlnstatic
      Alfonso del Carre
     """
     f_cbeam3_solv_nlnstatic = xbeamlib.cbeam3_solv_nlnstatic_python
-    f_cbeam3_solv_nlnstatic.restype = None
 
     n_elem = ct.c_int(beam.num_elem)
     n_nodes = ct.c_int(beam.num_node)
@@ -146,7 +193,6 @@ def cbeam3_loads(beam, timestep):
         tuple: Tuple containing the ``strains`` and ``loads``.
     """
     f_cbeam3_loads = xbeamlib.cbeam3_loads
-    f_cbeam3_loads.restype = None
 
     n_elem = ct.c_int(beam.num_elem)
     n_nodes = ct.c_int(beam.num_node)
@@ -173,7 +219,6 @@ def cbeam3_loads(beam, timestep):
 
 def cbeam3_solv_nlndyn(beam, settings):
     f_cbeam3_solv_nlndyn = xbeamlib.cbeam3_solv_nlndyn_python
-    f_cbeam3_solv_nlndyn.restype = None
 
     n_elem = ct.c_int(beam.num_elem)
     n_nodes = ct.c_int(beam.num_node)
@@ -264,7 +309,6 @@ def cbeam3_solv_nlndyn(beam, settings):
 
 def cbeam3_step_nlndyn(beam, settings, ts, tstep=None, dt=None):
     f_cbeam3_solv_nlndyn_step = xbeamlib.cbeam3_solv_nlndyn_step_python
-    f_cbeam3_solv_nlndyn_step.restype = None
 
     if tstep is None:
         tstep = beam.timestep_info[-1]
@@ -275,26 +319,24 @@ def cbeam3_step_nlndyn(beam, settings, ts, tstep=None, dt=None):
     n_stiff = ct.c_int(beam.n_stiff)
     num_dof = ct.c_int(len(tstep.q) - 10)
 
-    xbopts = Xbopts()
-    xbopts.PrintInfo = ct.c_bool(settings['print_info'])
-    xbopts.Solution = ct.c_int(312)
-    xbopts.MaxIterations = ct.c_int(settings['max_iterations'])
-    xbopts.NumLoadSteps = ct.c_int(settings['num_load_steps'])
-    xbopts.NumGauss = ct.c_int(0)
-    xbopts.DeltaCurved = ct.c_double(settings['delta_curved'])
-    xbopts.MinDelta = ct.c_double(settings['min_delta'])
-    xbopts.abs_threshold = ct.c_double(settings['abs_threshold'])
-    xbopts.NewmarkDamp = ct.c_double(settings['newmark_damp'])
-    xbopts.gravity_on = ct.c_bool(settings['gravity_on'])
-    xbopts.gravity = ct.c_double(settings['gravity'])
-    xbopts.gravity_dir_x = ct.c_double(settings['gravity_dir'][0])
-    xbopts.gravity_dir_y = ct.c_double(settings['gravity_dir'][1])
-    xbopts.gravity_dir_z = ct.c_double(settings['gravity_dir'][2])
-    xbopts.relaxation_factor = ct.c_double(settings['relaxation_factor'])
-
     # here we only need to set the flags at True, all the forces are follower
-    xbopts.FollowerForce = ct.c_bool(True)
-    xbopts.FollowerForceRig = ct.c_bool(True)
+    xbopts = get_xbopts(PrintInfo=settings['print_info'],
+                        Solution=312,
+                        MaxIterations=settings['max_iterations'],
+                        NumLoadSteps=settings['num_load_steps'],
+                        NumGauss=0,
+                        DeltaCurved=settings['delta_curved'],
+                        MinDelta=settings['min_delta'],
+                        abs_threshold=settings['abs_threshold'],
+                        NewmarkDamp=settings['newmark_damp'],
+                        gravity_on=settings['gravity_on'],
+                        gravity=settings['gravity'],
+                        gravity_dir_x=settings['gravity_dir'][0],
+                        gravity_dir_y=settings['gravity_dir'][1],
+                        gravity_dir_z=settings['gravity_dir'][2],
+                        relaxation_factor=settings['relaxation_factor'],
+                        FollowerForce=True,
+                        FollowerForceRig=True)
 
     if dt is None:
         in_dt = ct.c_double(settings['dt'])
@@ -344,7 +386,6 @@ def cbeam3_step_nlndyn(beam, settings, ts, tstep=None, dt=None):
 
 
 f_xbeam_solv_couplednlndyn = xbeamlib.xbeam_solv_couplednlndyn_python
-f_xbeam_solv_couplednlndyn.restype = None
 
 
 def xbeam_solv_couplednlndyn(beam, settings):
@@ -472,7 +513,6 @@ def xbeam_solv_couplednlndyn(beam, settings):
 def xbeam_step_couplednlndyn(beam, settings, ts, tstep=None, dt=None):
     # library load
     f_xbeam_solv_nlndyn_step_python = xbeamlib.xbeam_solv_nlndyn_step_python
-    f_xbeam_solv_nlndyn_step_python.restype = None
 
     if tstep is None:
         tstep = beam.timestep_info[-1]
@@ -483,21 +523,20 @@ def xbeam_step_couplednlndyn(beam, settings, ts, tstep=None, dt=None):
     n_mass = ct.c_int(beam.n_mass)
     n_stiff = ct.c_int(beam.n_stiff)
 
-    xbopts = Xbopts()
-    xbopts.PrintInfo = ct.c_bool(settings['print_info'])
-    xbopts.MaxIterations = ct.c_int(settings['max_iterations'])
-    xbopts.NumLoadSteps = ct.c_int(settings['num_load_steps'])
-    xbopts.DeltaCurved = ct.c_double(settings['delta_curved'])
-    xbopts.MinDelta = ct.c_double(settings['min_delta'])
-    xbopts.abs_threshold = ct.c_double(settings['abs_threshold'])
-    xbopts.NewmarkDamp = ct.c_double(settings['newmark_damp'])
-    xbopts.gravity_on = ct.c_bool(settings['gravity_on'])
-    xbopts.gravity = ct.c_double(settings['gravity'])
-    xbopts.balancing = ct.c_bool(settings['balancing'])
-    xbopts.gravity_dir_x = ct.c_double(settings['gravity_dir'][0])
-    xbopts.gravity_dir_y = ct.c_double(settings['gravity_dir'][1])
-    xbopts.gravity_dir_z = ct.c_double(settings['gravity_dir'][2])
-    xbopts.relaxation_factor = ct.c_double(settings['relaxation_factor'])
+    xbopts = get_xbopts(PrintInfo=settings['print_info'],
+                        MaxIterations=settings['max_iterations'],
+                        NumLoadSteps=settings['num_load_steps'],
+                        DeltaCurved=settings['delta_curved'],
+                        MinDelta=settings['min_delta'],
+                        abs_threshold=settings['abs_threshold'],
+                        NewmarkDamp=settings['newmark_damp'],
+                        gravity_on=settings['gravity_on'],
+                        gravity=settings['gravity'],
+                        balancing=settings['balancing'],
+                        gravity_dir_x=settings['gravity_dir'][0],
+                        gravity_dir_y=settings['gravity_dir'][1],
+                        gravity_dir_z=settings['gravity_dir'][2],
+                        relaxation_factor=settings['relaxation_factor'])
 
     if dt is None:
         in_dt = ct.c_double(settings['dt'])
@@ -551,7 +590,6 @@ def xbeam_step_couplednlndyn(beam, settings, ts, tstep=None, dt=None):
 def xbeam_init_couplednlndyn(beam, settings, ts, dt=None):
     # library load
     f_xbeam_solv_nlndyn_init_python = xbeamlib.xbeam_solv_nlndyn_init_python
-    f_xbeam_solv_nlndyn_init_python.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -637,7 +675,6 @@ def xbeam_solv_state2accel(beam, tstep, cbeam3=False):
 def cbeam3_solv_state2disp(beam, tstep):
     # library load
     f_cbeam3_solv_state2disp = xbeamlib.cbeam3_solv_state2disp_python
-    f_cbeam3_solv_state2disp.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -664,7 +701,6 @@ def cbeam3_solv_state2disp(beam, tstep):
 def cbeam3_solv_state2accel(beam, tstep):
     # library load
     f_cbeam3_solv_state2disp = xbeamlib.cbeam3_solv_state2disp_python
-    f_cbeam3_solv_state2disp.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -712,7 +748,6 @@ def xbeam_solv_accel2state(beam, tstep):
 def cbeam3_solv_disp2state(beam, tstep):
     # library load
     f_cbeam3_solv_disp2state = xbeamlib.cbeam3_solv_disp2state_python
-    f_cbeam3_solv_disp2state.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -735,7 +770,6 @@ def cbeam3_solv_disp2state(beam, tstep):
 def cbeam3_solv_accel2state(beam, tstep):
     # library load
     f_cbeam3_solv_disp2state = xbeamlib.cbeam3_solv_disp2state_python
-    f_cbeam3_solv_disp2state.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -786,7 +820,6 @@ def cbeam3_solv_modal(beam, settings, ts, FullMglobal, FullCglobal, FullKglobal)
     """
 
     f_cbeam3_solv_modal = xbeamlib.cbeam3_solv_modal_python
-    f_cbeam3_solv_modal.restype = None
 
     n_elem = ct.c_int(beam.num_elem)
     n_nodes = ct.c_int(beam.num_node)
@@ -880,7 +913,6 @@ def cbeam3_asbly_dynamic(beam, tstep, settings):
 
     # library load
     f_cbeam3_asbly_dynamic_python = xbeamlib.cbeam3_asbly_dynamic_python
-    f_cbeam3_asbly_dynamic_python.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -984,7 +1016,6 @@ def xbeam3_asbly_dynamic(beam, tstep, settings):
 
     # library load
     f_xbeam3_asbly_dynamic_python = xbeamlib.xbeam3_asbly_dynamic_python
-    f_xbeam3_asbly_dynamic_python.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -1077,7 +1108,6 @@ def cbeam3_correct_gravity_forces(beam, tstep, settings):
 
     # library load
     f_cbeam3_correct_gravity_forces_python = xbeamlib.cbeam3_correct_gravity_forces_python
-    f_cbeam3_correct_gravity_forces_python.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -1130,7 +1160,6 @@ def cbeam3_asbly_static(beam, tstep, settings, iLoadStep):
 
     # library load
     f_cbeam3_asbly_static_python = xbeamlib.cbeam3_asbly_static_python
-    f_cbeam3_asbly_static_python.restype = None
 
     # initialisation
     n_elem = ct.c_int(beam.num_elem)
@@ -1199,7 +1228,6 @@ def cbeam3_asbly_static(beam, tstep, settings, iLoadStep):
 def xbeam_step_coupledrigid(beam, settings, ts, tstep=None, dt=None):
     # library load
     f_xbeam_solv_rigid_step_python = xbeamlib.xbeam_solv_coupledrigid_step_python
-    f_xbeam_solv_rigid_step_python.restype = None
 
     if tstep is None:
         tstep = beam.timestep_info[-1]
@@ -1210,21 +1238,20 @@ def xbeam_step_coupledrigid(beam, settings, ts, tstep=None, dt=None):
     n_mass = ct.c_int(beam.n_mass)
     n_stiff = ct.c_int(beam.n_stiff)
 
-    xbopts = Xbopts()
-    xbopts.PrintInfo = ct.c_bool(settings['print_info'])
-    xbopts.MaxIterations = ct.c_int(settings['max_iterations'])
-    xbopts.NumLoadSteps = ct.c_int(settings['num_load_steps'])
-    xbopts.DeltaCurved = ct.c_double(settings['delta_curved'])
-    xbopts.MinDelta = ct.c_double(settings['min_delta'])
-    xbopts.abs_threshold = ct.c_double(settings['abs_threshold'])
-    xbopts.NewmarkDamp = ct.c_double(settings['newmark_damp'])
-    xbopts.gravity_on = ct.c_bool(settings['gravity_on'])
-    xbopts.gravity = ct.c_double(settings['gravity'])
-    xbopts.balancing = ct.c_bool(settings['balancing'])
-    xbopts.gravity_dir_x = ct.c_double(settings['gravity_dir'][0])
-    xbopts.gravity_dir_y = ct.c_double(settings['gravity_dir'][1])
-    xbopts.gravity_dir_z = ct.c_double(settings['gravity_dir'][2])
-    xbopts.relaxation_factor = ct.c_double(settings['relaxation_factor'])
+    xbopts = get_xbopts(PrintInfo=settings['print_info'],
+                        MaxIterations=settings['max_iterations'],
+                        NumLoadSteps=settings['num_load_steps'],
+                        DeltaCurved=settings['delta_curved'],
+                        MinDelta=settings['min_delta'],
+                        abs_threshold=settings['abs_threshold'],
+                        NewmarkDamp=settings['newmark_damp'],
+                        gravity_on=settings['gravity_on'],
+                        gravity=settings['gravity'],
+                        balancing=settings['balancing'],
+                        gravity_dir_x=settings['gravity_dir'][0],
+                        gravity_dir_y=settings['gravity_dir'][1],
+                        gravity_dir_z=settings['gravity_dir'][2],
+                        relaxation_factor=settings['relaxation_factor'])
 
     if dt is None:
         in_dt = ct.c_double(settings['dt'])
@@ -166,6 +166,22 @@ def unit_vector(vector):
     return vector/np.linalg.norm(vector)
 
 
+
+def unit_vector_vec(vectors):
+    r"""
+    Vectorised version of :func:`unit_vector` for a stack of vectors.
+
+    Args:
+        vectors (np.ndarray): ``n x 3`` array of vectors to normalise
+
+    Returns:
+        np.ndarray: ``n x 3`` array of unit vectors (zero where the norm of the vector is below ``1e-6``)
+    """
+    norms = np.linalg.norm(vectors, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit = vectors/norms[:, None]
+    return np.where(norms[:, None] < 1e-6, 0., unit)
+
 def rotation_matrix_around_axis(axis, angle):
     axis = unit_vector(axis)
     rot = np.cos(angle)*np.eye(3)
@@ -672,6 +688,84 @@ def crv2triad_vec(crv_vec):
     return v1, v2, v3
 
 
+def crv2rotation_vec(crv_vec):
+    r"""
+    Vectorised version of :func:`crv2rotation` for a stack of Cartesian rotation vectors.
+
+    Args:
+        crv_vec (np.ndarray): ``n x 3`` array of Cartesian rotation vectors
+
+    Returns:
+        np.ndarray: ``n x 3 x 3`` array of rotation matrices
+    """
+    crv_vec = np.asarray(crv_vec, dtype=float).reshape((-1, 3))
+    n_rot = crv_vec.shape[0]
+
+    norm_psi = np.linalg.norm(crv_vec, axis=1)
+    small = norm_psi < 1e-15
+
+    skew_psi = np.zeros((n_rot, 3, 3))
+    skew_psi[:, 1, 2] = -crv_vec[:, 0]
+    skew_psi[:, 2, 0] = -crv_vec[:, 1]
+    skew_psi[:, 0, 1] = -crv_vec[:, 2]
+    skew_psi[:, 2, 1] = crv_vec[:, 0]
+    skew_psi[:, 0, 2] = crv_vec[:, 1]
+    skew_psi[:, 1, 0] = crv_vec[:, 2]
+
+    # coefficients of the skew matrix of psi (not of the normal vector)
+    coeff1 = np.ones((n_rot,))
+    coeff2 = 0.5*np.ones((n_rot,))
+    large = np.logical_not(small)
+    coeff1[large] = np.sin(norm_psi[large])/norm_psi[large]
+    coeff2[large] = (1.0 - np.cos(norm_psi[large]))/norm_psi[large]**2
+
+    rot_matrix = np.zeros((n_rot, 3, 3))
+    rot_matrix[:, [0, 1, 2], [0, 1, 2]] = 1.
+    rot_matrix += coeff1[:, None, None]*skew_psi
+    rot_matrix += coeff2[:, None, None]*np.matmul(skew_psi, skew_psi)
+
+    return rot_matrix
+
+
+def crv2tan_vec(crv_vec):
+    r"""
+    Vectorised version of :func:`crv2tan` for a stack of Cartesian rotation vectors.
+
+    Args:
+        crv_vec (np.ndarray): ``n x 3`` array of Cartesian rotation vectors
+
+    Returns:
+        np.ndarray: ``n x 3 x 3`` array of tangential operators
+    """
+    crv_vec = np.asarray(crv_vec, dtype=float).reshape((-1, 3))
+    n_rot = crv_vec.shape[0]
+
+    norm_psi = np.linalg.norm(crv_vec, axis=1)
+    small = norm_psi < 1e-8
+    large = np.logical_not(small)
+
+    skew_psi = np.zeros((n_rot, 3, 3))
+    skew_psi[:, 1, 2] = -crv_vec[:, 0]
+    skew_psi[:, 2, 0] = -crv_vec[:, 1]
+    skew_psi[:, 0, 1] = -crv_vec[:, 2]
+    skew_psi[:, 2, 1] = crv_vec[:, 0]
+    skew_psi[:, 0, 2] = crv_vec[:, 1]
+    skew_psi[:, 1, 0] = crv_vec[:, 2]
+
+    # series expansion for small rotations
+    k1 = -0.5*np.ones((n_rot,))
+    k2 = np.ones((n_rot,))/6.0
+    k1[large] = (np.cos(norm_psi[large]) - 1.0)/norm_psi[large]**2
+    k2[large] = (1.0 - np.sin(norm_psi[large])/norm_psi[large])/norm_psi[large]**2
+
+    tan_matrix = np.zeros((n_rot, 3, 3))
+    tan_matrix[:, [0, 1, 2], [0, 1, 2]] = 1.
+    tan_matrix += k1[:, None, None]*skew_psi
+    tan_matrix += k2[:, None, None]*np.matmul(skew_psi, skew_psi)
+
+    return tan_matrix
+
+
 def quat2rotation(q1):
     r"""Calculate rotation matrix based on quaternions.
 
@@ -0,0 +1,204 @@
+"""Background Postprocessors
+
+Utilities to run the online postprocessors of a time marching solver in a background thread, so that the formatting
+and writing of the output files does not stall the time marching.
+
+The solver thread only takes a snapshot of the time step variables each postprocessor declares it needs
+(see :meth:`sharpy.utils.solver_interface.BaseSolver.snapshot_variables`) and puts it in a bounded queue. A worker
+thread runs the postprocessors on the snapshots in order. If the queue is full, the solver waits for the worker
+(back-pressure), so the memory used by the snapshots is bounded.
+"""
+import copy
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+def snapshot_timestep(tstep, variables=None):
+    """
+    Copies the required variables of a time step.
+
+    Args:
+        tstep: Time step (i.e. :class:`~sharpy.utils.datastructures.StructTimeStepInfo`). Can be ``None``.
+        variables (list(str)): Attributes to copy. If ``None``, the whole time step is copied with its ``copy()``
+          method.
+
+    Returns:
+        Instance of the same class as ``tstep`` that only holds copies of the attributes in ``variables``.
+    """
+    if tstep is None:
+        return None
+    if variables is None:
+        return tstep.copy()
+
+    snapshot = tstep.__class__.__new__(tstep.__class__)
+    for name in variables:
+        try:
+            value = getattr(tstep, name)
+        except AttributeError:
+            continue
+        if isinstance(value, np.ndarray):
+            value = value.copy()
+        elif isinstance(value, list) and all([isinstance(item, np.ndarray) for item in value]):
+            value = [item.copy() for item in value]
+        else:
+            value = copy.deepcopy(value)
+        setattr(snapshot, name, value)
+    return snapshot
+
+
+def snapshot_data(data, variables, full_history=False):
+    """
+    Creates a shallow copy of ``data`` (:class:`~sharpy.presharpy.presharpy.PreSharpy`) in which the
+    ``timestep_info`` of the requested components are replaced by lists of snapshots.
+
+    Only the last time step is copied unless ``full_history``, in which case all the available time steps are.
+    The remaining entries of the lists are ``None``, as if they had been removed by the ``Cleanup`` postprocessor.
+
+    Args:
+        data (sharpy.presharpy.presharpy.PreSharpy): Simulation data
+        variables (dict): Variables to copy for each component (``structure``, ``aero`` or ``nonlifting_body``).
+          See :func:`snapshot_timestep`.
+        full_history (bool): Copy all the time steps.
+
+    Returns:
+        sharpy.presharpy.presharpy.PreSharpy: Snapshot of the data
+    """
+    snapshot = copy.copy(data)
+    for component, component_variables in variables.items():
+        try:
+            original = getattr(data, component)
+        except AttributeError:
+            continue
+        if original is None:
+            continue
+
+        component_snapshot = copy.copy(original)
+        n_tsteps = len(original.timestep_info)
+        component_snapshot.timestep_info = [None]*n_tsteps
+        if full_history:
+            time_steps = range(n_tsteps)
+        else:
+            time_steps = [n_tsteps - 1]
+        for it in time_steps:
+            component_snapshot.timestep_info[it] = snapshot_timestep(original.timestep_info[it],
+                                                                     component_variables)
+        setattr(snapshot, component, component_snapshot)
+
+    return snapshot
+
+
+class BackgroundPostprocessors(object):
+    """
+    Runs online postprocessors in a background worker thread.
+
+    Postprocessors are run on a snapshot of the data taken by :meth:`submit` by temporarily replacing their ``data``
+    attribute. The first snapshot of each postprocessor includes all the available time steps, so that
+    postprocessors writing the history on their first call (like ``SaveData``) find it.
+
+    Exceptions raised in the worker are raised again in the solver thread in the next call to :meth:`submit` or
+    :meth:`shutdown`.
+
+    Args:
+        postprocessors (dict): Postprocessor instances by name. Only those that support running in the background
+          (whose ``snapshot_variables()`` is not ``None``) should be included.
+        queue_size (int): Maximum number of time steps waiting to be postprocessed.
+
+    Attributes:
+        submit_time (float): Time spent in the solver thread by the last call to :meth:`submit`
+        worker_time (float): Time spent by the worker postprocessing the last completed time step
+        n_completed (int): Number of time steps postprocessed
+    """
+    def __init__(self, postprocessors, queue_size=2):
+        self.postprocessors = postprocessors
+        self.queue = queue.Queue(maxsize=max(int(queue_size), 1))
+        self.first_submission = {name: True for name in self.postprocessors}
+
+        self.submit_time = 0.
+        self.worker_time = 0.
+        self.n_completed = 0
+        self.exception = None
+
+        self.thread = threading.Thread(target=self._worker, name='sharpy-postprocessors', daemon=True)
+        self.thread.start()
+
+    def submit(self, data, solvers=None):
+        """
+        Takes the snapshots of ``data`` required by the postprocessors and queues them. It blocks if the queue is
+        full.
+
+        Args:
+            data (sharpy.presharpy.presharpy.PreSharpy): Simulation data
+            solvers (dict): Solvers dictionary passed on to the postprocessors
+        """
+        self.check_exception()
+        ini_time = time.perf_counter()
+        tasks = []
+        for name, postproc in self.postprocessors.items():
+            tasks.append((name, snapshot_data(data,
+                                              postproc.snapshot_variables(),
+                                              full_history=self.first_submission[name])))
+            self.first_submission[name] = False
+        self.queue.put((tasks, solvers))
+        self.submit_time = time.perf_counter() - ini_time
+
+    def time_saved(self):
+        """
+        Estimate of the time saved in the solver thread per time step: time taken by the worker on the last
+        completed time step minus the time taken to submit the last time step.
+        """
+        if not self.n_completed:
+            return 0.
+        return self.worker_time - self.submit_time
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+
+            tasks, solvers = item
+            if self.exception is None:
+                ini_time = time.perf_counter()
+                try:
+                    for name, snapshot in tasks:
+                        postproc = self.postprocessors[name]
+                        original_data = postproc.data
+                        postproc.data = snapshot
+                        try:
+                            postproc.run(online=True, solvers=solvers)
+                        finally:
+                            postproc.data = original_data
+                except Exception as e:
+                    self.exception = e
+                self.worker_time = time.perf_counter() - ini_time
+                self.n_completed += 1
+            self.queue.task_done()
+
+    def check_exception(self):
+        """
+        Raises in the calling thread any exception raised by the worker
+        """
+        if self.exception is not None:
+            exception = self.exception
+            self.exception = None
+            raise exception
+
+    def drain(self):
+        """
+        Waits for the queued time steps to be postprocessed. The worker stays idle until the next :meth:`submit`.
+        """
+        if threading.current_thread() is not self.thread:
+            self.queue.join()
+
+    def shutdown(self):
+        """
+        Waits for the queued time steps to be postprocessed and stops the worker.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check_exception()
@@ -0,0 +1,161 @@
+"""Checkpoints
+
+Compact HDF5 checkpoints to continue (warm start) a time marching simulation.
+
+Restarting from a ``PickleData`` snapshot (``sharpy -r case.pkl``) unpickles the whole ``data`` structure, including
+the complete time step history, and all the solver instances. A checkpoint only stores what is needed to carry on
+the time marching:
+
+* The initial (``ts = 0``) and the last time steps of the structure, the aerodynamic grid (including the wake) and
+  the nonlifting bodies, as written by :func:`sharpy.utils.h5utils.flatten_timestep`. The ``postproc_cell`` and
+  ``postproc_node`` variables are not included.
+
+* The internal state of the solvers, controllers and generators, as returned by their ``checkpoint_state()``
+  method (i.e. the Lagrange multipliers of
+  :class:`~sharpy.solvers.nonlineardynamicmultibody.NonLinearDynamicMultibody` or the integrators of the PID
+  controllers).
+
+The case is restarted by running it again with the loaders in its ``flow`` (i.e. ``BeamLoader`` and
+``AerogridLoader``), which build the model from the input files, and the ``DynamicCoupled`` solver restores the
+checkpoint, either from its ``restart_checkpoint`` setting or from ``sharpy case.sharpy -r case.checkpoint.h5``.
+The time steps that are not stored are ``None`` in the ``timestep_info`` lists of the restarted simulation.
+The postprocessors of the restarted simulation are initialised before the checkpoint is restored, and their
+output files (i.e. the time histories written by ``WriteVariablesTime``) overwrite those of the previous run, so
+they should be copied elsewhere if required.
+
+The file layout is versioned with :data:`schema_version`::
+
+    /                               attrs: schema_version, sharpy_version, case, ts
+    /timesteps/<component>/<ts>/    variables of the time step. attrs of <component>: n_steps
+    /state/<object>/                internal state of each solver, controller and generator
+"""
+import os
+
+import h5py as h5
+
+import sharpy.utils.exceptions as exceptions
+import sharpy.utils.h5utils as h5utils
+from sharpy.version import __version__
+
+# version of the layout of the checkpoint files. Increase it when the layout changes
+schema_version = 1
+
+# components of ``data`` whose time steps are stored
+components = ('structure', 'aero', 'nonlifting_body')
+
+# time step variables only used by the postprocessors
+skip_variables = ('postproc_cell', 'postproc_node')
+
+
+def write_state(grp, state, skip=()):
+    """
+    Writes a state dictionary (arrays and numbers, possibly nested in dictionaries and lists) or a time step in
+    ``grp``, skipping the variables in ``skip``
+    """
+    for path, value in h5utils.flatten_timestep(state, SkipAttr=skip).items():
+        grp.create_dataset(path, data=value)
+
+
+def read_state(grp):
+    """
+    Reads a state dictionary written by :func:`write_state`. Lists are returned as dictionaries with keys
+    ``00000``, ``00001``... (see :func:`state_list`)
+    """
+    state = dict()
+    for name, item in grp.items():
+        if isinstance(item, h5._hl.group.Group):
+            state[name] = read_state(item)
+        else:
+            state[name] = item[()]
+    return state
+
+
+def state_list(state_dict):
+    """
+    Returns the list saved in a state as a dictionary with keys ``00000``, ``00001``...
+    """
+    return [state_dict[key] for key in sorted(state_dict.keys())]
+
+
+def write_checkpoint(filename, data, objects, n_steps=3):
+    """
+    Writes a checkpoint.
+
+    The file is written to a temporary file first and then renamed, so that an existing checkpoint is not lost if
+    the simulation stops while writing.
+
+    Args:
+        filename (str): Path to the checkpoint
+        data (sharpy.presharpy.presharpy.PreSharpy): Simulation data
+        objects (dict): Solvers, controllers and generators whose state is saved, by name
+        n_steps (int): Number of most recent time steps stored, besides the initial one
+    """
+    temp_filename = filename + '.tmp'
+    with h5.File(temp_filename, 'w') as checkpoint:
+        checkpoint.attrs['schema_version'] = schema_version
+        checkpoint.attrs['sharpy_version'] = __version__
+        checkpoint.attrs['case'] = data.settings['SHARPy']['case']
+        checkpoint.attrs['ts'] = data.ts
+
+        for name in components:
+            component = getattr(data, name, None)
+            if component is None or not len(getattr(component, 'timestep_info', [])):
+                continue
+            history = component.timestep_info
+            grp = checkpoint.create_group('timesteps/' + name)
+            grp.attrs['n_steps'] = len(history)
+            for i_step in sorted({0} | set(range(max(len(history) - n_steps, 0), len(history)))):
+                tstep = history[i_step]
+                if tstep is not None:
+                    write_state(grp.create_group('%05d' % i_step), tstep, skip=skip_variables)
+
+        for name, obj in objects.items():
+            state = obj.checkpoint_state() if hasattr(obj, 'checkpoint_state') else None
+            if state is not None:
+                write_state(checkpoint.create_group('state/' + name), state)
+
+    os.replace(temp_filename, filename)
+
+
+def restore_checkpoint(filename, data, objects):
+    """
+    Restores a checkpoint.
+
+    The time steps are restored on copies of the initial time step of each component in ``data``, so the model
+    needs to have been loaded already.
+
+    Args:
+        filename (str): Path to the checkpoint
+        data (sharpy.presharpy.presharpy.PreSharpy): Simulation data
+        objects (dict): Solvers, controllers and generators whose state is restored, by name
+
+    Returns:
+        list(str): Names of the objects in ``objects`` with no state in the checkpoint
+    """
+    h5utils.check_file_exists(filename)
+    with h5.File(filename, 'r') as checkpoint:
+        version = int(checkpoint.attrs.get('schema_version', 0))
+        if version < 1 or version > schema_version:
+            raise exceptions.NotValidInputFile('The checkpoint %s has schema version %u, whereas this version of '
+                                               'SHARPy reads up to version %u' % (filename, version, schema_version))
+
+        for name, grp in checkpoint['timesteps'].items():
+            component = getattr(data, name, None)
+            if component is None or not len(component.timestep_info):
+                raise exceptions.NotValidInputFile('The checkpoint has %s time steps but they have not been '
+                                                   'loaded for this case' % name)
+            template = component.timestep_info[0]
+            history = [None]*int(grp.attrs['n_steps'])
+            for step_name, step_grp in grp.items():
+                history[int(step_name)] = h5utils.restore_timestep(template.copy(), step_grp)
+            component.timestep_info = history
+        data.ts = int(checkpoint.attrs['ts'])
+
+        missing = []
+        for name, obj in objects.items():
+            if 'state/' + name in checkpoint:
+                obj.restore_checkpoint_state(read_state(checkpoint['state/' + name]))
+            elif hasattr(obj, 'checkpoint_state') and obj.checkpoint_state() is not None:
+                missing.append(name)
+
+    return missing
@@ -115,3 +115,18 @@ class PID(object):
         detailed[1] = self._accumulated_integral*self._ki
 
         return actuation, detailed
+
+    def checkpoint_state(self):
+        """
+        Returns the internal state of the controller, to continue a simulation from a checkpoint
+        """
+        return {'point': self._point,
+                'accumulated_integral': self._accumulated_integral,
+                'error_history': self._error_history.copy(),
+                'n_calls': self._n_calls}
+
+    def restore_checkpoint_state(self, state):
+        self._point = float(state['point'])
+        self._accumulated_integral = float(state['accumulated_integral'])
+        self._error_history = np.array(state['error_history'], dtype=float)
+        self._n_calls = int(state['n_calls'])
@@ -1,8 +1,9 @@
 from abc import ABCMeta, abstractmethod
 import sharpy.utils.cout_utils as cout
 import os
+from sharpy.utils.registry import LazyRegistry
 
-dict_of_controllers = {}
+dict_of_controllers = LazyRegistry('controller')
 controllers = {}  # for internal working
 
 
@@ -29,6 +30,13 @@ class BaseController(metaclass=ABCMeta):
     def teardown(self):
         pass
 
+    # state of the controller (i.e. integrators) to restart from a checkpoint, see BaseSolver.checkpoint_state
+    def checkpoint_state(self):
+        return None
+
+    def restore_checkpoint_state(self, state):
+        pass
+
 
 def controller_from_string(string):
     return dict_of_controllers[string]
@@ -18,3 +18,57 @@ def import_ctypes_lib(route, libname):
     library = ct.CDLL(lib_path, mode=ct.RTLD_GLOBAL)
 
     return library
+
+
+def hashable_setting(value):
+    """
+    Returns a hashable version of a setting value so that it can be used as a dictionary key.
+
+    ``ctypes`` scalars are replaced by their value and arrays and lists by tuples.
+    """
+    if isinstance(value, ct._SimpleCData):
+        return value.value
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return tuple([hashable_setting(item) for item in value])
+    return value
+
+
+class StructureCache(object):
+    """
+    Cache of ``ctypes`` structures (such as the option structures of the UVLM and xbeam libraries) built from a set
+    of settings.
+
+    The structures are built once for every different key and shared afterwards, so they must not be modified by
+    the caller. The cache is emptied when it reaches ``max_size`` entries, which only happens if the settings change
+    continuously (e.g. a variable time step).
+
+    Args:
+        max_size (int): Maximum number of structures in the cache
+    """
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.structures = dict()
+
+    def get(self, key, build):
+        """
+        Returns the structure for ``key``, calling ``build()`` to generate it if it is not in the cache
+
+        Args:
+            key (tuple): Settings that define the structure. They are made hashable with :func:`hashable_setting`
+            build (callable): Function without arguments that returns the structure
+
+        Returns:
+            ct.Structure: Cached structure
+        """
+        key = hashable_setting(key)
+        try:
+            return self.structures[key]
+        except KeyError:
+            pass
+        if len(self.structures) >= self.max_size:
+            self.structures.clear()
+        structure = build()
+        self.structures[key] = structure
+        return structure
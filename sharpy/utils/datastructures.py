@@ -3,13 +3,24 @@
 These classes are responsible for storing the aerodynamic and structural time step information and relevant variables.
 
 """
+import collections
 import copy
 import ctypes as ct
+import os
+import pickle
+import tempfile
+import weakref
+import zlib
+from collections.abc import MutableSequence
+
 import numpy as np
 
 import sharpy.utils.algebra as algebra
 import sharpy.utils.multibody as mb
 
+# pointer tables built by ``generate_ctypes_pointers``, by time step. The entries are dropped with the time step
+_ctypes_pointer_tables = weakref.WeakKeyDictionary()
+
 
 class TimeStepInfo(object):
     """
@@ -56,6 +67,14 @@ class TimeStepInfo(object):
         dimensions (np.ndarray): Matrix defining the dimensions of the vortex grid on solid surfaces
           ``[num_surf x chordwise panels x spanwise panels]``
     """
+    # variables stored as a list of arrays, one per surface
+    _surface_variables = ('zeta', 'zeta_dot', 'normals', 'forces', 'dynamic_forces', 'u_ext')
+    # variables stored as a single ``[n_surf x 6]`` array
+    _total_forces_variables = ('inertial_steady_forces', 'body_steady_forces',
+                               'inertial_unsteady_forces', 'body_unsteady_forces')
+    # variables exposed to ``uvlmlib`` through ``generate_ctypes_pointers``
+    _ctypes_variables = ('zeta', 'zeta_dot', 'u_ext', 'normals', 'forces', 'dynamic_forces')
+
     def __init__(self, dimensions):
         self.ct_dimensions = None
 
@@ -159,9 +178,84 @@ class TimeStepInfo(object):
 
         return copied
 
+    def copy_into(self, other):
+        """
+        Copies the content of this time step into ``other`` reusing its arrays whenever their shape allows it.
+
+        Unlike :meth:`copy`, no new arrays are allocated unless the dimensions of ``other`` differ from those of
+        ``self``. This is intended for iterative solvers that repeatedly copy time steps of the same size.
+
+        Args:
+            other (TimeStepInfo): Time step (of the same class) to be overwritten
+
+        Returns:
+            TimeStepInfo: ``other``, holding a copy of ``self``
+        """
+        other.dimensions = copy_array_into(self.dimensions, other.dimensions)
+        other.n_surf = self.n_surf
+        for name in self._surface_variables:
+            setattr(other, name, copy_list_into(getattr(self, name), getattr(other, name)))
+
+        for name in self._total_forces_variables:
+            setattr(other, name, copy_array_into(getattr(self, name), getattr(other, name)))
+
+        other.postproc_cell = copy_dict_into(self.postproc_cell, other.postproc_cell)
+        other.postproc_node = copy_dict_into(self.postproc_node, other.postproc_node)
+        other.in_global_AFoR = self.in_global_AFoR
+
+        return other
+
     def generate_ctypes_pointers(self):
         """
         Generates the pointers to aerodynamic variables used to interface the C++ library ``uvlmlib``
+
+        The pointer tables are only built the first time and reused afterwards, until any of the arrays they point
+        to is reallocated (i.e. replaced by a new array) or the dimensions of the grid or the wake change.
+        """
+        key = self.ctypes_pointers_key()
+        try:
+            cached_key, attributes, incidence_pointer = _ctypes_pointer_tables[self]
+        except KeyError:
+            cached_key = None
+
+        if cached_key != key:
+            self.build_ctypes_pointers()
+            attributes = {name: value for name, value in self.__dict__.items() if name.startswith('ct_')}
+            incidence_pointer = self.postproc_cell.get('incidence_angle_ct_pointer')
+            # ``reshape(-1)`` copies non contiguous arrays, whose pointers cannot be reused
+            if all([array.flags.c_contiguous for array in self.ctypes_arrays()]):
+                _ctypes_pointer_tables[self] = (key, attributes, incidence_pointer)
+            else:
+                _ctypes_pointer_tables.pop(self, None)
+            return
+
+        self.__dict__.update(attributes)
+        if incidence_pointer is not None:
+            self.postproc_cell['incidence_angle_ct_pointer'] = incidence_pointer
+
+    def ctypes_arrays(self):
+        """
+        Returns the list of arrays exposed to ``uvlmlib`` by :meth:`generate_ctypes_pointers`
+        """
+        arrays = []
+        for name in self._ctypes_variables:
+            arrays.extend(getattr(self, name))
+        if 'incidence_angle' in self.postproc_cell:
+            arrays.extend(self.postproc_cell['incidence_angle'])
+        return arrays
+
+    def ctypes_pointers_key(self):
+        """
+        Key identifying the pointer tables of :meth:`generate_ctypes_pointers`.
+
+        Arrays are identified by ``id``. This is safe since the cached pointer tables keep a reference to the arrays
+        they point to, so their ``id`` cannot be reused by a new array while the tables are cached.
+        """
+        return tuple([id(array) for array in self.ctypes_arrays()]), self.dimensions.tobytes()
+
+    def build_ctypes_pointers(self):
+        """
+        Builds the pointer tables of :meth:`generate_ctypes_pointers`
         """
         self.ct_dimensions = self.dimensions.astype(dtype=ct.c_uint, copy=True)
 
@@ -230,10 +324,16 @@ class TimeStepInfo(object):
             self.postproc_cell['incidence_angle_ct_pointer'] = ((ct.POINTER(ct.c_double)*len(self.ct_incidence_list))
                             (* [np.ctypeslib.as_ctypes(array) for array in self.ct_incidence_list]))
 
-    def remove_ctypes_pointers(self):
+    def remove_ctypes_pointers(self, clear_cache=False):
         """
-            Removes the pointers to aerodynamic variables used to interface the C++ library ``uvlmlib``
+        Removes the pointers to aerodynamic variables used to interface the C++ library ``uvlmlib``
+
+        Args:
+            clear_cache (bool): Drop as well the pointer tables kept for the next call to
+              :meth:`generate_ctypes_pointers`
         """
+        if clear_cache:
+            _ctypes_pointer_tables.pop(self, None)
 
         list_class_attributes = list(self.__dict__.keys()).copy()
         for name_attribute in list_class_attributes:
@@ -298,6 +398,9 @@ class NonliftingBodyTimeStepInfo(TimeStepInfo):
         dimensions (np.ndarray): Matrix defining the dimensions of the vortex grid on solid surfaces
           ``[num_surf x radial panels x spanwise panels]``
     """
+    _surface_variables = TimeStepInfo._surface_variables + ('sigma', 'sigma_dot', 'pressure_coefficients')
+    _ctypes_variables = TimeStepInfo._ctypes_variables + ('sigma', 'sigma_dot', 'pressure_coefficients')
+
     def __init__(self, dimensions): #remove dimensions_star as input
         super().__init__(dimensions)
 
@@ -342,13 +445,8 @@ class NonliftingBodyTimeStepInfo(TimeStepInfo):
         return copied
 
 
-    def generate_ctypes_pointers(self):
-        """
-        Generates the pointers to aerodynamic variables used to interface the C++ library ``uvlmlib``
-        """
-        super().generate_ctypes_pointers()
-
-        from sharpy.utils.constants import NDIM
+    def build_ctypes_pointers(self):
+        super().build_ctypes_pointers()
 
         self.ct_sigma_list = []
         for i_surf in range(self.n_surf):
@@ -365,7 +463,7 @@ class NonliftingBodyTimeStepInfo(TimeStepInfo):
         self.ct_p_sigma = ((ct.POINTER(ct.c_double)*len(self.ct_sigma_list))
                             (* [np.ctypeslib.as_ctypes(array) for array in self.ct_sigma_list]))
         self.ct_p_sigma_dot = ((ct.POINTER(ct.c_double)*len(self.ct_sigma_dot_list))
-                            (* [np.ctypeslib.as_ctypes(array) for array in self.ct_sigma_list]))
+                            (* [np.ctypeslib.as_ctypes(array) for array in self.ct_sigma_dot_list]))
         self.ct_p_pressure_coefficients = ((ct.POINTER(ct.c_double)*len(self.ct_pressure_coefficients_list))
                                 (* [np.ctypeslib.as_ctypes(array) for array in self.ct_pressure_coefficients_list]))
 
@@ -432,6 +530,11 @@ class AeroTimeStepInfo(TimeStepInfo):
         dimensions_star (np.ndarray): Matrix defining the dimensions of the vortex grid on wakes
           ``[num_surf x streamwise panels x spanwise panels]``
     """
+    _surface_variables = TimeStepInfo._surface_variables + ('zeta_star', 'u_ext_star', 'gamma', 'gamma_dot',
+                                                            'gamma_star', 'dist_to_orig', 'wake_conv_vel')
+    _ctypes_variables = TimeStepInfo._ctypes_variables + ('zeta_star', 'u_ext_star', 'gamma', 'gamma_dot',
+                                                          'gamma_star', 'dist_to_orig', 'wake_conv_vel')
+
     def __init__(self, dimensions, dimensions_star):
         super().__init__(dimensions)
         self.ct_dimensions_star = None
@@ -526,10 +629,37 @@ class AeroTimeStepInfo(TimeStepInfo):
         
         return copied
 
-    def generate_ctypes_pointers(self):
+    def copy_into(self, other):
+        """
+        Copies the content of this time step into ``other`` reusing its arrays whenever their shape allows it.
+
+        Wake arrays are only reallocated if the wake dimensions of ``other`` differ from ``dimensions_star``.
+
+        Args:
+            other (AeroTimeStepInfo): Time step to be overwritten
+
+        Returns:
+            AeroTimeStepInfo: ``other``, holding a copy of ``self``
+        """
+        other.dimensions_star = copy_array_into(self.dimensions_star, other.dimensions_star)
+        super().copy_into(other)
+
+        other.control_surface_deflection = copy_array_into(self.control_surface_deflection,
+                                                           other.control_surface_deflection)
+        other.flag_zeta_phantom = copy_array_into(self.flag_zeta_phantom, other.flag_zeta_phantom)
+
+        return other
+
+    def ctypes_arrays(self):
+        return super().ctypes_arrays() + [self.flag_zeta_phantom]
+
+    def ctypes_pointers_key(self):
+        return super().ctypes_pointers_key() + (self.dimensions_star.tobytes(),)
+
+    def build_ctypes_pointers(self):
         from sharpy.utils.constants import NDIM
         n_surf = len(self.dimensions)
-        super().generate_ctypes_pointers()
+        super().build_ctypes_pointers()
         self.ct_dimensions_star = self.dimensions_star.astype(dtype=ct.c_uint, copy=True)
 
         self.ct_zeta_star_list = []
@@ -622,6 +752,323 @@ def standalone_ctypes_pointer(matrix):
     return ct_list, ct_pointer
 
 
+def copy_array_into(source, destination, order='C'):
+    """
+    Copies ``source`` into ``destination`` in place if both arrays have the same shape and type.
+
+    Otherwise, a new copy of ``source`` is allocated (keeping its ``dtype``).
+
+    Args:
+        source (np.ndarray): Array to be copied. Can be ``None``.
+        destination (np.ndarray): Array to be overwritten. Can be ``None``.
+        order (str): Memory layout of the new array if it needs to be allocated.
+
+    Returns:
+        np.ndarray: Array holding the copy of ``source``
+    """
+    if source is None:
+        return None
+    if destination is source:
+        return destination
+    if (isinstance(destination, np.ndarray) and
+            destination.shape == source.shape and
+            destination.dtype == source.dtype and
+            destination.flags.writeable):
+        destination[...] = source
+        return destination
+    return source.astype(dtype=source.dtype, order=order, copy=True)
+
+
+def copy_list_into(source, destination, order='C'):
+    """
+    Copies a list of arrays (such as ``zeta``, ``[n_surf][3 x M x N]``) into ``destination``, reusing the arrays
+    of ``destination`` as in :func:`copy_array_into`.
+    """
+    if destination is None or len(destination) != len(source):
+        return [copy_array_into(array, None, order=order) for array in source]
+    for i_array, array in enumerate(source):
+        destination[i_array] = copy_array_into(array, destination[i_array], order=order)
+    return destination
+
+
+def copy_dict_into(source, destination):
+    """
+    Copies a dictionary (such as ``postproc_cell`` or ``mb_dict``) into ``destination``.
+
+    Arrays, lists of arrays and nested dictionaries are copied in place whenever possible. Any other value is
+    deep-copied. Keys in ``destination`` not present in ``source`` are removed.
+    """
+    if source is None:
+        return None
+    if not isinstance(destination, dict) or destination is source:
+        return copy.deepcopy(source)
+
+    for key in list(destination.keys()):
+        if key not in source:
+            del destination[key]
+
+    for key, value in source.items():
+        if isinstance(value, np.ndarray):
+            destination[key] = copy_array_into(value, destination.get(key))
+        elif isinstance(value, dict):
+            destination[key] = copy_dict_into(value, destination.get(key))
+        elif (isinstance(value, list) and len(value) > 0 and
+              all([isinstance(item, np.ndarray) for item in value]) and
+              isinstance(destination.get(key), list)):
+            destination[key] = copy_list_into(value, destination[key])
+        else:
+            destination[key] = copy.deepcopy(value)
+
+    return destination
+
+
+class TimeStepBufferPool(object):
+    """
+    Pool of preallocated time step buffers.
+
+    Buffers are identified by name and created the first time they are requested. Further requests overwrite
+    the existing buffer in place through the ``copy_into`` method of the time step classes, so that iterative
+    solvers (like the FSI loop in :class:`~sharpy.solvers.dynamiccoupled.DynamicCoupled`) do not allocate new
+    arrays every time a time step needs to be copied.
+
+    Buffers returned by the pool are overwritten by the next call to :meth:`fill` with the same name, so they
+    must not be stored (i.e. appended to ``timestep_info``). Use ``copy()`` for that.
+
+    Attributes:
+        buffers (dict): Time step buffers by name
+        n_allocations (int): Number of buffers allocated by the pool
+        n_copies (int): Number of in-place copies performed by the pool
+    """
+    def __init__(self):
+        self.buffers = dict()
+        self.n_allocations = 0
+        self.n_copies = 0
+
+    def fill(self, name, source):
+        """
+        Copies ``source`` into the buffer ``name``, allocating it if it does not exist yet.
+
+        Args:
+            name (str): Buffer name
+            source: Time step to be copied (``StructTimeStepInfo``, ``AeroTimeStepInfo``, etc)
+
+        Returns:
+            Buffer holding a copy of ``source``
+        """
+        try:
+            buffer = self.buffers[name]
+        except KeyError:
+            buffer = None
+
+        if buffer is None or type(buffer) is not type(source):
+            buffer = source.copy()
+            self.buffers[name] = buffer
+            self.n_allocations += 1
+        elif buffer is not source:
+            source.copy_into(buffer)
+            self.n_copies += 1
+
+        return buffer
+
+    def clear(self):
+        """
+        Removes all the buffers from the pool
+        """
+        self.buffers = dict()
+
+
+class _HistorySlot(object):
+    """
+    Time step of a :class:`TimeStepHistory`. ``step`` is ``None`` while the time step is on disk and ``record`` holds
+    the ``(offset, size, crc)`` of its last copy on disk, if any.
+    """
+    __slots__ = ('step', 'record')
+
+    def __init__(self, step):
+        self.step = step
+        self.record = None
+
+
+class TimeStepHistory(MutableSequence):
+    """
+    List of time steps with bounded memory.
+
+    The last ``in_memory`` time steps are always kept in memory. Older time steps are pickled into a temporary file
+    (in ``folder``, deleted when the history is closed or garbage collected) and reloaded on access, so that the
+    whole history is still available to the postprocessors. Up to ``cache_size`` reloaded time steps are kept in
+    memory in least recently used order. Time steps that have been modified after reloading are written again when
+    evicted from the cache, unchanged ones are just dropped.
+
+    Apart from the memory use, it behaves as a ``list``: time steps can be appended, inserted, replaced (i.e. with
+    ``None`` by the ``Cleanup`` postprocessor) or deleted, and slices return lists. Pickled or deep-copied
+    histories become plain lists holding all the time steps.
+
+    References to spilled time steps held elsewhere are not updated: changes made through them after the time step
+    has been spilled are lost. Hence, ``in_memory`` should be larger than the number of previous time steps
+    referenced by the solvers (such as the filter of ``gamma_dot`` in ``StepUvlm``).
+
+    Args:
+        steps (list): Initial time steps
+        in_memory (int): Number of most recent time steps always kept in memory
+        cache_size (int): Number of older time steps kept in memory after being reloaded. Defaults to ``in_memory``
+        folder (str): Folder of the temporary file. Defaults to the system temporary folder.
+
+    Attributes:
+        n_spills (int): Number of time steps written to disk
+        n_loads (int): Number of time steps reloaded from disk
+    """
+    def __init__(self, steps=(), in_memory=10, cache_size=None, folder=None):
+        self.in_memory = max(in_memory, 1)
+        if cache_size is None:
+            cache_size = self.in_memory
+        self.cache_size = cache_size
+        self.folder = folder
+
+        self.n_spills = 0
+        self.n_loads = 0
+
+        self._slots = []
+        # reloaded (or replaced) old slots kept in memory, by ``id``
+        self._cache = collections.OrderedDict()
+        self._file = None
+
+        for step in steps:
+            self.append(step)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._slots)))]
+        slot = self._slots[index]
+        if slot.step is None and slot.record is not None:
+            slot.step = self._load(slot.record)
+            self._keep_in_cache(slot)
+        elif id(slot) in self._cache:
+            self._cache.move_to_end(id(slot))
+        return slot.step
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self._slots)))
+            values = list(value)
+            if len(indices) != len(values):
+                raise ValueError('Slice assignment of {:d} time steps to a slice of size {:d}'.format(
+                    len(values), len(indices)))
+            for i, step in zip(indices, values):
+                self[i] = step
+            return
+        slot = self._slots[index]
+        slot.step = value
+        slot.record = None
+        if not self._is_recent(slot):
+            self._keep_in_cache(slot)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(len(self._slots))), reverse=True):
+                del self[i]
+            return
+        slot = self._slots.pop(index)
+        self._cache.pop(id(slot), None)
+
+    def insert(self, index, value):
+        slot = _HistorySlot(value)
+        self._slots.insert(index, slot)
+        if not self._is_recent(slot):
+            self._keep_in_cache(slot)
+        else:
+            # the time step that stops being one of the last ``in_memory``
+            self._spill_old(len(self._slots) - self.in_memory - 1)
+
+    def append(self, value):
+        self._slots.append(_HistorySlot(value))
+        self._spill_old(len(self._slots) - self.in_memory - 1)
+
+    def __reduce__(self):
+        return list, (self[:],)
+
+    def __repr__(self):
+        return 'TimeStepHistory({:d} time steps, {:d} in memory)'.format(len(self), self.n_in_memory)
+
+    @property
+    def n_in_memory(self):
+        """Number of time steps currently held in memory"""
+        return len([slot for slot in self._slots if slot.step is not None])
+
+    def close(self):
+        """
+        Loads all the time steps back to memory and removes the temporary file
+        """
+        for slot in self._slots:
+            if slot.step is None and slot.record is not None:
+                slot.step = self._load(slot.record)
+            slot.record = None
+        self._cache.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __del__(self):
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+
+    def _is_recent(self, slot):
+        return any([recent is slot for recent in self._slots[-self.in_memory:]])
+
+    def _spill_old(self, index):
+        if index < 0:
+            return
+        slot = self._slots[index]
+        if id(slot) not in self._cache:
+            self._spill(slot)
+
+    def _keep_in_cache(self, slot):
+        self._cache[id(slot)] = slot
+        self._cache.move_to_end(id(slot))
+        while len(self._cache) > self.cache_size:
+            evicted = self._cache.popitem(last=False)[1]
+            if not self._is_recent(evicted):
+                self._spill(evicted)
+
+    def _spill(self, slot):
+        step = slot.step
+        if step is None:
+            return
+        strip_ctypes_pointers(step)
+        data = pickle.dumps(step, protocol=pickle.HIGHEST_PROTOCOL)
+        crc = zlib.crc32(data)
+        if slot.record is None or slot.record[1:] != (len(data), crc):
+            if self._file is None:
+                if self.folder is not None:
+                    os.makedirs(self.folder, exist_ok=True)
+                self._file = tempfile.TemporaryFile(dir=self.folder, suffix='.timesteps')
+            self._file.seek(0, os.SEEK_END)
+            slot.record = (self._file.tell(), len(data), crc)
+            self._file.write(data)
+            self.n_spills += 1
+        slot.step = None
+
+    def _load(self, record):
+        self._file.seek(record[0])
+        self.n_loads += 1
+        return pickle.loads(self._file.read(record[1]))
+
+
+def strip_ctypes_pointers(step):
+    """
+    Removes the ``ctypes`` pointers and the flattened views of the arrays used to interface the C++ libraries from
+    a time step. They are generated again when needed.
+    """
+    if not hasattr(step, 'remove_ctypes_pointers'):
+        return
+    step.remove_ctypes_pointers(clear_cache=True)
+    for name in list(step.__dict__.keys()):
+        if name.startswith('ct_') and name.endswith('_list'):
+            delattr(step, name)
+
+
 class StructTimeStepInfo(object):
     """
     Structural Time Step Class.
@@ -685,6 +1132,17 @@ class StructTimeStepInfo(object):
 
         mb_dict (np.ndarray): Dictionary with the multibody information. It comes from the file ``case.mb.h5``
     """
+    _array_variables = ('pos', 'pos_dot', 'pos_ddot',
+                        'psi', 'psi_dot', 'psi_ddot',
+                        'quat', 'for_pos', 'for_vel', 'for_acc',
+                        'steady_applied_forces', 'unsteady_applied_forces',
+                        'runtime_steady_forces', 'runtime_unsteady_forces',
+                        'gravity_forces', 'total_gravity_forces', 'total_forces',
+                        'q', 'dqdt', 'dqddt',
+                        'psi_local', 'psi_dot_local',
+                        'mb_FoR_pos', 'mb_FoR_vel', 'mb_FoR_acc', 'mb_quat', 'mb_dquatdt',
+                        'forces_constraints_nodes', 'forces_constraints_FoR')
+
     def __init__(self, num_node, num_elem, num_node_elem=3, num_dof=None, num_bodies=1):
         self.in_global_AFoR = True
         self.num_node = num_node
@@ -793,6 +1251,33 @@ class StructTimeStepInfo(object):
 
         return copied
 
+    def copy_into(self, other):
+        """
+        Copies the content of this time step into ``other`` reusing its arrays whenever their shape allows it.
+
+        Unlike :meth:`copy`, no new arrays are allocated (and ``postproc_cell``, ``postproc_node`` and ``mb_dict``
+        are not deep-copied) unless the sizes of ``other`` differ from those of ``self``.
+
+        Args:
+            other (StructTimeStepInfo): Time step to be overwritten
+
+        Returns:
+            StructTimeStepInfo: ``other``, holding a copy of ``self``
+        """
+        other.in_global_AFoR = self.in_global_AFoR
+        other.num_node = self.num_node
+        other.num_elem = self.num_elem
+        other.num_node_elem = self.num_node_elem
+
+        for name in self._array_variables:
+            setattr(other, name, copy_array_into(getattr(self, name), getattr(other, name), order='F'))
+
+        other.postproc_cell = copy_dict_into(self.postproc_cell, other.postproc_cell)
+        other.postproc_node = copy_dict_into(self.postproc_node, other.postproc_node)
+        other.mb_dict = copy_dict_into(self.mb_dict, other.mb_dict)
+
+        return other
+
     def glob_pos(self, include_rbm=True):
         """
         Returns the position of the nodes in ``G`` FoR
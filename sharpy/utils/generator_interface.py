@@ -4,8 +4,9 @@ from abc import ABCMeta, abstractmethod
 import sharpy.utils.cout_utils as cout
 import os
 import shutil
+from sharpy.utils.registry import LazyRegistry
 
-dict_of_generators = {}
+dict_of_generators = LazyRegistry('generator')
 generators = {}  # for internal working
 
 
@@ -28,7 +29,12 @@ def print_available_generators():
 
 
 class BaseGenerator(metaclass=ABCMeta):
-    pass
+    # state of the generator to restart from a checkpoint, see BaseSolver.checkpoint_state
+    def checkpoint_state(self):
+        return None
+
+    def restore_checkpoint_state(self, state):
+        pass
 
 def generator_from_string(string):
     return dict_of_generators[string]
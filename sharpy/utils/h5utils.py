@@ -419,3 +419,296 @@ def save_list_as_array(list_obj, grp_target, compress_float=False):
 
                 return True
     return False
+
+
+# ------------------------------------------------------------ Time histories
+
+
+def flatten_timestep(obj, SkipAttr=(), prefix=''):
+    """
+    Flattens the numerical content of a time step (such as a
+    :class:`~sharpy.utils.datastructures.StructTimeStepInfo`) into a dictionary of arrays suitable for
+    :class:`TimeHistoryWriter`.
+
+    Arrays and numerical scalars are stored with their attribute name. Lists of arrays (i.e. one array per
+    surface) and dictionaries (such as ``postproc_cell``) are stored as sub-paths, ``zeta/00000`` or
+    ``postproc_node/aero_steady_forces``. Any other attribute is not included.
+
+    Args:
+        obj: time step instance, dictionary or list
+        SkipAttr (list): Attributes not to be included
+        prefix (str): Path prefix of the variables
+
+    Returns:
+        dict: Dictionary of ``path: np.ndarray``
+    """
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, (list, tuple)):
+        items = [('%.5d' % nn, value) for nn, value in enumerate(obj)]
+    else:
+        items = obj.__dict__.items()
+
+    flat = dict()
+    for name, value in items:
+        if name in SkipAttr or name.startswith('ct_'):
+            continue
+        path = prefix + name
+        if isinstance(value, ndarray):
+            if value.dtype.kind in ('f', 'i', 'u', 'b', 'c'):
+                flat[path] = value
+        elif isinstance(value, BasicNumTypes + (bool,)):
+            flat[path] = np.array(value)
+        elif isinstance(value, (ct.c_bool, ct.c_double, ct.c_int)):
+            flat[path] = np.array(value.value)
+        elif isinstance(value, (dict, list, tuple)):
+            flat.update(flatten_timestep(value, SkipAttr, prefix=path + '/'))
+
+    return flat
+
+
+def restore_timestep(obj, grp):
+    """
+    Inverse of :func:`flatten_timestep`. Sets the variables saved in ``grp`` into an existing time step (or
+    dictionary or list).
+
+    Arrays of the same shape are copied in place, keeping their data type and memory layout. Arrays of a different
+    shape replace the existing ones and keep their data type. Variables that do not exist in ``obj`` are added.
+
+    Args:
+        obj: time step instance, dictionary or list
+        grp (h5py.Group): Group with the variables written from :func:`flatten_timestep`, where the ``/`` in the
+          variable paths are subgroups
+
+    Returns:
+        ``obj``
+    """
+    for name, item in grp.items():
+        if isinstance(obj, dict):
+            current = obj.get(name)
+        elif isinstance(obj, list):
+            current = obj[int(name)]
+        else:
+            current = getattr(obj, name, None)
+
+        if isinstance(item, h5._hl.group.Group):
+            if current is None:
+                current = dict()
+            restore_timestep(current, item)
+            new = current
+        else:
+            value = item[()]
+            if isinstance(current, ndarray):
+                if current.shape == value.shape:
+                    current[...] = value
+                    continue
+                new = np.array(value, dtype=current.dtype, order='F' if current.flags.f_contiguous else 'C')
+            elif isinstance(current, (ct.c_bool, ct.c_double, ct.c_int)):
+                current.value = value.item()
+                continue
+            elif isinstance(current, BasicNumTypes + (bool,)):
+                new = type(current)(value)
+            else:
+                new = value
+
+        if isinstance(obj, dict):
+            obj[name] = new
+        elif isinstance(obj, list):
+            obj[int(name)] = new
+        else:
+            setattr(obj, name, new)
+
+    return obj
+
+
+class TimeHistoryWriter(object):
+    """
+    Columnar writer of time histories in HDF5.
+
+    Every variable is stored in a single resizable and chunked dataset whose leading axis is time, rather than in a
+    group per time step. A ``ts`` dataset holds the time step number of every row. Rows are kept in memory and
+    written in batches of ``flush_every`` time steps, so the file (or group) can be kept open during the whole run.
+
+    If a variable is not present in a given time step, its row is filled with ``NaN`` (or ``0`` for non-float
+    variables). Variables that first appear after the first row store the index of the first row in which they
+    appear in the attribute ``first_row``.
+
+    See :func:`read_time_history` to read the variables back.
+
+    Args:
+        grp (h5py.Group): Group in which to write the time histories. Existing time histories are appended to.
+        flush_every (int): Number of time steps kept in memory before writing to disk
+        compression (str): ``h5py`` compression filter (``gzip`` or ``lzf``). ``None`` for no compression
+        compress_float (bool): Save 64-bit floats in single precision
+    """
+    def __init__(self, grp, flush_every=100, compression=None, compress_float=False):
+        self.grp = grp
+        self.flush_every = max(int(flush_every), 1)
+        self.compression = compression if compression else None
+        self.compress_float = compress_float
+
+        self.variables = dict()  # path: [shape, dtype, first_row]
+        self.pending = dict()  # path: list of rows not yet written
+        self.pending_ts = []
+        self.skipped = set()
+
+        if 'ts' in self.grp:
+            self.n_rows = self.grp['ts'].shape[0]
+            for path, dataset in self._existing_datasets(self.grp):
+                self.variables[path] = [dataset.shape[1:], dataset.dtype, int(dataset.attrs.get('first_row', 0))]
+                self.pending[path] = []
+        else:
+            self.n_rows = 0
+
+    @staticmethod
+    def _existing_datasets(grp, prefix=''):
+        datasets = []
+        for name, item in grp.items():
+            if isinstance(item, h5._hl.group.Group):
+                datasets.extend(TimeHistoryWriter._existing_datasets(item, prefix + name + '/'))
+            elif not (prefix == '' and name == 'ts'):
+                datasets.append((prefix + name, item))
+        return datasets
+
+    def _dtype(self, value):
+        if self.compress_float and value.dtype == float64:
+            return np.dtype('f4')
+        return value.dtype
+
+    def append(self, ts, values):
+        """
+        Adds a new row to the time histories
+
+        Args:
+            ts (int): Time step number
+            values (dict): Dictionary of ``path: np.ndarray`` (see :func:`flatten_timestep`)
+        """
+        row = self.n_rows + len(self.pending_ts)
+        arrays = dict()
+        for path, value in values.items():
+            if path in self.skipped:
+                continue
+            value = np.asarray(value)
+            arrays[path] = value
+            try:
+                shape, dtype, _ = self.variables[path]
+            except KeyError:
+                self.variables[path] = [value.shape, self._dtype(value), row]
+                self.pending[path] = []
+                continue
+            if value.shape != shape:
+                warnings.warn('The shape of %s changed from %s to %s. It will not be saved from time step %d '
+                              'onwards' % (path, shape, value.shape, ts))
+                self.skipped.add(path)
+
+        for path, (shape, dtype, first_row) in self.variables.items():
+            if first_row > row or path in self.skipped:
+                continue
+            try:
+                # copied, as the values are usually views of the time step arrays, which may change before the
+                # rows are written
+                self.pending[path].append(np.array(arrays[path], dtype=dtype, copy=True))
+            except KeyError:
+                fill = np.nan if dtype.kind in ('f', 'c') else 0
+                self.pending[path].append(np.full(shape, fill, dtype=dtype))
+
+        self.pending_ts.append(ts)
+        if len(self.pending_ts) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the rows held in memory to the file
+        """
+        n_new = len(self.pending_ts)
+        if n_new == 0:
+            return
+
+        self._write_rows('ts', (), np.dtype(int), 0, self.pending_ts)
+        for path, (shape, dtype, first_row) in self.variables.items():
+            if len(self.pending[path]):
+                self._write_rows(path, shape, dtype, first_row, self.pending[path])
+                self.pending[path] = []
+
+        self.n_rows += n_new
+        self.pending_ts = []
+
+    def _write_rows(self, path, shape, dtype, first_row, rows):
+        try:
+            dataset = self.grp[path]
+        except KeyError:
+            chunk_rows = min(self.flush_every, max(1, 2**20 // max(int(np.prod(shape)) * dtype.itemsize, 1)))
+            dataset = self.grp.create_dataset(path,
+                                              shape=(0,) + tuple(shape),
+                                              maxshape=(None,) + tuple(shape),
+                                              chunks=(chunk_rows,) + tuple(shape) if len(shape) else (chunk_rows,),
+                                              dtype=dtype,
+                                              compression=self.compression)
+            if first_row:
+                dataset.attrs['first_row'] = first_row
+        n_old = dataset.shape[0]
+        dataset.resize(n_old + len(rows), axis=0)
+        dataset[n_old:] = np.stack(rows)
+
+    def close(self):
+        """
+        Writes any pending rows. The file itself is not closed.
+        """
+        self.flush()
+
+
+def read_time_history(filename, variable, ts_start=None, ts_end=None, group='timeseries'):
+    """
+    Reads a variable written by :class:`TimeHistoryWriter` within a window of time steps, without loading the
+    rest of the time history.
+
+    Args:
+        filename (str or h5py.Group): Path to the HDF5 file or open group
+        variable (str): Path to the variable, relative to ``group``, i.e. ``structure/pos`` or
+          ``aero/gamma/00000``
+        ts_start (int (optional)): First time step to read (inclusive). Defaults to the first saved time step.
+        ts_end (int (optional)): Last time step to read (exclusive). Defaults to the last saved time step.
+        group (str): Group within the file holding the time histories
+
+    Returns:
+        tuple: Time steps of the rows read (``np.ndarray``) and values of the variable with time as the leading axis
+    """
+    if isinstance(filename, (h5._hl.group.Group, h5._hl.files.File)):
+        return _read_time_history(filename[group] if group else filename, variable, ts_start, ts_end)
+
+    check_file_exists(filename)
+    with h5.File(filename, 'r') as hdfile:
+        return _read_time_history(hdfile[group] if group else hdfile, variable, ts_start, ts_end)
+
+
+def _read_time_history(grp, variable, ts_start, ts_end):
+    # the time step index lives in the component group (i.e. ``structure``)
+    component_grp = grp
+    path = variable.strip('/').split('/')
+    for i_level in range(len(path)):
+        if 'ts' in component_grp:
+            break
+        component_grp = component_grp[path[i_level]]
+    if 'ts' not in component_grp:
+        raise KeyError('No time step index found for %s' % variable)
+
+    ts = component_grp['ts'][()]
+    dataset = grp[variable]
+    first_row = int(dataset.attrs.get('first_row', 0))
+
+    row_start = 0 if ts_start is None else int(np.searchsorted(ts, ts_start, side='left'))
+    row_end = len(ts) if ts_end is None else int(np.searchsorted(ts, ts_end, side='left'))
+    row_start = max(row_start, first_row)
+    row_end = max(min(row_end, first_row + dataset.shape[0]), row_start)
+
+    return ts[row_start:row_end], dataset[row_start - first_row:row_end - first_row]
+
+
+def list_time_history_variables(filename, group='timeseries'):
+    """
+    Returns the paths of the variables written by :class:`TimeHistoryWriter` in the file
+    """
+    check_file_exists(filename)
+    with h5.File(filename, 'r') as hdfile:
+        return [path for path, _ in TimeHistoryWriter._existing_datasets(hdfile[group])
+                if path.split('/')[-1] != 'ts']
@@ -1,8 +1,50 @@
 """Plotting utilities
 """
+import functools
+
 import numpy as np
 
 
+@functools.lru_cache(maxsize=64)
+def quad_connectivity(m, n):
+    """
+    Connectivity of the quadrilateral panels of a structured ``m x n`` panel grid (such as the lifting surfaces and
+    wakes in :class:`~sharpy.utils.datastructures.AeroTimeStepInfo`) in Paraview's format.
+
+    The vertices and panels are numbered with the chordwise index ``i_m`` running fastest, as returned by
+    :func:`flatten_grid_variable`. The result is cached for each grid dimension and must not be modified.
+
+    Args:
+        m (int): Number of chordwise panels
+        n (int): Number of spanwise panels
+
+    Returns:
+        np.ndarray: ``(m*n, 4)`` array with the vertex indices of each panel
+    """
+    i_m, i_n = np.meshgrid(np.arange(m), np.arange(n), indexing='xy')
+    corner = (i_n*(m + 1) + i_m).reshape(-1)
+    conn = np.column_stack((corner, corner + 1, corner + m + 2, corner + m + 1))
+    conn.flags.writeable = False
+    return conn
+
+
+def flatten_grid_variable(variable):
+    """
+    Rearranges a variable defined at the vertices or panels of a structured grid, with shape ``(k, M, N)`` or
+    ``(M, N)``, into an ``(M*N, k)`` or ``(M*N,)`` array with the chordwise index running fastest, consistent with
+    :func:`quad_connectivity`.
+
+    Args:
+        variable (np.ndarray): Grid variable such as ``zeta[i_surf]`` or ``gamma[i_surf]``
+
+    Returns:
+        np.ndarray: Flattened variable. It is a new array.
+    """
+    if variable.ndim == 3:
+        return np.array(variable.transpose(2, 1, 0).reshape(-1, variable.shape[0]))
+    return np.array(variable.T.reshape(-1))
+
+
 def set_axes_equal(ax):
     '''Make axes of 3D plot have equal scale so that spheres appear as spheres,
     cubes as cubes, etc..  This is one possible solution to Matplotlib's
@@ -0,0 +1,211 @@
+"""Lazy Registries
+
+Solvers, postprocessors, generators and controllers register themselves in the dictionaries of their interface
+(``dict_of_solvers``, ``dict_of_generators`` and ``dict_of_controllers``) through the ``@solver``, ``@generator`` and
+``@controller`` decorators when their module is imported.
+
+Rather than importing all the modules of the packages on start up, these dictionaries are :class:`LazyRegistry`
+instances that import the module of a class the first time it is requested. The module of each class is taken from
+the static index in ``sharpy.utils.registry_index``, generated by :func:`write_index` by parsing (not importing) the
+source files. If a class is not in the index (i.e. a new solver has been added without regenerating it), the
+packages are scanned again and, as a last resort, all their modules are imported.
+
+Iterating over a registry (for instance to generate the documentation) imports all the modules.
+"""
+import ast
+import importlib
+import importlib.util
+import os
+
+# packages holding the classes of each registry
+packages = {'solver': ('sharpy.presharpy', 'sharpy.solvers', 'sharpy.postproc'),
+            'generator': ('sharpy.generators',),
+            'controller': ('sharpy.controllers',)}
+
+index_module = 'sharpy.utils.registry_index'
+
+
+def package_modules(package):
+    """
+    Returns the names of the modules in ``package``, as ``solver_list_from_path`` does
+
+    Args:
+        package (str): Package name, such as ``sharpy.solvers``
+
+    Returns:
+        list(str): Full names of the modules of the package
+    """
+    folder = os.path.dirname(importlib.util.find_spec(package).origin)
+    return [package + '.' + file[:-3] for file in sorted(os.listdir(folder))
+            if file.endswith('.py') and file != '__init__.py' and os.path.isfile(os.path.join(folder, file))]
+
+
+def scan_module(module, kind):
+    """
+    Finds the classes registered by ``module`` without importing it.
+
+    Looks for the classes decorated with ``@<kind>`` (or ``@<interface>.<kind>``) that define ``<kind>_id`` as a
+    string in their body.
+
+    Args:
+        module (str): Full module name
+        kind (str): ``solver``, ``generator`` or ``controller``
+
+    Returns:
+        dict: Module name by class id
+    """
+    with open(importlib.util.find_spec(module).origin) as source_file:
+        tree = ast.parse(source_file.read())
+
+    found = dict()
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        decorators = [decorator.id if isinstance(decorator, ast.Name) else getattr(decorator, 'attr', None)
+                      for decorator in node.decorator_list]
+        if kind not in decorators:
+            continue
+        for statement in node.body:
+            if (isinstance(statement, ast.Assign) and
+                    any([getattr(target, 'id', None) == kind + '_id' for target in statement.targets]) and
+                    isinstance(statement.value, ast.Constant)):
+                found[statement.value.value] = module
+    return found
+
+
+def scan_packages(kind):
+    """
+    Returns the index of the classes of ``kind`` by parsing the modules of their packages
+
+    Args:
+        kind (str): ``solver``, ``generator`` or ``controller``
+
+    Returns:
+        dict: Module name by class id
+    """
+    index = dict()
+    for package in packages[kind]:
+        for module in package_modules(package):
+            index.update(scan_module(module, kind))
+    return index
+
+
+def write_index(filename=None):
+    """
+    Generates the static index ``sharpy/utils/registry_index.py``.
+
+    It needs to be run whenever a solver, postprocessor, generator or controller is added, renamed or moved,
+    although missing classes are still found (more slowly) by scanning the packages.
+
+    Args:
+        filename (str): Output file. Defaults to the ``sharpy.utils.registry_index`` module
+    """
+    if filename is None:
+        filename = os.path.join(os.path.dirname(__file__), 'registry_index.py')
+    index = {kind: scan_packages(kind) for kind in packages}
+    with open(filename, 'w') as index_file:
+        index_file.write('"""Static index of the SHARPy registries\n\n'
+                         'Module of every solver, postprocessor, generator and controller by its id. Generated by\n'
+                         '``sharpy.utils.registry.write_index()``, do not edit.\n"""\n')
+        index_file.write('index = {\n')
+        for kind in sorted(index):
+            index_file.write("    '{:s}': {{\n".format(kind))
+            for class_id in sorted(index[kind]):
+                index_file.write("        '{:s}': '{:s}',\n".format(class_id, index[kind][class_id]))
+            index_file.write('    },\n')
+        index_file.write('}\n')
+
+
+def load_index(kind):
+    """
+    Returns the static index of the classes of ``kind``, or an empty dictionary if it is not available
+    """
+    try:
+        return dict(importlib.import_module(index_module).index[kind])
+    except (ImportError, AttributeError, KeyError):
+        return dict()
+
+
+class LazyRegistry(dict):
+    """
+    Dictionary of classes by id that imports the module of a class the first time it is requested.
+
+    Classes are added by the registering decorators when their module is imported. Lookups (``[]``, ``in`` and
+    ``get``) only import the module of the requested class, whereas iterating over the registry or asking for its
+    length, keys, values or items imports all the modules in the packages of the registry.
+
+    Args:
+        kind (str): ``solver``, ``generator`` or ``controller``
+
+    Attributes:
+        index (dict): Module name by class id
+        all_loaded (bool): All the modules in the packages have been imported
+    """
+    def __init__(self, kind):
+        super().__init__()
+        self.kind = kind
+        self.index = None
+        self.all_loaded = False
+        self.scanned = False
+
+    def __missing__(self, key):
+        if self.index is None:
+            self.index = load_index(self.kind)
+
+        if key in self.index:
+            importlib.import_module(self.index[key])
+        if not dict.__contains__(self, key) and not self.scanned:
+            # the static index is outdated
+            self.index = scan_packages(self.kind)
+            self.scanned = True
+            if key in self.index:
+                importlib.import_module(self.index[key])
+        if not dict.__contains__(self, key):
+            self.load_all()
+        if not dict.__contains__(self, key):
+            raise KeyError(key)
+        return dict.get(self, key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def load_all(self):
+        """
+        Imports all the modules in the packages of the registry
+        """
+        if self.all_loaded:
+            return
+        for package in packages[self.kind]:
+            for module in package_modules(package):
+                importlib.import_module(module)
+        self.all_loaded = True
+
+    def __iter__(self):
+        self.load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self.load_all()
+        return super().__len__()
+
+    def keys(self):
+        self.load_all()
+        return super().keys()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+    def items(self):
+        self.load_all()
+        return super().items()
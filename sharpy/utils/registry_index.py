@@ -0,0 +1,79 @@
+"""Static index of the SHARPy registries
+
+Module of every solver, postprocessor, generator and controller by its id. Generated by
+``sharpy.utils.registry.write_index()``, do not edit.
+"""
+index = {
+    'controller': {
+        'BladePitchPid': 'sharpy.controllers.bladepitchpid',
+        'ControlSurfacePidController': 'sharpy.controllers.controlsurfacepidcontroller',
+        'TakeOffTrajectoryController': 'sharpy.controllers.takeofftrajectorycontroller',
+    },
+    'generator': {
+        'BumpVelocityField': 'sharpy.generators.bumpvelocityfield',
+        'DynamicControlSurface': 'sharpy.generators.dynamiccontrolsurface',
+        'EfficiencyCorrection': 'sharpy.generators.polaraeroforces',
+        'FloatingForces': 'sharpy.generators.floatingforces',
+        'GridBox': 'sharpy.generators.gridbox',
+        'GustVelocityField': 'sharpy.generators.gustvelocityfield',
+        'HelicoidalWake': 'sharpy.generators.helicoidalwake',
+        'ModifyStructure': 'sharpy.generators.modifystructure',
+        'PolarCorrection': 'sharpy.generators.polaraeroforces',
+        'ShearVelocityField': 'sharpy.generators.shearvelocityfield',
+        'SteadyVelocityField': 'sharpy.generators.steadyvelocityfield',
+        'StraightWake': 'sharpy.generators.straightwake',
+        'TrajectoryGenerator': 'sharpy.generators.trajectorygenerator',
+        'TurbVelocityField': 'sharpy.generators.turbvelocityfield',
+        'TurbVelocityFieldBts': 'sharpy.generators.turbvelocityfieldbts',
+    },
+    'solver': {
+        'AeroForcesCalculator': 'sharpy.postproc.aeroforcescalculator',
+        'AerogridLoader': 'sharpy.solvers.aerogridloader',
+        'AerogridPlot': 'sharpy.postproc.aerogridplot',
+        'AsymptoticStability': 'sharpy.postproc.asymptoticstability',
+        'BeamLoader': 'sharpy.solvers.beamloader',
+        'BeamLoads': 'sharpy.postproc.beamloads',
+        'BeamPlot': 'sharpy.postproc.beamplot',
+        'Cleanup': 'sharpy.postproc.cleanup',
+        'DynamicCoupled': 'sharpy.solvers.dynamiccoupled',
+        'DynamicUVLM': 'sharpy.solvers.dynamicuvlm',
+        'FrequencyResponse': 'sharpy.postproc.frequencyresponse',
+        'GeneralisedAlpha': 'sharpy.solvers.timeintegrators',
+        'GridLoader': 'sharpy.solvers.gridloader',
+        'InitialAeroelasticLoader': 'sharpy.solvers.initialaeroelasticloader',
+        'LiftDistribution': 'sharpy.postproc.liftdistribution',
+        'LinDynamicSim': 'sharpy.solvers.lindynamicsim',
+        'LinearAssembler': 'sharpy.solvers.linearassembler',
+        'Modal': 'sharpy.solvers.modal',
+        'NewmarkBeta': 'sharpy.solvers.timeintegrators',
+        'NoAero': 'sharpy.solvers.noaero',
+        'NoStructural': 'sharpy.solvers.nostructural',
+        'NonLinearDynamic': 'sharpy.solvers.nonlineardynamic',
+        'NonLinearDynamicCoupledStep': 'sharpy.solvers.nonlineardynamiccoupledstep',
+        'NonLinearDynamicMultibody': 'sharpy.solvers.nonlineardynamicmultibody',
+        'NonLinearDynamicPrescribedStep': 'sharpy.solvers.nonlineardynamicprescribedstep',
+        'NonLinearStatic': 'sharpy.solvers.nonlinearstatic',
+        'NonliftingbodygridLoader': 'sharpy.solvers.nonliftingbodygridloader',
+        'PickleData': 'sharpy.postproc.pickledata',
+        'PlotFlowField': 'sharpy.postproc.plotflowfield',
+        'PreSharpy': 'sharpy.presharpy.presharpy',
+        'PrescribedUvlm': 'sharpy.solvers.prescribeduvlm',
+        'RigidDynamicCoupledStep': 'sharpy.solvers.rigiddynamiccoupledstep',
+        'RigidDynamicPrescribedStep': 'sharpy.solvers.rigiddynamicprescribedstep',
+        'SaveData': 'sharpy.postproc.savedata',
+        'SaveParametricCase': 'sharpy.postproc.saveparametriccase',
+        'StabilityDerivatives': 'sharpy.postproc.stabilityderivatives',
+        'StallCheck': 'sharpy.postproc.stallcheck',
+        'StaticCoupled': 'sharpy.solvers.staticcoupled',
+        'StaticTrim': 'sharpy.solvers.statictrim',
+        'StaticUvlm': 'sharpy.solvers.staticuvlm',
+        'StepLinearUVLM': 'sharpy.solvers.steplinearuvlm',
+        'StepUvlm': 'sharpy.solvers.stepuvlm',
+        'Trim': 'sharpy.solvers.trim',
+        'UDPout': 'sharpy.postproc.udpout',
+        'UpdatePickle': 'sharpy.solvers.updatepickle',
+        'WriteVariablesTime': 'sharpy.postproc.writevariablestime',
+        '_BaseStructural': 'sharpy.solvers._basestructural',
+        '_BaseTimeIntegrator': 'sharpy.solvers.timeintegrators',
+    },
+}
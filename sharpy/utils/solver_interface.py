@@ -5,8 +5,9 @@ import sharpy.utils.settings as settings
 import inspect
 import shutil
 import sharpy.utils.exceptions as exceptions
+from sharpy.utils.registry import LazyRegistry
 
-dict_of_solvers = {}
+dict_of_solvers = LazyRegistry('solver')
 solvers = {}  # for internal working
 
 
@@ -65,6 +66,20 @@ class BaseSolver(metaclass=ABCMeta):
     def teardown(self):
         pass
 
+    # Time step variables needed by an online postprocessor, by component (``structure``, ``aero``...). A list of
+    # attribute names, or ``None`` for the whole time step. ``None`` if it cannot run in the background
+    # (see sharpy.utils.background_postproc)
+    def snapshot_variables(self):
+        return None
+
+    # Internal state needed to continue a time marching simulation from a checkpoint, as a dictionary of arrays and
+    # numbers. ``None`` if there is no state other than the time steps (see sharpy.utils.checkpoint)
+    def checkpoint_state(self):
+        return None
+
+    def restore_checkpoint_state(self, state):
+        pass
+
 
 def solver_from_string(string):
     try:
@@ -0,0 +1,348 @@
+"""Parametric Sweeps
+
+Runs variations of a SHARPy case in parallel and collects selected outputs of every case in a single HDF5 table.
+
+The cases are defined by a base ``.sharpy`` settings file (or dictionary) and either a grid of parameters (all the
+combinations of the values of each parameter) or a list of cases. Parameters are settings of the ``.sharpy`` file,
+given by their path, i.e. ``NonLinearStatic.gravity`` or
+``DynamicCoupled.aero_solver_settings.velocity_field_input.u_inf``.
+
+All the cases read the case input files (``.fem.h5``, ``.aero.h5``, ``.dyn.h5``...) from the ``route`` of the base
+settings, which are therefore shared instead of being copied to every case folder. Each case writes its output
+to its own ``log_folder``, ``<folder>/cases/<case number>/``, where its ``.sharpy`` file is also written.
+
+The cases run on a pool of processes through :func:`sharpy.sharpy_main.main`. The number of threads used by
+the BLAS and OpenMP libraries in each process is limited so that the workers do not compete for the cores.
+
+The results are written to ``<folder>/<name>.sweep.h5`` as soon as each case finishes. This table records the state
+of every case, so that an interrupted sweep can be resumed by running it again: only the cases that have not
+finished are run. See :func:`read_sweep` for its contents.
+
+Note:
+    The worker processes are started with the ``spawn`` method, so scripts running a sweep need to be guarded
+    with ``if __name__ == '__main__':``.
+
+Examples:
+
+    .. code-block:: python
+
+        import sharpy.utils.sweep as sweep
+
+        if __name__ == '__main__':
+            envelope = sweep.ParametricSweep('./cases/wing.sharpy',
+                                             {'StaticCoupled.aero_solver_settings.velocity_field_input.u_inf':
+                                                  [10., 20., 30.],
+                                              'StaticCoupled.aero_solver_settings.rho': [1.225, 0.9]},
+                                             outputs={'tip_pos': 'structure.timestep_info[-1].pos[-1]'},
+                                             folder='./output/envelope/',
+                                             n_workers=6)
+            results = envelope.run()
+"""
+import concurrent.futures
+import contextlib
+import copy
+import itertools
+import multiprocessing
+import os
+import re
+
+import configobj
+import h5py as h5
+import numpy as np
+
+import sharpy.utils.cout_utils as cout
+import sharpy.utils.exceptions as exceptions
+from sharpy.utils.settings import load_config_file
+
+# case status in the sweep table
+PENDING = 0
+FINISHED = 1
+FAILED = -1
+
+# environment variables limiting the threads of the numerical libraries
+thread_variables = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS')
+
+
+@contextlib.contextmanager
+def thread_limits(num_threads):
+    """
+    Sets the environment variables limiting the threads of the BLAS and OpenMP libraries, which are read by the
+    processes started within the context. The previous environment is restored on exit.
+
+    Args:
+        num_threads (int): Number of threads. If ``None``, the environment is not modified.
+    """
+    previous = {variable: os.environ.get(variable) for variable in thread_variables}
+    if num_threads is not None:
+        for variable in thread_variables:
+            os.environ[variable] = str(int(num_threads))
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def get_output(data, output):
+    """
+    Extracts an output from the results of a case.
+
+    Args:
+        data (sharpy.presharpy.presharpy.PreSharpy): Results of the case
+        output (str or callable): Attribute path with optional indices, i.e.
+          ``structure.timestep_info[-1].pos[-1, 2]``, or function taking ``data`` and returning the output.
+          Functions need to be defined at module level so that they can be sent to the worker processes.
+
+    Returns:
+        np.ndarray: Output value
+    """
+    if callable(output):
+        return np.asarray(output(data))
+
+    value = data
+    for attribute, index in re.findall(r'\.?(\w+)|\[([^\]]+)\]', output):
+        if attribute:
+            value = getattr(value, attribute)
+        else:
+            value = value[tuple(int(i) for i in index.split(','))] if ',' in index else value[int(index)]
+    return np.asarray(value)
+
+
+def set_setting(settings, path, value):
+    """
+    Sets the value of a setting given its path (``<solver>.<setting>[.<subsetting>...]``)
+    """
+    keys = path.split('.')
+    section = settings
+    for key in keys[:-1]:
+        try:
+            section = section[key]
+        except KeyError:
+            raise exceptions.NotValidInputFile('The sweep parameter %s is not in the base settings: %s '
+                                               'is not defined' % (path, key))
+    section[keys[-1]] = value
+
+
+def run_case(settings_file, outputs):
+    """
+    Runs a case in a worker process and returns its outputs
+
+    Args:
+        settings_file (str): Path to the ``.sharpy`` file of the case
+        outputs (dict): Outputs to extract by name. See :func:`get_output`
+
+    Returns:
+        dict: Output values by name
+    """
+    import sharpy.sharpy_main
+    data = sharpy.sharpy_main.main(['sharpy', settings_file])
+    return {name: get_output(data, output) for name, output in outputs.items()}
+
+
+def read_sweep(filename):
+    """
+    Reads the table of a sweep.
+
+    Args:
+        filename (str): Path to the ``.sweep.h5`` file
+
+    Returns:
+        dict: With the following keys, all arrays having the case as the leading axis
+
+            * ``parameters``: Value of every parameter by name. Non-numeric values are returned as strings.
+
+            * ``outputs``: Value of every output by name. ``NaN`` for the cases that have not finished.
+
+            * ``status``: ``1`` for finished cases, ``0`` for pending cases and ``-1`` for failed cases.
+    """
+    with h5.File(filename, 'r') as table:
+        parameters = dict()
+        for name in table['parameters'].attrs['order']:
+            name = name.decode() if isinstance(name, bytes) else name
+            values = table['parameters'][name][()]
+            if values.dtype.kind == 'S':
+                values = np.array([value.decode() for value in values])
+            parameters[name] = values
+        outputs = {name: dataset[()] for name, dataset in table['outputs'].items()}
+        status = table['status'][()]
+    return {'parameters': parameters, 'outputs': outputs, 'status': status}
+
+
+class ParametricSweep(object):
+    """
+    Parametric sweep of a SHARPy case.
+
+    Args:
+        base_settings (str or dict): Path to the ``.sharpy`` file of the base case or its settings
+        parameters (dict or list(dict)): Values of each parameter by setting path. If a ``dict`` of lists, a case is
+          run for every combination of values. If a list of ``dict``, a case is run for each of them.
+        outputs (dict): Outputs to collect by name. See :func:`get_output`
+        folder (str): Output folder of the sweep
+        name (str): Name of the sweep table. Defaults to the case name of the base settings
+        n_workers (int): Number of cases run in parallel. Defaults to the number of cores divided by
+          ``threads_per_case``
+        threads_per_case (int): Maximum number of threads of the numerical libraries in each worker. If ``None``, the
+          environment is not modified.
+        write_screen (bool): Display the output of the cases on screen. Output of parallel cases is interleaved.
+
+    Attributes:
+        cases (list(dict)): Parameter values of each case
+        table_file (str): Path to the sweep table
+    """
+    def __init__(self, base_settings, parameters, outputs, folder, name=None, n_workers=None, threads_per_case=1,
+                 write_screen=False):
+        if isinstance(base_settings, str):
+            base_settings = load_config_file(base_settings)
+        if isinstance(base_settings, configobj.ConfigObj):
+            base_settings = base_settings.dict()
+        self.base_settings = copy.deepcopy(dict(base_settings))
+        self.base_settings['SHARPy']['route'] = os.path.abspath(self.base_settings['SHARPy']['route'])
+
+        if isinstance(parameters, dict):
+            self.parameter_names = list(parameters.keys())
+            self.cases = [dict(zip(self.parameter_names, values))
+                          for values in itertools.product(*[parameters[name] for name in self.parameter_names])]
+        else:
+            self.cases = [dict(case) for case in parameters]
+            self.parameter_names = list(self.cases[0].keys()) if self.cases else []
+            for case in self.cases:
+                if set(case.keys()) != set(self.parameter_names):
+                    raise exceptions.NotValidInputFile('All the cases of a sweep need to define the same parameters')
+
+        self.outputs = dict(outputs)
+        self.folder = os.path.abspath(folder) + '/'
+        self.name = name if name is not None else self.base_settings['SHARPy']['case']
+        self.table_file = self.folder + self.name + '.sweep.h5'
+
+        self.threads_per_case = threads_per_case
+        if n_workers is None:
+            n_workers = max((os.cpu_count() or 1) // max(threads_per_case or 1, 1), 1)
+        self.n_workers = n_workers
+        self.write_screen = write_screen
+
+    def case_folder(self, i_case):
+        return self.folder + 'cases/%04d/' % i_case
+
+    def case_settings(self, i_case):
+        """
+        Returns the settings of a case: the base settings with the parameter values of the case and the output
+        redirected to the case folder
+        """
+        settings = copy.deepcopy(self.base_settings)
+        for path, value in self.cases[i_case].items():
+            set_setting(settings, path, value)
+        settings['SHARPy']['log_folder'] = self.case_folder(i_case)
+        settings['SHARPy']['write_screen'] = self.write_screen
+        return settings
+
+    def write_case(self, i_case):
+        """
+        Writes the ``.sharpy`` file of a case in its folder and returns its path
+        """
+        settings = self.case_settings(i_case)
+        os.makedirs(self.case_folder(i_case), exist_ok=True)
+        config = configobj.ConfigObj()
+        config.filename = self.case_folder(i_case) + settings['SHARPy']['case'] + '.sharpy'
+        for section, values in settings.items():
+            config[section] = values
+        config.write()
+        return config.filename
+
+    @staticmethod
+    def _parameter_array(values):
+        try:
+            return np.array(values, dtype=float)
+        except (TypeError, ValueError):
+            return np.array([str(value).encode() for value in values])
+
+    def open_table(self):
+        """
+        Opens the sweep table, creating it if it does not exist. An existing table needs to have been created with the
+        same cases.
+
+        Returns:
+            h5py.File: Sweep table
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        n_cases = len(self.cases)
+        parameters = {name: self._parameter_array([case[name] for case in self.cases])
+                      for name in self.parameter_names}
+
+        if os.path.isfile(self.table_file):
+            table = h5.File(self.table_file, 'a')
+            same_cases = (table['status'].shape == (n_cases,) and
+                          all([name in table['parameters'] and
+                               np.array_equal(table['parameters'][name][()], values)
+                               for name, values in parameters.items()]))
+            if not same_cases:
+                table.close()
+                raise exceptions.NotValidInputFile('The sweep table %s holds a different set of cases. Remove it or '
+                                                   'change the name of the sweep.' % self.table_file)
+            return table
+
+        table = h5.File(self.table_file, 'w')
+        parameters_grp = table.create_group('parameters')
+        parameters_grp.attrs['order'] = np.array([name.encode() for name in self.parameter_names])
+        for name, values in parameters.items():
+            parameters_grp.create_dataset(name, data=values)
+        table.create_dataset('status', data=np.full((n_cases,), PENDING, dtype=np.int8))
+        table.create_group('outputs')
+        return table
+
+    @staticmethod
+    def write_outputs(table, i_case, values):
+        outputs_grp = table['outputs']
+        for name, value in values.items():
+            if name not in outputs_grp:
+                dtype = complex if np.iscomplexobj(value) else float
+                outputs_grp.create_dataset(name, shape=(table['status'].shape[0],) + value.shape, dtype=dtype,
+                                           fillvalue=np.nan)
+            dataset = outputs_grp[name]
+            if dataset.shape[1:] != value.shape:
+                raise ValueError('Output %s of case %u has shape %s, whereas %s was expected' %
+                                 (name, i_case, value.shape, dataset.shape[1:]))
+            dataset[i_case] = value
+
+    def run(self, retry_failed=False):
+        """
+        Runs the cases of the sweep that have not finished yet
+
+        Args:
+            retry_failed (bool): Run again the cases that failed in a previous run
+
+        Returns:
+            dict: Sweep table, as returned by :func:`read_sweep`
+        """
+        with self.open_table() as table:
+            status = table['status'][()]
+            to_run = [i_case for i_case in range(len(self.cases))
+                      if status[i_case] == PENDING or (retry_failed and status[i_case] == FAILED)]
+            cout.cout_wrap('Sweep %s: running %u of %u cases with %u workers' % (self.name, len(to_run),
+                                                                              len(self.cases), self.n_workers))
+
+            if to_run:
+                with thread_limits(self.threads_per_case):
+                    # the workers are started on submission so that they read the thread limits
+                    executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.n_workers, mp_context=multiprocessing.get_context('spawn'))
+                    futures = {executor.submit(run_case, self.write_case(i_case), self.outputs): i_case
+                               for i_case in to_run}
+
+                with executor:
+                    for future in concurrent.futures.as_completed(futures):
+                        i_case = futures[future]
+                        try:
+                            self.write_outputs(table, i_case, future.result())
+                            table['status'][i_case] = FINISHED
+                        except Exception as error:
+                            table['status'][i_case] = FAILED
+                            cout.cout_wrap('Sweep %s: case %u failed (%s: %s). See %s' %
+                                           (self.name, i_case, type(error).__name__, error,
+                                            self.case_folder(i_case)), 3)
+                        table.flush()
+
+        return read_sweep(self.table_file)
@@ -0,0 +1,24 @@
+"""
+Opt-in benchmarks
+
+The benchmarks in the test suite report the timings (or allocations) of the optimised code paths against the
+original implementations. They do not assert on them, as they depend on the machine and its load, and are skipped
+unless the ``SHARPY_BENCHMARK`` environment variable is set::
+
+    SHARPY_BENCHMARK=1 python -m unittest tests.linear.statespace.test_freqresp -v
+"""
+import os
+import time
+import unittest
+
+benchmark = unittest.skipUnless(os.environ.get('SHARPY_BENCHMARK'), 'benchmarks run with SHARPY_BENCHMARK=1')
+
+
+def timeit(function, n_calls=1):
+    """
+    Average wall-clock time in seconds of ``n_calls`` calls to ``function``, which takes no arguments
+    """
+    ini_time = time.perf_counter()
+    for _ in range(n_calls):
+        function()
+    return (time.perf_counter() - ini_time) / n_calls
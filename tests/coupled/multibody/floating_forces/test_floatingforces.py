@@ -4,6 +4,7 @@ import os
 import shutil
 from scipy import fft
 import sharpy.generators.floatingforces as ff
+from tests.benchmark import benchmark, timeit
 
 
 class TestFloatingForces(unittest.TestCase):
@@ -166,6 +167,121 @@ class TestFloatingForces(unittest.TestCase):
             plt.close()
 
 
+    @staticmethod
+    def radiation_kernel(s):
+        """
+            Radiation kernel with two resonances in each diagonal term and a symmetric coupling term
+        """
+        np.random.seed(7)
+        K = np.zeros((s.shape[0], 6, 6), dtype=complex)
+        for idof in range(6):
+            for iterm in range(2):
+                w0 = 0.4 + 1.5*np.random.rand()
+                zeta = 0.3 + 0.4*np.random.rand()
+                K[:, idof, idof] += 1e4*(1. + np.random.rand())*s/(s**2 + 2*zeta*w0*s + w0**2)
+        K[:, 1, 5] = 2e3*s/(s**2 + 0.8*s + 1.)*(s + 1.)/(s**2 + 0.6*s + 4.)
+        K[:, 5, 1] = K[:, 1, 5]
+        return K
+
+    def test_radiation_state_space(self):
+        """
+            Fit the state-space radiation model to added mass and damping data and compare its recursive
+            integration with the FFT response to a periodic velocity
+        """
+        omega = np.concatenate((np.linspace(0.02, 6., 300), [np.inf]))
+        added_mass_inf = np.diag(1e4*(1. + np.random.rand(6)))
+        K_true = self.radiation_kernel(1j*omega[:-1])
+        damping = np.concatenate((K_true.real, np.zeros((1, 6, 6))))
+        added_mass = np.concatenate((added_mass_inf + K_true.imag/omega[:-1, None, None], [added_mass_inf]))
+
+        K_freq = ff.radiation_kernel_freq(omega, added_mass, damping, added_mass_inf)
+        K_rf = ff.fit_radiation_kernel(omega, K_freq, 4)
+        self.assertEqual(sorted(K_rf.keys()), sorted(["%d_%d" % (idof, idof) for idof in range(6)] + ["1_5", "5_1"]))
+        A, B, C = ff.rational_function_ss(K_rf)
+        self.assertTrue((np.linalg.eigvals(A).real < 0).all())
+
+        K_fit = np.array([C.dot(np.linalg.solve(1j*w*np.eye(A.shape[0]) - A, B)) for w in omega[:-1]])
+        np.testing.assert_allclose(K_fit, K_true, atol=1e-6*np.max(np.abs(K_true)))
+
+        # Periodic velocities with a few harmonics
+        dt = 0.05
+        nperiod = 4000
+        t = np.arange(3*nperiod)*dt
+        qdot = np.zeros((3*nperiod, 6))
+        for harmonic in [7, 23, 41, 60]:
+            w = 2.*np.pi*harmonic/(nperiod*dt)
+            qdot += np.outer(np.cos(w*t), np.random.rand(6)) + np.outer(np.sin(w*t), np.random.rand(6))
+
+        phi, gamma0, gamma1 = ff.discretise_first_order_hold(A, B, dt)
+        x = np.zeros((A.shape[0]))
+        for it in range(1, 3*nperiod):
+            x = phi.dot(x) + gamma0.dot(qdot[it - 1, :]) + gamma1.dot(qdot[it, :])
+        f_ss = C.dot(x)
+
+        f_fft = ff.response_freq_dep_matrix(K_freq[:-1], omega[:-1], qdot, nperiod - 1, dt)
+        np.testing.assert_allclose(f_ss, f_fft, atol=5e-3*np.max(np.abs(f_fft)))
+
+    @benchmark
+    def test_radiation_benchmark(self):
+        nsteps = 1000
+        dt = 0.05
+        omega = np.linspace(0.02, 6., 300)
+        K_freq = self.radiation_kernel(1j*omega)
+        qdot = np.random.rand(nsteps, 6)
+
+        def fft_history():
+            for it in range(1, nsteps):
+                ff.response_freq_dep_matrix(K_freq, omega, qdot, it, dt)
+
+        def state_space():
+            A, B, C = ff.rational_function_ss(ff.fit_radiation_kernel(omega, K_freq, 4))
+            phi, gamma0, gamma1 = ff.discretise_first_order_hold(A, B, dt)
+            x = np.zeros((A.shape[0]))
+            for it in range(1, nsteps):
+                x = phi.dot(x) + gamma0.dot(qdot[it - 1, :]) + gamma1.dot(qdot[it, :])
+                C.dot(x)
+
+        print('Radiation forces over {:d} time steps: {:.2e} s FFT of the history, '
+              '{:.2e} s fitting and integrating the state-space model'.format(nsteps, timeit(fft_history),
+                                                                                timeit(state_space)))
+
+    def test_step_wave_forces(self):
+        Tp = 14.656
+        Hs = 5.49
+        dt = 0.1
+        grav = 9.81
+        dx = 3.
+        xi = np.zeros((2, 6), dtype=complex)
+        xi[0, :] = np.random.rand(6) + 1j*np.random.rand(6)
+        xi[1, :] = np.random.rand(6) + 1j*np.random.rand(6)
+        w_xi = np.array([0., 4.])
+
+        for ntime_steps in [200, 201]:
+            floating_forces = ff.FloatingForces()
+            floating_forces.freq_wave_forces_variables(Tp, Hs, dt, np.arange(ntime_steps)*dt, xi, w_xi)
+
+            # Two-sided spectrum built term by term
+            omega = floating_forces.omega
+            force_freq_2s = np.zeros((ntime_steps, 6), dtype=complex)
+            for idim in range(6):
+                for iomega in range(omega.shape[0]):
+                    k = omega[iomega]**2/grav
+                    force_freq_2s[iomega, idim] = (floating_forces.noise_freq[iomega]*
+                                                   0.5*floating_forces.jonswap_freq[iomega]*
+                                                   floating_forces.xi_interp[iomega, idim]*
+                                                   np.exp(-1j*k*dx))
+                    if not iomega == 0:
+                        if not ((iomega == omega.shape[0] - 1) and (ntime_steps%2 == 0)):
+                            force_freq_2s[-iomega, idim] = np.conj(force_freq_2s[iomega, idim])
+            reference = np.real(np.fft.ifft(force_freq_2s, axis=0))
+
+            wave_forces = floating_forces.time_wave_forces(dx, grav)
+            np.testing.assert_allclose(wave_forces, reference, atol=1e-10*np.max(np.abs(reference)))
+            for it in range(ntime_steps):
+                np.testing.assert_allclose(floating_forces.step_wave_forces(dx, grav, it), reference[it, :],
+                                           atol=1e-10*np.max(np.abs(reference)))
+
+
     # def tearDown(self):
     #     solver_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
     #     solver_path += '/'
@@ -0,0 +1,190 @@
+"""
+Regression tests of the vectorised induced velocity derivatives against the
+original panel by panel assembly
+"""
+
+import os
+import itertools
+import unittest
+import numpy as np
+
+import sharpy.utils.h5utils as h5utils
+import sharpy.utils.algebra as algebra
+import sharpy.linear.src.assembly as assembly
+import sharpy.linear.src.lib_dbiot as dbiot
+import sharpy.linear.src.multisurfaces as multisurfaces
+from sharpy.aero.utils.uvlmlib import dvinddzeta_cpp, eval_panel_cpp
+from tests.benchmark import benchmark, timeit
+
+vortex_radius = 1e-4
+dmver = [0, 1, 1, 0]
+dnver = [0, 0, 1, 1]
+
+
+def reference_nc_dqcdzeta(Surfs, Surfs_star):
+    """
+    Collocation point by collocation point assembly, as originally implemented in assembly.nc_dqcdzeta
+    """
+    n_surf = len(Surfs)
+    DAICcoll = []
+    DAICvert = []
+    for ss_out in range(n_surf):
+        Surf_out = Surfs[ss_out]
+        if not hasattr(Surf_out, 'zetac'):
+            Surf_out.generate_collocations()
+        K_out = Surf_out.maps.K
+        shape_zeta_out = Surf_out.maps.shape_vert_vect
+        wcv_out = Surf_out.get_panel_wcv()
+        Dcoll = np.zeros((K_out, 3 * Surf_out.maps.Kzeta))
+        DAICvert_sub = []
+        for ss_in in range(n_surf):
+            Dvert = np.zeros((K_out, 3 * Surfs[ss_in].maps.Kzeta))
+            for Surf_in, is_bound in [(Surfs[ss_in], True), (Surfs_star[ss_in], False)]:
+                for cc_out in range(K_out):
+                    mm_out = Surf_out.maps.ind_2d_pan_scal[0][cc_out]
+                    nn_out = Surf_out.maps.ind_2d_pan_scal[1][cc_out]
+                    zetac_here = Surf_out.zetac[:, mm_out, nn_out].copy()
+                    nc_here = Surf_out.normals[:, mm_out, nn_out]
+                    dvind_coll, dvind_vert = dvinddzeta_cpp(zetac_here, Surf_in, is_bound=is_bound,
+                                                            vortex_radius=Surf_in.vortex_radius,
+                                                            M_in_bound=Surfs[ss_in].maps.M)
+                    Dvert[cc_out, :] += np.dot(nc_here, dvind_vert)
+                    dvindnorm_coll = np.dot(nc_here, dvind_coll)
+                    for vv, dm, dn in zip(range(4), dmver, dnver):
+                        ii_v = [np.ravel_multi_index((cc, mm_out + dm, nn_out + dn), shape_zeta_out)
+                                for cc in range(3)]
+                        Dcoll[cc_out, ii_v] += wcv_out[vv] * dvindnorm_coll
+            DAICvert_sub.append(Dvert)
+        DAICcoll.append(Dcoll)
+        DAICvert.append(DAICvert_sub)
+    return DAICcoll, DAICvert
+
+
+def reference_dfqsdvind_zeta(Surfs, Surfs_star):
+    """
+    Segment by segment assembly, as originally implemented in assembly.dfqsdvind_zeta
+    """
+    n_surf = len(Surfs)
+    Dercoll_list = []
+    Dervert_list = []
+    for ss_out in range(n_surf):
+        Surf_out = Surfs[ss_out]
+        M_out, N_out = Surf_out.maps.M, Surf_out.maps.N
+        shape_fqs = Surf_out.maps.shape_vert_vect
+        Dercoll = np.zeros((3 * Surf_out.maps.Kzeta, 3 * Surf_out.maps.Kzeta))
+        Dervert_sub = [np.zeros((3 * Surf_out.maps.Kzeta, 3 * Surfs[ss_in].maps.Kzeta)) for ss_in in range(n_surf)]
+
+        segments = []
+        for mm_out, nn_out in itertools.product(range(M_out), range(N_out)):
+            for aa, bb in zip([0, 1, 2, 3], [1, 2, 3, 0]):
+                segments.append(((mm_out + dmver[aa], nn_out + dnver[aa]),
+                                 (mm_out + dmver[bb], nn_out + dnver[bb]),
+                                 Surf_out.gamma[mm_out, nn_out]))
+        for nn_out in range(N_out):
+            segments.append(((M_out, nn_out + 1), (M_out, nn_out), Surfs_star[ss_out].gamma[0, nn_out]))
+
+        for (mn_a, mn_b, gamma) in segments:
+            zeta_a = Surf_out.zeta[:, mn_a[0], mn_a[1]]
+            zeta_b = Surf_out.zeta[:, mn_b[0], mn_b[1]]
+            zeta_mid = 0.5 * (zeta_b + zeta_a)
+            Lskew = algebra.skew((-Surf_out.rho * gamma) * (zeta_b - zeta_a))
+            ii_a = [np.ravel_multi_index((cc,) + mn_a, shape_fqs) for cc in range(3)]
+            ii_b = [np.ravel_multi_index((cc,) + mn_b, shape_fqs) for cc in range(3)]
+            for ss_in in range(n_surf):
+                Surf_in = Surfs[ss_in]
+                for Surf_here, is_bound in [(Surf_in, True), (Surfs_star[ss_in], False)]:
+                    dvind_mid, dvind_vert = dvinddzeta_cpp(zeta_mid, Surf_here, is_bound=is_bound,
+                                                           vortex_radius=Surf_in.vortex_radius,
+                                                           M_in_bound=Surf_in.maps.M)
+                    Df = np.dot(0.25 * Lskew, dvind_mid)
+                    Dercoll[np.ix_(ii_a, ii_a)] += Df
+                    Dercoll[np.ix_(ii_b, ii_a)] += Df
+                    Dercoll[np.ix_(ii_a, ii_b)] += Df
+                    Dercoll[np.ix_(ii_b, ii_b)] += Df
+                    Df = np.dot(0.5 * Lskew, dvind_vert)
+                    Dervert_sub[ss_in][ii_a, :] += Df
+                    Dervert_sub[ss_in][ii_b, :] += Df
+        Dercoll_list.append(Dercoll)
+        Dervert_list.append(Dervert_sub)
+    return Dercoll_list, Dervert_list
+
+
+class TestAssemblyVectorised(unittest.TestCase):
+    """
+    Compares the vectorised assembly of the induced velocity derivatives with the original loops
+    """
+
+    def setUp(self):
+        fname = os.path.dirname(os.path.abspath(__file__)) + '/h5input/goland_mod_Nsurf02_M003_N004_a040.aero_state.h5'
+        haero = h5utils.readh5(fname)
+        MS = multisurfaces.MultiAeroGridSurfaces(haero.ts00000, vortex_radius)
+        MS.get_normal_ind_velocities_at_collocation_points()
+        self.MS = MS
+
+    def assert_matrices_equal(self, computed, reference):
+        scale = max(np.max(np.abs(reference)), 1.)
+        np.testing.assert_allclose(computed, reference, rtol=0., atol=1e-12 * scale)
+
+    def test_eval_panels_vec(self):
+        np.random.seed(3)
+        ZetaPanels = np.array([[[1.0, 3.0, 0.9], [5.0, 3.1, 1.9], [4.8, 8.1, 2.5], [0.9, 7.9, 1.7]],
+                               [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.1], [0.0, 1.0, 0.1]]])
+        gamma = np.array([4., -1.5])
+        zetaP = np.random.rand(5, 3) * 4.
+        # a point on a segment, within the vortex core
+        zetaP[-1] = 0.5 * (ZetaPanels[1, 1] + ZetaPanels[1, 2])
+
+        DerP, DerVertices = dbiot.eval_panels_vec(zetaP, ZetaPanels, vortex_radius, gamma)
+        DerP_coll, _ = dbiot.eval_panels_vec(zetaP, ZetaPanels, vortex_radius, gamma, vertices=False)
+        for pp in range(zetaP.shape[0]):
+            DerP_ref = np.zeros((3, 3))
+            for kk in range(ZetaPanels.shape[0]):
+                DP, DV = eval_panel_cpp(zetaP[pp].copy(), ZetaPanels[kk].copy(), vortex_radius, gamma_pan=gamma[kk])
+                DerP_ref += DP
+                np.testing.assert_allclose(DerVertices[pp, kk], DV, rtol=1e-12, atol=1e-14)
+            np.testing.assert_allclose(DerP[pp], DerP_ref, rtol=1e-12, atol=1e-14)
+            np.testing.assert_allclose(DerP_coll[pp], DerP_ref, rtol=1e-12, atol=1e-14)
+
+    def test_nc_dqcdzeta(self):
+        MS = self.MS
+        reference_coll, reference_vert = reference_nc_dqcdzeta(MS.Surfs, MS.Surfs_star)
+        for num_cores in [1, 2]:
+            Dcoll, Dvert = assembly.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, num_cores=num_cores)
+            for ss_out in range(MS.n_surf):
+                self.assert_matrices_equal(Dcoll[ss_out], reference_coll[ss_out])
+                for ss_in in range(MS.n_surf):
+                    self.assert_matrices_equal(Dvert[ss_out][ss_in], reference_vert[ss_out][ss_in])
+
+    def test_dfqsdvind_zeta(self):
+        MS = self.MS
+        reference_coll, reference_vert = reference_dfqsdvind_zeta(MS.Surfs, MS.Surfs_star)
+        for num_cores in [1, 2]:
+            Dcoll, Dvert = assembly.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star, num_cores=num_cores)
+            for ss_out in range(MS.n_surf):
+                self.assert_matrices_equal(Dcoll[ss_out], reference_coll[ss_out])
+                for ss_in in range(MS.n_surf):
+                    self.assert_matrices_equal(Dvert[ss_out][ss_in], reference_vert[ss_out][ss_in])
+
+    def test_dvinddzeta(self):
+        MS = self.MS
+        zetac = 0.5 * (MS.Surfs[0].zeta[:, 1, 2] + MS.Surfs[0].zeta[:, 1, 3])
+        for ss_in in range(MS.n_surf):
+            for Surf_in, is_bound in [(MS.Surfs[ss_in], True), (MS.Surfs_star[ss_in], False)]:
+                dcoll, dvert = assembly.dvinddzeta(zetac, Surf_in, IsBound=is_bound, M_in_bound=MS.Surfs[ss_in].maps.M)
+                dcoll_ref, dvert_ref = dvinddzeta_cpp(zetac.copy(), Surf_in, is_bound=is_bound,
+                                                      vortex_radius=Surf_in.vortex_radius,
+                                                      M_in_bound=MS.Surfs[ss_in].maps.M)
+                self.assert_matrices_equal(dcoll, dcoll_ref)
+                self.assert_matrices_equal(dvert, dvert_ref)
+
+    @benchmark
+    def test_benchmark(self):
+        MS = self.MS
+        reference_time = timeit(lambda: reference_dfqsdvind_zeta(MS.Surfs, MS.Surfs_star))
+        vectorised_time = timeit(lambda: assembly.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star))
+        print('dfqsdvind_zeta on {:d} surfaces: {:.2e} s segment by segment, {:.2e} s vectorised'.format(
+            MS.n_surf, reference_time, vectorised_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
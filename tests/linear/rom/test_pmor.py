@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import configobj
+import numpy as np
+import scipy.linalg as scalg
+
+import sharpy.linear.src.libss as libss
+from sharpy.rom.utils.librom_pmor import ParametricCase, ParametricROMDatabase
+from tests.benchmark import benchmark, timeit
+
+
+class TestParametricROMDatabase(unittest.TestCase):
+    """
+    Interpolation of a family of reduced order models with parameter-affine full order matrices, projected onto a
+    common subspace but saved in different (scrambled) coordinates at each point. Once the coordinates are made
+    consistent, linear interpolation recovers the reduced order model at the query point exactly.
+    """
+
+    n_full = 150
+    n_rom = 10
+    n_in = 2
+    n_out = 3
+    dt = 0.05
+
+    @classmethod
+    def setUpClass(cls):
+        np.random.seed(21)
+        modes = np.linalg.qr(np.random.randn(cls.n_full, cls.n_full))[0]
+        cls.A0 = modes.dot(np.diag(0.8 * np.random.rand(cls.n_full))).dot(modes.T)
+        cls.A1 = [modes.dot(np.diag(0.05 * np.random.rand(cls.n_full))).dot(modes.T) for _ in range(2)]
+        cls.B0 = np.random.randn(cls.n_full, cls.n_in)
+        cls.B1 = np.random.randn(cls.n_full, cls.n_in)
+        cls.C = np.random.randn(cls.n_out, cls.n_full)
+        cls.D = np.random.randn(cls.n_out, cls.n_in)
+        cls.V = np.linalg.qr(np.random.randn(cls.n_full, cls.n_rom))[0]
+
+        cls.folder = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
+
+    def full_system(self, point):
+        A = self.A0 + sum(p * A1 for p, A1 in zip(point, self.A1))
+        B = self.B0 + point[0] * self.B1
+        return A, B
+
+    def reference_rom(self, point):
+        A, B = self.full_system(point)
+        return libss.StateSpace(self.V.T.dot(A.dot(self.V)), self.V.T.dot(B), self.C.dot(self.V), self.D, dt=self.dt)
+
+    def scrambled_case(self, point, name):
+        """ROM at ``point`` with the basis V G, where G is a random invertible matrix"""
+        G = np.linalg.qr(np.random.randn(self.n_rom, self.n_rom))[0] * (0.5 + np.random.rand(self.n_rom))
+        Ginv = np.linalg.inv(G)
+        A, B = self.full_system(point)
+        ss = libss.StateSpace(Ginv.dot(self.V.T.dot(A.dot(self.V))).dot(G), Ginv.dot(self.V.T.dot(B)),
+                              self.C.dot(self.V).dot(G), self.D, dt=self.dt)
+        parameters = {'p{:d}'.format(i): value for i, value in enumerate(point)}
+        return ParametricCase(parameters, ss, aero_basis=self.V.dot(G), name=name), Ginv.dot(self.V.T)
+
+    def save_case(self, case, WT):
+        """Saves the case as the SaveParametricCase post-processor"""
+        case_folder = os.path.join(self.folder, case.name)
+        os.makedirs(case_folder + '/save_pmor_data/')
+        config = configobj.ConfigObj()
+        config.filename = case_folder + '/' + case.name + '.pmor.sharpy'
+        config['parameters'] = case.parameters
+        config['sim_info'] = {'case': case.name, 'path_to_data': os.path.abspath(case_folder)}
+        config.write()
+
+        base_name = case_folder + '/save_pmor_data/' + case.name
+        case.ss.save(base_name + '_statespace.h5')
+        libss.Gain.save_multiple_gains(base_name + '_krylov_aerorob.h5', ('V', libss.Gain(case.aero_basis)),
+                                       ('W', libss.Gain(WT.T)))
+
+    def test_weights(self):
+        cases = [self.scrambled_case([p], 'case_1d_{:d}'.format(i))[0] for i, p in enumerate([1., 0., 0.5])]
+        database = ParametricROMDatabase(cases, method='direct')
+        indices, weights = database.weights(0.75)
+        np.testing.assert_array_equal(np.sort(indices), [0, 2])
+        np.testing.assert_allclose(weights.dot(database.points[indices, 0]), 0.75)
+        with self.assertRaises(ValueError):
+            database.weights(1.5)
+        with self.assertRaisesRegex(ValueError, 'congruent'):
+            ParametricROMDatabase(cases, method='linear')
+
+        points = np.random.rand(8, 2)
+        cases = [self.scrambled_case(point, 'case_2d_{:d}'.format(i))[0] for i, point in enumerate(points)]
+        database = ParametricROMDatabase(cases, method='direct')
+        query = points.mean(axis=0)
+        indices, weights = database.weights({'p0': query[0], 'p1': query[1]})
+        np.testing.assert_allclose(weights.sum(), 1.)
+        np.testing.assert_allclose(weights.dot(database.points[indices]), query)
+
+    def test_interpolation(self):
+        grid = [[p0, p1] for p0 in np.linspace(0., 1., 4) for p1 in np.linspace(0., 1., 3)]
+        for i_case, point in enumerate(grid):
+            self.save_case(*self.scrambled_case(point, 'case{:02d}'.format(i_case)))
+
+        queries = np.random.rand(5, 2)
+        wv = np.linspace(0.1, 30., 20)
+        reference_yfreq = np.array([self.reference_rom(point).freqresp(wv) for point in queries])
+        reference_eigs = np.array([np.sort_complex(self.reference_rom(point).eigvals()) for point in queries])
+
+        for method in ['congruent', 'grassmann']:
+            with self.subTest(method=method):
+                database = ParametricROMDatabase.from_directory(self.folder, method=method)
+                self.assertEqual(database.parameter_names, ['p0', 'p1'])
+                yfreq = database.freqresp(queries, wv, num_cores=2)
+                np.testing.assert_allclose(yfreq, reference_yfreq, rtol=1e-8, atol=1e-8)
+                eigs = database.eigenvalues(queries)
+                np.testing.assert_allclose(np.sort_complex(eigs), reference_eigs, rtol=1e-8, atol=1e-8)
+
+        # the coordinates are not consistent across the cases
+        database = ParametricROMDatabase.from_directory(self.folder, method='direct')
+        self.assertFalse(np.allclose(database.freqresp(queries, wv), reference_yfreq, rtol=1e-3))
+
+    @benchmark
+    def test_benchmark(self):
+        grid = [[p0, p1] for p0 in np.linspace(0., 1., 5) for p1 in np.linspace(0., 1., 5)]
+        database = ParametricROMDatabase([self.scrambled_case(point, 'case{:02d}'.format(i_case))[0]
+                                          for i_case, point in enumerate(grid)], method='congruent')
+        envelope = np.random.rand(100, 2)
+
+        def relinearise():
+            for point in envelope:
+                # reassembly of the full order system and Krylov reduction about z = 1
+                A, B = self.full_system(point)
+                lu = scalg.lu_factor(np.eye(self.n_full) - A)
+                krylov = [scalg.lu_solve(lu, B)]
+                for _ in range(self.n_rom // self.n_in - 1):
+                    krylov.append(scalg.lu_solve(lu, krylov[-1]))
+                V = np.linalg.qr(np.hstack(krylov))[0]
+                libss.StateSpace(V.T.dot(A.dot(V)), V.T.dot(B), self.C.dot(V), self.D, dt=self.dt).eigvals()
+
+        relinearisation_time = timeit(relinearise)
+        interpolation_time = timeit(lambda: database.eigenvalues(envelope))
+        print('Eigenvalues at {:d} points: {:.2e} s reassembling and reducing the full order system, '
+              '{:.2e} s interpolating the ROM database'.format(len(envelope), relinearisation_time,
+                                                               interpolation_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
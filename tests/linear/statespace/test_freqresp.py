@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+
+from sharpy.linear.src import libsparse as libsp
+from sharpy.linear.src import libss
+from tests.benchmark import benchmark, timeit
+
+
+def reference_freqresp(SS, wv, dlti=True):
+    """
+    Frequency response with a full solve at every frequency, as originally implemented
+    """
+    if dlti:
+        zv = np.exp(1j * wv * SS.dt)
+    else:
+        zv = 1j * wv
+    Yfreq = np.empty((SS.outputs, SS.inputs, len(wv)), dtype=complex)
+    Eye = libsp.eye_as(SS.A)
+    for ii in range(len(wv)):
+        sol_cplx = libsp.solve(zv[ii] * Eye - SS.A, SS.B)
+        Yfreq[:, :, ii] = libsp.dot(SS.C, sol_cplx, type_out=np.ndarray) + SS.D
+    return Yfreq
+
+
+class TestFreqResp(unittest.TestCase):
+    """
+    Compares the frequency response engine against the original loop and benchmarks it
+    """
+
+    def setUp(self):
+        np.random.seed(17)
+
+    def random_system(self, nx, nu, ny, dt=None, sparse=False):
+        if sparse:
+            A = sp.random(nx, nx, density=5. / nx, format='csc')
+            A = libsp.csc_matrix(A * (0.8 / np.max(np.abs(A.toarray()).sum(axis=1))))
+            B = libsp.csc_matrix(sp.random(nx, nu, density=0.2, format='csc'))
+        else:
+            A = np.random.rand(nx, nx)
+            A *= 0.8 / np.max(np.abs(np.linalg.eigvals(A)))
+            B = np.random.rand(nx, nu)
+        if dt is None:
+            A = A - 2. * libsp.eye_as(A)
+            if sparse:
+                A = libsp.csc_matrix(A)
+        return libss.StateSpace(A, B, np.random.rand(ny, nx), np.random.rand(ny, nu), dt=dt)
+
+    def test_dense(self):
+        wv = np.linspace(0.1, 30., 40)
+        for dt in [0.05, None]:
+            SS = self.random_system(60, 3, 4, dt=dt)
+            reference = reference_freqresp(SS, wv, dlti=dt is not None)
+            np.testing.assert_allclose(SS.freqresp(wv), reference, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(SS.freqresp(wv[:3]), reference[:, :, :3], rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(SS.freqresp(wv, num_cores=3), reference, rtol=1e-9, atol=1e-12)
+
+    def test_sparse(self):
+        wv = np.linspace(0.1, 30., 20)
+        for dt in [0.05, None]:
+            SS = self.random_system(300, 2, 3, dt=dt, sparse=True)
+            reference = reference_freqresp(SS, wv, dlti=dt is not None)
+            np.testing.assert_allclose(SS.freqresp(wv, num_cores=2), reference, rtol=1e-9, atol=1e-12)
+
+    def test_callback(self):
+        SS = self.random_system(30, 2, 2, dt=0.05)
+        wv = np.linspace(0.1, 30., 57)
+        received = np.zeros((SS.outputs, SS.inputs, len(wv)), dtype=complex)
+        calls = []
+
+        def callback(chunk, y_chunk):
+            calls.append(chunk)
+            received[:, :, chunk] = y_chunk
+
+        for num_cores in [1, 4]:
+            calls.clear()
+            Yfreq = libss.freqresp(SS, wv, num_cores=num_cores, callback=callback)
+            np.testing.assert_array_equal(received, Yfreq)
+            np.testing.assert_array_equal(np.sort(np.concatenate(calls)), np.arange(len(wv)))
+            self.assertGreater(len(calls), 1)
+
+    @benchmark
+    def test_benchmark(self):
+        SS = self.random_system(400, 4, 6, dt=0.05)
+        wv = np.linspace(0.1, 60., 200)
+
+        reference_time = timeit(lambda: reference_freqresp(SS, wv))
+        timings = [timeit(lambda: SS.freqresp(wv, num_cores=num_cores)) for num_cores in [1, 4]]
+        print('Frequency response of {:d} states at {:d} frequencies: {:.2e} s loop, {:.2e} s engine, '
+              '{:.2e} s engine on 4 threads'.format(SS.states, len(wv), reference_time, *timings))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from sharpy.linear.src import libsparse as libsp
+from sharpy.postproc.asymptoticstability import AsymptoticStability
+
+
+class TestShiftInvertStability(unittest.TestCase):
+    """
+    Compares the shift-invert eigenvalues against the direct eigen-decomposition on a sparse discrete time system
+    """
+
+    dt = 0.01
+
+    def setUp(self):
+        np.random.seed(11)
+        # lightly damped oscillators in continuous time, between 1 and 200 rad/s
+        num_modes = 150
+        frequencies = np.linspace(1., 200., num_modes)
+        damping = -0.02 * frequencies * np.random.rand(num_modes)
+        blocks = [np.array([[sigma, omega], [-omega, sigma]]) for sigma, omega in zip(damping, frequencies)]
+        A_ct = sp.block_diag(blocks, format='csc')
+        # similarity transformation that keeps the matrix sparse
+        T = sp.identity(2 * num_modes, format='csc') + sp.random(2 * num_modes, 2 * num_modes, density=0.005)
+        self.A = libsp.csc_matrix(T.dot(sp.csc_matrix(spla.expm(A_ct * self.dt))).dot(spla.inv(T.tocsc())))
+
+    def stability_solver(self, method):
+        solver = AsymptoticStability()
+        solver.settings = {'eigenvalue_method': method,
+                           'target_frequencies': np.array([20., 120.]),
+                           'num_evals_per_target': 6}
+        return solver
+
+    def test_shift_invert(self):
+        direct_evals, _ = self.stability_solver('direct').eigen_decomposition(self.A, self.dt)
+        evals, evecs = self.stability_solver('shift_invert').eigen_decomposition(self.A, self.dt)
+
+        # every eigenvalue found is an eigenvalue of the system, together with its conjugate
+        for eigenvalue in evals:
+            self.assertLess(np.min(np.abs(direct_evals - eigenvalue)), 1e-8)
+            self.assertLess(np.min(np.abs(evals - eigenvalue.conj())), 1e-8)
+        np.testing.assert_allclose(self.A.dot(evecs), evecs * evals, atol=1e-8)
+
+        # the modes closest to each target are found
+        direct_ct = np.log(direct_evals) / self.dt
+        ct = np.log(evals) / self.dt
+        for frequency in [20., 120.]:
+            closest = direct_ct[np.argmin(np.abs(direct_ct - 1j * frequency))]
+            self.assertLess(np.min(np.abs(ct - closest)), 1e-6)
+
+        self.assertEqual(len(evals), len(set(np.round(evals, 8))))
+
+
+if __name__ == '__main__':
+    unittest.main()
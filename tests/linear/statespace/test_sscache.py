@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+import time
+import types
+import unittest
+
+import numpy as np
+
+import sharpy.cases.templates.flying_wings as wings
+import sharpy.linear.src.libss as libss
+import sharpy.linear.utils.sscache as sscache
+import sharpy.sharpy_main
+
+
+class TestLinearSystemCache(unittest.TestCase):
+    """
+    Stores and retrieves assembled systems from the on-disk cache
+    """
+
+    def setUp(self):
+        np.random.seed(13)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def random_objects(self, n_states=20):
+        ss = libss.StateSpace(np.random.rand(n_states, n_states), np.random.rand(n_states, 2),
+                              np.random.rand(3, n_states), np.random.rand(3, 2), dt=0.1)
+        uvlm_sys = types.SimpleNamespace(ScalingFacts={'length': 0.9, 'speed': 10., 'time': 0.09})
+        beam_sys = types.SimpleNamespace(modal=True, clamped=True, num_dof_rig=0, U=np.random.rand(12, 4))
+        linear_system = types.SimpleNamespace(linearisation_vectors={'zeta': np.random.rand(10),
+                                                                     'forces_aero': np.random.rand(10)},
+                                              uvlm=types.SimpleNamespace(ss=ss, linearisation_vectors=dict(),
+                                                                         sys=uvlm_sys, scaled=True),
+                                              beam=types.SimpleNamespace(ss=ss, linearisation_vectors=dict(),
+                                                                         sys=beam_sys),
+                                              couplings={'Kas': libss.Gain(np.random.rand(4, 3))})
+        return sscache.get_cached_objects(ss, linear_system)
+
+    def reference_state(self):
+        tsaero0 = types.SimpleNamespace(zeta=[np.random.rand(3, 5, 7)], gamma=[np.random.rand(4, 6)])
+        tsstruct0 = types.SimpleNamespace(pos=np.random.rand(7, 3), psi=np.random.rand(3, 3, 3),
+                                          modal={'eigenvalues': np.random.rand(5), 'rigid_body_modes': False})
+        structure = types.SimpleNamespace(num_node=7, stiffness_db=np.random.rand(1, 6, 6))
+        aero = types.SimpleNamespace(data_dict={'control_surface_type': np.array([0, 1]),
+                                                'control_surface_chord': np.array([2, 2]),
+                                                'control_surface_hinge_coord': np.array([0., 0.25])})
+        settings = {'linear_system': 'LinearAeroelastic',
+                    'linear_system_settings': {'beam_settings': {'modal_projection': True}},
+                    'rigid_modes_ppal_axes': False}
+        return tsaero0, tsstruct0, structure, aero, settings
+
+    def test_key(self):
+        tsaero0, tsstruct0, structure, aero, settings = self.reference_state()
+        key = sscache.linearisation_key(tsaero0, tsstruct0, structure, settings, aero=aero)
+        self.assertEqual(key, sscache.linearisation_key(tsaero0, tsstruct0, structure, dict(settings), aero=aero))
+
+        tsaero0.zeta[0][0, 0, 0] += 1e-12
+        self.assertNotEqual(key, sscache.linearisation_key(tsaero0, tsstruct0, structure, settings, aero=aero))
+        tsaero0.zeta[0][0, 0, 0] -= 1e-12
+        aero.data_dict['control_surface_hinge_coord'][1] = 0.
+        self.assertNotEqual(key, sscache.linearisation_key(tsaero0, tsstruct0, structure, settings, aero=aero))
+        aero.data_dict['control_surface_hinge_coord'][1] = 0.25
+        settings['rigid_modes_ppal_axes'] = True
+        self.assertNotEqual(key, sscache.linearisation_key(tsaero0, tsstruct0, structure, settings, aero=aero))
+        settings['rigid_modes_ppal_axes'] = False
+        settings['linear_system_settings']['beam_settings']['modal_projection'] = False
+        self.assertNotEqual(key, sscache.linearisation_key(tsaero0, tsstruct0, structure, settings, aero=aero))
+
+    def test_store_load(self):
+        cache = sscache.LinearSystemCache(self.folder)
+        objects = self.random_objects()
+        self.assertIsNone(cache.load('key'))
+        self.assertTrue(cache.store('key', objects))
+
+        loaded = cache.load('key')
+        for name in ['ss', 'uvlm_ss']:
+            for matrix, loaded_matrix in zip(objects[name].get_mats(), loaded[name].get_mats()):
+                np.testing.assert_array_equal(matrix, loaded_matrix)
+            self.assertEqual(loaded[name].dt, objects[name].dt)
+        np.testing.assert_array_equal(loaded['couplings_Kas'].value, objects['couplings_Kas'].value)
+        for k, v in objects['linearisation_vectors'].items():
+            np.testing.assert_array_equal(loaded['linearisation_vectors'][k], v)
+
+        linear_system = sscache.CachedLinearSystem('LinearAeroelastic', loaded)
+        self.assertIs(linear_system.ss, loaded['ss'])
+        self.assertIs(linear_system.uvlm.ss, loaded['uvlm_ss'])
+        self.assertIs(linear_system.couplings['Kas'], loaded['couplings_Kas'])
+        with self.assertRaises(sscache.CachedSystemError):
+            linear_system.update(10.)
+
+        # attributes used by the postprocessors
+        self.assertTrue(linear_system.uvlm.scaled)
+        self.assertEqual(linear_system.uvlm.sys.ScalingFacts, objects['uvlm_scaling_facts'])
+        self.assertTrue(linear_system.beam.sys.modal)
+        self.assertEqual(linear_system.beam.sys.num_dof_rig, 0)
+        np.testing.assert_array_equal(linear_system.beam.sys.U, objects['beam_sys']['U'])
+        with self.assertRaisesRegex(AttributeError, 'Disable the cache'):
+            linear_system.uvlm.rom
+
+    def test_store_unsupported(self):
+        cache = sscache.LinearSystemCache(self.folder)
+        objects = self.random_objects()
+        objects['linearisation_vectors']['zeta'] = [np.random.rand(3, 4)]
+        self.assertFalse(cache.store('key', objects))
+        self.assertIsNone(cache.load('key'))
+
+    def test_eviction(self):
+        objects = self.random_objects(n_states=50)
+        cache = sscache.LinearSystemCache(self.folder)
+        for key in ['a', 'b', 'c']:
+            cache.store(key, objects)
+        entry_size = cache.entries()[0][2]
+
+        # 'a' is the least recently used, 'c' was not used for a long time
+        now = time.time()
+        for key, age in [('a', 2.), ('b', 1.), ('c', 40. * 86400.)]:
+            os.utime(cache.entry_path(key), (now - age, now - age))
+
+        cache = sscache.LinearSystemCache(self.folder, max_age=30.)
+        cache.evict()
+        self.assertEqual(sorted(entry[0] for entry in cache.entries()), ['a', 'b'])
+
+        cache = sscache.LinearSystemCache(self.folder, max_size=1.5 * entry_size / 1024 ** 2, max_age=30.)
+        cache.store('d', objects)
+        self.assertEqual(sorted(entry[0] for entry in cache.entries()), ['d'])
+
+
+class TestCachedStability(unittest.TestCase):
+    """
+    Runs AsymptoticStability on a scaled Goland wing with and without the linear system cache
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    u_inf = 140.
+
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder)
+        shutil.rmtree(self.route_test_dir + '/cases/', ignore_errors=True)
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+    def run_case(self, case_name, cache_folder, reference_velocity):
+        ws = wings.Goland(M=4, N=8, Mstar_fact=4, u_inf=self.u_inf, alpha=0., rho=1.02,
+                          route=self.route_test_dir + '/cases', case_name=case_name)
+        ws.clean_test_files()
+        ws.update_derived_params()
+        ws.set_default_config_dict()
+        ws.generate_aero_file()
+        ws.generate_fem_file()
+
+        ws.config['SHARPy'] = {'flow': ['BeamLoader', 'AerogridLoader', 'StaticCoupled', 'Modal',
+                                        'LinearAssembler', 'AsymptoticStability'],
+                               'case': ws.case_name, 'route': ws.route,
+                               'write_screen': 'off', 'write_log': 'on',
+                               'log_folder': self.route_test_dir + '/output/',
+                               'log_file': ws.case_name + '.log'}
+        ws.config['Modal'] = {'NumLambda': 20,
+                              'rigid_body_modes': 'off',
+                              'use_undamped_modes': True}
+        ws.config['LinearAssembler'] = {'linear_system': 'LinearAeroelastic',
+                                        'cache_folder': cache_folder,
+                                        'linear_system_settings': {
+                                            'beam_settings': {'modal_projection': 'on',
+                                                              'inout_coords': 'modes',
+                                                              'discrete_time': 'on',
+                                                              'newmark_damp': 0.5e-4,
+                                                              'discr_method': 'newmark',
+                                                              'dt': ws.dt,
+                                                              'proj_modes': 'undamped',
+                                                              'num_modes': 4,
+                                                              'gravity': 'on',
+                                                              'remove_dofs': []},
+                                            'aero_settings': {'dt': ws.dt,
+                                                              'ScalingDict': {'length': 0.5 * ws.c_ref,
+                                                                              'speed': self.u_inf,
+                                                                              'density': ws.rho},
+                                                              'integr_order': 2,
+                                                              'density': ws.rho,
+                                                              'remove_predictor': False,
+                                                              'use_sparse': False,
+                                                              'remove_inputs': ['u_gust']}}}
+        ws.config['AsymptoticStability'] = {'export_eigenvalues': True,
+                                            'reference_velocity': reference_velocity,
+                                            'num_evals': 20}
+        ws.config.write()
+
+        data = sharpy.sharpy_main.main(['', ws.route + ws.case_name + '.sharpy'])
+        eigenvalues = np.loadtxt(data.output_folder + '/stability/aeroelastic_eigenvalues.dat')
+        return data, eigenvalues
+
+    def test_cached_stability(self):
+        for reference_velocity in [1., self.u_inf]:
+            _, reference = self.run_case('uncached', '', reference_velocity)
+
+            # the first run stores the system, the second one finds it in the cache
+            self.run_case('store', self.cache_folder, reference_velocity)
+            data, eigenvalues = self.run_case('cached', self.cache_folder, reference_velocity)
+
+            # the system is only loaded from the cache when AsymptoticStability does not need to rescale it
+            self.assertEqual(isinstance(data.linear.linear_system, sscache.CachedLinearSystem),
+                             reference_velocity == 1.)
+            self.assertTrue(data.linear.linear_system.uvlm.scaled)
+            np.testing.assert_allclose(eigenvalues, reference, rtol=1e-10, atol=1e-10)
+            shutil.rmtree(self.cache_folder)
+            os.makedirs(self.cache_folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
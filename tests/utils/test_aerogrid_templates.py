@@ -0,0 +1,154 @@
+import types
+import unittest
+
+import numpy as np
+import scipy.interpolate
+
+import sharpy.utils.algebra as algebra
+from sharpy.aero.models.aerogrid import Aerogrid, generate_strip
+from tests.benchmark import benchmark, timeit
+
+
+def reference_zeta(aerogrid, structure_tstep, aero_tstep, it):
+    """
+    Node by node generation of the lattice, as originally implemented in Aerogrid.generate_zeta_timestep_info
+    """
+    data_dict = aerogrid.data_dict
+    for i_surf, template in enumerate(aerogrid.strip_templates):
+        for i_elem, i_local_node, i_global_node, i_n in zip(template['i_elem'], template['i_local_node'],
+                                                            template['i_global_node'], template['i_n']):
+            control_surface_info = None
+            if data_dict['control_surface'][i_elem, i_local_node] >= 0:
+                control_surface_info = aerogrid.get_control_surface_info(
+                    data_dict['control_surface'][i_elem, i_local_node], aero_tstep, it)
+            node_info = {'i_node': i_global_node,
+                         'i_local_node': i_local_node,
+                         'chord': data_dict['chord'][i_elem, i_local_node],
+                         'eaxis': data_dict['elastic_axis'][i_elem, i_local_node],
+                         'twist': data_dict['twist'][i_elem, i_local_node],
+                         'sweep': data_dict['sweep'][i_elem, i_local_node],
+                         'M': aerogrid.dimensions[i_surf, 0],
+                         'M_distribution': data_dict['m_distribution'].decode('ascii'),
+                         'airfoil': data_dict['airfoil_distribution'][i_elem, i_local_node],
+                         'control_surface': control_surface_info,
+                         'beam_coord': structure_tstep.pos[i_global_node, :],
+                         'pos_dot': structure_tstep.pos_dot[i_global_node, :],
+                         'beam_psi': structure_tstep.psi[i_elem, i_local_node, :],
+                         'psi_dot': structure_tstep.psi_dot[i_elem, i_local_node, :],
+                         'cga': structure_tstep.cga()}
+            (aero_tstep.zeta[i_surf][:, :, i_n],
+             aero_tstep.zeta_dot[i_surf][:, :, i_n]) = generate_strip(node_info,
+                                                                      aerogrid.airfoil_db,
+                                                                      aerogrid.aero_settings['aligned_grid'],
+                                                                      orientation_in=aerogrid.aero_settings['freestream_dir'],
+                                                                      calculate_zeta_dot=True)
+
+
+class TestAerogridTemplates(unittest.TestCase):
+    """
+    Compares the batched regeneration of the lattice from cached strip templates against the node by node one
+    on a multi-surface configuration with control surfaces
+    """
+
+    def setUp(self):
+        np.random.seed(5)
+
+    def build_grid(self, n_surf, n_elem_surf, M):
+        num_node_elem = 3
+        n_elem = n_surf*n_elem_surf
+        n_node_surf = 2*n_elem_surf + 1
+        n_node = n_surf*n_node_surf
+
+        elements = []
+        for i_surf in range(n_surf):
+            for i_elem in range(n_elem_surf):
+                first = i_surf*n_node_surf + 2*i_elem
+                elements.append(types.SimpleNamespace(global_connectivities=np.array([first, first + 2, first + 1])))
+        struct2aero_mapping = [[{'i_surf': i_node // n_node_surf, 'i_n': i_node % n_node_surf}]
+                               for i_node in range(n_node)]
+
+        control_surface = -np.ones((n_elem, num_node_elem), dtype=int)
+        control_surface[n_elem_surf // 2, :] = 0
+        control_surface[n_elem_surf + 1, :] = 1
+        control_surface[-1, :] = 2
+
+        airfoil = np.column_stack((np.linspace(0., 1., 11), 0.05*np.sin(np.pi*np.linspace(0., 1., 11))))
+        aerogrid = Aerogrid()
+        aerogrid.data_dict = {'surface_distribution': np.repeat(np.arange(n_surf), n_elem_surf),
+                              'aero_node': np.ones((n_node,), dtype=bool),
+                              'surface_m': M*np.ones((n_surf,), dtype=int),
+                              'm_distribution': b'uniform',
+                              'chord': 1. + np.random.rand(n_elem, num_node_elem),
+                              'elastic_axis': 0.25 + 0.1*np.random.rand(n_elem, num_node_elem),
+                              'twist': 0.1*np.random.rand(n_elem, num_node_elem),
+                              'sweep': 0.05*np.random.rand(n_elem, num_node_elem),
+                              'airfoil_distribution': np.zeros((n_elem, num_node_elem), dtype=int),
+                              'control_surface': control_surface,
+                              'control_surface_type': np.array([0, 1, 2]),
+                              'control_surface_chord': np.array([2, 3, M]),
+                              'control_surface_deflection': np.array([0.1, 0., -0.05]),
+                              'control_surface_hinge_coords': np.array([0., 0., 0.3])}
+        aerogrid.beam = types.SimpleNamespace(elements=elements, num_node_elem=num_node_elem)
+        aerogrid.n_elem = n_elem
+        aerogrid.n_surf = n_surf
+        aerogrid.surface_distribution = aerogrid.data_dict['surface_distribution']
+        aerogrid.dimensions = np.column_stack((aerogrid.data_dict['surface_m'],
+                                               (n_node_surf - 1)*np.ones((n_surf,), dtype=int)))
+        aerogrid.struct2aero_mapping = struct2aero_mapping
+        aerogrid.aero_settings = {'aligned_grid': True, 'freestream_dir': np.array([1., 0., 0.])}
+        aerogrid.airfoil_db[0] = scipy.interpolate.interp1d(airfoil[:, 0], airfoil[:, 1], kind='quadratic',
+                                                            fill_value='extrapolate', assume_sorted=True)
+        aerogrid.cs_generators = [None, lambda params: (0.02*params['it'], 0.3), None]
+
+        quat = algebra.euler2quat(np.array([0.1, 0.05, -0.2]))
+        structure_tstep = types.SimpleNamespace(pos=np.random.rand(n_node, 3),
+                                                pos_dot=np.random.rand(n_node, 3),
+                                                psi=0.5*np.random.rand(n_elem, num_node_elem, 3) - 0.25,
+                                                psi_dot=np.random.rand(n_elem, num_node_elem, 3),
+                                                cga=lambda: algebra.quat2rotation(quat))
+        # a node without rotation
+        structure_tstep.psi[0, 0, :] = 0.
+        return aerogrid, structure_tstep
+
+    def aero_tstep(self, aerogrid):
+        return types.SimpleNamespace(zeta=[np.zeros((3, m + 1, n + 1)) for m, n in aerogrid.dimensions],
+                                     zeta_dot=[np.zeros((3, m + 1, n + 1)) for m, n in aerogrid.dimensions],
+                                     control_surface_deflection=np.array([0.1, 0.08, 0.07]))
+
+    def compare(self, n_surf, n_elem_surf, M, n_steps=1):
+        aerogrid, structure_tstep = self.build_grid(n_surf, n_elem_surf, M)
+
+        for it in range(n_steps):
+            aero_tstep = self.aero_tstep(aerogrid)
+            aerogrid.generate_zeta_timestep_info(structure_tstep, aero_tstep, None, aerogrid.aero_settings,
+                                                 it=it)
+
+            reference_tstep = self.aero_tstep(aerogrid)
+            reference_zeta(aerogrid, structure_tstep, reference_tstep, it)
+
+            for i_surf in range(n_surf):
+                np.testing.assert_allclose(aero_tstep.zeta[i_surf], reference_tstep.zeta[i_surf],
+                                           rtol=1e-12, atol=1e-12)
+                np.testing.assert_allclose(aero_tstep.zeta_dot[i_surf], reference_tstep.zeta_dot[i_surf],
+                                           rtol=1e-12, atol=1e-12)
+            structure_tstep.psi += 0.01*np.random.rand(*structure_tstep.psi.shape)
+            structure_tstep.pos += 0.01*np.random.rand(*structure_tstep.pos.shape)
+
+    def test_templates(self):
+        self.compare(3, 4, 6, n_steps=3)
+
+    @benchmark
+    def test_benchmark(self):
+        n_surf, n_elem_surf, M, n_steps = 8, 40, 16, 5
+        aerogrid, structure_tstep = self.build_grid(n_surf, n_elem_surf, M)
+        aero_tstep = self.aero_tstep(aerogrid)
+        batched_time = timeit(lambda: aerogrid.generate_zeta_timestep_info(structure_tstep, aero_tstep, None,
+                                                                           aerogrid.aero_settings, it=0), n_steps)
+        reference_time = timeit(lambda: reference_zeta(aerogrid, structure_tstep, aero_tstep, 0), n_steps)
+        print('Lattice of {:d} surfaces with {:d} strips of {:d} panels: {:.2e} s node by node, '
+              '{:.2e} s from templates per regeneration'.format(n_surf, 2*n_elem_surf + 1, M,
+                                                                reference_time, batched_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import ctypes as ct
+import pickle
+import time
+import unittest
+
+import numpy as np
+
+from sharpy.solvers.dynamiccoupled import DynamicCoupled
+from sharpy.utils.background_postproc import BackgroundPostprocessors, snapshot_data
+from sharpy.utils.datastructures import StructTimeStepInfo
+
+
+class Component(object):
+    def __init__(self):
+        self.timestep_info = []
+
+
+class Data(object):
+    def __init__(self):
+        self.ts = 0
+        self.structure = Component()
+
+
+class SlowPostprocessor(object):
+    """
+    Records the position of the first node at every time step
+    """
+    def __init__(self, variables, delay=0.):
+        self.data = None
+        self.variables = variables
+        self.delay = delay
+        self.history = []
+
+    def snapshot_variables(self):
+        return self.variables
+
+    def run(self, online=True, solvers=None):
+        time.sleep(self.delay)
+        self.history.append((self.data.ts, self.data.structure.timestep_info[-1].pos[0, 0]))
+        return self.data
+
+    def shutdown(self):
+        self.history.append('shutdown')
+
+
+class TestBackgroundPostprocessors(unittest.TestCase):
+
+    num_node = 11
+
+    def add_step(self, data, ts):
+        data.ts = ts
+        tstep = StructTimeStepInfo(self.num_node, 5, 3, num_dof=ct.c_int((self.num_node - 1) * 6))
+        tstep.pos[0, 0] = ts
+        data.structure.timestep_info.append(tstep)
+
+    def test_snapshot(self):
+        data = Data()
+        for ts in range(3):
+            self.add_step(data, ts)
+
+        snapshot = snapshot_data(data, {'structure': ['pos']})
+        self.assertEqual(len(snapshot.structure.timestep_info), 3)
+        self.assertIsNone(snapshot.structure.timestep_info[0])
+        self.assertFalse(hasattr(snapshot.structure.timestep_info[-1], 'psi'))
+
+        data.structure.timestep_info[-1].pos[0, 0] = -1.
+        self.assertEqual(snapshot.structure.timestep_info[-1].pos[0, 0], 2.)
+
+        snapshot = snapshot_data(data, {'structure': None}, full_history=True)
+        self.assertEqual(snapshot.structure.timestep_info[0].pos[0, 0], 0.)
+        self.assertIs(data.structure.timestep_info[0].__class__, snapshot.structure.timestep_info[0].__class__)
+
+    def test_background_run(self):
+        data = Data()
+        postproc = SlowPostprocessor({'structure': ['pos']}, delay=0.01)
+        postproc.data = data
+        worker = BackgroundPostprocessors({'slow': postproc}, queue_size=2)
+
+        n_steps = 10
+        for ts in range(n_steps):
+            self.add_step(data, ts)
+            worker.submit(data)
+            # the solver keeps modifying the current time step
+            data.structure.timestep_info[-1].pos[0, 0] = -1.
+        worker.shutdown()
+
+        self.assertIs(postproc.data, data)
+        self.assertEqual(postproc.history, [(ts, float(ts)) for ts in range(n_steps)])
+        self.assertFalse(worker.thread.is_alive())
+
+    def test_exception(self):
+        data = Data()
+        self.add_step(data, 0)
+        postproc = SlowPostprocessor({'structure': ['psi']})
+        postproc.data = data
+        worker = BackgroundPostprocessors({'failing': postproc})
+        worker.submit(data)
+        with self.assertRaises(AttributeError):
+            worker.shutdown()
+
+    def test_pickle_solver(self):
+        data = Data()
+        postproc = SlowPostprocessor({'structure': ['pos']}, delay=0.01)
+        postproc.data = data
+        solver = DynamicCoupled()
+        solver.postprocessors = {'slow': postproc}
+        solver.background_postprocessors = BackgroundPostprocessors(solver.postprocessors, queue_size=4)
+
+        n_steps = 6
+        for ts in range(n_steps):
+            self.add_step(data, ts)
+            solver.background_postprocessors.submit(data)
+        # the queued time steps are postprocessed before pickling
+        unpickled = pickle.loads(pickle.dumps(solver))
+        self.assertIsNone(unpickled.background_postprocessors)
+        self.assertEqual(unpickled.postprocessors['slow'].history, [(ts, float(ts)) for ts in range(n_steps)])
+
+        # the worker carries on
+        self.add_step(data, n_steps)
+        solver.background_postprocessors.submit(data)
+        solver.stop_background_postprocessors()
+        self.assertEqual(postproc.history, [(ts, float(ts)) for ts in range(n_steps + 1)])
+
+    def test_shutdown_on_exception(self):
+        postproc = SlowPostprocessor({'structure': ['pos']})
+        solver = DynamicCoupled()
+        solver.postprocessors = {'slow': postproc, 'no_shutdown': object()}
+
+        def time_loop(**kwargs):
+            raise RuntimeError('diverged')
+
+        solver.time_loop = time_loop
+        with self.assertRaises(RuntimeError):
+            solver.run()
+        self.assertEqual(postproc.history, ['shutdown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import ctypes as ct
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import h5py as h5
+import numpy as np
+
+import sharpy.cases.templates.flying_wings as wings
+import sharpy.sharpy_main
+import sharpy.utils.checkpoint as checkpoint
+import sharpy.utils.exceptions as exceptions
+from sharpy.solvers.stepuvlm import GammaDotFilter
+from sharpy.utils.control_utils import PID
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo
+
+
+class TestCheckpoint(unittest.TestCase):
+    """
+    Writes a checkpoint of a mock simulation and restores it on the initial time steps of a new one
+    """
+
+    num_node = 21
+    num_elem = 10
+    n_steps = 60
+
+    def setUp(self):
+        np.random.seed(7)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def initial_data(self):
+        struct_tstep = StructTimeStepInfo(self.num_node, self.num_elem, 3, num_dof=ct.c_int((self.num_node - 1)*6))
+        struct_tstep.mb_dict = {'constraint_00': {'velocity': np.zeros((3,)), 'behaviour': 'hinge_FoR'}}
+        aero_tstep = AeroTimeStepInfo(np.array([[4, 10], [4, 10]]), np.array([[40, 10], [40, 10]]))
+        return types.SimpleNamespace(settings={'SHARPy': {'case': 'checkpoint'}},
+                                     ts=0,
+                                     structure=types.SimpleNamespace(timestep_info=[struct_tstep]),
+                                     aero=types.SimpleNamespace(timestep_info=[aero_tstep]))
+
+    def run_case(self):
+        data = self.initial_data()
+        gamma_dot_filter = GammaDotFilter(window=8, filter_param=3)
+        pid = PID(2., 0.5, 0.1, 0.05)
+        for data.ts in range(1, self.n_steps + 1):
+            struct_tstep = data.structure.timestep_info[-1].copy()
+            struct_tstep.pos[:] = np.random.rand(self.num_node, 3)
+            struct_tstep.psi[:] = np.random.rand(self.num_elem, 3, 3)
+            struct_tstep.quat[:] = np.random.rand(4)
+            struct_tstep.q[:] = np.random.rand(len(struct_tstep.q))
+            struct_tstep.mb_dict['constraint_00']['velocity'][:] = np.random.rand(3)
+            struct_tstep.postproc_node['aero_steady_forces'] = np.random.rand(self.num_node, 6)
+            data.structure.timestep_info.append(struct_tstep)
+
+            aero_tstep = data.aero.timestep_info[-1].copy()
+            for i_surf in range(aero_tstep.n_surf):
+                for variable in ['zeta', 'gamma', 'gamma_dot', 'zeta_star', 'gamma_star', 'dist_to_orig']:
+                    getattr(aero_tstep, variable)[i_surf][:] = np.random.rand(
+                        *getattr(aero_tstep, variable)[i_surf].shape)
+            gamma_dot_filter.filter(aero_tstep, data.aero.timestep_info)
+            data.aero.timestep_info.append(aero_tstep)
+
+            pid.set_point(1.)
+            pid(np.random.rand())
+        return data, {'aero_solver': gamma_dot_filter, 'controllers/pid': pid, 'no_state': object()}
+
+    def test_restore(self):
+        data, objects = self.run_case()
+        filename = self.folder + '/checkpoint.checkpoint.h5'
+        checkpoint.write_checkpoint(filename, data, objects, n_steps=3)
+
+        restarted = self.initial_data()
+        restarted_objects = {'aero_solver': GammaDotFilter(window=8, filter_param=3),
+                             'controllers/pid': PID(2., 0.5, 0.1, 0.05),
+                             'controllers/new': PID(1., 0., 0., 0.05)}
+        missing = checkpoint.restore_checkpoint(filename, restarted, restarted_objects)
+        self.assertEqual(missing, ['controllers/new'])
+        self.assertEqual(restarted.ts, self.n_steps)
+
+        for component in ['structure', 'aero']:
+            history = getattr(restarted, component).timestep_info
+            self.assertEqual(len(history), self.n_steps + 1)
+            self.assertEqual([i_step for i_step, tstep in enumerate(history) if tstep is not None],
+                             [0, self.n_steps - 2, self.n_steps - 1, self.n_steps])
+
+        for i_step in [0, self.n_steps - 1, self.n_steps]:
+            struct_tstep = restarted.structure.timestep_info[i_step]
+            reference = data.structure.timestep_info[i_step]
+            for variable in ['pos', 'psi', 'quat', 'q']:
+                np.testing.assert_array_equal(getattr(struct_tstep, variable), getattr(reference, variable))
+            self.assertTrue(struct_tstep.pos.flags.f_contiguous)
+            np.testing.assert_array_equal(struct_tstep.mb_dict['constraint_00']['velocity'],
+                                          reference.mb_dict['constraint_00']['velocity'])
+            self.assertEqual(struct_tstep.postproc_node, dict())
+
+            aero_tstep = restarted.aero.timestep_info[i_step]
+            reference = data.aero.timestep_info[i_step]
+            for variable in ['zeta', 'gamma', 'gamma_dot', 'zeta_star', 'gamma_star', 'dist_to_orig']:
+                for i_surf in range(aero_tstep.n_surf):
+                    np.testing.assert_array_equal(getattr(aero_tstep, variable)[i_surf],
+                                                  getattr(reference, variable)[i_surf])
+
+        # the restarted objects continue as the original ones
+        next_tstep = data.aero.timestep_info[-1].copy()
+        restarted_tstep = next_tstep.copy()
+        objects['aero_solver'].filter(next_tstep, data.aero.timestep_info)
+        restarted_objects['aero_solver'].filter(restarted_tstep, restarted.aero.timestep_info)
+        for i_surf in range(next_tstep.n_surf):
+            np.testing.assert_array_equal(restarted_tstep.gamma_dot[i_surf], next_tstep.gamma_dot[i_surf])
+        np.testing.assert_array_equal(restarted_objects['controllers/pid'](0.3)[1], objects['controllers/pid'](0.3)[1])
+
+    def test_schema_version(self):
+        data, objects = self.run_case()
+        filename = self.folder + '/checkpoint.checkpoint.h5'
+        checkpoint.write_checkpoint(filename, data, objects)
+        self.assertFalse(os.path.isfile(filename + '.tmp'))
+        with h5.File(filename, 'a') as checkpoint_file:
+            checkpoint_file.attrs['schema_version'] = checkpoint.schema_version + 1
+        with self.assertRaises(exceptions.NotValidInputFile):
+            checkpoint.restore_checkpoint(filename, self.initial_data(), dict())
+
+
+class TestDynamicCoupledRestart(unittest.TestCase):
+    """
+    Continues a DynamicCoupled simulation of a Goland wing from a checkpoint and compares it against the
+    simulation run without interruption
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    n_steps = 10
+    restart_step = 5
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ws = wings.Goland(M=4, N=8, Mstar_fact=4, u_inf=50., alpha=2., rho=1.02,
+                               route=self.route_test_dir + '/cases', case_name='checkpoint_restart')
+        self.ws.clean_test_files()
+        self.ws.update_derived_params()
+        self.ws.set_default_config_dict()
+        self.ws.generate_aero_file()
+        self.ws.generate_fem_file()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+        shutil.rmtree(self.route_test_dir + '/cases/', ignore_errors=True)
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+    def run_case(self, name, n_steps, args=(), **checkpoint_settings):
+        config = self.ws.config
+        config['SHARPy']['flow'] = ['BeamLoader', 'AerogridLoader', 'DynamicCoupled']
+        config['SHARPy']['write_screen'] = 'off'
+        config['SHARPy']['log_folder'] = self.route_test_dir + '/output/'
+        config['DynamicCoupled']['n_time_steps'] = n_steps
+        config['DynamicCoupled']['structural_solver_settings']['num_steps'] = n_steps
+        config['DynamicCoupled']['aero_solver_settings']['n_time_steps'] = n_steps
+        config['DynamicCoupled']['postprocessors'] = []
+        config['DynamicCoupled']['postprocessors_settings'] = dict()
+        for setting in ['checkpoint_stride', 'checkpoint_file', 'restart_checkpoint']:
+            config['DynamicCoupled'].pop(setting, None)
+        config['DynamicCoupled'].update(checkpoint_settings)
+        config.filename = self.folder + '/' + name + '.sharpy'
+        config.write()
+        return sharpy.sharpy_main.main(['', config.filename] + list(args))
+
+    def test_restart(self):
+        checkpoint_file = self.folder + '/restart.checkpoint.h5'
+        self.run_case('first_part', self.restart_step, checkpoint_stride=self.restart_step,
+                      checkpoint_file=checkpoint_file)
+        reference = self.run_case('continuous', self.n_steps)
+
+        for name, args, settings in [('command_line', ['-r', checkpoint_file], dict()),
+                                     ('setting', [], {'restart_checkpoint': checkpoint_file})]:
+            with self.subTest(restart=name):
+                data = self.run_case(name, self.n_steps, args, **settings)
+                self.assertEqual(data.ts, self.n_steps)
+                self.assertEqual(len(data.structure.timestep_info), self.n_steps + 1)
+                self.assertIsNone(data.structure.timestep_info[1])
+
+                np.testing.assert_allclose(data.structure.timestep_info[-1].pos,
+                                           reference.structure.timestep_info[-1].pos, rtol=1e-10, atol=1e-12)
+                for i_surf in range(data.aero.n_surf):
+                    for variable in ['gamma', 'gamma_star']:
+                        np.testing.assert_allclose(getattr(data.aero.timestep_info[-1], variable)[i_surf],
+                                                   getattr(reference.aero.timestep_info[-1], variable)[i_surf],
+                                                   rtol=1e-10, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
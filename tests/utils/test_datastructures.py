@@ -0,0 +1,384 @@
+import copy
+import ctypes as ct
+import gc
+import pickle
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import weakref
+
+import numpy as np
+
+import sharpy.utils.ctypes_utils as ct_utils
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo, TimeStepBufferPool, TimeStepHistory
+from tests.benchmark import benchmark, timeit
+
+
+class TestTimeStepBuffers(unittest.TestCase):
+    """
+    Tests the in-place copy of time steps and the buffer pool used in the FSI loop
+    """
+
+    num_node = 101
+    num_elem = 50
+    n_fsi_iter = 20
+
+    def setUp(self):
+        np.random.seed(1)
+        self.struct_tstep = StructTimeStepInfo(self.num_node, self.num_elem, 3,
+                                               num_dof=ct.c_int((self.num_node - 1) * 6))
+        self.struct_tstep.pos[:] = np.random.rand(self.num_node, 3)
+        self.struct_tstep.psi[:] = np.random.rand(self.num_elem, 3, 3)
+        self.struct_tstep.q[:] = np.random.rand(len(self.struct_tstep.q))
+        self.struct_tstep.postproc_node['aero_steady_forces'] = np.random.rand(self.num_node, 6)
+        self.struct_tstep.mb_dict = {'constraint_00': {'velocity': np.random.rand(3), 'behaviour': 'hinge_FoR'}}
+
+        dimensions = np.array([[8, 40], [8, 40]], dtype=int)
+        dimensions_star = np.array([[100, 40], [100, 40]], dtype=int)
+        self.aero_tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+        for i_surf in range(self.aero_tstep.n_surf):
+            self.aero_tstep.zeta[i_surf][:] = np.random.rand(*self.aero_tstep.zeta[i_surf].shape)
+            self.aero_tstep.gamma_star[i_surf][:] = np.random.rand(*self.aero_tstep.gamma_star[i_surf].shape)
+
+    def test_struct_copy_into(self):
+        other = StructTimeStepInfo(self.num_node, self.num_elem, 3, num_dof=ct.c_int((self.num_node - 1) * 6))
+        pos_array = other.pos
+        self.struct_tstep.copy_into(other)
+
+        assert other.pos is pos_array, 'copy_into reallocated an array of the same size'
+        np.testing.assert_array_equal(other.pos, self.struct_tstep.pos)
+        np.testing.assert_array_equal(other.psi, self.struct_tstep.psi)
+        np.testing.assert_array_equal(other.q, self.struct_tstep.q)
+        np.testing.assert_array_equal(other.postproc_node['aero_steady_forces'],
+                                      self.struct_tstep.postproc_node['aero_steady_forces'])
+        np.testing.assert_array_equal(other.mb_dict['constraint_00']['velocity'],
+                                      self.struct_tstep.mb_dict['constraint_00']['velocity'])
+
+        # the copy must be independent of the original
+        other.pos[0, 0] += 1.
+        other.mb_dict['constraint_00']['velocity'][0] += 1.
+        self.assertNotEqual(other.pos[0, 0], self.struct_tstep.pos[0, 0])
+        self.assertNotEqual(other.mb_dict['constraint_00']['velocity'][0],
+                            self.struct_tstep.mb_dict['constraint_00']['velocity'][0])
+
+    def test_aero_copy_into(self):
+        other = self.aero_tstep.copy()
+        for i_surf in range(other.n_surf):
+            other.zeta[i_surf].fill(0.)
+        self.aero_tstep.copy_into(other)
+        for i_surf in range(other.n_surf):
+            np.testing.assert_array_equal(other.zeta[i_surf], self.aero_tstep.zeta[i_surf])
+            np.testing.assert_array_equal(other.gamma_star[i_surf], self.aero_tstep.gamma_star[i_surf])
+
+        # wake of different size is reallocated
+        larger_wake = AeroTimeStepInfo(self.aero_tstep.dimensions, self.aero_tstep.dimensions_star + [[10, 0], [10, 0]])
+        larger_wake.copy_into(other)
+        np.testing.assert_array_equal(other.dimensions_star, larger_wake.dimensions_star)
+        self.assertEqual(other.gamma_star[0].shape, larger_wake.gamma_star[0].shape)
+
+    def fsi_iterations(self, copy_function):
+        controlled = copy_function('controlled_structural', self.struct_tstep)
+        controlled_aero = copy_function('controlled_aero', self.aero_tstep)
+        structural_kstep = copy_function('structural', controlled)
+        for k in range(self.n_fsi_iter):
+            aero_kstep = copy_function('aero', controlled_aero)
+            previous_kstep = copy_function('previous_structural', structural_kstep)
+            structural_kstep = copy_function('structural', controlled)
+            copy_structural_kstep = copy_function('copy_structural', structural_kstep)
+
+    def test_buffer_pool_allocations(self):
+        """
+        The buffers are allocated in the first time step and overwritten in place afterwards
+        """
+        pool = TimeStepBufferPool()
+        self.fsi_iterations(pool.fill)
+        self.assertEqual(pool.n_allocations, 6)
+        buffers = dict(pool.buffers)
+        pos = pool.buffers['structural'].pos
+        zeta = pool.buffers['aero'].zeta[0]
+        n_copies = pool.n_copies
+
+        self.fsi_iterations(pool.fill)
+        self.assertEqual(pool.n_allocations, 6)
+        self.assertEqual(pool.n_copies - n_copies, 3 + 4 * self.n_fsi_iter)
+        for name, buffer in buffers.items():
+            self.assertIs(pool.buffers[name], buffer)
+        self.assertIs(pool.buffers['structural'].pos, pos)
+        self.assertIs(pool.buffers['aero'].zeta[0], zeta)
+        np.testing.assert_array_equal(pool.buffers['copy_structural'].pos, self.struct_tstep.pos)
+
+    @staticmethod
+    def count_allocated_blocks(function):
+        tracemalloc.start()
+        function()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        return sum([stat.count for stat in snapshot.statistics('filename')])
+
+    @benchmark
+    def test_benchmark(self):
+        """
+        Number of allocations in the FSI loop with and without buffers
+        """
+        pool = TimeStepBufferPool()
+        # the first time step allocates the buffers
+        self.fsi_iterations(pool.fill)
+        with_pool = self.count_allocated_blocks(lambda: self.fsi_iterations(pool.fill))
+
+        tstep_list = []
+
+        def copy_and_keep(name, tstep):
+            # keep references so the copies are included in the allocation count
+            tstep_list.append(tstep.copy())
+            return tstep_list[-1]
+
+        without_pool = self.count_allocated_blocks(lambda: self.fsi_iterations(copy_and_keep))
+        print('Allocated blocks per time step with {:d} FSI iterations: '
+              '{:d} with copy(), {:d} with TimeStepBufferPool'.format(self.n_fsi_iter, without_pool, with_pool))
+
+
+class TestCtypesPointers(unittest.TestCase):
+    """
+    Tests the reuse of the pointer tables passed to the UVLM library and of the option structures
+    """
+
+    n_calls = 2000
+
+    def setUp(self):
+        dimensions = np.array([[8, 40], [8, 40], [4, 10]], dtype=int)
+        dimensions_star = np.array([[50, 40], [50, 40], [50, 10]], dtype=int)
+        self.tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+        self.tstep.postproc_cell['incidence_angle'] = [np.zeros((dimensions[i_surf, 0], dimensions[i_surf, 1]))
+                                                       for i_surf in range(len(dimensions))]
+
+    @staticmethod
+    def address(pointer):
+        return ct.cast(pointer, ct.c_void_p).value
+
+    def check_pointers(self, tstep):
+        for i_surf in range(tstep.n_surf):
+            for i_dim in range(3):
+                self.assertEqual(self.address(tstep.ct_p_zeta[3*i_surf + i_dim]),
+                                 tstep.zeta[i_surf][i_dim].ctypes.data)
+                self.assertEqual(self.address(tstep.ct_p_zeta_star[3*i_surf + i_dim]),
+                                 tstep.zeta_star[i_surf][i_dim].ctypes.data)
+            self.assertEqual(self.address(tstep.ct_p_gamma_star[i_surf]), tstep.gamma_star[i_surf].ctypes.data)
+            self.assertEqual(self.address(tstep.postproc_cell['incidence_angle_ct_pointer'][i_surf]),
+                             tstep.postproc_cell['incidence_angle'][i_surf].ctypes.data)
+            self.assertEqual(tstep.ct_p_dimensions_star[i_surf][0], tstep.dimensions_star[i_surf, 0])
+
+    def test_cached_pointers(self):
+        tstep = self.tstep
+        tstep.generate_ctypes_pointers()
+        self.check_pointers(tstep)
+        p_zeta = tstep.ct_p_zeta
+        tstep.remove_ctypes_pointers()
+        self.assertFalse(hasattr(tstep, 'ct_p_zeta'))
+        self.assertNotIn('incidence_angle_ct_pointer', tstep.postproc_cell)
+
+        # the time step can be pickled and copied without the pointers
+        pickle.loads(pickle.dumps(tstep))
+        copy.deepcopy(tstep)
+
+        tstep.generate_ctypes_pointers()
+        self.assertIs(tstep.ct_p_zeta, p_zeta)
+        self.check_pointers(tstep)
+        tstep.remove_ctypes_pointers()
+
+        # reallocated arrays
+        tstep.zeta[1] = tstep.zeta[1].copy()
+        tstep.generate_ctypes_pointers()
+        self.assertIsNot(tstep.ct_p_zeta, p_zeta)
+        self.check_pointers(tstep)
+        tstep.remove_ctypes_pointers()
+
+        # the tables are rebuilt when the dimensions change, even if the arrays are not reallocated
+        tstep.generate_ctypes_pointers()
+        p_zeta = tstep.ct_p_zeta
+        p_dimensions_star = tstep.ct_p_dimensions_star
+        tstep.remove_ctypes_pointers()
+        tstep.dimensions_star[2, 0] = 49
+        tstep.generate_ctypes_pointers()
+        self.assertIsNot(tstep.ct_p_zeta, p_zeta)
+        self.assertIsNot(tstep.ct_p_dimensions_star, p_dimensions_star)
+        self.assertEqual(tstep.ct_p_dimensions_star[2][0], 49)
+        tstep.remove_ctypes_pointers()
+
+        # new wake size
+        tstep.dimensions_star[2, 0] = 60
+        tstep.zeta_star[2] = np.zeros((3, 61, 11))
+        tstep.gamma_star[2] = np.zeros((60, 10))
+        tstep.generate_ctypes_pointers()
+        self.check_pointers(tstep)
+        tstep.remove_ctypes_pointers()
+
+        # copied time steps build their own tables
+        tstep_copy = tstep.copy()
+        tstep_copy.generate_ctypes_pointers()
+        self.check_pointers(tstep_copy)
+        tstep_copy.remove_ctypes_pointers()
+
+        # non contiguous arrays are not cached
+        tstep.gamma[0] = np.zeros((40, 8)).T
+        tstep.generate_ctypes_pointers()
+        p_gamma = tstep.ct_p_gamma
+        tstep.remove_ctypes_pointers()
+        tstep.generate_ctypes_pointers()
+        self.assertIsNot(tstep.ct_p_gamma, p_gamma)
+        tstep.remove_ctypes_pointers()
+
+    def test_structure_cache(self):
+        cache = ct_utils.StructureCache(max_size=2)
+        first = cache.get(('a', ct.c_double(1.), np.array([0., 1.])), ct.c_double)
+        self.assertIs(cache.get(('a', 1., [0., 1.]), ct.c_double), first)
+        self.assertIsNot(cache.get(('a', 2., [0., 1.]), ct.c_double), first)
+        cache.get(('b', 1., [0., 1.]), ct.c_double)
+        self.assertEqual(len(cache.structures), 1)
+
+    @benchmark
+    def test_benchmark(self):
+        """
+        Per call overhead of the pointer generation with and without the cached pointer tables
+        """
+        tstep = self.tstep
+
+        def uncached():
+            tstep.generate_ctypes_pointers()
+            tstep.remove_ctypes_pointers(clear_cache=True)
+
+        def cached():
+            tstep.generate_ctypes_pointers()
+            tstep.remove_ctypes_pointers()
+
+        uncached_time = timeit(uncached, self.n_calls)
+        cached_time = timeit(cached, self.n_calls)
+        print('Pointer generation for {:d} surfaces: {:.2e} s per call building the tables, '
+              '{:.2e} s per call with cached tables'.format(tstep.n_surf, uncached_time, cached_time))
+
+
+class TestTimeStepHistory(unittest.TestCase):
+    """
+    Tests the time step history that spills old time steps to disk
+    """
+
+    n_steps = 30
+    in_memory = 4
+
+    def setUp(self):
+        np.random.seed(2)
+        self.folder = tempfile.mkdtemp()
+        self.dimensions = np.array([[4, 10]], dtype=int)
+        self.dimensions_star = np.array([[20, 10]], dtype=int)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def new_step(self, its):
+        tstep = AeroTimeStepInfo(self.dimensions, self.dimensions_star)
+        tstep.zeta[0][:] = its + np.random.rand(*tstep.zeta[0].shape)
+        tstep.gamma_star[0][:] = np.random.rand(*tstep.gamma_star[0].shape)
+        tstep.generate_ctypes_pointers()
+        tstep.remove_ctypes_pointers()
+        return tstep
+
+    def run_history(self):
+        history = TimeStepHistory(in_memory=self.in_memory, folder=self.folder)
+        reference = []
+        for its in range(self.n_steps):
+            history.append(self.new_step(its))
+            reference.append(history[-1].copy())
+            self.assertLessEqual(history.n_in_memory, self.in_memory)
+        return history, reference
+
+    def test_history(self):
+        history, reference = self.run_history()
+        self.assertEqual(len(history), self.n_steps)
+        self.assertEqual(history.n_spills, self.n_steps - self.in_memory)
+
+        for its, tstep in enumerate(history):
+            np.testing.assert_array_equal(tstep.zeta[0], reference[its].zeta[0])
+            np.testing.assert_array_equal(tstep.gamma_star[0], reference[its].gamma_star[0])
+        self.assertLessEqual(history.n_in_memory, 2*self.in_memory)
+        # unchanged time steps are not written again
+        self.assertEqual(history.n_spills, self.n_steps - self.in_memory)
+
+        # changes in reloaded time steps are kept
+        history[3].postproc_cell['loads'] = np.ones((3,))
+        history[5].zeta[0][:] = 0.
+        for _ in history:
+            pass
+        np.testing.assert_array_equal(history[3].postproc_cell['loads'], np.ones((3,)))
+        self.assertFalse(np.any(history[5].zeta[0]))
+
+        # the ctypes pointers are generated again for the reloaded time steps
+        history[0].generate_ctypes_pointers()
+        self.assertEqual(ct.cast(history[0].ct_p_zeta[0], ct.c_void_p).value, history[0].zeta[0][0].ctypes.data)
+        history[0].remove_ctypes_pointers()
+
+        np.testing.assert_array_equal(history[-3:][0].zeta[0], reference[-3].zeta[0])
+
+        # pickled histories become lists
+        unpickled = pickle.loads(pickle.dumps(history))
+        self.assertIsInstance(unpickled, list)
+        np.testing.assert_array_equal(unpickled[10].gamma_star[0], reference[10].gamma_star[0])
+
+        history.close()
+        self.assertEqual(history.n_in_memory, self.n_steps)
+
+    def test_list_operations(self):
+        history, reference = self.run_history()
+
+        # as done by the Cleanup postprocessor
+        for its in range(self.n_steps - 10):
+            history[its] = None
+        self.assertIsNone(history[0])
+        np.testing.assert_array_equal(history[self.n_steps - 10].zeta[0], reference[self.n_steps - 10].zeta[0])
+
+        history.insert(0, reference[0])
+        self.assertIs(history[0], reference[0])
+        self.assertEqual(len(history), self.n_steps + 1)
+
+        # as done by DynamicCoupled.cleanup_timestep_info
+        history[0] = history[-1].copy()
+        while len(history) - 1:
+            del history[-1]
+        self.assertEqual(len(history), 1)
+        np.testing.assert_array_equal(history[0].zeta[0], reference[-1].zeta[0])
+
+    def test_memory(self):
+        """
+        Only the last ``in_memory`` time steps are held in memory, the spilled ones are released
+        """
+        history = TimeStepHistory(in_memory=self.in_memory, folder=self.folder)
+        references = []
+        for its in range(self.n_steps):
+            history.append(self.new_step(its))
+            references.append(weakref.ref(history[-1]))
+            self.assertEqual(history.n_in_memory, min(its + 1, self.in_memory))
+            self.assertEqual(history.n_spills, max(its + 1 - self.in_memory, 0))
+        gc.collect()
+        self.assertEqual([reference() is not None for reference in references],
+                         [False]*(self.n_steps - self.in_memory) + [True]*self.in_memory)
+
+    @benchmark
+    def test_memory_benchmark(self):
+        """
+        Peak memory of a time history with all the time steps in memory and with the ``TimeStepHistory``
+        """
+        for in_memory in [None, self.in_memory]:
+            tracemalloc.start()
+            if in_memory is None:
+                history = []
+            else:
+                history = TimeStepHistory(in_memory=in_memory, folder=self.folder)
+            for its in range(self.n_steps):
+                history.append(self.new_step(its))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('Peak memory of {:d} aerodynamic time steps with {:s} in memory: {:.2f} MB'.format(
+                self.n_steps, 'all' if in_memory is None else str(in_memory), peak / 1024**2))
+
+
+if __name__ == '__main__':
+    unittest.main()
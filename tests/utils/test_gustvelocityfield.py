@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import sharpy.generators.gustvelocityfield as gustvelocityfield
+from tests.benchmark import benchmark, timeit
+
+
+class TestGustShapeBatch(unittest.TestCase):
+    """
+    Compares the array evaluation of the gust profiles against the point by point one, also through the
+    ``GustVelocityField`` generator on a multi-surface grid, and benchmarks it
+    """
+
+    def setUp(self):
+        np.random.seed(3)
+        self.folder = tempfile.mkdtemp()
+        self.time_file = os.path.join(self.folder, 'gust.txt')
+        time_history = np.zeros((50, 4))
+        time_history[:, 0] = np.linspace(0, 5, 50)
+        time_history[:, 1:] = np.random.rand(50, 3)
+        np.savetxt(self.time_file, time_history)
+
+        self.gust_parameters = {'1-cos': {'gust_length': 5., 'gust_intensity': 0.2},
+                                'DARPA': {'gust_length': 5., 'gust_intensity': 0.2, 'span': 20.},
+                                'continuous_sin': {'gust_length': 5., 'gust_intensity': 0.2},
+                                'time varying global': {'file': self.time_file},
+                                'time varying': {'file': self.time_file},
+                                'span sine': {'gust_intensity': 0.2, 'span': 20., 'periods_per_span': 2,
+                                              'span_with_gust': 15.}}
+
+        # HALE-like lattice: two wings, two tails and a fin
+        self.zeta = []
+        for m, n, y0 in [(8, 80, 0.), (8, 80, -32.), (4, 20, 0.), (4, 20, -5.), (4, 10, 0.)]:
+            chord = np.linspace(-1, 1, m + 1)
+            span = np.linspace(y0, y0 + 32., n + 1)
+            zeta = np.zeros((3, m + 1, n + 1))
+            zeta[0], zeta[1] = np.meshgrid(chord, span, indexing='ij')
+            zeta[2] = 0.1 * np.random.rand(m + 1, n + 1)
+            self.zeta.append(zeta)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def generator(self, gust_shape, offset=2.):
+        generator = gustvelocityfield.GustVelocityField()
+        generator.initialise({'u_inf': 10.,
+                              'u_inf_direction': np.array([1., 0., 0.]),
+                              'offset': offset,
+                              'relative_motion': True,
+                              'gust_shape': gust_shape,
+                              'gust_parameters': dict(self.gust_parameters[gust_shape])})
+        return generator
+
+    def generate(self, generator, t=0.3):
+        uext = [np.zeros_like(zeta) for zeta in self.zeta]
+        generator.generate({'zeta': self.zeta,
+                            'override': True,
+                            'ts': 3,
+                            't': t,
+                            'dt': 0.1,
+                            'for_pos': np.zeros(6)}, uext)
+        return uext
+
+    def test_gust_shape_batch(self):
+        for gust_shape in self.gust_parameters:
+            gust = self.generator(gust_shape).gust
+            x, y, z = -6. * np.random.rand(3, 7, 5) + np.array([1., -10., 0.])[:, None, None]
+            batch = gust.gust_shape_batch(x, y, z, 0.7)
+            scalar = gustvelocityfield.BaseGust.gust_shape_batch(gust, x, y, z, 0.7)
+            np.testing.assert_allclose(batch, scalar, rtol=1e-12, atol=1e-14, err_msg=gust_shape)
+
+    def test_generate(self):
+        generator = self.generator('DARPA')
+        uext_batch = self.generate(generator)
+
+        # point by point fallback, as used by user defined gusts
+        gust = generator.gust
+        gust.gust_shape_batch = lambda x, y, z, t: gustvelocityfield.BaseGust.gust_shape_batch(gust, x, y, z, t)
+        uext_scalar = self.generate(generator)
+
+        for i_surf in range(len(self.zeta)):
+            np.testing.assert_allclose(uext_batch[i_surf], uext_scalar[i_surf], rtol=1e-12, atol=1e-14)
+
+    @benchmark
+    def test_benchmark(self):
+        generator = self.generator('DARPA')
+        batch_time = timeit(lambda: self.generate(generator))
+
+        gust = generator.gust
+        gust.gust_shape_batch = lambda x, y, z, t: gustvelocityfield.BaseGust.gust_shape_batch(gust, x, y, z, t)
+        scalar_time = timeit(lambda: self.generate(generator))
+        print('GustVelocityField.generate on {:d} vertices: {:.2e} s point by point, '
+              '{:.2e} s batch ({:.0f}x)'.format(sum([zeta[0].size for zeta in self.zeta]),
+                                                scalar_time, batch_time, scalar_time / batch_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+import sharpy.utils.h5utils as h5utils
+
+
+class TestTimeHistory(unittest.TestCase):
+    """
+    Tests the columnar time history writer and reader
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'timehistory.h5')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_write_read(self):
+        n_steps = 25
+        history = np.random.rand(n_steps, 4, 3)
+        with h5py.File(self.filename, 'a') as hdfile:
+            writer = h5utils.TimeHistoryWriter(hdfile.require_group('timeseries/structure'), flush_every=7)
+            for ts in range(n_steps):
+                values = {'pos': history[ts],
+                          'quat': np.array([1., 0, 0, 0]),
+                          'zeta/00000': history[ts, 0]}
+                if ts >= 10:
+                    values['postproc_node/late_variable'] = np.array(float(ts))
+                writer.append(ts, values)
+            writer.close()
+
+        ts, pos = h5utils.read_time_history(self.filename, 'structure/pos', ts_start=5, ts_end=12)
+        np.testing.assert_array_equal(ts, np.arange(5, 12))
+        np.testing.assert_array_equal(pos, history[5:12])
+
+        ts, late = h5utils.read_time_history(self.filename, 'structure/postproc_node/late_variable')
+        np.testing.assert_array_equal(ts, np.arange(10, n_steps))
+        np.testing.assert_array_equal(late, np.arange(10, n_steps))
+
+        variables = h5utils.list_time_history_variables(self.filename)
+        self.assertIn('structure/zeta/00000', variables)
+
+        # reopen and append
+        with h5py.File(self.filename, 'a') as hdfile:
+            writer = h5utils.TimeHistoryWriter(hdfile['timeseries/structure'])
+            writer.append(n_steps, {'pos': history[0], 'quat': np.array([1., 0, 0, 0]), 'zeta/00000': history[0, 0],
+                                    'postproc_node/late_variable': np.array(-1.)})
+            writer.close()
+
+        ts, late = h5utils.read_time_history(self.filename, 'structure/postproc_node/late_variable', ts_start=n_steps)
+        np.testing.assert_array_equal(ts, [n_steps])
+        np.testing.assert_array_equal(late, [-1.])
+
+    def test_buffered_copies(self):
+        # the same array is modified in place between time steps, as the time step variables are
+        pos = np.zeros((4, 3))
+        with h5py.File(self.filename, 'a') as hdfile:
+            writer = h5utils.TimeHistoryWriter(hdfile.require_group('timeseries/structure'), flush_every=10)
+            for ts in range(5):
+                pos[:] = ts
+                writer.append(ts, {'pos': pos})
+            writer.close()
+
+        _, history = h5utils.read_time_history(self.filename, 'structure/pos')
+        np.testing.assert_array_equal(history[:, 0, 0], np.arange(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import pickle
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+import sharpy.structure.utils.lagrangeconstraints as lagrangeconstraints
+import sharpy.solvers.timeintegrators as timeintegrators
+from sharpy.solvers.nonlineardynamicmultibody import NonLinearDynamicMultibody
+
+
+class TestSparseMultibodySystem(unittest.TestCase):
+    """
+    Compares the sparse assembly of the multibody system with the dense one
+    """
+
+    sys_size = 40
+    num_LM_eq = 6
+
+    def setUp(self):
+        np.random.seed(7)
+
+    def test_sparse_lagrange_matrix(self):
+        size = self.sys_size + self.num_LM_eq
+        dense = np.zeros((size, size))
+        sparse = lagrangeconstraints.SparseLagrangeMatrix((size, size))
+
+        # the patterns used by the constraints
+        for matrix in [dense, sparse]:
+            matrix[self.sys_size:self.sys_size + 3, 10:13] += np.eye(3)
+            matrix[10:13, self.sys_size:self.sys_size + 3] += 2.*np.eye(3)
+            matrix[10:13, 10:13] += np.arange(9.).reshape(3, 3)
+            matrix[10:13, 10:13] -= np.ones((3, 3))
+            matrix[self.sys_size + 3:self.sys_size + 4, 20:24] += np.array([1., 2., 0., 4.])
+            matrix[:self.sys_size, :self.sys_size] += 1e-3*np.eye(self.sys_size)
+            matrix[-2:, 30:32] += 5.
+
+        np.testing.assert_array_equal(sparse.tocsc().toarray(), dense)
+        with self.assertRaises(NotImplementedError):
+            sparse[0:2, 0:2] = np.ones((2, 2))
+
+    def test_build_sparse_matrix(self):
+        size = self.sys_size
+        M = np.diag(np.random.rand(size) + 1.)
+        C = np.random.rand(size, size)*(np.random.rand(size, size) > 0.8)
+        K = np.random.rand(size, size)*(np.random.rand(size, size) > 0.8) + 10.*np.eye(size)
+        Q = np.random.rand(size)
+        kBnh = np.zeros((self.num_LM_eq, size))
+        kBnh[:, :self.num_LM_eq] = np.eye(self.num_LM_eq)
+        LM_Q = np.random.rand(self.num_LM_eq)
+
+        for integrator in [timeintegrators.NewmarkBeta(), timeintegrators.GeneralisedAlpha()]:
+            integrator.initialise(None, {'dt': 0.01, 'sys_size': size, 'num_LM_eq': self.num_LM_eq})
+            Asys, Qout = integrator.build_matrix(M, C, K, Q, kBnh, LM_Q)
+            sparse_Asys, sparse_Qout = integrator.build_sparse_matrix(sp.csc_matrix(M), sp.csc_matrix(C),
+                                                                       sp.csc_matrix(K), Q,
+                                                                       sp.csc_matrix(kBnh), LM_Q)
+            np.testing.assert_allclose(sparse_Asys.toarray(), Asys, rtol=1e-14, err_msg=integrator.solver_id)
+            np.testing.assert_array_equal(sparse_Qout, Qout)
+
+            Dq = np.linalg.solve(Asys, -Qout)
+            np.testing.assert_allclose(spla.splu(sparse_Asys).solve(-sparse_Qout), Dq, rtol=1e-10)
+
+    def test_factorisation_reuse(self):
+        solver = NonLinearDynamicMultibody()
+        solver.settings = {'reuse_factorisation': True,
+                           'reuse_factorisation_tol': 1e-3}
+        A = sp.random(50, 50, density=0.1, format='csc') + 10.*sp.identity(50, format='csc')
+        Q = np.random.rand(50)
+
+        np.testing.assert_allclose(A.dot(solver.sparse_solve(A, Q)), -Q, rtol=1e-10)
+        # small change: the factorisation is kept
+        solver.sparse_solve(A*(1. + 1e-5), Q)
+        self.assertEqual(solver.n_factorisations, 1)
+        # large change: the system is factorised again
+        np.testing.assert_allclose(A.dot(solver.sparse_solve(A*2., Q)), -0.5*Q, rtol=1e-10)
+        self.assertEqual(solver.n_factorisations, 2)
+
+        # the factorisation is not pickled and is computed again after unpickling
+        unpickled = pickle.loads(pickle.dumps(solver))
+        self.assertIsNone(unpickled.lu)
+        np.testing.assert_allclose(A.dot(unpickled.sparse_solve(A, Q)), -Q, rtol=1e-10)
+        self.assertEqual(unpickled.n_factorisations, 3)
+
+        # without reuse, the factorisation is not kept
+        solver = NonLinearDynamicMultibody()
+        solver.settings = {'reuse_factorisation': False}
+        np.testing.assert_allclose(A.dot(solver.sparse_solve(A, Q)), -Q, rtol=1e-10)
+        self.assertIsNone(solver.lu)
+        pickle.dumps(solver)
+
+        cond = np.linalg.cond(A.toarray(), p=1)
+        self.assertAlmostEqual(solver.sparse_cond_estimate(A)/cond, 1., delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+import sharpy.aero.utils.mapping as mapping
+import sharpy.utils.algebra as algebra
+
+
+class TestForceMapping(unittest.TestCase):
+    """
+    Compares the vectorised aero to structure force mapping against the reference implementation
+    """
+
+    def setUp(self):
+        np.random.seed(10)
+        # two surfaces sharing the root node
+        n_elem_surf = 4
+        self.n_elem = 2 * n_elem_surf
+        self.n_node = 2 * (2 * n_elem_surf) + 1
+        self.conn = np.zeros((self.n_elem, 3), dtype=int)
+        right_nodes = np.arange(0, 2 * n_elem_surf + 1)
+        left_nodes = np.concatenate(([0], np.arange(2 * n_elem_surf + 1, self.n_node)))
+        for i_elem in range(n_elem_surf):
+            self.conn[i_elem, :] = right_nodes[[2 * i_elem, 2 * i_elem + 2, 2 * i_elem + 1]]
+            self.conn[n_elem_surf + i_elem, :] = left_nodes[[2 * i_elem, 2 * i_elem + 2, 2 * i_elem + 1]]
+
+        self.struct2aero_mapping = [[] for _ in range(self.n_node)]
+        for i_n, i_node in enumerate(right_nodes):
+            self.struct2aero_mapping[i_node].append({'i_surf': 0, 'i_n': i_n})
+        for i_n, i_node in enumerate(left_nodes):
+            self.struct2aero_mapping[i_node].append({'i_surf': 1, 'i_n': i_n})
+
+        m = 5
+        self.dimensions = np.array([[m, 2 * n_elem_surf], [m, 2 * n_elem_surf]], dtype=int)
+        self.zeta = [np.random.rand(3, m + 1, 2 * n_elem_surf + 1) for _ in range(2)]
+        self.forces = [np.random.rand(6, m + 1, 2 * n_elem_surf + 1) for _ in range(2)]
+        self.dynamic_forces = [np.random.rand(6, m + 1, 2 * n_elem_surf + 1) for _ in range(2)]
+        self.pos = np.random.rand(self.n_node, 3)
+        self.psi = 0.3 * np.random.rand(self.n_elem, 3, 3)
+        self.cag = algebra.euler2rot(np.array([0.1, 0.2, -0.3])).T
+
+    def reference(self, forces, skip_moments=False):
+        return mapping.aero2struct_force_mapping(forces, self.struct2aero_mapping, self.zeta, self.pos, self.psi,
+                                                 None, self.conn, self.cag,
+                                                 skip_moments_generated_by_forces=skip_moments)
+
+    def test_map_forces(self):
+        force_mapping = mapping.AeroStructForceMapping(self.struct2aero_mapping, self.conn, self.dimensions)
+        steady, unsteady = force_mapping.map_forces([self.forces, self.dynamic_forces],
+                                                    self.zeta, self.pos, self.psi, self.cag)
+        np.testing.assert_allclose(steady, self.reference(self.forces), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(unsteady, self.reference(self.dynamic_forces), rtol=1e-12, atol=1e-12)
+
+        skipped = force_mapping.map_forces([self.forces], self.zeta, self.pos, self.psi, self.cag,
+                                           skip_moments_generated_by_forces=True)[0]
+        np.testing.assert_allclose(skipped, self.reference(self.forces, skip_moments=True), rtol=1e-12, atol=1e-12)
+
+    def test_gain(self):
+        force_mapping = mapping.AeroStructForceMapping(self.struct2aero_mapping, self.conn, self.dimensions)
+        gain = force_mapping.gain(self.zeta, self.pos, self.psi, self.cag)
+        stacked_forces = force_mapping.stack_vertex_variable(self.forces).reshape(-1)
+        np.testing.assert_allclose(gain.dot(stacked_forces).reshape((self.n_node, 6)),
+                                   self.reference(self.forces), rtol=1e-12, atol=1e-12)
+
+    def test_crv2rotation_vec(self):
+        psi = np.concatenate((np.random.rand(10, 3), np.zeros((1, 3)), 1e-16 * np.ones((1, 3))))
+        rot = algebra.crv2rotation_vec(psi)
+        for i_rot in range(psi.shape[0]):
+            np.testing.assert_allclose(rot[i_rot], algebra.crv2rotation(psi[i_rot]), rtol=1e-13, atol=1e-15)
+
+
+if __name__ == '__main__':
+    unittest.main()
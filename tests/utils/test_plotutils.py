@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+import sharpy.utils.plotutils as plotutils
+
+
+class TestGridTemplates(unittest.TestCase):
+    """
+    Compares the Paraview connectivity templates and flattened variables against the original loops
+    """
+
+    m = 4
+    n = 7
+
+    def test_quad_connectivity(self):
+        conn = []
+        node_counter = -1
+        for i_n in range(self.n + 1):
+            for i_m in range(self.m + 1):
+                node_counter += 1
+                if i_n < self.n and i_m < self.m:
+                    conn.append([node_counter + 0,
+                                 node_counter + 1,
+                                 node_counter + self.m + 2,
+                                 node_counter + self.m + 1])
+
+        np.testing.assert_array_equal(plotutils.quad_connectivity(self.m, self.n), conn)
+        self.assertIs(plotutils.quad_connectivity(self.m, self.n), plotutils.quad_connectivity(self.m, self.n))
+
+    def test_flatten_grid_variable(self):
+        zeta = np.random.rand(3, self.m + 1, self.n + 1)
+        gamma = np.random.rand(self.m, self.n)
+
+        coords = np.zeros(((self.m + 1) * (self.n + 1), 3))
+        counter = -1
+        for i_n in range(self.n + 1):
+            for i_m in range(self.m + 1):
+                counter += 1
+                coords[counter, :] = zeta[:, i_m, i_n]
+
+        panel_gamma = np.zeros((self.m * self.n))
+        counter = -1
+        for i_n in range(self.n):
+            for i_m in range(self.m):
+                counter += 1
+                panel_gamma[counter] = gamma[i_m, i_n]
+
+        flat_coords = plotutils.flatten_grid_variable(zeta)
+        np.testing.assert_array_equal(flat_coords, coords)
+        np.testing.assert_array_equal(plotutils.flatten_grid_variable(gamma), panel_gamma)
+
+        # the result must not be a view of the original variable
+        flat_coords += 1.
+        np.testing.assert_array_equal(zeta[:, 0, 0], coords[0, :])
+
+
+if __name__ == '__main__':
+    unittest.main()
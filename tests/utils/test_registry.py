@@ -0,0 +1,74 @@
+import subprocess
+import sys
+import unittest
+
+import sharpy.utils.registry as registry
+import sharpy.utils.registry_index as registry_index
+from tests.benchmark import benchmark
+
+
+class TestLazyRegistry(unittest.TestCase):
+    """
+    Tests the on demand import of solvers, postprocessors, generators and controllers and benchmarks the start up
+    time of a simple case with ``python -X importtime``
+    """
+
+    # loads the solvers of a static structural case
+    static_case = ('import sharpy.utils.solver_interface as solver_interface\n'
+                   'for solver_id in ["BeamLoader", "NonLinearStatic", "BeamPlot"]:\n'
+                   '    solver_interface.solver_from_string(solver_id)\n')
+
+    @staticmethod
+    def run_python(code, *options):
+        process = subprocess.run([sys.executable] + list(options) + ['-c', code],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        return process.stdout, process.stderr
+
+    @staticmethod
+    def total_import_time(importtime_output):
+        """Sum of the cumulative import time in seconds of the top level imports in the output of ``-X importtime``"""
+        total = 0
+        for line in importtime_output.splitlines():
+            fields = line.split('|')
+            if line.startswith('import time:') and 'self [us]' not in line and not fields[2].startswith('  '):
+                total += int(fields[1])
+        return total * 1e-6
+
+    def test_index(self):
+        for kind in registry.packages:
+            with self.subTest(kind=kind):
+                self.assertEqual(registry_index.index[kind], registry.scan_packages(kind),
+                                 'The static index is outdated. Run sharpy.utils.registry.write_index()')
+
+    def test_lazy_import(self):
+        code = self.static_case + ('import sys\n'
+                                   'print(" ".join(sorted(sys.modules)))\n')
+        modules = self.run_python(code)[0].split()
+        self.assertIn('sharpy.solvers.beamloader', modules)
+        self.assertIn('sharpy.solvers.nonlinearstatic', modules)
+        self.assertIn('sharpy.postproc.beamplot', modules)
+        self.assertNotIn('sharpy.solvers.dynamiccoupled', modules)
+        self.assertNotIn('sharpy.postproc.asymptoticstability', modules)
+        self.assertNotIn('sharpy.generators.floatingforces', modules)
+
+        # unknown ids
+        code = ('import sharpy.utils.solver_interface as solver_interface\n'
+                'import sharpy.utils.exceptions as exceptions\n'
+                'try:\n'
+                '    solver_interface.solver_from_string("NotASolver")\n'
+                'except exceptions.SolverNotFound:\n'
+                '    print(solver_interface.dict_of_solvers.all_loaded, "DynamicCoupled" in solver_interface.dict_of_solvers)\n')
+        self.assertEqual(self.run_python(code)[0].split(), ['True', 'True'])
+
+    @benchmark
+    def test_benchmark(self):
+        lazy_time = self.total_import_time(self.run_python(self.static_case, '-X', 'importtime')[1])
+        eager_time = self.total_import_time(self.run_python(self.static_case +
+                                                            'len(solver_interface.dict_of_solvers)\n',
+                                                            '-X', 'importtime')[1])
+        print('Import time of a static case: {:.3f} s importing the required solvers, '
+              '{:.3f} s importing all the solvers and postprocessors'.format(lazy_time, eager_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import sharpy.utils.sweep as sweep
+
+
+def tip_deflection(data):
+    return data.structure.timestep_info[-1].pos[-1, 2]
+
+
+class TestParametricSweep(unittest.TestCase):
+    """
+    Sweeps the gravity of the Geradin clamped beam on two workers and resumes interrupted sweeps
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.case = importlib.import_module('tests.xbeam.geradin.generate_geradin')
+        cls.case.clean_test_files()
+        cls.case.generate_fem_file(cls.case.route, cls.case.case_name, 20)
+        cls.case.generate_solver_file()
+        cls.settings_file = cls.case.route + '/' + cls.case.case_name + '.sharpy'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.case.clean_test_files()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def gravity_sweep(self, gravity):
+        return sweep.ParametricSweep(self.settings_file,
+                                     {'NonLinearStatic.gravity': gravity,
+                                      'NonLinearStatic.num_load_steps': [10]},
+                                     outputs={'tip_pos': 'structure.timestep_info[-1].pos[-1]',
+                                              'tip_deflection': tip_deflection},
+                                     folder=self.folder,
+                                     n_workers=2)
+
+    def test_sweep(self):
+        gravity = [0., 4.905, 9.81]
+        results = self.gravity_sweep(gravity).run()
+
+        np.testing.assert_array_equal(results['status'], sweep.FINISHED)
+        np.testing.assert_array_equal(results['parameters']['NonLinearStatic.gravity'], gravity)
+        self.assertEqual(results['outputs']['tip_pos'].shape, (3, 3))
+        np.testing.assert_array_equal(results['outputs']['tip_pos'][:, 2], results['outputs']['tip_deflection'])
+
+        # tip deflection of the reference case in tests.xbeam.test_xbeam
+        self.assertAlmostEqual(results['outputs']['tip_deflection'][2], -2.159, 2)
+        self.assertEqual(len(set(np.sign(np.diff(results['outputs']['tip_deflection'])))), 1)
+
+        # the case input files are shared
+        self.assertFalse(os.path.isfile(self.folder + '/cases/0000/geradin.fem.h5'))
+        self.assertTrue(os.path.isfile(self.folder + '/cases/0000/geradin.sharpy'))
+
+        # resuming a finished sweep does not run any case
+        shutil.rmtree(self.folder + '/cases/')
+        resumed = self.gravity_sweep(gravity).run()
+        self.assertFalse(os.path.isdir(self.folder + '/cases/'))
+        np.testing.assert_array_equal(resumed['outputs']['tip_pos'], results['outputs']['tip_pos'])
+
+        # the table belongs to a different sweep
+        with self.assertRaises(sweep.exceptions.NotValidInputFile):
+            self.gravity_sweep([1., 2.]).run()
+
+    def test_resume(self):
+        gravity = [0., 9.81]
+        # interrupted sweep in which only the first case finished
+        interrupted = self.gravity_sweep(gravity)
+        with interrupted.open_table() as table:
+            interrupted.write_outputs(table, 0, {'tip_pos': np.ones((3,)), 'tip_deflection': np.array(1.)})
+            table['status'][0] = sweep.FINISHED
+
+        results = self.gravity_sweep(gravity).run()
+        np.testing.assert_array_equal(results['status'], sweep.FINISHED)
+        np.testing.assert_array_equal(results['outputs']['tip_pos'][0], np.ones((3,)))
+        self.assertAlmostEqual(results['outputs']['tip_deflection'][1], -2.159, 2)
+        self.assertFalse(os.path.isdir(interrupted.case_folder(0)))
+        self.assertTrue(os.path.isdir(interrupted.case_folder(1)))
+
+    def test_settings(self):
+        case_sweep = sweep.ParametricSweep(self.settings_file,
+                                           [{'NonLinearStatic.gravity': 1., 'BeamLoader.unsteady': 'on'},
+                                            {'NonLinearStatic.gravity': 2., 'BeamLoader.unsteady': 'off'}],
+                                           outputs={}, folder=self.folder, n_workers=1)
+        settings = case_sweep.case_settings(1)
+        self.assertEqual(settings['NonLinearStatic']['gravity'], 2.)
+        self.assertEqual(settings['BeamLoader']['unsteady'], 'off')
+        self.assertEqual(settings['SHARPy']['log_folder'], case_sweep.case_folder(1))
+        self.assertEqual(case_sweep.base_settings['NonLinearStatic']['gravity'], '9.81')
+
+        with self.assertRaises(sweep.exceptions.NotValidInputFile):
+            sweep.set_setting(settings, 'NotASolver.gravity', 1.)
+
+        with sweep.thread_limits(3):
+            self.assertEqual(os.environ['OMP_NUM_THREADS'], '3')
+
+
+if __name__ == '__main__':
+    unittest.main()
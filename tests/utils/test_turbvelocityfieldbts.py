@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import sharpy.generators.turbvelocityfieldbts as turbvelocityfieldbts
+import sharpy.utils.exceptions as exceptions
+from sharpy.generators.turbvelocityfieldbts import TurbVelocityFieldBts
+from tests.benchmark import benchmark, timeit
+
+
+def reference_interpolation(points, grid, vector_field, out_value):
+    """
+    Point by point interpolation with the polynomial coefficients of every cell, as originally implemented
+    """
+    output = np.zeros((points.shape[0], 3))
+    for ipoint in range(points.shape[0]):
+        if any([(points[ipoint, idim] > grid[idim][-1]) or (points[ipoint, idim] < grid[idim][0])
+                for idim in range(3)]):
+            output[ipoint, :] = out_value
+            continue
+
+        igrid = np.zeros((3,), dtype=int)
+        for idim in range(3):
+            while points[ipoint, idim] >= grid[idim][igrid[idim]]:
+                igrid[idim] += 1
+
+        corners = []
+        values = []
+        for kz in (-1, 0):
+            for ky in (-1, 0):
+                for kx in (-1, 0):
+                    corners.append([grid[0][igrid[0] + kx], grid[1][igrid[1] + ky], grid[2][igrid[2] + kz]])
+                    values.append(vector_field[:, igrid[0] + kx, igrid[1] + ky, igrid[2] + kz])
+        corners = np.array(corners)
+        xvec, yvec, zvec = corners.T
+        A = np.column_stack((np.ones(8), xvec, yvec, zvec, xvec*yvec, xvec*zvec, yvec*zvec, xvec*yvec*zvec))
+        f = np.linalg.solve(A, np.array(values))
+        x, y, z = points[ipoint, :]
+        output[ipoint, :] = np.dot(np.array([1., x, y, z, x*y, x*z, y*z, x*y*z]), f)
+    return output
+
+
+def reference_orientation(old_vel, orientation):
+    """
+    Velocity field reoriented with the original loops
+    """
+    position_in_old = np.zeros((3), dtype=int)
+    sign = np.array([1, 1, 1], dtype=int)
+    for ivel in range(3):
+        if orientation[0] == '-':
+            sign[ivel] = -1
+            orientation = orientation[1:]
+        position_in_old[ivel] = 'xyz'.index(orientation[0])
+        orientation = orientation[1:]
+
+    new_dim = np.array(old_vel.shape[1:])[position_in_old]
+    new_vel = np.zeros((3, new_dim[0], new_dim[1], new_dim[2]))
+    for ix in range(new_dim[0]):
+        for iy in range(new_dim[1]):
+            for iz in range(new_dim[2]):
+                new_i = np.array([ix, iy, iz])
+                old_i = new_i[position_in_old]
+                for icoord in range(3):
+                    if sign[icoord] == -1:
+                        old_i[icoord] = -1*old_i[icoord] - 1
+                for ivel in range(3):
+                    new_vel[ivel, ix, iy, iz] = old_vel[position_in_old[ivel], old_i[0], old_i[1], old_i[2]]*sign[ivel]
+    return new_vel
+
+
+class TestTurbVelocityFieldBts(unittest.TestCase):
+    """
+    Validates the vectorised interpolation, reader and reorientation against the original loops
+    """
+
+    def setUp(self):
+        np.random.seed(5)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_interpolation(self):
+        grid = (np.linspace(-20., 0., 21), np.linspace(-5., 5., 11), np.linspace(-3., 3., 7))
+        vector_field = np.random.rand(3, 21, 11, 7)
+        out_value = np.array([10., 0., 0.])
+        points = np.random.rand(500, 3) * np.array([24., 12., 7.]) + np.array([-22., -6., -3.5])
+
+        reference = reference_interpolation(points, grid, vector_field, out_value)
+        regular = turbvelocityfieldbts.interp_rectgrid_vectorfield(points, grid, vector_field, out_value,
+                                                                   regularGrid=True)
+        np.testing.assert_allclose(regular, reference, rtol=1e-10, atol=1e-10)
+        rectilinear = turbvelocityfieldbts.interp_rectgrid_vectorfield(points, grid, vector_field, out_value,
+                                                                       regularGrid=False)
+        np.testing.assert_allclose(rectilinear, reference, rtol=1e-10, atol=1e-10)
+        parallel = turbvelocityfieldbts.interp_rectgrid_vectorfield(points, grid, vector_field, out_value,
+                                                                    regularGrid=True, num_cores=4)
+        np.testing.assert_array_equal(parallel, regular)
+
+    @benchmark
+    def test_benchmark(self):
+        grid = (np.linspace(-20., 0., 21), np.linspace(-5., 5., 11), np.linspace(-3., 3., 7))
+        vector_field = np.random.rand(3, 21, 11, 7)
+        out_value = np.array([10., 0., 0.])
+        points = np.random.rand(500, 3) * np.array([24., 12., 7.]) + np.array([-22., -6., -3.5])
+
+        reference_time = timeit(lambda: reference_interpolation(points, grid, vector_field, out_value))
+        regular_time = timeit(lambda: turbvelocityfieldbts.interp_rectgrid_vectorfield(points, grid, vector_field,
+                                                                                        out_value, regularGrid=True))
+        print('Interpolation of {:d} points: {:.2e} s point by point, {:.2e} s vectorised'.format(
+            points.shape[0], reference_time, regular_time))
+
+    def write_bts(self, filename, nt, ny, nz):
+        header = np.dtype([('id', np.int16), ('nz', np.int32), ('ny', np.int32), ('tower_points', np.int32),
+                           ('ntime_steps', np.int32), ('dz', np.float32), ('dy', np.float32), ('dt', np.float32),
+                           ('u_mean', np.float32), ('HubHt', np.float32), ('Zbottom', np.float32),
+                           ('scaling', np.float32, (6,)), ('n_char_description', np.int32)])
+        description = b'Synthetic TurbSim field for testing purposes'
+        values = np.array([(7, nz, ny, 0, nt, 2., 3., 0.1, 10., 50., 40.,
+                            [300., 10., 400., 0., 500., -5.], len(description))], dtype=header)
+        data = np.random.randint(-1000, 1000, size=3*nt*ny*nz).astype(np.int16)
+        with open(filename, 'wb') as fid:
+            fid.write(values.tobytes())
+            fid.write(description)
+            fid.write(data.tobytes())
+        return data, values
+
+    def test_read_and_orientation(self):
+        nt, ny, nz = 12, 5, 4
+        filename = os.path.join(self.folder, 'field.bts')
+        data, header = self.write_bts(filename, nt, ny, nz)
+        scaling = header['scaling'][0, 0::2]
+        offset = header['scaling'][0, 1::2]
+
+        x_grid, y_grid, z_grid, vel = TurbVelocityFieldBts.read_turbsim_bts(filename)
+
+        reference = np.zeros((3, nt, ny, nz))
+        counter = -1
+        for ix in range(nt):
+            for iz in range(nz):
+                for iy in range(ny):
+                    for ivel in range(3):
+                        counter += 1
+                        reference[ivel, -ix, iy, iz] = (data[counter] - offset[ivel])/scaling[ivel]
+        np.testing.assert_array_equal(vel, reference)
+        self.assertEqual(len(x_grid), nt)
+        np.testing.assert_allclose(y_grid, np.linspace(-6., 6., ny))
+
+        # rotation of pi around y, the usual reorientation for wind turbines
+        new_x, new_y, new_z, new_vel = TurbVelocityFieldBts.change_orientation(x_grid, y_grid, z_grid, vel, '-xy-z')
+        np.testing.assert_array_equal(new_x, -x_grid[::-1])
+        np.testing.assert_array_equal(new_z, -z_grid[::-1])
+        for ix in range(nt):
+            for iy in range(ny):
+                for iz in range(nz):
+                    np.testing.assert_array_equal(new_vel[:, ix, iy, iz],
+                                                  np.array([-1., 1., -1.]) * vel[:, -ix - 1, iy, -iz - 1])
+
+        for orientation in ['-xy-z', 'xz-y', '-x-yz']:
+            new_vel = TurbVelocityFieldBts.change_orientation(x_grid, y_grid, z_grid, vel, orientation)[3]
+            np.testing.assert_array_equal(new_vel, reference_orientation(vel, orientation), err_msg=orientation)
+
+    def test_streaming(self):
+        nt, ny, nz = 200, 9, 7
+        filename = os.path.join(self.folder, 'long_field.bts')
+        self.write_bts(filename, nt, ny, nz)
+
+        generators = []
+        for streaming in [False, True]:
+            generator = TurbVelocityFieldBts()
+            generator.initialise({'turbulent_field': filename,
+                                  'new_orientation': '-xy-z',
+                                  'u_fed': np.array([10., 0., 0.]),
+                                  'u_out': np.array([10., 0., 0.]),
+                                  'print_info': False,
+                                  'streaming': streaming,
+                                  'streaming_planes': 20})
+            generators.append(generator)
+
+        zeta = [np.zeros((3, 5, 11))]
+        zeta[0][0], zeta[0][1] = np.meshgrid(np.linspace(-1., 1., 5), np.linspace(-5., 5., 11), indexing='ij')
+        zeta[0][2] = 0.5
+        # the lattice is fed through the field from x = 150 to x = 10
+        for_pos = np.array([150., 0., 0., 0., 0., 0.])
+        for t in np.linspace(0., 14., 41):
+            uext = [[np.zeros_like(zeta[0])] for _ in generators]
+            for generator, generator_uext in zip(generators, uext):
+                generator.generate({'zeta': zeta, 'for_pos': for_pos, 't': t}, generator_uext)
+            np.testing.assert_allclose(uext[1][0], uext[0][0], rtol=1e-12, atol=1e-12)
+            self.assertFalse(np.all(uext[1][0][0] == 10.), 'Lattice outside the field')
+
+        stream = generators[1].stream
+        self.assertLessEqual(stream.vel.shape[1], 20)
+        self.assertLess(stream.n_loads, 41)
+
+        # the field is streamed along x, which the new orientation must keep
+        with self.assertRaises(exceptions.NotValidSetting):
+            TurbVelocityFieldBts().initialise({'turbulent_field': filename,
+                                               'new_orientation': 'zyx',
+                                               'print_info': False,
+                                               'streaming': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+import sharpy.utils.h5utils as h5utils
+from sharpy.postproc.writevariablestime import WriteVariablesTime
+
+
+class TestWriteVariablesTime(unittest.TestCase):
+    """
+    Runs the postprocessor online on a mock simulation and checks the buffered text and the columnar ``h5`` outputs
+    """
+
+    n_steps = 7
+
+    def setUp(self):
+        np.random.seed(3)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def mock_data(self):
+        structure = types.SimpleNamespace(timestep_info=[], node_master_elem=np.array([[0, 0], [0, 2], [0, 1]]))
+        aero = types.SimpleNamespace(timestep_info=[])
+        return types.SimpleNamespace(structure=structure, aero=aero, output_folder=self.folder, ts=0)
+
+    def add_step(self, data):
+        data.structure.timestep_info.append(types.SimpleNamespace(for_pos=np.random.rand(6),
+                                                                  pos=np.random.rand(3, 3),
+                                                                  psi=np.random.rand(1, 3, 3)))
+        data.aero.timestep_info.append(types.SimpleNamespace(gamma=[np.random.rand(2, 4)],
+                                                             zeta=[np.random.rand(3, 3, 5)]))
+        data.ts = len(data.structure.timestep_info) - 1
+
+    def run_case(self, output_format):
+        data = self.mock_data()
+        postproc = WriteVariablesTime()
+        postproc.initialise(data, custom_settings={'FoR_variables': ['for_pos'],
+                                                   'structure_variables': ['pos', 'psi'],
+                                                   'structure_nodes': [1, 2],
+                                                   'aero_panels_variables': ['gamma'],
+                                                   'aero_panels_isurf': [0],
+                                                   'aero_panels_im': [1],
+                                                   'aero_panels_in': [3],
+                                                   'aero_nodes_variables': ['zeta'],
+                                                   'aero_nodes_isurf': [0],
+                                                   'aero_nodes_im': [2],
+                                                   'aero_nodes_in': [4],
+                                                   'cleanup_old_solution': True,
+                                                   'output_format': output_format,
+                                                   'flush_stride': 3})
+        for _ in range(self.n_steps):
+            self.add_step(data)
+            postproc.run(online=True)
+        postproc.teardown()
+        return data, data.output_folder + '/WriteVariablesTime/'
+
+    def test_text(self):
+        data, folder = self.run_case('text')
+
+        pos = np.loadtxt(folder + 'struct_pos_node2.dat')
+        np.testing.assert_array_equal(pos[:, 0], np.arange(self.n_steps))
+        np.testing.assert_allclose(pos[:, 1:], [tstep.pos[2] for tstep in data.structure.timestep_info], rtol=1e-6)
+
+        psi = np.loadtxt(folder + 'struct_psi_node1.dat')
+        np.testing.assert_allclose(psi[:, 1:], [tstep.psi[0, 2] for tstep in data.structure.timestep_info], rtol=1e-6)
+
+        gamma = np.loadtxt(folder + 'aero_gamma_panel_isurf0_im1_in3.dat')
+        np.testing.assert_allclose(gamma[:, 1], [tstep.gamma[0][1, 3] for tstep in data.aero.timestep_info],
+                                   rtol=1e-6)
+
+        with open(folder + 'FoR_00_for_pos.dat') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), self.n_steps)
+        self.assertEqual(lines[0], '0 ' + ' '.join('%e' % value
+                                                   for value in data.structure.timestep_info[0].for_pos) + '\n')
+
+    def test_default_stride(self):
+        data = self.mock_data()
+        postproc = WriteVariablesTime()
+        postproc.initialise(data, custom_settings={'FoR_variables': ['for_pos'],
+                                                   'cleanup_old_solution': True})
+        for i_step in range(3):
+            self.add_step(data)
+            postproc.run(online=True)
+            # every time step is in the file once computed
+            with open(data.output_folder + '/WriteVariablesTime/FoR_00_for_pos.dat') as f:
+                self.assertEqual(len(f.readlines()), i_step + 1)
+        postproc.teardown()
+
+    def test_h5(self):
+        data, folder = self.run_case('h5')
+        self.assertFalse(os.path.isfile(folder + 'struct_pos_node2.dat'))
+
+        ts, pos = h5utils.read_time_history(folder + 'WriteVariablesTime.h5', 'structure/struct_pos_node2', group=None)
+        np.testing.assert_array_equal(ts, np.arange(self.n_steps))
+        np.testing.assert_array_equal(pos, [tstep.pos[2] for tstep in data.structure.timestep_info])
+
+        ts, zeta = h5utils.read_time_history(folder + 'WriteVariablesTime.h5',
+                                             'aero_nodes/aero_zeta_node_isurf0_im2_in4', group=None)
+        np.testing.assert_array_equal(zeta, [tstep.zeta[0][:, 2, 4] for tstep in data.aero.timestep_info])
+
+        ts, for_pos = h5utils.read_time_history(folder + 'WriteVariablesTime.h5', 'FoR/FoR_00_for_pos', group=None)
+        np.testing.assert_array_equal(for_pos[:, 0, :], [tstep.for_pos for tstep in data.structure.timestep_info])
+
+
+if __name__ == '__main__':
+    unittest.main()
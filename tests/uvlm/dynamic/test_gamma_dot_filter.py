@@ -0,0 +1,109 @@
+import unittest
+
+import numpy as np
+import scipy.signal
+
+from sharpy.solvers.stepuvlm import GammaDotFilter
+from tests.benchmark import benchmark, timeit
+
+
+class TimeStep(object):
+    def __init__(self, dimensions):
+        self.gamma_dot = [np.random.rand(m, n) for m, n in dimensions]
+        self.gamma = [np.zeros((m, n)) for m, n in dimensions]
+        self.zeta = [None for _ in dimensions]
+
+
+def reference_filter(tstep, history, filter_param):
+    """
+    Panel by panel filter, as originally implemented in StepUvlm.filter_gamma_dot
+    """
+    clean_history = [x for x in history if x is not None]
+    series_length = len(clean_history) + 1
+    for i_surf in range(len(tstep.zeta)):
+        n_rows, n_cols = tstep.gamma[i_surf].shape
+        for i in range(n_rows):
+            for j in range(n_cols):
+                series = np.zeros((series_length,))
+                for it in range(series_length - 1):
+                    series[it] = clean_history[it].gamma_dot[i_surf][i, j]
+                series[-1] = tstep.gamma_dot[i_surf][i, j]
+                tstep.gamma_dot[i_surf][i, j] = scipy.signal.wiener(series, filter_param)[-1]
+
+
+class TestGammaDotFilter(unittest.TestCase):
+    """
+    Compares the buffered filter against the original one along a time history
+    """
+
+    dimensions = [(4, 10), (4, 10), (2, 5)]
+
+    def setUp(self):
+        np.random.seed(23)
+
+    def run_history(self, n_steps, filter_param, window, fsi_iterations=2):
+        reference_history = [TimeStep(self.dimensions)]
+        history = [TimeStep(self.dimensions)]
+        history[0].gamma_dot = [g.copy() for g in reference_history[0].gamma_dot]
+        gamma_dot_filter = GammaDotFilter(window, filter_param)
+        for ts in range(1, n_steps):
+            # as in DynamicCoupled, the current time step is a copy that is filtered in every FSI iteration
+            for _ in range(fsi_iterations):
+                raw = [np.random.rand(m, n) for m, n in self.dimensions]
+                reference_tstep = TimeStep(self.dimensions)
+                reference_tstep.gamma_dot = [g.copy() for g in raw]
+                tstep = TimeStep(self.dimensions)
+                tstep.gamma_dot = [g.copy() for g in raw]
+
+                if window:
+                    reference_filter(reference_tstep, reference_history[-window:], filter_param)
+                else:
+                    reference_filter(reference_tstep, reference_history, filter_param)
+                gamma_dot_filter.filter(tstep, history)
+                for i_surf in range(len(self.dimensions)):
+                    np.testing.assert_allclose(tstep.gamma_dot[i_surf], reference_tstep.gamma_dot[i_surf],
+                                               rtol=1e-10, atol=1e-12)
+            reference_history.append(reference_tstep)
+            history.append(tstep)
+
+    def test_whole_history(self):
+        for filter_param in [None, 5]:
+            self.run_history(90, filter_param, 0)
+
+    def test_window(self):
+        self.run_history(40, 3, 7)
+
+    def test_current_step_in_history(self):
+        history = [TimeStep(self.dimensions) for _ in range(6)]
+        reference = [[g.copy() for g in history[-1].gamma_dot]]
+        reference_tstep = TimeStep(self.dimensions)
+        reference_tstep.gamma_dot = reference[0]
+        reference_filter(reference_tstep, history[:-1] + [reference_tstep], 3)
+
+        GammaDotFilter(0, 3).filter(history[-1], history)
+        for i_surf in range(len(self.dimensions)):
+            np.testing.assert_allclose(history[-1].gamma_dot[i_surf], reference_tstep.gamma_dot[i_surf],
+                                       rtol=1e-10, atol=1e-12)
+
+    @benchmark
+    def test_benchmark(self):
+        n_steps = 200
+        history = [TimeStep(self.dimensions) for _ in range(n_steps)]
+        tstep = TimeStep(self.dimensions)
+        reference_tstep = TimeStep(self.dimensions)
+        reference_tstep.gamma_dot = [g.copy() for g in tstep.gamma_dot]
+
+        reference_time = timeit(lambda: reference_filter(reference_tstep, history, 3))
+        gamma_dot_filter = GammaDotFilter(0, 3)
+        gamma_dot_filter.update(history, tstep)
+        buffered_time = timeit(lambda: gamma_dot_filter.filter(tstep, history))
+
+        for i_surf in range(len(self.dimensions)):
+            np.testing.assert_allclose(tstep.gamma_dot[i_surf], reference_tstep.gamma_dot[i_surf],
+                                       rtol=1e-10, atol=1e-12)
+        print('Gamma_dot filter with {:d} time steps: {:.2e} s per panel loop, {:.2e} s buffered'.format(
+            n_steps, reference_time, buffered_time))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+import itertools
+import shutil
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+import sharpy.utils.algebra as algebra
+from sharpy.aero.utils.airfoilpolars import Polar, PolarTables
+from sharpy.aero.utils.utils import magnitude_and_direction_of_relative_velocity, local_stability_axes, span_chord
+from sharpy.generators.polaraeroforces import PolarCorrection
+
+
+def reference_generate(generator, **params):
+    """
+    Node by node polar correction, as originally implemented in ``PolarCorrection.generate``
+
+    Args:
+        generator (PolarCorrection): Initialised generator
+
+    Keyword Args:
+        aero_kstep (:class:`sharpy.utils.datastructures.AeroTimeStepInfo`): Current aerodynamic substep
+        structural_kstep (:class:`sharpy.utils.datastructures.StructTimeStepInfo`): Current structural substep
+        struct_forces (np.array): Array with the aerodynamic forces mapped on the structure in the B frame of
+          reference
+
+    Returns:
+        np.array: New corrected structural forces
+    """
+    aero_kstep = params['aero_kstep']
+    structural_kstep = params['structural_kstep']
+    struct_forces = params['struct_forces']
+    ts = params['ts']
+
+    aerogrid = generator.aero
+    structure = generator.structure
+    rho = generator.rho
+    correct_lift = generator.settings['correct_lift']
+    moment_from_polar = generator.settings['moment_from_polar']
+
+    list_aoa_induced = []
+
+    data_dict = aerogrid.data_dict
+    if aerogrid.polars is None:
+        return struct_forces
+    new_struct_forces = np.zeros_like(struct_forces)
+
+    nnode = struct_forces.shape[0]
+
+    # Compute induced velocities at the structural points
+    cga = algebra.quat2rotation(structural_kstep.quat)
+    pos_g = np.array([cga.dot(structural_kstep.pos[inode]) + np.array([0, 0, 0]) for inode in range(nnode)])
+
+    for inode in range(nnode):
+        new_struct_forces[inode, :] = struct_forces[inode, :].copy()
+        if data_dict['aero_node'][inode]:
+            ielem, inode_in_elem = structure.node_master_elem[inode]
+            iairfoil = data_dict['airfoil_distribution'][ielem, inode_in_elem]
+            isurf = aerogrid.struct2aero_mapping[inode][0]['i_surf']
+            if isurf not in generator.settings['skip_surfaces']:
+                i_n = aerogrid.struct2aero_mapping[inode][0]['i_n']
+                polar = aerogrid.polars[iairfoil]
+                cab = algebra.crv2rotation(structural_kstep.psi[ielem, inode_in_elem, :])
+                cgb = np.dot(cga, cab)
+
+                if not generator.cd_from_cl:
+                    airfoil = str(data_dict['airfoil_distribution'][ielem, inode_in_elem])
+                    aoa_0cl = generator.list_aoa_cl0[int(airfoil)]
+
+                # computing surface area of panels contributing to force
+                dir_span, span, dir_chord, chord = span_chord(i_n, aero_kstep.zeta[isurf])
+                area = span * chord
+                area = generator.correct_surface_area(inode, aerogrid.struct2aero_mapping, aero_kstep.zeta, area)
+
+                # Define the relative velocity and its direction
+                urel, dir_urel = magnitude_and_direction_of_relative_velocity(structural_kstep.pos[inode, :],
+                                                                            structural_kstep.pos_dot[inode, :],
+                                                                            structural_kstep.for_vel[:],
+                                                                            cga,
+                                                                            aero_kstep.u_ext[isurf][:, :, i_n],
+                                                                            generator.settings['add_rotation'],
+                                                                            generator.settings['rot_vel_g'],
+                                                                            generator.settings['centre_rot_g'],)
+                # Coefficient to change from aerodynamic coefficients to forces (and viceversa)
+                coef = 0.5 * rho * np.linalg.norm(urel) ** 2 * area
+                # Stability axes - projects forces in B onto S
+                c_bs = local_stability_axes(cgb.T.dot(dir_urel), cgb.T.dot(dir_chord))
+                forces_s = c_bs.T.dot(struct_forces[inode, :3])
+                moment_s = c_bs.T.dot(struct_forces[inode, 3:])
+                drag_force = forces_s[0]
+                lift_force = forces_s[2]
+                # Compute the associated lift
+                cl = np.sign(lift_force) * np.linalg.norm(lift_force) / coef
+                cd_sharpy = np.linalg.norm(drag_force) / coef
+
+                if generator.cd_from_cl:
+                    # Compute the drag from the UVLM computed lift
+                    cd, cm = polar.get_cdcm_from_cl(cl)
+
+                else:
+                    """
+                    Compute L, D, M from polar depending on:
+                    ii) Compute the effective angle of attack from potential flow theory or specified it as setting
+                    input. The local lift curve slope is 2pi and the zero-lift angle of attack is given by thin
+                    airfoil theory or specified it as setting input. From this, the effective angle of attack is
+                    computed for the section and includes 3D effects.
+                    """
+                    aoa = cl / 2 / np.pi + aoa_0cl
+                    list_aoa_induced.append(aoa)
+                    # Compute the coefficients associated to that angle of attack
+                    cl_polar, cd, cm = polar.get_coefs(aoa)
+
+                    if correct_lift:
+                        # Use polar generated CL rather than UVLM computed CL
+                        cl = cl_polar
+
+                # Recompute the forces based on the coefficients (side force is uncorrected)
+                forces_s[0] += cd * coef  # add viscous drag to induced drag from UVLM
+                forces_s[2] = cl * coef
+
+                new_struct_forces[inode, 0:3] = c_bs.dot(forces_s)
+
+                # Pitching moment
+                # The panels are shifted by 0.25 of a panel aft from the leading edge
+                panel_shift = 0.25 * (aero_kstep.zeta[isurf][:, 1, i_n] - aero_kstep.zeta[isurf][:, 0, i_n])
+                ref_point = aero_kstep.zeta[isurf][:, 0, i_n] + 0.25 * chord * dir_chord - panel_shift
+
+                # viscous contribution (pure moment)
+                moment_s[1] += cm * coef * chord
+
+                # moment due to drag
+                arm = cgb.T.dot(ref_point - pos_g[inode])  # in B frame
+                moment_polar_drag = algebra.cross3(c_bs.T.dot(arm), cd * dir_urel * coef)  # in S frame
+                moment_s += moment_polar_drag
+
+                # Pitching moment
+                if moment_from_polar:
+                    # The panels are shifted by 0.25 of a panel aft from the leading edge
+                    panel_shift = 0.25 * (aero_kstep.zeta[isurf][:, 1, i_n] - aero_kstep.zeta[isurf][:, 0, i_n])
+                    ref_point = aero_kstep.zeta[isurf][:, 0, i_n] + 0.25 * chord * dir_chord - panel_shift
+                    new_struct_forces[inode, 3:6] = c_bs.dot(moment_s)
+
+                    # viscous contribution (pure moment)
+                    moment_s[1] += cm * coef * chord
+
+
+                    # moment due to drag
+                    arm = cgb.T.dot(ref_point - pos_g[inode])  # in B frame
+                    moment_polar_drag = algebra.cross3(c_bs.T.dot(arm), cd * dir_urel * coef)  # in S frame
+                    moment_s += moment_polar_drag
+
+                # moment due to lift (if corrected)
+                if correct_lift and moment_from_polar:
+                    # add moment from scratch: cm_polar + cm_drag_polar + cl_lift_polar
+                    moment_s = np.zeros(3)
+                    moment_s[1] = cm * coef * chord
+                    moment_s += moment_polar_drag
+                    moment_polar_lift = algebra.cross3(c_bs.T.dot(arm), forces_s[2] * np.array([0, 0, 1]))
+                    moment_s += moment_polar_lift
+
+                new_struct_forces[inode, 3:6] = c_bs.dot(moment_s)
+
+    if generator.settings['write_induced_aoa']:
+        generator.write_induced_aoa_of_each_node(ts, list_aoa_induced)
+
+    return new_struct_forces
+
+
+class TestPolarCorrection(unittest.TestCase):
+    """
+    Compares the vectorised polar correction with the node by node reference on a wing of two surfaces sharing the
+    root node
+    """
+
+    n_chord = 2
+    n_span = 3
+
+    def setUp(self):
+        np.random.seed(5)
+        self.folder = tempfile.mkdtemp()
+
+        aoa = np.linspace(-np.pi, np.pi, 361)
+        self.polars = []
+        for shift, scale in [(0.03, 1.), (0.05, 0.9)]:
+            table = np.column_stack((aoa,
+                                     scale*np.pi*np.sin(2*(aoa + shift)),
+                                     0.01 + scale*aoa**2,
+                                     -0.05*scale*aoa))
+            polar = Polar()
+            polar.initialise(table)
+            self.polars.append(polar)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def mock_case(self):
+        n_node = 7
+        n_elem = 3
+        dimensions = np.array([[self.n_chord, self.n_span], [self.n_chord, self.n_span]])
+
+        # node 0 is the root, nodes 1 to 3 in the right wing and 4 to 6 in the left one
+        struct2aero_mapping = [[{'i_surf': 0, 'i_n': 0}, {'i_surf': 1, 'i_n': 0}]]
+        struct2aero_mapping += [[{'i_surf': 0, 'i_n': i_n}] for i_n in range(1, 4)]
+        struct2aero_mapping += [[{'i_surf': 1, 'i_n': i_n}] for i_n in range(1, 4)]
+        aero_node = np.ones((n_node,), dtype=bool)
+        aero_node[6] = False
+
+        data_dict = {'aero_node': aero_node,
+                     'airfoil_distribution': np.random.randint(0, 2, size=(n_elem, 3))}
+        aero = types.SimpleNamespace(data_dict=data_dict, polars=self.polars, dimensions=dimensions,
+                                     struct2aero_mapping=struct2aero_mapping)
+        structure = types.SimpleNamespace(num_node=n_node,
+                                          node_master_elem=np.array([[0, 0], [0, 2], [0, 1], [1, 1],
+                                                                     [2, 2], [2, 1], [1, 0]]))
+
+        pos = np.zeros((n_node, 3))
+        pos[1:4, 1] = np.arange(1, 4)
+        pos[4:, 1] = -np.arange(1, 4)
+        pos += 0.05*np.random.rand(n_node, 3)
+
+        zeta = []
+        u_ext = []
+        for sign in [1., -1.]:
+            surface = np.zeros((3, self.n_chord + 1, self.n_span + 1))
+            surface[0] = np.linspace(-0.25, 0.75, self.n_chord + 1)[:, None]
+            surface[1] = sign*np.arange(self.n_span + 1)[None, :]
+            surface += 0.05*np.random.rand(*surface.shape)
+            zeta.append(surface)
+            u_ext.append(np.array([10., 0., 1.])[:, None, None] + np.random.rand(3, self.n_chord + 1, self.n_span + 1))
+        aero_kstep = types.SimpleNamespace(zeta=zeta, u_ext=u_ext)
+
+        quat = algebra.euler2quat(0.1*np.random.rand(3))
+        structural_kstep = types.SimpleNamespace(quat=quat / np.linalg.norm(quat),
+                                                 pos=pos,
+                                                 pos_dot=np.random.rand(n_node, 3),
+                                                 psi=0.1*np.random.rand(n_elem, 3, 3),
+                                                 for_vel=np.random.rand(6))
+        struct_forces = 50.*(2.*np.random.rand(n_node, 6) - 1.)
+        return aero, structure, aero_kstep, structural_kstep, struct_forces
+
+    def test_generate(self):
+        aero, structure, aero_kstep, structural_kstep, struct_forces = self.mock_case()
+        for cd_from_cl, correct_lift, moment_from_polar, add_rotation in itertools.product([False, True], repeat=4):
+            for skip_surfaces in [[], [1]]:
+                settings = {'cd_from_cl': cd_from_cl,
+                            'correct_lift': correct_lift,
+                            'moment_from_polar': moment_from_polar,
+                            'add_rotation': add_rotation,
+                            'rot_vel_g': [0., 0.5, 0.],
+                            'centre_rot_g': [0.1, 0., 0.],
+                            'skip_surfaces': skip_surfaces,
+                            'aoa_cl0': [-0.03, -0.05]}
+                with self.subTest(**settings):
+                    generator = PolarCorrection()
+                    generator.initialise(settings, aero=aero, structure=structure, rho=1.225,
+                                         output_folder=self.folder)
+                    params = {'aero_kstep': aero_kstep,
+                              'structural_kstep': structural_kstep,
+                              'struct_forces': struct_forces,
+                              'ts': 0}
+                    np.testing.assert_allclose(generator.generate(**params), reference_generate(generator, **params),
+                                               rtol=1e-10, atol=1e-10*np.max(np.abs(struct_forces)))
+
+    def test_polar_tables(self):
+        tables = PolarTables(self.polars)
+        iairfoil = np.random.randint(0, 2, size=50)
+
+        aoa = np.random.uniform(-1., 1., size=50)
+        coefs = tables.get_coefs(aoa, iairfoil)
+        for isection in range(50):
+            np.testing.assert_allclose([coef[isection] for coef in coefs],
+                                       self.polars[iairfoil[isection]].get_coefs(aoa[isection]), rtol=1e-12)
+        with self.assertRaises(ValueError):
+            tables.get_coefs(np.array([4.]), np.array([0]))
+
+        cl = np.concatenate((np.random.uniform(-2.5, 2.5, size=48), [0., 3.5]))
+        cd, cm = tables.get_cdcm_from_cl(cl, iairfoil)
+        for isection in range(50):
+            np.testing.assert_allclose([cd[isection], cm[isection]],
+                                       self.polars[iairfoil[isection]].get_cdcm_from_cl(cl[isection]), rtol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
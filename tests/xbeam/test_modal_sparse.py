@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+import sharpy.structure.utils.modalutils as modalutils
+from tests.benchmark import benchmark, timeit
+
+
+class TestSparseModes(unittest.TestCase):
+    """
+    Compares the shift-invert sparse modal solvers against the dense ones used by the ``Modal`` solver on a banded
+    spring-mass chain
+    """
+
+    def setUp(self):
+        np.random.seed(11)
+
+    @staticmethod
+    def chain(num_dof, free=False):
+        stiffness = 1e3 * (1. + np.random.rand(num_dof + 1))
+        if free:
+            stiffness[0] = 0.
+        stiffness[-1] = 0.
+        K = np.diag(stiffness[:-1] + stiffness[1:]) - np.diag(stiffness[1:-1], 1) - np.diag(stiffness[1:-1], -1)
+        M = np.diag(1. + np.random.rand(num_dof))
+        M += 0.1 * (np.diag(np.diag(M)[1:], 1) + np.diag(np.diag(M)[1:], -1))
+        return M, K
+
+    def test_undamped(self):
+        num_modes = 8
+        for free in [False, True]:
+            with self.subTest(free=free):
+                M, K = self.chain(60, free=free)
+                eigenvalues, eigenvectors = modalutils.sparse_undamped_modes(M, K, num_modes)
+                order = np.argsort(eigenvalues)
+
+                reference = np.sort(np.linalg.eig(np.linalg.solve(M, K))[0].real)[:num_modes]
+                np.testing.assert_allclose(eigenvalues[order], reference, rtol=1e-8, atol=1e-8 * reference[-1])
+
+                phi = modalutils.scale_mass_normalised_modes(eigenvectors[:, order], M)
+                np.testing.assert_allclose(phi.T.dot(K.dot(phi)), np.diag(eigenvalues[order]),
+                                           atol=1e-8 * reference[-1])
+
+        # unsymmetric stiffness
+        M, K = self.chain(60)
+        K[0, 1] *= 1.01
+        eigenvalues = modalutils.sparse_undamped_modes(M, K, num_modes)[0]
+        reference = np.sort(np.linalg.eig(np.linalg.solve(M, K))[0].real)[:num_modes]
+        np.testing.assert_allclose(np.sort(eigenvalues), reference, rtol=1e-8)
+
+    def test_damped(self):
+        num_dof = 60
+        num_modes = 10
+        M, K = self.chain(num_dof)
+        C = 1e-3 * K + 1e-2 * M
+
+        eigenvalues, eigenvectors_left, eigenvectors = modalutils.sparse_damped_modes(M, C, K, num_modes)
+
+        Minv_neg = -np.linalg.inv(M)
+        A = np.block([[np.zeros_like(M), np.eye(num_dof)], [Minv_neg.dot(K), Minv_neg.dot(C)]])
+        reference = np.linalg.eigvals(A)
+        reference = reference[np.argsort(np.abs(reference))][:num_modes]
+        np.testing.assert_allclose(np.sort_complex(eigenvalues), np.sort_complex(reference), rtol=1e-8)
+
+        tolerance = 1e-8 * np.abs(A).max()
+        np.testing.assert_allclose(A.dot(eigenvectors), eigenvectors * eigenvalues, atol=tolerance)
+        left = eigenvectors_left.conj()
+        left /= np.linalg.norm(left, axis=0)
+        np.testing.assert_allclose(left.T.dot(A), eigenvalues[:, None] * left.T, atol=tolerance)
+        product = np.abs(left.T.dot(eigenvectors))
+        self.assertLess(np.max(product - np.diag(np.diag(product))), 1e-6 * np.min(np.diag(product)))
+
+    @benchmark
+    def test_benchmark(self):
+        num_dof = 1500
+        num_modes = 20
+        M, K = self.chain(num_dof)
+
+        dense_time = timeit(lambda: np.linalg.eig(np.linalg.solve(M, K)))
+        sparse_time = timeit(lambda: modalutils.sparse_undamped_modes(M, K, num_modes))
+        print('{:d} modes of {:d} degrees of freedom: {:.2e} s dense, {:.2e} s sparse shift-invert'.format(
+            num_modes, num_dof, dense_time, sparse_time))
+
+
+if __name__ == '__main__':
+    unittest.main()